@@ -3,12 +3,24 @@
 import type {
   TranscribeRequest,
   TranscribeResponse,
+  TranscribeStreamRecord,
   BatchTranscribeRequest,
+  BatchTranscribeResponse,
+  Job,
+  JobListResponse,
+  JobStatus,
+  JobSubmitRequest,
+  UploadOptions,
+  UploadResponse,
   RealtimeControlRequest,
   RealtimeStatus,
   MonitorRequest,
   MonitorStatus,
   ExportRequest,
+  ExportBundleRequest,
+  ExportBundleResponse,
+  ArchiveReadRequest,
+  ArchiveReadResponse,
   Settings,
   HealthResponse,
   ModelInfo,
@@ -95,7 +107,47 @@ export async function transcribe(
   });
 }
 
-export async function batchTranscribe(req: BatchTranscribeRequest): Promise<void> {
+/** Stream transcription records (segments, speakers, formatted text) as NDJSON */
+export async function* transcribeStream(
+  req: TranscribeRequest,
+  signal?: AbortSignal
+): AsyncGenerator<TranscribeStreamRecord> {
+  const headers: Record<string, string> = {
+    "Content-Type": "application/json",
+    Accept: "application/x-ndjson",
+  };
+  if (apiToken) {
+    headers["Authorization"] = `Bearer ${apiToken}`;
+  }
+  const res = await fetch(`${baseUrl}/api/transcribe`, {
+    method: "POST",
+    headers,
+    body: JSON.stringify(req),
+    signal,
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`API Error ${res.status}: ${await res.text()}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    let newline: number;
+    while ((newline = buffer.indexOf("\n")) >= 0) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line) {
+        yield JSON.parse(line) as TranscribeStreamRecord;
+      }
+    }
+    if (done) break;
+  }
+}
+
+export async function batchTranscribe(req: BatchTranscribeRequest): Promise<BatchTranscribeResponse> {
   return request("/api/batch-transcribe", {
     method: "POST",
     body: JSON.stringify(req),
@@ -110,6 +162,49 @@ export async function cancelBatch(): Promise<void> {
   return request("/api/cancel-batch", { method: "POST" });
 }
 
+// --- Jobs ---
+
+export async function submitJob(req: JobSubmitRequest): Promise<Job> {
+  return request("/api/jobs", {
+    method: "POST",
+    body: JSON.stringify(req),
+  });
+}
+
+export async function listJobs(params: { status?: JobStatus; batch_id?: string; limit?: number } = {}): Promise<JobListResponse> {
+  const query = new URLSearchParams();
+  if (params.status) query.set("status", params.status);
+  if (params.batch_id) query.set("batch_id", params.batch_id);
+  if (params.limit) query.set("limit", String(params.limit));
+  const qs = query.toString();
+  return request(`/api/jobs${qs ? `?${qs}` : ""}`);
+}
+
+export async function getJob(jobId: string): Promise<Job> {
+  return request(`/api/jobs/${encodeURIComponent(jobId)}`);
+}
+
+export async function cancelJob(jobId: string): Promise<Job> {
+  return request(`/api/jobs/${encodeURIComponent(jobId)}/cancel`, { method: "POST" });
+}
+
+/** Upload a file as the request body; transcription starts while it is still uploading */
+export async function uploadAndTranscribe(
+  file: Blob,
+  filename: string,
+  options: UploadOptions = {}
+): Promise<UploadResponse> {
+  const query = new URLSearchParams({ filename });
+  for (const [key, value] of Object.entries(options)) {
+    if (value !== undefined) query.set(key, String(value));
+  }
+  return request(`/api/upload?${query.toString()}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/octet-stream" },
+    body: file,
+  });
+}
+
 // --- Realtime ---
 
 export async function startRealtime(req: RealtimeControlRequest): Promise<void> {
@@ -219,3 +314,17 @@ export async function exportFile(format: string, req: ExportRequest): Promise<{
     body: JSON.stringify(req),
   });
 }
+
+export async function exportBundle(req: ExportBundleRequest): Promise<ExportBundleResponse> {
+  return request("/api/export/bundle", {
+    method: "POST",
+    body: JSON.stringify(req),
+  });
+}
+
+export async function readArchive(req: ArchiveReadRequest): Promise<ArchiveReadResponse> {
+  return request("/api/export/archive/read", {
+    method: "POST",
+    body: JSON.stringify(req),
+  });
+}
@@ -43,7 +43,12 @@ export const transcriptionError = writable<string | null>(null);
 
 // --- Batch processing state ---
 export const isBatchProcessing = writable(false);
-export const batchProgress = writable({ completed: 0, total: 0, filename: "" });
+export const batchProgress = writable<{
+  completed: number;
+  total: number;
+  filename: string;
+  eta_seconds?: number | null;
+}>({ completed: 0, total: 0, filename: "" });
 export const batchResults = writable<
   Array<{ file_path: string; text: string; success: boolean }>
 >([]);
@@ -61,9 +66,20 @@ export const realtimeVolume = writable(0);
 export const monitorStatus = writable<MonitorStatus>({
   is_running: false,
   folder_path: null,
+  folder_paths: [],
+  recursive: false,
   check_interval: 10,
   total_processed: 0,
   total_failed: 0,
+  mode: null,
+  pending_files: 0,
+  detected_files: 0,
+  last_detection_latency: null,
+  avg_detection_latency: null,
+  queued_files: 0,
+  in_flight_files: 0,
+  deferred_files: 0,
+  duplicate_files: 0,
 });
 
 // --- Derived stores ---
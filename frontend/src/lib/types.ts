@@ -16,36 +16,68 @@ export interface TranscribeRequest {
   use_llm_correction: boolean;
 }
 
+// Per-job stage timing (start_ms is relative to the root span)
+export interface TraceSpan {
+  name: string;
+  start_ms: number;
+  duration_ms: number;
+  attrs?: Record<string, unknown>;
+  children?: TraceSpan[];
+}
+
 export interface TranscribeResponse {
   text: string;
   segments: Segment[];
   duration: number | null;
+  job_id?: string | null;
+  trace?: TraceSpan | null;
 }
 
+// NDJSON streaming transcription (Accept: application/x-ndjson)
+export type TranscribeStreamRecord =
+  | { type: "job"; job_id: string }
+  | { type: "segment"; index: number; start: number; end: number; text: string }
+  | { type: "speaker"; speaker: string; start: number; end: number }
+  | { type: "text"; text: string }
+  | { type: "done"; job_id: string; segment_count: number; duration: number; trace?: TraceSpan | null }
+  | { type: "cancelled" | "error"; job_id: string; message: string };
+
 export interface BatchTranscribeRequest {
   file_paths: string[];
   enable_diarization: boolean;
   max_workers: number;
   remove_fillers: boolean;
   add_punctuation: boolean;
+  order?: BatchOrder;
 }
 
+export type BatchOrder = "submission" | "longest_first" | "shortest_first";
+
 export interface RealtimeControlRequest {
   model_size: string;
   device: string;
   buffer_duration: number;
   vad_threshold: number;
+  adaptive?: boolean;
+  target_latency?: number;
+  fallback_model_size?: string | null;
+  enable_refinement?: boolean;
 }
 
 export interface RealtimeStatus {
   is_running: boolean;
   is_paused: boolean;
   model_size: string | null;
+  decoding_profile?: string | null;
 }
 
 export interface MonitorRequest {
   folder_path: string;
   check_interval: number;
+  stable_seconds?: number;
+  max_in_flight?: number;
+  additional_folders?: string[];
+  recursive?: boolean;
   enable_diarization: boolean;
   auto_move: boolean;
   completed_folder: string | null;
@@ -54,9 +86,20 @@ export interface MonitorRequest {
 export interface MonitorStatus {
   is_running: boolean;
   folder_path: string | null;
+  folder_paths: string[];
+  recursive: boolean;
   check_interval: number;
   total_processed: number;
   total_failed: number;
+  mode: "events" | "polling" | null;
+  pending_files: number;
+  detected_files: number;
+  last_detection_latency: number | null;
+  avg_detection_latency: number | null;
+  queued_files: number;
+  in_flight_files: number;
+  deferred_files: number;
+  duplicate_files: number;
 }
 
 export interface ExportRequest {
@@ -66,17 +109,136 @@ export interface ExportRequest {
   format: string;
   include_timestamps: boolean;
   include_speakers: boolean;
+  metadata?: Record<string, unknown>;
+  engine_config?: Record<string, unknown>;
+}
+
+export type ExportFormat = "txt" | "docx" | "xlsx" | "srt" | "vtt" | "json" | "ktb";
+
+// One request, several formats written concurrently from one normalized transcript
+export interface ExportBundleRequest {
+  text: string;
+  segments: Segment[];
+  output_base: string;
+  formats: ExportFormat[];
+}
+
+export interface ExportBundleItem {
+  format: ExportFormat;
+  output_path: string;
+  success: boolean;
+  seconds: number;
+  error: string | null;
+}
+
+export interface ExportBundleResponse {
+  success: boolean;
+  results: ExportBundleItem[];
+  normalize_seconds: number;
+  total_seconds: number;
+  trace?: TraceSpan | null;
+}
+
+// Time-range read from a .ktb transcript archive (only overlapping blocks are decoded)
+export interface ArchiveReadRequest {
+  path: string;
+  start?: number | null;
+  end?: number | null;
+  include_text?: boolean;
+}
+
+export interface ArchiveReadResponse {
+  text: string | null;
+  segments: Segment[];
+  metadata: Record<string, unknown>;
+  engine_config: Record<string, unknown>;
+  total_segments: number;
+  duration: number;
 }
 
 export interface BatchTranscribeResponse {
   message: string;
   total_files: number;
+  batch_id?: string | null;
+}
+
+// Job queue
+export type JobPriority = "interactive" | "monitor" | "batch";
+export type JobStatus = "queued" | "running" | "completed" | "failed" | "cancelled";
+
+export interface JobSubmitRequest {
+  file_path: string;
+  priority?: JobPriority;
+  enable_diarization?: boolean;
+  remove_fillers?: boolean;
+  add_punctuation?: boolean;
+  format_paragraphs?: boolean;
+  write_output?: boolean;
+}
+
+export interface Job {
+  job_id: string;
+  kind: string;
+  priority: JobPriority;
+  file_path: string;
+  status: JobStatus;
+  progress: number;
+  result: { text?: string; segments?: Segment[]; output_path?: string } | null;
+  error: string | null;
+  batch_id: string | null;
+  created_at: number;
+  started_at: number | null;
+  finished_at: number | null;
+  cancel_requested: boolean;
+}
+
+export interface JobListResponse {
+  jobs: Job[];
+  queued: number;
+  running_job_id: string | null;
+}
+
+export interface UploadResponse {
+  upload_id: string;
+  job_id: string;
+  bytes_received: number;
+  status: JobStatus;
+  text: string | null;
+  segments: Segment[];
+  trace?: TraceSpan | null;
+}
+
+export interface UploadOptions {
+  enable_diarization?: boolean;
+  remove_fillers?: boolean;
+  add_punctuation?: boolean;
+  format_paragraphs?: boolean;
+  wait?: boolean;
+}
+
+/** job_segment: one transcribed segment of a streaming upload */
+export interface JobSegmentEventData {
+  job_id: string;
+  index: number;
+  start: number;
+  end: number;
+  text: string;
+}
+
+export interface JobEventData {
+  job_id: string;
+  status?: JobStatus;
+  priority?: JobPriority;
+  batch_id?: string | null;
+  value?: number;
+  error?: string | null;
 }
 
 export interface ExportResponse {
   success: boolean;
   output_path: string;
   message: string;
+  trace?: TraceSpan | null;
 }
 
 export interface FormatTextRequest {
@@ -139,6 +301,13 @@ export interface WsEvent {
   type: string;
   data: Record<string, unknown>;
   timestamp?: number;
+  /** Monotonic sequence number (absent on synthetic events such as replay_gap) */
+  seq?: number;
+}
+
+export interface ReplayGapEventData {
+  since: number;
+  oldest_seq: number | null;
 }
 
 export interface ProgressEventData {
@@ -157,27 +326,48 @@ export interface BatchProgressEventData {
   completed: number;
   total: number;
   filename: string;
+  progress?: number;
+  eta_seconds?: number | null;
 }
 
 export interface FileFinishedEventData {
   file_path: string;
   text: string;
   success: boolean;
+  duplicate_of?: string | null;
 }
 
 export interface AllFinishedEventData {
   success_count: number;
   failed_count: number;
+  duplicate_count?: number;
 }
 
 export interface TextReadyEventData {
   text: string;
+  segment_id?: number;
+}
+
+export interface RefinedTextEventData {
+  segment_ids: number[];
+  text: string;
+  draft_text: string;
 }
 
 export interface VolumeChangedEventData {
   level: number;
 }
 
+export interface DecodingProfileChangedEventData {
+  from: string;
+  to: string;
+  reason: string;
+  beam_size: number;
+  best_of: number;
+  buffer_duration: number;
+  fallback_model: boolean;
+}
+
 export interface NewFilesDetectedEventData {
   files: string[];
 }
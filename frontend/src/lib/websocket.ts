@@ -20,6 +20,9 @@ class WebSocketClient {
   private reconnectDelay = 1000;
   private maxReconnectDelay = 30000;
   private shouldReconnect = true;
+  private lastSeq: number | null = null;
+  /** Server-side flush window; events inside it arrive as one JSON array frame */
+  private batchMs = 30;
 
   /** Start WebSocket connection */
   connect(url: string) {
@@ -75,8 +78,14 @@ class WebSocketClient {
       return;
 
     try {
+      const params = new URLSearchParams();
       const token = getApiToken();
-      const wsUrl = token ? `${this.url}?token=${encodeURIComponent(token)}` : this.url;
+      if (token) params.set("token", token);
+      // Resume from the last received event so nothing is lost across reconnects
+      if (this.lastSeq !== null) params.set("since", String(this.lastSeq));
+      if (this.batchMs > 0) params.set("batch_ms", String(this.batchMs));
+      const query = params.toString();
+      const wsUrl = query ? `${this.url}?${query}` : this.url;
       this.ws = new WebSocket(wsUrl);
 
       this.ws.onopen = () => {
@@ -87,8 +96,12 @@ class WebSocketClient {
 
       this.ws.onmessage = (msg) => {
         try {
-          const event: WsEvent = JSON.parse(msg.data);
-          this._dispatch(event);
+          const payload: WsEvent | WsEvent[] = JSON.parse(msg.data);
+          const events = Array.isArray(payload) ? payload : [payload];
+          for (const event of events) {
+            if (typeof event.seq === "number") this.lastSeq = event.seq;
+            this._dispatch(event);
+          }
         } catch (e) {
           console.error("[WS] Parse error:", e);
         }
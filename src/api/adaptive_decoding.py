@@ -0,0 +1,192 @@
+"""
+負荷適応型デコードパラメータ制御
+リアルタイム文字起こしのキュー遅延と RTF を監視し、
+ビームサイズ・候補数・バッファ長・フォールバックモデルを段階的に切り替える。
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DecodingProfile:
+    """デコード設定の1段階"""
+    name: str
+    beam_size: int
+    best_of: int
+    buffer_scale: float = 1.0  # 基準バッファ長に対する倍率
+    use_fallback_model: bool = False
+
+
+# 高精度 → 低遅延 の順に並べる（インデックスが大きいほど軽量）
+DEFAULT_PROFILES = (
+    DecodingProfile("accurate", beam_size=5, best_of=5),
+    DecodingProfile("balanced", beam_size=3, best_of=3),
+    DecodingProfile("fast", beam_size=1, best_of=1),
+    DecodingProfile("faster", beam_size=1, best_of=1, buffer_scale=0.5),
+    DecodingProfile("fallback", beam_size=1, best_of=1, buffer_scale=0.5, use_fallback_model=True),
+)
+
+# 従来の固定設定（beam_size=1）に相当する初期段階
+DEFAULT_INITIAL_PROFILE = "fast"
+
+
+class AdaptiveDecodingController:
+    """
+    キュー遅延と RTF に基づくデコード設定コントローラ（スレッドセーフ）。
+
+    - 遅延 = キュー待ち時間 + 推論時間（バッファ確定からテキスト発行まで）
+    - 平滑化した遅延が目標を超えるか RTF が上限を超えたら即座に1段階軽量化
+    - 余裕のある状態が upgrade_patience 回連続したら1段階高精度化
+    - 段階が変わるたびにログ出力し、on_transition コールバックを呼ぶ
+    """
+
+    def __init__(self,
+                 target_latency: float = 2.0,
+                 profiles: Sequence[DecodingProfile] = DEFAULT_PROFILES,
+                 initial_profile: str = DEFAULT_INITIAL_PROFILE,
+                 allow_fallback_model: bool = False,
+                 rtf_high: float = 0.8,
+                 rtf_low: float = 0.4,
+                 smoothing: float = 0.3,
+                 upgrade_patience: int = 5,
+                 on_transition: Optional[Callable[[DecodingProfile, DecodingProfile, str], None]] = None):
+        """
+        初期化
+
+        Args:
+            target_latency: 目標遅延（秒）
+            profiles: デコード段階（高精度 → 低遅延の順）
+            initial_profile: 初期段階名
+            allow_fallback_model: フォールバックモデル段階を使用するか
+            rtf_high: この RTF を超えたら軽量化
+            rtf_low: この RTF 未満なら高精度化の候補
+            smoothing: EWMA 平滑化係数（0〜1、大きいほど直近を重視）
+            upgrade_patience: 高精度化に必要な連続余裕回数
+            on_transition: 段階変更時コールバック (old, new, reason)
+        """
+        if target_latency <= 0:
+            raise ValueError(f"target_latency must be positive, got {target_latency}")
+        if not 0.0 < smoothing <= 1.0:
+            raise ValueError(f"smoothing must be in (0, 1], got {smoothing}")
+
+        self._profiles: List[DecodingProfile] = [
+            p for p in profiles if allow_fallback_model or not p.use_fallback_model
+        ]
+        if not self._profiles:
+            raise ValueError("At least one decoding profile is required")
+
+        names = [p.name for p in self._profiles]
+        self._level = names.index(initial_profile) if initial_profile in names else 0
+
+        self.target_latency = target_latency
+        self.rtf_high = rtf_high
+        self.rtf_low = rtf_low
+        self.smoothing = smoothing
+        self.upgrade_patience = max(1, upgrade_patience)
+        self._on_transition = on_transition
+
+        self._lock = threading.Lock()
+        self._latency_ewma: Optional[float] = None
+        self._rtf_ewma: Optional[float] = None
+        self._headroom_streak = 0
+        self._observations = 0
+        self._transitions = 0
+
+    @property
+    def current(self) -> DecodingProfile:
+        """現在のデコード段階"""
+        with self._lock:
+            return self._profiles[self._level]
+
+    def disable_fallback_model(self) -> None:
+        """フォールバックモデル段階を無効化（モデルロード失敗時など）"""
+        with self._lock:
+            current = self._profiles[self._level]
+            self._profiles = [p for p in self._profiles if not p.use_fallback_model] or self._profiles
+            if current.use_fallback_model:
+                self._level = len(self._profiles) - 1
+            else:
+                self._level = self._profiles.index(current)
+        logger.info("Adaptive decoding: fallback model disabled")
+
+    def observe(self, audio_duration: float, processing_time: float, queue_lag: float) -> DecodingProfile:
+        """
+        1チャンク分の計測値を反映し、次に使うデコード段階を返す
+
+        Args:
+            audio_duration: チャンクの音声長（秒）
+            processing_time: 推論時間（秒）
+            queue_lag: チャンク確定から推論開始までの待ち時間（秒）
+
+        Returns:
+            次のチャンクに適用するデコード段階
+        """
+        rtf = processing_time / audio_duration if audio_duration > 0 else 0.0
+        latency = max(0.0, queue_lag) + max(0.0, processing_time)
+
+        transition = None
+        with self._lock:
+            self._observations += 1
+            a = self.smoothing
+            self._latency_ewma = latency if self._latency_ewma is None else a * latency + (1 - a) * self._latency_ewma
+            self._rtf_ewma = rtf if self._rtf_ewma is None else a * rtf + (1 - a) * self._rtf_ewma
+
+            old = self._profiles[self._level]
+            overloaded = self._latency_ewma > self.target_latency or self._rtf_ewma > self.rtf_high
+            has_headroom = self._latency_ewma < self.target_latency * 0.5 and self._rtf_ewma < self.rtf_low
+
+            if overloaded:
+                self._headroom_streak = 0
+                if self._level < len(self._profiles) - 1:
+                    self._level += 1
+                    transition = (old, self._profiles[self._level], "overload")
+            elif has_headroom:
+                self._headroom_streak += 1
+                if self._headroom_streak >= self.upgrade_patience and self._level > 0:
+                    self._level -= 1
+                    self._headroom_streak = 0
+                    transition = (old, self._profiles[self._level], "headroom")
+            else:
+                self._headroom_streak = 0
+
+            if transition:
+                self._transitions += 1
+                # 切り替え直後は新しい設定で測り直す
+                self._latency_ewma = None
+                self._rtf_ewma = None
+            current = self._profiles[self._level]
+
+        if transition:
+            old_profile, new_profile, reason = transition
+            logger.info(
+                f"Adaptive decoding: {old_profile.name} -> {new_profile.name} ({reason}, "
+                f"latency={latency:.2f}s, rtf={rtf:.2f}, lag={queue_lag:.2f}s, "
+                f"target={self.target_latency:.2f}s)"
+            )
+            if self._on_transition:
+                try:
+                    self._on_transition(old_profile, new_profile, reason)
+                except Exception as e:
+                    logger.debug(f"Transition callback failed: {e}")
+
+        return current
+
+    def get_stats(self) -> Dict:
+        """統計情報を取得"""
+        with self._lock:
+            return {
+                "profile": self._profiles[self._level].name,
+                "level": self._level,
+                "target_latency": self.target_latency,
+                "latency_ewma": self._latency_ewma,
+                "rtf_ewma": self._rtf_ewma,
+                "observations": self._observations,
+                "transitions": self._transitions,
+                "timestamp": time.time(),
+            }
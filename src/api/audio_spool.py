@@ -0,0 +1,127 @@
+"""
+リアルタイム音声スプール
+キャプチャした発話音声を固定サイズのディスク上リング（16bit PCM + メモリ内インデックス）に保存し、
+後段の高精度再文字起こしでセグメント単位に読み出せるようにする。
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AudioSpool:
+    """
+    ディスク上のリングバッファ（スレッドセーフ）。
+
+    - 音声は int16 PCM（モノラル）で追記し、容量に達したら先頭へ巻き戻る
+    - 上書きされたセグメントはインデックスから除去され、read() は None を返す
+    - close() で一時ファイルを削除
+    """
+
+    BYTES_PER_SAMPLE = 2
+
+    def __init__(self, sample_rate: int = 16000, max_seconds: float = 1800.0,
+                 directory: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            sample_rate: サンプリングレート
+            max_seconds: 保持する最大音声長（秒）
+            directory: スプールファイルの作成先（None の場合はシステム一時ディレクトリ）
+        """
+        if max_seconds <= 0:
+            raise ValueError(f"max_seconds must be positive, got {max_seconds}")
+        self.sample_rate = sample_rate
+        self.capacity = int(sample_rate * max_seconds) * self.BYTES_PER_SAMPLE
+
+        fd, self.path = tempfile.mkstemp(suffix=".pcm", prefix="realtime_spool_", dir=directory)
+        self._file = os.fdopen(fd, "w+b")
+        self._lock = threading.Lock()
+        self._write_pos = 0
+        # segment_id → (offset, nbytes)。挿入順 = リング上の古い順
+        self._index: "OrderedDict[int, Tuple[int, int]]" = OrderedDict()
+        self.evicted = 0
+
+    def append(self, segment_id: int, audio: np.ndarray) -> bool:
+        """
+        セグメント音声を追記
+
+        Args:
+            segment_id: セグメントID
+            audio: float32 音声（-1.0〜1.0）
+
+        Returns:
+            保存できた場合True（容量超過・クローズ済みの場合False）
+        """
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+        nbytes = len(pcm)
+        if nbytes == 0 or nbytes > self.capacity:
+            return False
+
+        with self._lock:
+            if self._file is None:
+                return False
+            if self._write_pos + nbytes > self.capacity:
+                self._write_pos = 0
+            start, end = self._write_pos, self._write_pos + nbytes
+            # 書き込み範囲に重なる最古のセグメントを除去（リングの先頭 = 最古）
+            while self._index:
+                oldest_id, (offset, length) = next(iter(self._index.items()))
+                if offset < end and start < offset + length:
+                    del self._index[oldest_id]
+                    self.evicted += 1
+                else:
+                    break
+            self._index.pop(segment_id, None)
+            self._file.seek(start)
+            self._file.write(pcm)
+            self._index[segment_id] = (start, nbytes)
+            self._write_pos = end
+        return True
+
+    def read(self, segment_id: int) -> Optional[np.ndarray]:
+        """セグメント音声を float32 で読み出す（上書き済み・未登録の場合None）"""
+        with self._lock:
+            if self._file is None:
+                return None
+            entry = self._index.get(segment_id)
+            if entry is None:
+                return None
+            offset, nbytes = entry
+            self._file.flush()
+            self._file.seek(offset)
+            data = self._file.read(nbytes)
+        return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def discard(self, segment_id: int) -> None:
+        """セグメントをインデックスから除去（領域は次の周回で再利用）"""
+        with self._lock:
+            self._index.pop(segment_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    def close(self) -> None:
+        """スプールファイルを閉じて削除"""
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._file.close()
+            except OSError as e:
+                logger.debug(f"Spool close failed: {e}")
+            self._file = None
+            self._index.clear()
+        try:
+            os.unlink(self.path)
+        except OSError as e:
+            logger.debug(f"Spool cleanup failed: {e}")
@@ -18,6 +18,9 @@ _config_manager = None
 _text_formatter = None
 _lock = threading.Lock()
 
+# エンジン排他ロック（JobScheduler がジョブ実行中に保持。バックグラウンド処理は空きを待つ）
+_engine_lock = threading.Lock()
+
 
 def get_transcription_engine():
     """TranscriptionEngine シングルトンを取得"""
@@ -78,6 +81,21 @@ def get_text_formatter():
     return _text_formatter
 
 
+def get_engine_lock() -> threading.Lock:
+    """TranscriptionEngine の排他ロックを取得"""
+    return _engine_lock
+
+
+def is_engine_busy() -> bool:
+    """
+    ジョブがエンジンを使用中、またはエンジン待ちのジョブがあるか（バックグラウンド処理の譲り合い用）
+    """
+    if _engine_lock.locked():
+        return True
+    from api.job_scheduler import has_active_job
+    return has_active_job()
+
+
 # --- 現在のワーカー状態管理 ---
 
 class WorkerState:
@@ -6,13 +6,176 @@ WebSocket ブリッジやワーカースレッドからの通知に使用。
 
 import asyncio
 import logging
+import os
 import queue
 import threading
 import time
-from typing import AsyncGenerator, Dict, Optional
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, FrozenSet, Iterable, List, Optional
+
+from api.event_log import EventLog
+from metrics import EVENTS_COALESCED, EVENTS_DROPPED, EVENTS_EMITTED
 
 logger = logging.getLogger(__name__)
 
+# 最新値のみ意味を持つイベント（未配信の同種イベントを上書きする）
+COALESCED_EVENT_TYPES = frozenset({
+    "progress",
+    "volume_changed",
+    "status_changed",
+    "status_update",
+    "batch_progress",
+    "job_progress",
+})
+
+# 必ず配信するイベント（キュー満杯でも破棄しない）
+TERMINAL_EVENT_TYPES = frozenset({
+    "finished",
+    "file_finished",
+    "all_finished",
+    "error",
+    "job_finished",
+    "__shutdown__",
+})
+
+
+class _Subscription:
+    """
+    サブスクライバー1件分の配信キュー（イベントループスレッド専用）。
+
+    - topics / job_id フィルタに一致するイベントのみ受理
+    - COALESCED_EVENT_TYPES は (type, job_id) ごとに未配信の1件を最新値に置き換える。
+      古い方を取り除いて末尾に積むため、キューは常に連番の昇順（クライアントの再接続位置
+      since が安全な基準になる）。後ろに終端イベントが積まれている場合は置き換えない
+    - 満杯時は最古の非終端イベントを破棄。TERMINAL_EVENT_TYPES は上限を超えても保持
+    - hold() 中に届いたライブイベントは release() まで保留（リプレイより先に並ばないように）
+    """
+
+    __slots__ = ("sub_id", "maxsize", "_exact_topics", "_topic_prefixes", "job_id",
+                 "_entries", "_coalesced", "_ready", "dropped", "coalesced", "last_seq",
+                 "_held", "_pushed", "_last_terminal")
+
+    def __init__(self, sub_id: int, maxsize: int,
+                 topics: Optional[Iterable[str]] = None,
+                 job_id: Optional[str] = None):
+        self.sub_id = sub_id
+        self.maxsize = maxsize
+        self._exact_topics: Optional[FrozenSet[str]] = None
+        self._topic_prefixes: tuple = ()
+        if topics:
+            topics = [t for t in topics if t]
+            self._exact_topics = frozenset(t for t in topics if not t.endswith("*"))
+            self._topic_prefixes = tuple(t[:-1] for t in topics if t.endswith("*"))
+        self.job_id = job_id
+        # エントリは [event, coalesce_key, 投入番号] のリスト
+        self._entries: Deque[list] = deque()
+        self._pushed = 0
+        # 最後に積んだ終端イベントの投入番号（これより前のエントリは置き換えない）
+        self._last_terminal = -1
+        self._coalesced: Dict[tuple, list] = {}
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.coalesced = 0
+        # 受理済みの最大連番（リプレイとライブ配信の重複排除用）
+        self.last_seq = 0
+        # リプレイ中に届いたライブイベント（None = 保留しない）
+        self._held: Optional[List[dict]] = None
+
+    def hold(self) -> None:
+        """以降の offer をリプレイ完了まで保留"""
+        self._held = []
+
+    def release(self, replay: Iterable[dict] = (), notice: Optional[dict] = None) -> None:
+        """通知・リプレイ分（フィルタ適用）に続けて、保留したライブイベントをキューへ移す"""
+        held, self._held = self._held or [], None
+        if notice is not None:
+            self.offer(notice)
+        for event in replay:
+            if self.accepts(event):
+                self.offer(event)
+        for event in held:
+            self.offer(event)
+
+    def accepts(self, event: dict) -> bool:
+        """フィルタ判定"""
+        event_type = event["type"]
+        if event_type == "__shutdown__":
+            return True
+        if self._exact_topics is not None and event_type not in self._exact_topics:
+            if not (self._topic_prefixes and event_type.startswith(self._topic_prefixes)):
+                return False
+        if self.job_id is not None and event["data"].get("job_id") != self.job_id:
+            return False
+        return True
+
+    def offer(self, event: dict) -> None:
+        """イベントをキューに追加（イベントループスレッドから呼ぶこと）"""
+        if self._held is not None:
+            self._held.append(event)
+            return
+        seq = event.get("seq")
+        if seq is not None:
+            if seq <= self.last_seq:
+                return
+            self.last_seq = seq
+        event_type = event["type"]
+        key = None
+        if event_type in COALESCED_EVENT_TYPES:
+            key = (event_type, event["data"].get("job_id"))
+            entry = self._coalesced.get(key)
+            if entry is not None and entry[2] > self._last_terminal:
+                # 古い方を取り除き、新しい方を末尾へ（連番の昇順を保つ）
+                for i, queued in enumerate(self._entries):
+                    if queued is entry:
+                        del self._entries[i]
+                        break
+                del self._coalesced[key]
+                self.coalesced += 1
+                EVENTS_COALESCED.inc()
+
+        if len(self._entries) >= self.maxsize and not self._drop_oldest():
+            if event_type not in TERMINAL_EVENT_TYPES:
+                self.dropped += 1
+                EVENTS_DROPPED.inc()
+                logger.warning(f"Event dropped for subscriber {self.sub_id}")
+                return
+
+        entry = [event, key, self._pushed]
+        self._pushed += 1
+        self._entries.append(entry)
+        if key is not None:
+            self._coalesced[key] = entry
+        if event_type in TERMINAL_EVENT_TYPES:
+            self._last_terminal = entry[2]
+        self._ready.set()
+
+    def _drop_oldest(self) -> bool:
+        """最古の非終端イベントを1件破棄。破棄できた場合True"""
+        for i, entry in enumerate(self._entries):
+            if entry[0]["type"] not in TERMINAL_EVENT_TYPES:
+                del self._entries[i]
+                if entry[1] is not None and self._coalesced.get(entry[1]) is entry:
+                    del self._coalesced[entry[1]]
+                self.dropped += 1
+                EVENTS_DROPPED.inc()
+                logger.warning(f"Event dropped for subscriber {self.sub_id}")
+                return True
+        return False
+
+    async def get(self) -> dict:
+        """次のイベントを取得"""
+        while not self._entries:
+            self._ready.clear()
+            await self._ready.wait()
+        entry = self._entries.popleft()
+        event, key = entry[0], entry[1]
+        if key is not None and self._coalesced.get(key) is entry:
+            del self._coalesced[key]
+        return event
+
+    def qsize(self) -> int:
+        return len(self._entries)
+
 
 class EventBus:
     """
@@ -21,10 +184,16 @@ class EventBus:
     - ワーカースレッド（sync）から emit() でイベントを発行
     - WebSocket ハンドラ（async）から subscribe() でイベントを受信
     - 複数のサブスクライバーに同時配信（ブロードキャスト）
+    - emit 1回につきイベントループへのコールバックは1回（ループ内で全購読者へ配信）
+    - 購読ごとに topics / job_id フィルタ、進捗系イベントの最新値コアレス、
+      終端イベント（finished 等）の確実な配信
+    - 全イベントに単調増加の連番（seq）を付与し、EventLog に保持。
+      subscribe(since=seq) で欠落分をリプレイしてからライブ配信に切り替える
     """
 
-    def __init__(self, maxsize: int = 1000):
-        self._subscribers: Dict[int, asyncio.Queue] = {}
+    def __init__(self, maxsize: int = 1000, replay_size: int = 2000,
+                 spill_path: Optional[str] = None):
+        self._subscribers: Dict[int, _Subscription] = {}
         self._lock = threading.Lock()
         self._counter = 0
         self._maxsize = maxsize
@@ -34,6 +203,9 @@ class EventBus:
         self._snapshot: Optional[list] = None
         # フォールバック: イベントループ未設定時の threading.Queue
         self._fallback_queues: Dict[int, queue.Queue] = {}
+        # リプレイログ（_lock 保持中にのみ操作）
+        self._seq = 0
+        self._log = EventLog(maxlen=replay_size, spill_path=spill_path)
 
     def set_loop(self, loop: asyncio.AbstractEventLoop):
         """メインの asyncio イベントループを設定"""
@@ -50,16 +222,28 @@ class EventBus:
                 self._snapshot = list(self._subscribers.items())
             return self._snapshot
 
+    def _in_loop_thread(self) -> bool:
+        """現在のスレッドで self._loop が実行中か"""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
     def shutdown(self):
         """シャットダウンフラグを設定し、全サブスクライバーにセンチネルを送信"""
         self._shutting_down = True
+        with self._lock:
+            self._log.close()
         sentinel = {"type": "__shutdown__", "data": {}, "timestamp": time.time()}
-        subscribers = self._get_snapshot()
-        for sub_id, queue in subscribers:
+        if not self._get_snapshot():
+            return
+        if self._loop and self._loop.is_running() and not self._in_loop_thread():
             try:
-                queue.put_nowait(sentinel)
-            except (asyncio.QueueFull, Exception):
+                self._loop.call_soon_threadsafe(self._dispatch, sentinel)
+                return
+            except RuntimeError:
                 pass
+        self._dispatch(sentinel)
 
     def emit(self, event_type: str, data: Optional[dict] = None):
         """
@@ -67,11 +251,12 @@ class EventBus:
         全サブスクライバーのキューにイベントを追加。
 
         スレッドセーフ実装:
-        - イベントループが稼働中 → call_soon_threadsafe() 経由で asyncio.Queue に追加
+        - イベントループが稼働中 → call_soon_threadsafe() で _dispatch を1回だけ予約
         - イベントループ未設定 → threading.Queue にフォールバック
         """
         if self._shutting_down:
             return
+        EVENTS_EMITTED.inc()
 
         event = {
             "type": event_type,
@@ -79,44 +264,41 @@ class EventBus:
             "timestamp": time.time(),
         }
 
-        subscribers = self._get_snapshot()
+        with self._lock:
+            # 連番付与・ログ追記・配信予約を同一ロック内で行い、スレッド間でも seq 順に配信する
+            self._seq += 1
+            event["seq"] = self._seq
+            self._log.append(event)
+            if self._snapshot is None:
+                self._snapshot = list(self._subscribers.items())
+            subscribers = self._snapshot
+            if not subscribers:
+                return
+            if self._loop and self._loop.is_running():
+                try:
+                    self._loop.call_soon_threadsafe(self._dispatch, event)
+                    return
+                except RuntimeError:
+                    # イベントループが停止中 — フォールバックに移行
+                    logger.debug("Event loop closing, falling back to threading.Queue")
 
-        for sub_id, async_queue in subscribers:
-            try:
-                if self._loop and self._loop.is_running():
-                    # asyncio.Queue への追加（スレッドセーフ）
-                    try:
-                        self._loop.call_soon_threadsafe(
-                            self._put_nowait, async_queue, event, sub_id
-                        )
-                    except RuntimeError:
-                        # イベントループが停止中 — フォールバックに移行
-                        logger.debug("Event loop closing, falling back to threading.Queue")
-                        self._put_to_fallback(sub_id, event)
-                else:
-                    # イベントループ未設定 — フォールバックキューを使用
-                    self._put_to_fallback(sub_id, event)
-            except Exception:
-                # 汎用的なエラーログ（情報漏洩防止）
-                logger.debug(f"Failed to emit event to subscriber {sub_id}")
+        # イベントループ未設定 — フォールバックキューを使用
+        for sub_id, subscription in subscribers:
+            if subscription.accepts(event):
+                self._put_to_fallback(sub_id, event)
 
-    def _put_nowait(self, async_queue: asyncio.Queue, event: dict, sub_id: int):
+    def _dispatch(self, event: dict):
         """
-        asyncio.Queue にイベントを追加（満杯時は古いイベントを破棄）
+        全サブスクライバーへ配信
         注: この関数はイベントループスレッド内で実行される（call_soon_threadsafe 経由）
         """
-        try:
-            async_queue.put_nowait(event)
-        except asyncio.QueueFull:
-            # 古いイベントを1つ破棄して再試行
-            try:
-                async_queue.get_nowait()
-            except asyncio.QueueEmpty:
-                pass
+        for sub_id, subscription in self._get_snapshot():
             try:
-                async_queue.put_nowait(event)
-            except asyncio.QueueFull:
-                logger.warning(f"Event dropped for subscriber {sub_id}")
+                if subscription.accepts(event):
+                    subscription.offer(event)
+            except Exception:
+                # 汎用的なエラーログ（情報漏洩防止）
+                logger.debug(f"Failed to emit event to subscriber {sub_id}")
 
     def _put_to_fallback(self, sub_id: int, event: dict):
         """
@@ -140,29 +322,61 @@ class EventBus:
             try:
                 fallback_q.put_nowait(event)
             except queue.Full:
+                EVENTS_DROPPED.inc()
                 logger.warning(f"Fallback event dropped for subscriber {sub_id}")
 
-    async def subscribe(self) -> AsyncGenerator[dict, None]:
+    async def subscribe(self, topics: Optional[Iterable[str]] = None,
+                        job_id: Optional[str] = None,
+                        since: Optional[int] = None) -> AsyncGenerator[dict, None]:
         """
         イベントストリームを購読。
         async for で使用:
             async for event in bus.subscribe():
                 print(event)
+            async for event in bus.subscribe(topics=["progress", "batch_*"], job_id="abc"):
+                ...
+
+        Args:
+            topics: 受信するイベント種別（末尾 * で前方一致、None で全種別）
+            job_id: data["job_id"] が一致するイベントのみ受信（None で全件）
+            since: 指定連番より後のイベントをログからリプレイしてからライブ配信に移行。
+                ログから消えたイベントがある場合は先頭に replay_gap イベントを配信する
 
         注: 購読開始時にフォールバックキューからイベントを移行しない。
         フォールバックキューは購読解除時にクリーンアップされる。
         """
-        async_queue: asyncio.Queue = asyncio.Queue(maxsize=self._maxsize)
         with self._lock:
             self._counter += 1
             sub_id = self._counter
-            self._subscribers[sub_id] = async_queue
+            subscription = _Subscription(sub_id, self._maxsize, topics=topics, job_id=job_id)
+            self._subscribers[sub_id] = subscription
             self._invalidate_snapshot()
+            if since is not None:
+                replay_snapshot = self._log.snapshot(since)
+                oldest_seq = self._log.oldest_seq
+                if replay_snapshot.needs_disk:
+                    subscription.hold()
 
         logger.debug(f"Subscriber {sub_id} registered")
         try:
+            if since is not None:
+                # 退避ファイルの読み出しはロック外・イベントループ外で行う
+                if replay_snapshot.needs_disk:
+                    replay, gap = await asyncio.to_thread(self._log.read_replay, replay_snapshot)
+                else:
+                    replay, gap = self._log.read_replay(replay_snapshot)
+                # 登録済みのため以降の emit はライブ配信される。ログと重複する分は last_seq で除外
+                gap_event = None
+                if gap:
+                    gap_event = {
+                        "type": "replay_gap",
+                        "data": {"since": since, "oldest_seq": oldest_seq},
+                        "timestamp": time.time(),
+                    }
+                subscription.release(replay, gap_event)
+                logger.debug(f"Subscriber {sub_id} replayed {len(replay)} events since {since}")
             while True:
-                event = await async_queue.get()
+                event = await subscription.get()
                 if event.get("type") == "__shutdown__":
                     break
                 yield event
@@ -180,6 +394,24 @@ class EventBus:
         with self._lock:
             return len(self._subscribers)
 
+    @property
+    def last_seq(self) -> int:
+        """最後に発行したイベントの連番"""
+        with self._lock:
+            return self._seq
+
+    def get_stats(self) -> List[dict]:
+        """サブスクライバーごとの配信統計（キュー長・破棄数・コアレス数）"""
+        return [
+            {
+                "subscriber_id": sub_id,
+                "queue_size": subscription.qsize(),
+                "dropped": subscription.dropped,
+                "coalesced": subscription.coalesced,
+            }
+            for sub_id, subscription in self._get_snapshot()
+        ]
+
 
 # グローバルシングルトン
 _event_bus: Optional[EventBus] = None
@@ -187,10 +419,15 @@ _event_bus_lock = threading.Lock()
 
 
 def get_event_bus() -> EventBus:
-    """EventBus シングルトンを取得"""
+    """
+    EventBus シングルトンを取得
+
+    環境変数 KOTOBA_EVENT_LOG にファイルパスを指定すると、
+    リプレイログから溢れたイベントをディスクへ退避する。
+    """
     global _event_bus
     if _event_bus is None:
         with _event_bus_lock:
             if _event_bus is None:
-                _event_bus = EventBus()
+                _event_bus = EventBus(spill_path=os.environ.get("KOTOBA_EVENT_LOG") or None)
     return _event_bus
@@ -0,0 +1,212 @@
+"""
+イベントログ — 再接続時のリプレイ用
+EventBus が発行したイベントを連番付きで保持するリングバッファ。
+メモリから溢れたイベントは任意で JSON Lines ファイルへ退避できる。
+"""
+
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReplaySnapshot:
+    """
+    リプレイ対象の確定結果（EventBus のロック内で取得し、ロック外で read_replay に渡す）
+
+    spill_range が None でなければ、退避ファイルから
+    spill_range[0] < seq < spill_range[1] のイベントを読む必要がある。
+    """
+    since: int
+    memory_events: List[dict]
+    last_seq: int
+    spill_range: Optional[Tuple[int, int]] = None
+    stale: bool = False         # since が最新連番より大きい（サーバー再起動前の連番）
+
+    @property
+    def needs_disk(self) -> bool:
+        return self.spill_range is not None
+
+
+class EventLog:
+    """
+    連番付きイベントのリプレイログ（スレッドセーフではない — EventBus のロック内で使用）。
+
+    - メモリ上に直近 maxlen 件を保持
+    - spill_path 指定時、溢れたイベントを JSON Lines で追記し、
+      spill_max_bytes を超えたら ``<spill_path>.1`` へローテーション（最大2世代）
+    """
+
+    def __init__(self, maxlen: int = 2000,
+                 spill_path: Optional[str] = None,
+                 spill_max_bytes: int = 8 * 1024 * 1024):
+        if maxlen <= 0:
+            raise ValueError(f"maxlen must be positive, got {maxlen}")
+        self.maxlen = maxlen
+        self._events: Deque[dict] = deque()
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self._spill_file = None
+        self._spill_bytes = 0
+        # ディスク上で参照可能な最古の連番（None = 退避なし）
+        self._spill_oldest_seq: Optional[int] = None
+        if spill_path:
+            self._open_spill(truncate=True)
+
+    # --- 書き込み ---
+
+    def append(self, event: dict) -> None:
+        """連番付きイベントを追加（event["seq"] は単調増加であること）"""
+        self._events.append(event)
+        if len(self._events) > self.maxlen:
+            evicted = self._events.popleft()
+            if self._spill_file is not None:
+                self._spill(evicted)
+
+    def _open_spill(self, truncate: bool = False) -> None:
+        try:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if truncate:
+                for path in (self.spill_path, self.spill_path + ".1"):
+                    if os.path.exists(path):
+                        os.unlink(path)
+            self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+            self._spill_bytes = 0
+        except OSError as e:
+            logger.warning(f"Event log spill disabled: {e}")
+            self._spill_file = None
+
+    def _spill(self, event: dict) -> None:
+        try:
+            line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        except (TypeError, ValueError):
+            return
+        try:
+            if self._spill_bytes + len(line) > self.spill_max_bytes:
+                self._rotate()
+                if self._spill_file is None:
+                    return
+            self._spill_file.write(line)
+            self._spill_bytes += len(line)
+            if self._spill_oldest_seq is None:
+                self._spill_oldest_seq = event["seq"]
+        except OSError as e:
+            logger.warning(f"Event log spill failed: {e}")
+
+    def _rotate(self) -> None:
+        """現行ファイルを .1 へ移動（旧 .1 は破棄）"""
+        self._spill_file.close()
+        self._spill_file = None
+        previous = self.spill_path + ".1"
+        os.replace(self.spill_path, previous)
+        self._spill_oldest_seq = self._first_seq_in(previous)
+        self._open_spill()
+
+    @staticmethod
+    def _first_seq_in(path: str) -> Optional[int]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                line = f.readline()
+            return json.loads(line)["seq"] if line else None
+        except (OSError, ValueError, KeyError):
+            return None
+
+    # --- 読み出し ---
+
+    @property
+    def last_seq(self) -> int:
+        """最新の連番（未発行なら0）"""
+        return self._events[-1]["seq"] if self._events else 0
+
+    @property
+    def oldest_seq(self) -> Optional[int]:
+        """リプレイ可能な最古の連番"""
+        if self._spill_oldest_seq is not None:
+            return self._spill_oldest_seq
+        return self._events[0]["seq"] if self._events else None
+
+    def since(self, seq: int) -> Tuple[List[dict], bool]:
+        """
+        指定連番より後のイベントを古い順に返す
+
+        Returns:
+            (イベントリスト, 欠落の有無)。欠落ありはログから既に消えたイベントがあることを示す
+
+        seq が最新連番より大きい場合（サーバー再起動前の連番）は全件を欠落ありで返す。
+        退避ファイルを読むため、ロック内・イベントループ上では snapshot() と
+        read_replay() に分けて使うこと。
+        """
+        return self.read_replay(self.snapshot(seq))
+
+    def snapshot(self, seq: int) -> ReplaySnapshot:
+        """メモリ上の対象イベントと退避ファイルから読む連番範囲を確定（ディスクは読まない）"""
+        last_seq = self.last_seq
+        stale = seq > last_seq
+        if stale:
+            seq = 0
+        memory_events = [e for e in self._events if e["seq"] > seq]
+        memory_oldest = self._events[0]["seq"] if self._events else None
+        spill_range = None
+        if memory_oldest is not None and seq + 1 < memory_oldest and self._spill_file is not None:
+            try:
+                # 対象範囲の行を書き切っておく（以降の読み出しはロック外）
+                self._spill_file.flush()
+                spill_range = (seq, memory_oldest)
+            except OSError:
+                pass
+        return ReplaySnapshot(seq, memory_events, last_seq, spill_range, stale)
+
+    def read_replay(self, snapshot: ReplaySnapshot) -> Tuple[List[dict], bool]:
+        """
+        snapshot() の結果からイベントを組み立てる（退避ファイルの読み出しを含む）
+
+        snapshot 以降に退避ファイルがローテーションされた場合、失われた分は欠落として扱う。
+        """
+        events: List[dict] = []
+        if snapshot.spill_range is not None:
+            events.extend(self._read_spill(*snapshot.spill_range))
+        events.extend(snapshot.memory_events)
+        if snapshot.stale:
+            return events, True
+
+        seq = snapshot.since
+        oldest = events[0]["seq"] if events else None
+        gap = oldest is not None and oldest > seq + 1
+        if not events and snapshot.last_seq > seq:
+            gap = True
+        return events, gap
+
+    def _read_spill(self, after_seq: int, before_seq: int) -> List[dict]:
+        """退避ファイルから after_seq < seq < before_seq のイベントを読み出す"""
+        events: List[dict] = []
+        for path in (self.spill_path + ".1", self.spill_path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            continue
+                        if after_seq < event.get("seq", 0) < before_seq:
+                            events.append(event)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Event log spill read failed: {e}")
+        return events
+
+    def close(self) -> None:
+        """退避ファイルを閉じる"""
+        if self._spill_file is not None:
+            try:
+                self._spill_file.close()
+            except OSError:
+                pass
+            self._spill_file = None
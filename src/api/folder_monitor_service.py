@@ -1,82 +1,158 @@
 """
 Qt-free フォルダ監視サービス
 threading.Thread + EventBus によるフォルダ監視。
+複数の監視フォルダ（ルート）を扱え、recursive=True ならサブフォルダ以下も監視する。
+watchdog が使える場合はファイルシステムイベントで変更されたパスだけを処理し、
+使えない場合（未インストール・監視開始失敗）は一定間隔の全体スキャンに戻る。
+JobScheduler を渡した場合は、準備完了ファイルを monitor 優先度のジョブとして直接投入する
+（内容が同一の文字起こし済みファイルがあれば、投入せずにその出力を再利用する）。
 """
 
 import os
 import time
 import logging
-import tempfile
 import threading
-from typing import List, Set, Optional
+from typing import Any, Dict, List, Set, Optional, Sequence
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
 
 from constants import SharedConstants
+from content_index import ContentIndex, get_content_index
+from file_readiness import ReadinessTracker, is_file_unlocked
+from folder_scanner import DirectoryScanner
+from processed_ledger import ProcessedLedger
+from metrics import FOLDER_DETECTION_SECONDS, FOLDER_FILES_DETECTED, FOLDER_SCAN_SECONDS
 from api.event_bus import EventBus, get_event_bus
+from api.job_scheduler import JobScheduler
+from api.monitor_queue import MonitorJobQueue
 
 logger = logging.getLogger(__name__)
 
+# 準備待ちファイルを再確認する最短間隔（秒）。ロック中のファイルで空回りしないための下限
+READINESS_RECHECK_MIN_SECONDS = 0.25
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """watchdog イベントを FolderMonitorService に渡す"""
+
+    def __init__(self, monitor: "FolderMonitorService"):
+        super().__init__()
+        self._monitor = monitor
+
+    def on_created(self, event):
+        self._monitor._on_path_changed(event.src_path, is_directory=event.is_directory)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._monitor._on_path_changed(event.src_path)
+
+    def on_moved(self, event):
+        self._monitor._on_path_changed(event.dest_path, is_directory=event.is_directory)
+
 
 class FolderMonitorService(threading.Thread):
     """
     フォルダ監視サービス（Qt非依存）。
     EventBus 経由で new_files_detected / status_update イベントを発行。
+
+    処理済み台帳は最初の監視フォルダ（folder_path）に置き、全ルートのファイルを記録する。
+
+    scheduler を渡すと、準備完了ファイルを文字起こしキューへ投入し（投入中のファイルは
+    再投入しない）、完了時に処理済みとしてマークする。in-flight が上限に達した間は
+    ファイルを保留し、空きができ次第投入する。new_files_detected は投入したファイルだけを通知する。
     """
 
     AUDIO_EXTENSIONS = SharedConstants.AUDIO_EXTENSIONS
     MAX_PROCESSED_ENTRIES = 50_000
 
     def __init__(self, folder_path: str, check_interval: int = 10,
-                 event_bus: Optional[EventBus] = None):
+                 event_bus: Optional[EventBus] = None, use_events: bool = True,
+                 stable_seconds: float = SharedConstants.FILE_STABLE_SECONDS,
+                 scheduler: Optional[JobScheduler] = None,
+                 job_options: Optional[Dict[str, Any]] = None,
+                 max_in_flight: int = SharedConstants.MONITOR_MAX_IN_FLIGHT,
+                 additional_folders: Optional[Sequence[str]] = None,
+                 recursive: bool = False,
+                 content_index: Optional[ContentIndex] = None):
         super().__init__(daemon=True)
         self.folder_path = folder_path
+        self.folder_paths = list(dict.fromkeys([folder_path, *(additional_folders or [])]))
+        self.recursive = recursive
         self.check_interval = check_interval
+        self.use_events = use_events and WATCHDOG_AVAILABLE
+        self.mode = "events" if self.use_events else "polling"
         self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
         self._processed_lock = threading.Lock()
-        self.processed_files: Set[str] = set()
+        self._ledger = ProcessedLedger.for_folder(folder_path)
+        # 前回の刈り込み後の件数（刈り込みの全件 stat を償却するため）
+        self._pruned_size = 0
         self._bus = event_bus or get_event_bus()
+
+        # イベントで変更通知されたパス（監視スレッドでまとめて処理）
+        self._changes_lock = threading.Lock()
+        self._changed_paths: Set[str] = set()
+        # 新しく現れたディレクトリ（中身はイベントが来ないため監視スレッドで走査する）
+        self._changed_dirs: Set[str] = set()
+        # ディレクトリ一覧のキャッシュ（更新時刻が変わらないディレクトリは読み直さない）
+        self._scanner = DirectoryScanner(self.folder_paths, self.AUDIO_EXTENSIONS, recursive=recursive)
+        # 未処理ファイルの準備状態（スキャン・イベントの間で保持）
+        self._readiness = ReadinessTracker(stable_seconds, lock_check=lambda path: self.is_file_ready(path))
+
+        # 検出遅延（ファイル最終更新から検出まで）
+        self._stats_lock = threading.Lock()
+        self._detected_count = 0
+        self._latency_total = 0.0
+        self._last_latency: Optional[float] = None
+        self._duplicate_count = 0
+
         self.load_processed_files()
 
-        logger.info(f"FolderMonitorService initialized: {folder_path}, interval: {check_interval}s")
+        # 文字起こしキューへの受け渡し（上限超過で保留中のファイルは検出順に保持）
+        self._queue: Optional[MonitorJobQueue] = None
+        if scheduler is not None:
+            self._queue = MonitorJobQueue(
+                scheduler, self.folder_paths, on_completed=self.mark_as_processed,
+                on_change=self._wakeup.set, max_in_flight=max_in_flight, options=job_options,
+            )
+        self._deferred: Dict[str, None] = {}
+        # 重複録音の検出（キューへ投入する場合のみ）
+        self._content_index: Optional[ContentIndex] = None
+        if scheduler is not None:
+            self._content_index = content_index or get_content_index()
+
+        logger.info(f"FolderMonitorService initialized: {', '.join(self.folder_paths)}, "
+                    f"recursive: {recursive}, interval: {check_interval}s")
+
+    @property
+    def processed_files(self) -> ProcessedLedger:
+        """処理済みファイル（台帳。in / len / 反復が O(1)〜O(n) で使える）"""
+        return self._ledger
+
+    @processed_files.setter
+    def processed_files(self, paths):
+        self._ledger.replace(paths)
 
     def load_processed_files(self):
-        """処理済みファイルリストを読み込み"""
+        """処理済みファイル台帳を読み込み（旧 .processed_files.txt は初回に取り込む）"""
         try:
-            processed_file_path = os.path.join(self.folder_path, '.processed_files.txt')
-            if os.path.exists(processed_file_path):
-                MAX_PROCESSED_SIZE = 50 * 1024 * 1024
-                file_size = os.path.getsize(processed_file_path)
-                if file_size > MAX_PROCESSED_SIZE:
-                    logger.error(f"Processed files list too large: {file_size} bytes")
-                    self.processed_files = set()
-                    return
-                with open(processed_file_path, 'r', encoding='utf-8') as f:
-                    self.processed_files = set(line.strip() for line in f if line.strip())
-                logger.info(f"Loaded {len(self.processed_files)} processed files")
-        except (IOError, OSError, UnicodeDecodeError) as e:
+            self._ledger.load()
+        except (IOError, OSError, UnicodeDecodeError, ValueError) as e:
             logger.error(f"Failed to load processed files: {e}")
-            self.processed_files = set()
         except Exception as e:
             logger.error(f"Failed to load processed files: {e}")
-            self.processed_files = set()
 
     def save_processed_files(self):
-        """処理済みファイルリストを保存（アトミック書き込み）"""
+        """処理済みファイル台帳を有効な記録だけで書き直す（アトミック書き込み）"""
         try:
-            with self._processed_lock:
-                files_copy = sorted(self.processed_files)
-            processed_file_path = os.path.join(self.folder_path, '.processed_files.txt')
-            fd, tmp_path = tempfile.mkstemp(dir=self.folder_path, suffix='.tmp')
-            try:
-                with os.fdopen(fd, 'w', encoding='utf-8') as f:
-                    for file_path in files_copy:
-                        f.write(f"{file_path}\n")
-                os.replace(tmp_path, processed_file_path)
-            except BaseException:
-                try:
-                    os.unlink(tmp_path)
-                except OSError:
-                    pass
-                raise
+            self._ledger.compact()
         except (IOError, OSError) as e:
             logger.error(f"Failed to save processed files: {e}")
         except Exception as e:
@@ -87,149 +163,362 @@ class FolderMonitorService(threading.Thread):
         ext = os.path.splitext(file_path)[1].lower()
         return ext in self.AUDIO_EXTENSIONS
 
+    @staticmethod
+    def _transcription_name(file_path: str) -> str:
+        return f"{os.path.splitext(os.path.basename(file_path))[0]}_文字起こし.txt"
+
     def is_processed(self, file_path: str) -> bool:
         """処理済みかチェック"""
-        base_name = os.path.splitext(file_path)[0]
-        transcription_file = f"{base_name}_文字起こし.txt"
+        transcription_file = os.path.join(os.path.dirname(file_path), self._transcription_name(file_path))
         abs_path = os.path.abspath(file_path)
         with self._processed_lock:
             return os.path.exists(transcription_file) or abs_path in self.processed_files
 
+    def _is_processed_scanned(self, file_path: str) -> bool:
+        """スキャン済みファイルの処理済みチェック（出力ファイルの有無はディレクトリ一覧で確認）"""
+        directory = os.path.dirname(file_path)
+        if self._scanner.has_entry(directory, self._transcription_name(file_path)):
+            return True
+        with self._processed_lock:
+            return os.path.abspath(file_path) in self.processed_files
+
     def get_unprocessed_files(self) -> List[str]:
-        """未処理ファイルを取得"""
-        unprocessed = []
+        """
+        未処理で準備完了のファイルを取得
+
+        準備中のファイルは追跡を続け、次回以降のスキャン・確認で判定する。
+        """
+        with FOLDER_SCAN_SECONDS.time():
+            unprocessed = self._scan_unprocessed()
+        FOLDER_FILES_DETECTED.inc(len(unprocessed))
+        return unprocessed
+
+    def _scan_unprocessed(self) -> List[str]:
+        candidates = []
         try:
-            if not os.path.exists(self.folder_path):
-                logger.warning(f"Folder does not exist: {self.folder_path}")
-                return []
-            for item in os.listdir(self.folder_path):
-                file_path = os.path.join(self.folder_path, item)
-                if not os.path.isfile(file_path):
-                    continue
-                if not self.is_audio_file(file_path):
+            for root in self.folder_paths:
+                if not os.path.isdir(root):
+                    logger.warning(f"Folder does not exist: {root}")
+            # 種別・拡張子は DirEntry で判定し、変化のないディレクトリは前回の一覧を使う
+            for file_path in self._scanner.scan():
+                if self._is_processed_scanned(file_path):
                     continue
-                if self.is_processed(file_path):
-                    continue
-                if self.is_file_ready(file_path):
-                    unprocessed.append(file_path)
+                candidates.append(file_path)
         except (IOError, OSError) as e:
             logger.error(f"I/O error getting unprocessed files: {e}")
         except Exception as e:
             logger.error(f"Error getting unprocessed files: {e}")
-        return unprocessed
+        # 全候補を1回の stat で判定（待機なし）
+        return self._readiness.update(candidates)
 
     def is_file_ready(self, file_path: str) -> bool:
-        """ファイルが読み取り可能かチェック"""
+        """
+        ファイルが空でなく、他プロセスにロックされていないかチェック
+
+        サイズ・更新時刻の安定判定は ReadinessTracker が行う。
+        """
         try:
             if os.path.getsize(file_path) == 0:
                 return False
-            try:
-                with open(file_path, 'r+b') as f:
-                    if os.name == 'nt':
-                        import msvcrt
-                        try:
-                            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
-                            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
-                        except IOError:
-                            return False
-                    else:
-                        import fcntl
-                        try:
-                            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                        except IOError:
-                            return False
-                    f.read(1)
-            except PermissionError:
-                return False
-
-            size1 = os.path.getsize(file_path)
-            time.sleep(1)
-            size2 = os.path.getsize(file_path)
-            return size1 == size2
-        except (OSError, IOError):
+        except OSError:
             return False
+        return is_file_unlocked(file_path)
+
+    def _root_of(self, path: str) -> Optional[str]:
+        """path を含む監視フォルダ（どれにも含まれなければ None）"""
+        abs_path = os.path.abspath(path)
+        for root in self.folder_paths:
+            folder_abs = os.path.abspath(root)
+            if abs_path == folder_abs or abs_path.startswith(folder_abs + os.sep):
+                return root
+        return None
 
     def _validate_within_folder(self, file_path: str) -> str:
-        """ファイルパスが監視フォルダ内であることを検証"""
-        abs_path = os.path.abspath(file_path)
-        folder_abs = os.path.abspath(self.folder_path)
-        if not abs_path.startswith(folder_abs + os.sep) and abs_path != folder_abs:
+        """ファイルパスがいずれかの監視フォルダ内であることを検証"""
+        if self._root_of(file_path) is None:
             raise ValueError("パスが監視フォルダ外です")
-        return abs_path
+        return os.path.abspath(file_path)
 
     def _prune_processed_files(self):
-        """メモリ上の処理済みセットがMAX_PROCESSED_ENTRIESを超えた場合、ディスク不在エントリを除去"""
+        """
+        処理済み台帳がMAX_PROCESSED_ENTRIESを超えた場合、ディスク不在エントリを除去
+
+        全件の存在確認は、前回の刈り込み後の件数の2倍に達するまで繰り返さない。
+        """
         with self._processed_lock:
-            if len(self.processed_files) <= self.MAX_PROCESSED_ENTRIES:
+            before = len(self._ledger)
+            if before <= max(self.MAX_PROCESSED_ENTRIES, 2 * self._pruned_size):
                 return
-            before = len(self.processed_files)
-            self.processed_files = {p for p in self.processed_files if os.path.exists(p)}
-            after = len(self.processed_files)
+            removed = [p for p in self._ledger if not os.path.exists(p)]
+            for path in removed:
+                self._ledger.remove(path)
+            after = len(self._ledger)
+            self._pruned_size = after
         if before != after:
             logger.info(f"Pruned processed_files: {before} -> {after}")
             self.save_processed_files()
 
     def mark_as_processed(self, file_path: str):
-        """ファイルを処理済みとしてマーク"""
+        """ファイルを処理済みとしてマーク（台帳への1行追記）"""
         abs_path = self._validate_within_folder(file_path)
-        with self._processed_lock:
-            self.processed_files.add(abs_path)
+        try:
+            with self._processed_lock:
+                self._ledger.mark(abs_path)
+        except (IOError, OSError) as e:
+            logger.error(f"Failed to record processed file: {e}")
         self._prune_processed_files()
-        self.save_processed_files()
         logger.info(f"Marked as processed: {abs_path}")
 
     def remove_from_processed(self, file_path: str):
-        """処理済みリストからファイルを削除"""
+        """処理済み台帳からファイルを削除"""
         abs_path = self._validate_within_folder(file_path)
-        with self._processed_lock:
-            if abs_path in self.processed_files:
-                self.processed_files.remove(abs_path)
-                needs_save = True
-            else:
-                needs_save = False
-        if needs_save:
-            self.save_processed_files()
+        try:
+            with self._processed_lock:
+                self._ledger.remove(abs_path)
+        except (IOError, OSError) as e:
+            logger.error(f"Failed to record processed file removal: {e}")
+
+    def _on_path_changed(self, path: str, is_directory: bool = False):
+        """
+        watchdog スレッドから呼ばれる。音声ファイルと新しいディレクトリだけを記録して監視スレッドを起こす
+
+        ディレクトリごと移動・コピーされた場合は中のファイルのイベントが来ないため、
+        ディレクトリを記録しておき監視スレッドで走査する。
+        """
+        if is_directory:
+            if not self.recursive or os.path.basename(path).startswith('.'):
+                return
+        elif not self.is_audio_file(path):
+            return
+        root = self._root_of(path)
+        if root is None:
+            return
+        # スキャン結果と同じキーになるよう監視フォルダ基準のパスにそろえる
+        normalized = os.path.join(root, os.path.relpath(path, root))
+        with self._changes_lock:
+            (self._changed_dirs if is_directory else self._changed_paths).add(normalized)
+        self._wakeup.set()
+
+    def _start_observer(self):
+        """watchdog の監視を開始（失敗時は None を返してポーリングに戻る）"""
+        if not self.use_events:
+            return None
+        try:
+            observer = Observer()
+            handler = _ChangeHandler(self)
+            for root in self.folder_paths:
+                observer.schedule(handler, root, recursive=self.recursive)
+            observer.daemon = True
+            observer.start()
+            return observer
+        except Exception as e:
+            logger.warning(f"Filesystem events unavailable for {', '.join(self.folder_paths)}, "
+                           f"falling back to polling: {e}")
+            return None
+
+    def _record_detection(self, files: List[str]):
+        """最終更新から検出までの遅延を記録"""
+        now = time.time()
+        latencies = []
+        for file_path in files:
+            try:
+                latencies.append(max(0.0, now - os.path.getmtime(file_path)))
+            except OSError:
+                continue
+        if not latencies:
+            return
+        for latency in latencies:
+            FOLDER_DETECTION_SECONDS.observe(latency)
+        with self._stats_lock:
+            self._detected_count += len(latencies)
+            self._latency_total += sum(latencies)
+            self._last_latency = latencies[-1]
+
+    def _emit_detected(self, files: List[str], status: Optional[str] = None):
+        logger.info(f"Found {len(files)} unprocessed files")
+        self._bus.emit("status_update", {"status": status or f"{len(files)}個の未処理ファイルを検出"})
+        self._bus.emit("new_files_detected", {"files": files})
+
+    def _dispatch(self, files: List[str], status: Optional[str] = None) -> List[str]:
+        """
+        準備完了ファイルを引き渡す
+
+        ジョブキューがあれば保留中のファイルに続けて投入し、投入できたものだけを通知する。
+        なければ従来どおり渡されたファイルをすべて通知する（処理済みマークはクライアントが行う）。
+
+        Returns:
+            通知したファイル
+        """
+        if self._queue is None:
+            if files:
+                self._emit_detected(files, status)
+            return files
+        candidates = [p for p in self._deferred if os.path.isfile(p) and not self.is_processed(p)]
+        # 保留分は検出時に確認済み
+        candidates += [p for p in files if p not in self._deferred and not self._reuse_duplicate(p)]
+        accepted, deferred = self._queue.offer(candidates)
+        self._deferred = dict.fromkeys(deferred)
+        if accepted:
+            self._emit_detected(accepted, status)
+        return accepted
+
+    def _reuse_duplicate(self, file_path: str) -> bool:
+        """
+        内容が同一の文字起こし済みファイルがあれば、その出力をコピーして処理済みにする
+
+        Returns:
+            再利用した場合 True（キューへは投入しない）
+        """
+        if self._content_index is None or self._queue.is_in_flight(file_path):
+            return False
+        match = self._content_index.find_duplicate(file_path, options=self._queue.options)
+        if match is None:
+            return False
+        try:
+            self._content_index.reuse(match, file_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to reuse transcript for duplicate {file_path}: {e}")
+            return False
+        self.mark_as_processed(file_path)
+        with self._stats_lock:
+            self._duplicate_count += 1
+        self._bus.emit("status_update", {
+            "status": f"重複ファイルのため既存の文字起こしを再利用: {os.path.basename(file_path)}"
+        })
+        return True
+
+    def _next_wait(self, limit: float) -> float:
+        """次の確認までの待ち時間（準備中のファイルが安定時間に達する時刻まで）"""
+        delay = self._readiness.next_check_delay()
+        if delay is None:
+            return max(0.0, limit)
+        return max(0.0, min(limit, max(delay, READINESS_RECHECK_MIN_SECONDS)))
+
+    def _collect_ready_files(self) -> List[str]:
+        """変更通知されたパスを追跡に加え、準備完了したものを返す（返したものは追跡から外す）"""
+        with self._changes_lock:
+            changed, self._changed_paths = self._changed_paths, set()
+            changed_dirs, self._changed_dirs = self._changed_dirs, set()
+        for directory in sorted(changed_dirs):
+            changed.update(p for p in self._scanner.scan_tree(directory)
+                           if not self._is_processed_scanned(p))
+        self._readiness.add(changed)
+
+        ready = []
+        for file_path in sorted(self._readiness.check()):
+            self._readiness.discard(file_path)
+            if not self.is_processed(file_path):
+                ready.append(file_path)
+        return ready
+
+    def _run_events(self, observer):
+        """イベント駆動ループ: 変更されたパスと準備待ちファイルだけを確認する"""
+        while not self._stop_event.is_set():
+            if not observer.is_alive():
+                logger.warning("Filesystem observer stopped unexpectedly, falling back to polling")
+                self.mode = "polling"
+                self._run_polling()
+                return
+            self._wakeup.wait(timeout=self._next_wait(self.check_interval))
+            self._wakeup.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                ready = self._collect_ready_files()
+                if ready:
+                    FOLDER_FILES_DETECTED.inc(len(ready))
+                    self._record_detection(ready)
+                if ready or self._deferred:
+                    self._dispatch(ready)
+            except Exception as e:
+                logger.error(f"Error in monitoring loop: {e}")
+
+    def _run_polling(self):
+        """
+        ポーリングループ: check_interval ごとにフォルダ全体をスキャンする
+
+        スキャンの間も、準備中のファイルが安定時間に達したら追跡中のものだけを確認する。
+        ジョブキューに空きができたとき（_wakeup）も保留中のファイルを投入するため起きる。
+        """
+        next_scan = 0.0
+        while not self._stop_event.is_set():
+            try:
+                if time.monotonic() >= next_scan:
+                    already_ready = set(self._readiness.ready_paths())
+                    unprocessed_files = self.get_unprocessed_files()
+                    next_scan = time.monotonic() + self.check_interval
+                    newly_ready = [p for p in unprocessed_files if p not in already_ready]
+                else:
+                    unprocessed_files = newly_ready = [
+                        p for p in self._readiness.check() if not self.is_processed(p)
+                    ]
+                    FOLDER_FILES_DETECTED.inc(len(unprocessed_files))
+                if newly_ready:
+                    self._record_detection(newly_ready)
+                if unprocessed_files or self._deferred:
+                    self._dispatch(unprocessed_files)
+            except Exception as e:
+                logger.error(f"Error in monitoring loop: {e}")
+            self._wakeup.wait(timeout=self._next_wait(next_scan - time.monotonic()))
+            self._wakeup.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """監視方式・準備待ち件数・検出遅延・ジョブキューの件数"""
+        with self._stats_lock:
+            count, total, last = self._detected_count, self._latency_total, self._last_latency
+            duplicates = self._duplicate_count
+        status = {
+            "mode": self.mode,
+            "pending_files": self._readiness.pending_count,
+            "detected_files": count,
+            "last_detection_latency": None if last is None else round(last, 3),
+            "avg_detection_latency": round(total / count, 3) if count else None,
+            "deferred_files": len(self._deferred),
+        }
+        if self._queue is not None:
+            status.update(self._queue.get_status())
+            status["duplicate_files"] = duplicates + status.pop("duplicate_jobs")
+        return status
 
     def run(self):
         """監視ループ"""
         self._stop_event.clear()
-        logger.info(f"Folder monitoring started: {self.folder_path}")
-        self._bus.emit("status_update", {"status": f"フォルダ監視開始: {self.folder_path}"})
+        folders = ', '.join(self.folder_paths)
+        logger.info(f"Folder monitoring started: {folders}")
+        self._bus.emit("status_update", {"status": f"フォルダ監視開始: {folders}"})
 
-        # 起動時に即座に全ファイルスキャン
+        # 初回スキャン中に作成されたファイルを取りこぼさないよう、監視を先に開始する
+        observer = self._start_observer()
+        self.mode = "events" if observer else "polling"
+        logger.info(f"Folder monitor mode: {self.mode}")
+
+        # 起動時に即座に全ファイルスキャン（準備中のファイルは追跡を続ける）
         try:
             logger.info("Initial scan: checking all files in folder")
             unprocessed_files = self.get_unprocessed_files()
+            if observer:
+                for file_path in unprocessed_files:
+                    self._readiness.discard(file_path)
 
             if unprocessed_files:
                 logger.info(f"Initial scan: found {len(unprocessed_files)} unprocessed files")
-                self._bus.emit("status_update", {
-                    "status": f"初回スキャン: {len(unprocessed_files)}個の未処理ファイルを検出"
-                })
-                self._bus.emit("new_files_detected", {"files": unprocessed_files})
+                self._dispatch(unprocessed_files,
+                               status=f"初回スキャン: {len(unprocessed_files)}個の未処理ファイルを検出")
             else:
                 logger.info("Initial scan: no unprocessed files found")
                 self._bus.emit("status_update", {"status": "初回スキャン: 未処理ファイルなし"})
         except Exception as e:
             logger.error(f"Error in initial scan: {e}")
 
-        while not self._stop_event.is_set():
-            try:
-                unprocessed_files = self.get_unprocessed_files()
-                if unprocessed_files:
-                    logger.info(f"Found {len(unprocessed_files)} unprocessed files")
-                    self._bus.emit("status_update", {
-                        "status": f"{len(unprocessed_files)}個の未処理ファイルを検出"
-                    })
-                    self._bus.emit("new_files_detected", {"files": unprocessed_files})
-
-                if self._stop_event.wait(timeout=self.check_interval):
-                    break
-            except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
-                if self._stop_event.wait(timeout=self.check_interval):
-                    break
+        try:
+            if observer:
+                self._run_events(observer)
+            else:
+                self._run_polling()
+        finally:
+            if observer:
+                observer.stop()
+                observer.join(timeout=5)
 
         logger.info("Folder monitoring stopped")
         self._bus.emit("status_update", {"status": "フォルダ監視停止"})
@@ -237,4 +526,5 @@ class FolderMonitorService(threading.Thread):
     def stop(self):
         """監視停止"""
         self._stop_event.set()
+        self._wakeup.set()
         logger.info("Stopping folder monitor...")
@@ -0,0 +1,546 @@
+"""
+ジョブスケジューラ
+JobStore のジョブを優先度順に1件ずつ実行し、エンジンを途切れなく稼働させる。
+進捗・完了は EventBus に job_id 付きで発行する。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import tracing
+from audio_metadata import order_by_duration
+from profiling import get_job_profiler
+from api.event_bus import EventBus, get_event_bus
+from api.job_store import JobStore, Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job, "JobContext"], Dict[str, Any]]
+RecordListener = Callable[[str, Dict[str, Any]], None]
+
+# ジョブ種別 → api.workers の既定ハンドラ名（遅延インポート: torch 等の依存を起動時に読まない）
+_DEFAULT_HANDLERS: Dict[str, str] = {
+    "transcribe": "run_transcription_job",
+    "upload": "run_upload_transcription_job",
+}
+
+# 終端ジョブの保持期間の既定値（日）と、削除を試みる間隔（秒）
+DEFAULT_JOB_RETENTION_DAYS = 7.0
+JOB_PURGE_INTERVAL_SECONDS = 3600.0
+
+# クライアントへ返すエラーメッセージ（詳細はログのみ — 情報漏洩防止）
+JOB_FAILED_MESSAGE = "文字起こし処理中にエラーが発生しました"
+
+
+def default_retention_seconds() -> Optional[float]:
+    """
+    終端ジョブの保持期間（環境変数 KOTOBA_JOB_RETENTION_DAYS で上書き可能）
+
+    0 以下を指定すると削除しない（None を返す）。
+    """
+    value = os.environ.get("KOTOBA_JOB_RETENTION_DAYS")
+    try:
+        days = float(value) if value else DEFAULT_JOB_RETENTION_DAYS
+    except ValueError:
+        logger.warning(f"Invalid KOTOBA_JOB_RETENTION_DAYS: {value!r}")
+        days = DEFAULT_JOB_RETENTION_DAYS
+    return days * 24 * 3600 if days > 0 else None
+
+
+class JobCancelled(Exception):
+    """実行中ジョブのキャンセル要求"""
+    pass
+
+
+class JobContext:
+    """ハンドラに渡す実行コンテキスト（進捗通知・キャンセル確認）"""
+
+    def __init__(self, scheduler: "JobScheduler", job: Job):
+        self._scheduler = scheduler
+        self.job = job
+
+    def progress(self, value: float) -> None:
+        """進捗を通知（0〜100）"""
+        self._scheduler._on_progress(self.job, value)
+
+    def emit(self, event_type: str, data: Dict[str, Any]) -> None:
+        """job_id 付きで EventBus にイベントを発行"""
+        self._scheduler._bus.emit(event_type, {**data, "job_id": self.job.job_id})
+
+    @property
+    def streaming(self) -> bool:
+        """部分結果の受信者が登録されているか"""
+        return self._scheduler._get_record_listener(self.job.job_id) is not None
+
+    def record(self, kind: str, data: Dict[str, Any]) -> None:
+        """部分結果（セグメント等）を受信者へ渡す（受信者がいなければ何もしない）"""
+        listener = self._scheduler._get_record_listener(self.job.job_id)
+        if listener is not None:
+            listener(kind, data)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._scheduler.is_cancel_requested(self.job.job_id)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise JobCancelled()
+
+
+class JobScheduler(threading.Thread):
+    """
+    優先度付きジョブスケジューラ（単一実行スレッド）。
+
+    - submit() で JobStore に投入し、空きができ次第 interactive > monitor > batch の順に実行
+    - 起動時に前回中断された monitor / batch ジョブ（running）を queued に戻して再開し、
+      待ち手のいない interactive ジョブは failed にする
+    - 保持期間（retention_seconds）を過ぎた終端ジョブを起動時と一定間隔で削除
+    - イベント: job_queued / job_started / job_progress / job_finished
+      （interactive は progress / finished / error、バッチは batch_progress /
+      file_finished / all_finished も従来どおり発行）
+    """
+
+    def __init__(self, store: Optional[JobStore] = None,
+                 event_bus: Optional[EventBus] = None,
+                 handlers: Optional[Dict[str, JobHandler]] = None,
+                 retention_seconds: Optional[float] = None):
+        """
+        Args:
+            retention_seconds: 終端ジョブの保持期間（秒）。0 以下で削除しない。
+                None の場合は default_retention_seconds()
+        """
+        super().__init__(daemon=True, name="JobScheduler")
+        self._store = store
+        self._bus = event_bus or get_event_bus()
+        self._handlers: Dict[str, JobHandler] = dict(handlers or {})
+        self._cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._stopping = False
+        self._current: Optional[Job] = None
+        self._cancel_requested: set = set()
+        self._callbacks: Dict[str, List[Callable[[Job], None]]] = {}
+        self._record_listeners: Dict[str, RecordListener] = {}
+        self.processed_count = 0
+        # これ以前に投入された interactive ジョブは前回プロセスの残り（recover() 参照）
+        self._created_at = time.time()
+        if retention_seconds is None:
+            retention_seconds = default_retention_seconds()
+        elif retention_seconds <= 0:
+            retention_seconds = None
+        self.retention_seconds = retention_seconds
+        self._next_purge = 0.0
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            with self._start_lock:
+                if self._store is None:
+                    self._store = JobStore()
+        return self._store
+
+    @property
+    def opened_store(self) -> Optional[JobStore]:
+        """生成済みの JobStore（未生成なら None。DB ファイルを作らない）"""
+        return self._store
+
+    def register_handler(self, kind: str, handler: JobHandler) -> None:
+        """ジョブ種別ごとのハンドラを登録"""
+        self._handlers[kind] = handler
+
+    def ensure_started(self) -> None:
+        """未起動なら実行スレッドを開始"""
+        with self._start_lock:
+            if not self.is_alive() and not self._stopping and self.ident is None:
+                self.start()
+
+    # --- 投入・参照 ---
+
+    def submit(self, file_path: str, priority: str = "interactive", kind: str = "transcribe",
+               options: Optional[Dict[str, Any]] = None,
+               batch_id: Optional[str] = None,
+               record_listener: Optional[RecordListener] = None) -> Job:
+        """
+        ジョブを投入
+
+        Args:
+            record_listener: 部分結果の受信者 (種別, データ)。実行スレッドから呼ばれる。
+                実行開始前に登録されるため最初のレコードから受け取れる
+        """
+        with self._cond:
+            job = self.store.add(file_path, priority=priority, kind=kind,
+                                 options=options, batch_id=batch_id)
+            if record_listener is not None:
+                self._record_listeners[job.job_id] = record_listener
+        self._bus.emit("job_queued", {
+            "job_id": job.job_id,
+            "priority": job.priority,
+            "file_path": job.file_path,
+            "batch_id": job.batch_id,
+        })
+        with self._cond:
+            self._cond.notify()
+        return job
+
+    def submit_batch(self, file_paths: List[str], priority: str = "batch",
+                     options: Optional[Dict[str, Any]] = None,
+                     durations: Optional[Mapping[str, Optional[float]]] = None,
+                     order: str = "submission") -> Tuple[str, List[Job]]:
+        """
+        複数ファイルを同一 batch_id で投入
+
+        Args:
+            durations: ファイルごとの長さ（秒、不明は None）。各ジョブの options["audio_duration"]
+                に保存され、バッチの進捗・残り時間が長さで重み付けされる
+            order: 処理順（submission / longest_first / shortest_first）。同じ優先度のジョブは
+                投入順に実行されるため、投入前に並び替える
+
+        Raises:
+            ValueError: order が不正な場合
+        """
+        durations = durations or {}
+        file_paths = order_by_duration(file_paths, durations, order)
+        batch_id = uuid.uuid4().hex
+        jobs = []
+        for fp in file_paths:
+            job_options = options
+            if durations.get(fp) is not None:
+                job_options = {**(options or {}), "audio_duration": durations[fp]}
+            jobs.append(self.submit(fp, priority=priority, options=job_options, batch_id=batch_id))
+        return batch_id, jobs
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def list(self, status: Optional[str] = None, batch_id: Optional[str] = None,
+             limit: int = 100) -> List[Job]:
+        return self.store.list(status=status, batch_id=batch_id, limit=limit)
+
+    def current_job(self) -> Optional[Job]:
+        """実行中のジョブ"""
+        with self._cond:
+            return self._current
+
+    # --- キャンセル ---
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        ジョブをキャンセル。queued は即座に cancelled、running はキャンセル要求を設定し
+        エンジン処理の区切りで破棄する。
+
+        Returns:
+            キャンセル後のジョブ（存在しない場合None）
+        """
+        if self.store.cancel_queued(job_id):
+            job = self.store.get(job_id)
+            self._on_terminal(job)
+            return job
+        with self._cond:
+            if self._current is not None and self._current.job_id == job_id:
+                self._cancel_requested.add(job_id)
+                logger.info(f"Cancellation requested for running job {job_id}")
+        return self.store.get(job_id)
+
+    def cancel_where(self, priority: Optional[str] = None,
+                     batch_id: Optional[str] = None) -> int:
+        """
+        指定優先度・バッチ（None で全件）の queued / running ジョブをキャンセルし、件数を返す。
+        queued は1回の UPDATE でまとめて遷移させ、バッチ集計はバッチごとに1回だけ発行する。
+        """
+        cancelled = self.store.cancel_queued_where(priority=priority, batch_id=batch_id)
+        last_by_batch: Dict[str, Job] = {}
+        for job in cancelled:
+            self._on_terminal(job, batch_summary=False)
+            if job.batch_id:
+                last_by_batch[job.batch_id] = job
+        for job in last_by_batch.values():
+            self._emit_batch_summary(job)
+        count = len(cancelled)
+
+        current = self.current_job()
+        if (current is not None
+                and (priority is None or current.priority == priority)
+                and (batch_id is None or current.batch_id == batch_id)):
+            self.cancel(current.job_id)
+            count += 1
+        return count
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._cond:
+            return job_id in self._cancel_requested
+
+    def _get_record_listener(self, job_id: str) -> Optional[RecordListener]:
+        with self._cond:
+            return self._record_listeners.get(job_id)
+
+    # --- 完了待ち ---
+
+    def add_done_callback(self, job_id: str, callback: Callable[[Job], None]) -> None:
+        """ジョブ終了時のコールバックを登録（終了済みなら即座に呼ぶ）"""
+        with self._cond:
+            job = self.store.get(job_id)
+            if job is not None and not job.is_terminal:
+                self._callbacks.setdefault(job_id, []).append(callback)
+                return
+        if job is not None:
+            callback(job)
+
+    async def wait(self, job_id: str) -> Job:
+        """ジョブの終了を待つ（asyncio）"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def _resolve(job: Job):
+            if not future.done():
+                future.set_result(job)
+
+        def _on_done(job: Job):
+            try:
+                loop.call_soon_threadsafe(_resolve, job)
+            except RuntimeError:
+                logger.debug(f"Event loop closed before job {job_id} finished")
+
+        self.add_done_callback(job_id, _on_done)
+        return await future
+
+    # --- 実行ループ ---
+
+    def stop(self) -> None:
+        """実行中のジョブ完了後にスレッドを終了"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def run(self):
+        """実行ループ"""
+        self.store.recover(before=self._created_at)
+        self._purge_expired()
+        logger.info("Job scheduler started")
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopping:
+                    job = self.store.claim_next()
+                    if job is not None:
+                        self._current = job
+                        break
+                    self._purge_expired()
+                    self._cond.wait(timeout=1.0)
+                if job is None:
+                    break
+            self._execute(job)
+        logger.info("Job scheduler stopped")
+
+    def _purge_expired(self) -> None:
+        """保持期間を過ぎた終端ジョブを削除（JOB_PURGE_INTERVAL_SECONDS に1回まで）"""
+        if self.retention_seconds is None:
+            return
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + JOB_PURGE_INTERVAL_SECONDS
+        try:
+            purged = self.store.purge_finished(self.retention_seconds)
+        except Exception as e:
+            logger.warning(f"Job purge failed: {e}")
+            return
+        if purged:
+            logger.info(f"Purged {purged} finished jobs older than {self.retention_seconds:.0f}s")
+
+    def _resolve_handler(self, kind: str) -> Optional[JobHandler]:
+        handler = self._handlers.get(kind)
+        if handler is None and kind in _DEFAULT_HANDLERS:
+            import api.workers
+            handler = self._handlers.setdefault(kind, getattr(api.workers, _DEFAULT_HANDLERS[kind]))
+        return handler
+
+    def _execute(self, job: Job) -> None:
+        self._bus.emit("job_started", {
+            "job_id": job.job_id,
+            "priority": job.priority,
+            "file_path": job.file_path,
+            "batch_id": job.batch_id,
+        })
+        result, error = None, None
+        root = None
+        try:
+            with tracing.trace("job", job_id=job.job_id, kind=job.kind,
+                               priority=job.priority) as root, \
+                    get_job_profiler().profile(job.job_id, kind=job.kind, priority=job.priority,
+                                               file_path=job.file_path):
+                handler = self._resolve_handler(job.kind)
+                if handler is None:
+                    raise ValueError(f"No handler for job kind: {job.kind}")
+                ctx = JobContext(self, job)
+                ctx.raise_if_cancelled()
+                result = handler(job, ctx)
+                ctx.raise_if_cancelled()
+            status = "completed"
+        except JobCancelled:
+            status = "cancelled"
+            logger.info(f"Job cancelled: {job.job_id}")
+        except Exception as e:
+            status = "failed"
+            error = JOB_FAILED_MESSAGE
+            logger.error(f"Job {job.job_id} failed: {type(e).__name__} - {e}", exc_info=True)
+        finally:
+            with self._cond:
+                self._current = None
+                self._cancel_requested.discard(job.job_id)
+
+        if root is not None:
+            if isinstance(result, dict):
+                result["trace"] = root.to_dict()
+            tracing.save_trace(root, job.job_id)
+
+        finished = self.store.finish(job.job_id, status, result=result, error=error)
+        self.processed_count += 1
+        self._on_terminal(finished)
+
+    def _on_progress(self, job: Job, value: float) -> None:
+        self.store.set_progress(job.job_id, value)
+        self._bus.emit("job_progress", {"job_id": job.job_id, "value": value})
+        if job.priority == "interactive":
+            self._bus.emit("progress", {"value": value, "job_id": job.job_id})
+
+    def _on_terminal(self, job: Job, batch_summary: bool = True) -> None:
+        """
+        終端状態になったジョブのイベント発行とコールバック呼び出し
+
+        Args:
+            batch_summary: バッチ集計（batch_progress / all_finished）も発行するか。
+                一括キャンセル時は呼び出し側がバッチごとに1回だけ発行する
+        """
+        with self._cond:
+            callbacks = self._callbacks.pop(job.job_id, [])
+            self._record_listeners.pop(job.job_id, None)
+
+        self._bus.emit("job_finished", {
+            "job_id": job.job_id,
+            "status": job.status,
+            "priority": job.priority,
+            "batch_id": job.batch_id,
+            "error": job.error,
+        })
+        if job.batch_id:
+            if batch_summary:
+                self._emit_batch_events(job)
+            else:
+                self._emit_file_finished(job)
+        elif job.priority == "interactive":
+            if job.status == "completed":
+                self._bus.emit("finished", {"text": (job.result or {}).get("text", ""),
+                                            "job_id": job.job_id})
+            elif job.status == "failed":
+                self._bus.emit("error", {"message": job.error or JOB_FAILED_MESSAGE,
+                                         "job_id": job.job_id})
+
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception as e:
+                logger.debug(f"Job callback failed: {e}")
+
+    def _emit_file_finished(self, job: Job) -> None:
+        """バッチジョブ1件分の従来イベント（file_finished）"""
+        success = job.status == "completed"
+        self._bus.emit("file_finished", {
+            "file_path": job.file_path,
+            "text": (job.result or {}).get("text", "") if success else (job.error or "キャンセルされました"),
+            "success": success,
+            "job_id": job.job_id,
+            "batch_id": job.batch_id,
+            "trace": (job.result or {}).get("trace"),
+            "duplicate_of": (job.result or {}).get("duplicate_of"),
+        })
+
+    def _emit_batch_events(self, job: Job) -> None:
+        """バッチジョブの従来イベント（batch_progress / file_finished / all_finished）"""
+        summary = self.store.batch_summary(job.batch_id)
+        self._emit_batch_progress(job, summary)
+        self._emit_file_finished(job)
+        self._emit_all_finished(job, summary)
+
+    def _emit_batch_summary(self, job: Job) -> None:
+        """バッチ集計イベントのみ（一括キャンセル後にバッチごとに1回）"""
+        summary = self.store.batch_summary(job.batch_id)
+        self._emit_batch_progress(job, summary)
+        self._emit_all_finished(job, summary)
+
+    def _emit_batch_progress(self, job: Job, summary: Dict[str, Any]) -> None:
+        counts = summary["counts"]
+        self._bus.emit("batch_progress", {
+            "completed": sum(counts.get(s, 0) for s in ("completed", "failed", "cancelled")),
+            "total": sum(counts.values()),
+            "filename": os.path.basename(job.file_path),
+            "batch_id": job.batch_id,
+            **_duration_progress(summary),
+        })
+
+    def _emit_all_finished(self, job: Job, summary: Dict[str, Any]) -> None:
+        counts = summary["counts"]
+        completed = sum(counts.get(s, 0) for s in ("completed", "failed", "cancelled"))
+        if completed == sum(counts.values()):
+            self._bus.emit("all_finished", {
+                "success_count": counts.get("completed", 0),
+                "failed_count": counts.get("failed", 0) + counts.get("cancelled", 0),
+                "duplicate_count": summary["duplicates"],
+                "batch_id": job.batch_id,
+            })
+
+
+def _duration_progress(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    バッチの長さで重み付けした進捗（0〜1）と残り時間（秒）
+
+    JobStore.batch_summary の集計から求める。長さが不明なジョブは判明分の平均で補う
+    （fill_unknown_durations と同じ）。残り時間は実際に実行したジョブの長さあたりの
+    所要時間から見積もる（未実行なら None）。
+    """
+    d = summary["durations"]
+    default = d["known_sum"] / d["known_count"] if d["known_count"] else 1.0
+    total_jobs = sum(summary["counts"].values())
+    total = d["known_sum"] + (total_jobs - d["known_count"]) * default
+    done = d["done_sum"] + d["done_unknown"] * default
+    ran_duration = d["ran_sum"] + d["ran_unknown"] * default
+    eta = None
+    if ran_duration > 0:
+        remaining = d["remaining_sum"] + d["remaining_unknown"] * default
+        started_sum, running = summary["running_started"]
+        eta = summary["ran_seconds"] / ran_duration * remaining - (time.time() * running - started_sum)
+        eta = max(0.0, eta)
+    return {"progress": done / total if total > 0 else 0.0, "eta_seconds": eta}
+
+
+# グローバルシングルトン
+_job_scheduler: Optional[JobScheduler] = None
+_job_scheduler_lock = threading.Lock()
+
+
+def has_active_job() -> bool:
+    """
+    スケジューラがジョブを実行中（エンジン待ちを含む）か。
+    スケジューラは queued ジョブを即座に取り出すため、待ちジョブの有無もこれで分かる。
+    未生成の場合は生成せず False を返す
+    """
+    scheduler = peek_job_scheduler()
+    return scheduler is not None and scheduler.current_job() is not None
+
+
+def peek_job_scheduler() -> Optional[JobScheduler]:
+    """生成済みの JobScheduler（未生成なら None。生成しない）"""
+    return _job_scheduler
+
+
+def get_job_scheduler() -> JobScheduler:
+    """JobScheduler シングルトンを取得"""
+    global _job_scheduler
+    if _job_scheduler is None:
+        with _job_scheduler_lock:
+            if _job_scheduler is None:
+                _job_scheduler = JobScheduler()
+    return _job_scheduler
@@ -0,0 +1,370 @@
+"""
+ジョブストア — SQLite による永続ジョブキュー
+文字起こしジョブを優先度付きで保存し、プロセス再起動後も未完了ジョブを再開できるようにする。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 優先度（小さいほど先に実行）: interactive > monitor > batch
+JOB_PRIORITIES: Dict[str, int] = {
+    "interactive": 0,
+    "monitor": 1,
+    "batch": 2,
+}
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+TERMINAL_JOB_STATUSES = frozenset({"completed", "failed", "cancelled"})
+
+# 再起動で待ち手を失った interactive ジョブのエラーメッセージ
+ORPHANED_JOB_MESSAGE = "サーバー再起動により中断されました"
+
+
+@dataclass
+class Job:
+    """ジョブ1件"""
+    job_id: str
+    kind: str
+    priority: str
+    file_path: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    status: str = "queued"
+    progress: float = 0.0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    batch_id: Optional[str] = None
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.status in TERMINAL_JOB_STATUSES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = asdict(self)
+        if not include_result:
+            data.pop("result", None)
+        return data
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    priority_rank INTEGER NOT NULL,
+    file_path TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    batch_id TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority_rank, seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id);
+"""
+
+_COLUMNS = ("job_id, kind, priority, file_path, options, status, progress, result, error, "
+            "batch_id, created_at, started_at, finished_at")
+
+
+def default_db_path() -> str:
+    """既定のデータベースパス（環境変数 KOTOBA_JOB_DB で上書き可能）"""
+    return os.environ.get("KOTOBA_JOB_DB") or os.path.join(
+        os.path.expanduser("~"), ".kotoba_transcriber", "jobs.db"
+    )
+
+
+class JobStore:
+    """
+    SQLite ジョブストア（スレッドセーフ）。
+
+    - claim_next() は優先度 → 投入順で queued ジョブを1件 running に遷移させる
+    - recover() は前回プロセスで running のまま残った monitor / batch ジョブを queued に戻し、
+      待ち手（HTTP リクエスト）を失った interactive ジョブは failed にする
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or default_db_path()
+        if self.db_path != ":memory:":
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        if self.db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _row_to_job(row) -> Job:
+        (job_id, kind, priority, file_path, options, status, progress, result, error,
+         batch_id, created_at, started_at, finished_at) = row
+        return Job(
+            job_id=job_id, kind=kind, priority=priority, file_path=file_path,
+            options=json.loads(options) if options else {},
+            status=status, progress=progress,
+            result=json.loads(result) if result else None,
+            error=error, batch_id=batch_id, created_at=created_at,
+            started_at=started_at, finished_at=finished_at,
+        )
+
+    def add(self, file_path: str, priority: str = "interactive", kind: str = "transcribe",
+            options: Optional[Dict[str, Any]] = None, batch_id: Optional[str] = None) -> Job:
+        """ジョブを投入"""
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        job = Job(
+            job_id=uuid.uuid4().hex, kind=kind, priority=priority, file_path=file_path,
+            options=dict(options or {}), batch_id=batch_id, created_at=time.time(),
+        )
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({_COLUMNS}, priority_rank) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.kind, job.priority, job.file_path,
+                 json.dumps(job.options, ensure_ascii=False), job.status, job.progress,
+                 None, None, job.batch_id, job.created_at, None, None,
+                 JOB_PRIORITIES[priority]),
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """ジョブを取得"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, status: Optional[str] = None, batch_id: Optional[str] = None,
+             limit: int = 100) -> List[Job]:
+        """ジョブ一覧（新しい順）"""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if batch_id:
+            clauses.append("batch_id = ?")
+            params.append(batch_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs {where} ORDER BY seq DESC LIMIT ?", params
+            ).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def claim_next(self) -> Optional[Job]:
+        """最優先の queued ジョブを running に遷移させて返す（無ければNone）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' "
+                "ORDER BY priority_rank, seq LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, progress = 0 "
+                "WHERE job_id = ?",
+                (now, row[0]),
+            )
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (row[0],)
+            ).fetchone()
+        return self._row_to_job(row)
+
+    def set_progress(self, job_id: str, progress: float) -> None:
+        """進捗を更新"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ? WHERE job_id = ? AND status = 'running'",
+                (progress, job_id),
+            )
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> Optional[Job]:
+        """ジョブを終端状態にする"""
+        if status not in TERMINAL_JOB_STATUSES:
+            raise ValueError(f"Not a terminal status: {status}")
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                "progress = CASE WHEN ? = 'completed' THEN 100 ELSE progress END "
+                "WHERE job_id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, time.time(), status, job_id),
+            )
+        return self.get(job_id)
+
+    def cancel_queued(self, job_id: str) -> bool:
+        """queued のジョブをキャンセル。遷移できた場合True"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            return cur.rowcount > 0
+
+    def cancel_queued_where(self, priority: Optional[str] = None,
+                            batch_id: Optional[str] = None) -> List[Job]:
+        """
+        条件に合う queued ジョブを1回の UPDATE でまとめてキャンセル
+
+        Returns:
+            キャンセルしたジョブ（実行順）
+        """
+        clauses, params = ["status = 'queued'"], []
+        if priority:
+            clauses.append("priority = ?")
+            params.append(priority)
+        if batch_id:
+            clauses.append("batch_id = ?")
+            params.append(batch_id)
+        where = " AND ".join(clauses)
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE {where} ORDER BY priority_rank, seq", params
+            ).fetchall()
+            if not rows:
+                return []
+            self._conn.execute(
+                f"UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE {where}",
+                [now, *params],
+            )
+        jobs = [self._row_to_job(r) for r in rows]
+        for job in jobs:
+            job.status = "cancelled"
+            job.finished_at = now
+        return jobs
+
+    def queued_ids(self, priority: Optional[str] = None) -> List[str]:
+        """queued ジョブID（実行順）"""
+        sql = "SELECT job_id FROM jobs WHERE status = 'queued'"
+        params: list = []
+        if priority:
+            sql += " AND priority = ?"
+            params.append(priority)
+        sql += " ORDER BY priority_rank, seq"
+        with self._lock:
+            return [r[0] for r in self._conn.execute(sql, params).fetchall()]
+
+    def batch_summary(self, batch_id: str) -> Dict[str, Any]:
+        """
+        バッチの集計（ジョブ行を読み込まず SQL の集約1回で求める）
+
+        Returns:
+            counts: ステータス別件数
+            duplicates: 重複として既存の出力を再利用した件数
+            durations: options["audio_duration"] の集計（*_sum は長さが判明している分の合計、
+                *_unknown は長さが不明な件数）。done = 終端、ran = 実際に実行した
+                completed / failed、remaining = 未終端
+            ran_seconds: 実行したジョブの所要時間の合計
+            running_started: 実行中ジョブの started_at の合計と件数
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE batch_id = ? GROUP BY status",
+                (batch_id,),
+            ).fetchall()
+            row = self._conn.execute(
+                "SELECT "
+                " COUNT(d), SUM(d), "
+                " SUM(CASE WHEN terminal THEN d END), SUM(terminal AND d IS NULL), "
+                " SUM(CASE WHEN ran THEN d END), SUM(ran AND d IS NULL), "
+                " SUM(CASE WHEN ran THEN finished_at - started_at END), "
+                " SUM(CASE WHEN NOT terminal THEN d END), SUM(NOT terminal AND d IS NULL), "
+                " SUM(CASE WHEN status = 'running' THEN started_at END), "
+                " SUM(status = 'running' AND started_at IS NOT NULL), "
+                " SUM(json_extract(result, '$.duplicate_of') IS NOT NULL) "
+                "FROM (SELECT status, started_at, finished_at, result, "
+                "  CASE WHEN json_extract(options, '$.audio_duration') > 0 "
+                "       THEN json_extract(options, '$.audio_duration') END AS d, "
+                "  status IN ('completed', 'failed', 'cancelled') AS terminal, "
+                "  (status IN ('completed', 'failed') AND started_at IS NOT NULL "
+                "   AND finished_at IS NOT NULL) AS ran "
+                " FROM jobs WHERE batch_id = ?)",
+                (batch_id,),
+            ).fetchone()
+        (known_count, known_sum, done_sum, done_unknown, ran_sum, ran_unknown, ran_seconds,
+         remaining_sum, remaining_unknown, running_started, running_count, duplicates) = row
+        return {
+            "counts": {status: count for status, count in rows},
+            "duplicates": duplicates or 0,
+            "durations": {
+                "known_count": known_count or 0, "known_sum": known_sum or 0.0,
+                "done_sum": done_sum or 0.0, "done_unknown": done_unknown or 0,
+                "ran_sum": ran_sum or 0.0, "ran_unknown": ran_unknown or 0,
+                "remaining_sum": remaining_sum or 0.0, "remaining_unknown": remaining_unknown or 0,
+            },
+            "ran_seconds": ran_seconds or 0.0,
+            "running_started": (running_started or 0.0, running_count or 0),
+        }
+
+    def recover(self, before: Optional[float] = None) -> int:
+        """
+        前回異常終了時に残ったジョブを整理する。
+        running の monitor / batch ジョブは queued に戻す。interactive ジョブは結果を待つ
+        HTTP リクエストが既に存在しないため、queued / running とも failed にする。
+
+        Args:
+            before: この時刻より前に投入された interactive ジョブのみ対象にする
+                （現プロセスで起動前に投入されたジョブを残すため。None で全件）
+
+        Returns:
+            queued に戻したジョブ数
+        """
+        now = time.time()
+        with self._lock:
+            orphaned = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE priority = 'interactive' AND status IN ('queued', 'running') "
+                "AND created_at < ?",
+                (ORPHANED_JOB_MESSAGE, now, now if before is None else before),
+            ).rowcount
+            count = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, progress = 0 "
+                "WHERE status = 'running'"
+            ).rowcount
+        if orphaned:
+            logger.info(f"Failed {orphaned} orphaned interactive jobs")
+        if count:
+            logger.info(f"Recovered {count} interrupted jobs")
+        return count
+
+    def purge_finished(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """古い終端ジョブを削除"""
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') "
+                "AND finished_at < ?",
+                (cutoff,),
+            )
+            return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error as e:
+                logger.debug(f"Job store close failed: {e}")
@@ -15,7 +15,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from api.auth import TokenAuthMiddleware, get_token_manager
 from api.event_bus import get_event_bus
-from api.websocket import manager
+from api.job_scheduler import get_job_scheduler
+from api.websocket import available_encodings, manager
 from api.routers import (
     transcription,
     realtime,
@@ -25,6 +26,9 @@ from api.routers import (
     monitor,
     export,
     health,
+    jobs,
+    upload,
+    debug,
 )
 
 # ロギング設定
@@ -49,6 +53,9 @@ async def lifespan(app: FastAPI):
         current_token = token_manager.get_current_token()
         logger.info(f"TokenManager initialized (TTL: {token_manager._ttl_seconds}s)")
 
+        # ジョブスケジューラ起動（前回中断されたジョブを再開）
+        get_job_scheduler().ensure_started()
+
         logger.info("KotobaTranscriber API started")
     except Exception as e:
         logger.error(f"EventBus initialization failed: {e}")
@@ -59,6 +66,12 @@ async def lifespan(app: FastAPI):
     bus = get_event_bus()
     bus.shutdown()
 
+    scheduler = get_job_scheduler()
+    scheduler.stop()
+    if scheduler.is_alive():
+        # 実行中のジョブは待たない（running のまま残り、次回起動時に再投入される）
+        scheduler.join(timeout=1)
+
     from api.dependencies import get_worker_state
     state = get_worker_state()
 
@@ -75,6 +88,8 @@ async def lifespan(app: FastAPI):
     rt = state.get_realtime_worker()
     if rt and rt.is_alive():
         rt.stop()
+    if rt:
+        rt.cancel_refinement()
 
     mon = state.get_folder_monitor()
     if mon and mon.is_alive():
@@ -123,6 +138,9 @@ app.include_router(postprocess.router, prefix="/api", tags=["postprocess"])
 app.include_router(settings.router, prefix="/api", tags=["settings"])
 app.include_router(monitor.router, prefix="/api", tags=["monitor"])
 app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+app.include_router(upload.router, prefix="/api", tags=["upload"])
+app.include_router(debug.router, prefix="/api", tags=["debug"])
 
 
 # WebSocket エンドポイント
@@ -132,25 +150,55 @@ async def websocket_endpoint(websocket: WebSocket):
     WebSocket接続 — EventBus からのイベントをリアルタイム配信
 
     認証チェックは ConnectionManager.connect() 内で実施されます。
+    クエリパラメータ:
+        topics: 受信するイベント種別（カンマ区切り、末尾 * で前方一致）
+        job_id: 特定ジョブのイベントのみ受信
+        since: 最後に受信したイベントの連番（seq）。再接続時に欠落分をリプレイしてから
+               ライブ配信に移行する
+        encoding: json（既定、テキストフレーム）または msgpack（バイナリフレーム）
+        batch_ms: フラッシュ間隔（ミリ秒）。0 より大きい場合は間隔内のイベントを
+                  配列にまとめて1フレームで送信する（既定 0 = 1イベント1フレーム）
     """
+    encoding = websocket.query_params.get("encoding", "json")
+    if encoding not in available_encodings():
+        await websocket.close(code=1003, reason="Unsupported encoding")
+        logger.warning("WebSocket rejected: unsupported encoding")
+        return
+    try:
+        batch_ms = max(0, int(websocket.query_params.get("batch_ms", "0")))
+    except ValueError:
+        batch_ms = 0
+
     accepted = await manager.connect(websocket)
     if not accepted:
         return
     bus = get_event_bus()
+    client = manager.open_stream(websocket, encoding=encoding, flush_interval=batch_ms / 1000.0)
+    sender = asyncio.create_task(client.run_sender())
+    topics_param = websocket.query_params.get("topics")
+    topics = [t.strip() for t in topics_param.split(",") if t.strip()] if topics_param else None
+    job_id = websocket.query_params.get("job_id") or None
+    since = None
+    since_param = websocket.query_params.get("since")
+    if since_param:
+        try:
+            since = max(0, int(since_param))
+        except ValueError:
+            logger.debug("Invalid 'since' parameter ignored")
     try:
-        async for event in bus.subscribe():
-            try:
-                await websocket.send_json(event)
-            except WebSocketDisconnect:
+        async for event in bus.subscribe(topics=topics, job_id=job_id, since=since):
+            # 送信は接続ごとの送信タスクが担当（満杯時はここで待機し、購読キューでコアレスされる）
+            if sender.done():
                 break
-            except Exception:
-                logger.debug("WebSocket send failed, closing connection")
+            await client.put(event)
+            if sender.done():
                 break
     except WebSocketDisconnect:
         pass
     except asyncio.CancelledError:
         logger.debug("WebSocket task cancelled (shutdown)")
     finally:
+        sender.cancel()
         manager.disconnect(websocket)
 
 
@@ -0,0 +1,183 @@
+"""
+フォルダ監視 → 文字起こしキューの受け渡し
+FolderMonitorService が検出したファイルを JobScheduler に monitor 優先度で直接投入する。
+
+- 投入済み（queued / running）のファイルは in-flight として保持し、再検出しても重複投入しない
+- in-flight が上限に達したら受け付けない（呼び出し側が保留し、空きができたら再投入する）
+- 完了したファイルは処理済みとしてマークし、失敗したファイルは内容が変わるまで再投入しない
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from api.job_scheduler import JobScheduler
+from api.job_store import Job
+
+logger = logging.getLogger(__name__)
+
+MONITOR_PRIORITY = "monitor"
+
+
+def _signature(file_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class MonitorJobQueue:
+    """
+    監視フォルダ用の有界ジョブキュー
+
+    Usage:
+        queue = MonitorJobQueue(scheduler, [folder], on_completed=monitor.mark_as_processed)
+        accepted, deferred = queue.offer(ready_files)
+    """
+
+    def __init__(self, scheduler: JobScheduler, folder_paths: Sequence[str],
+                 on_completed: Callable[[str], None],
+                 on_change: Optional[Callable[[], None]] = None,
+                 max_in_flight: int = 8,
+                 options: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            folder_paths: 監視フォルダ（以前の監視で投入済みのジョブを引き継ぐ範囲）
+            on_completed: 文字起こしが完了したファイルパスを受け取る（処理済みマーク用）
+            on_change: in-flight に空きができたときに呼ばれる（保留ファイルの再投入用）
+            max_in_flight: 同時に投入しておくファイル数の上限
+            options: ジョブオプション（write_output は常に有効）
+        """
+        self._scheduler = scheduler
+        self.folder_paths = [os.path.abspath(p) for p in folder_paths]
+        self._on_completed = on_completed
+        self._on_change = on_change
+        self.max_in_flight = max(1, max_in_flight)
+        self.options = {**(options or {}), "write_output": True}
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, str] = {}  # file_path -> job_id
+        self._failed: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._completed = 0
+        self._failed_count = 0
+        self._duplicate_count = 0
+        self._adopt_existing_jobs()
+
+    # --- 投入 ---
+
+    def offer(self, files: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        ファイルをジョブとして投入する
+
+        in-flight 中・失敗後に変化していないファイルは投入も保留もしない。
+
+        Returns:
+            (投入したファイル, 上限に達して受け付けなかったファイル)
+        """
+        accepted: List[str] = []
+        deferred: List[str] = []
+        for file_path in dict.fromkeys(files):
+            with self._lock:
+                if file_path in self._in_flight:
+                    continue
+                if file_path in self._failed:
+                    if self._failed[file_path] == _signature(file_path):
+                        continue
+                    del self._failed[file_path]
+                if len(self._in_flight) >= self.max_in_flight:
+                    deferred.append(file_path)
+                    continue
+                # 完了コールバックより先に in-flight に入れる（即時完了でも取りこぼさない）
+                self._in_flight[file_path] = ""
+            try:
+                job = self._scheduler.submit(file_path, priority=MONITOR_PRIORITY,
+                                             options=self.options)
+            except Exception as e:
+                logger.error(f"Failed to queue monitored file {file_path}: {e}")
+                with self._lock:
+                    self._in_flight.pop(file_path, None)
+                continue
+            with self._lock:
+                if file_path in self._in_flight:
+                    self._in_flight[file_path] = job.job_id
+            accepted.append(file_path)
+            self._scheduler.add_done_callback(job.job_id, self._on_job_done)
+        if accepted:
+            logger.info(f"Queued {len(accepted)} monitored files "
+                        f"({len(deferred)} deferred, {self.in_flight_count} in flight)")
+        return accepted, deferred
+
+    def is_in_flight(self, file_path: str) -> bool:
+        with self._lock:
+            return file_path in self._in_flight
+
+    @property
+    def in_flight_count(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    # --- 完了 ---
+
+    def _on_job_done(self, job: Job) -> None:
+        """ジョブ終了時（スケジューラの実行スレッドから呼ばれる）"""
+        with self._lock:
+            self._in_flight.pop(job.file_path, None)
+            if job.status == "completed":
+                self._completed += 1
+                if (job.result or {}).get("duplicate_of"):
+                    self._duplicate_count += 1
+            elif job.status == "failed":
+                self._failed_count += 1
+                self._failed[job.file_path] = _signature(job.file_path)
+
+        if job.status == "completed":
+            try:
+                self._on_completed(job.file_path)
+            except Exception as e:
+                logger.error(f"Failed to mark monitored file as processed: {e}")
+        elif job.status == "failed":
+            logger.warning(f"Monitored file failed, not retried until modified: {job.file_path}")
+
+        if self._on_change is not None:
+            self._on_change()
+
+    def _adopt_existing_jobs(self) -> None:
+        """
+        以前の監視で投入済みの未完了ジョブを in-flight として引き継ぐ
+
+        監視の再開直後に同じファイルを重複投入しないため。
+        """
+        jobs = [self._scheduler.get(job_id)
+                for job_id in self._scheduler.store.queued_ids(MONITOR_PRIORITY)]
+        current = self._scheduler.current_job()
+        if current is not None and current.priority == MONITOR_PRIORITY:
+            jobs.append(current)
+        prefixes = tuple(folder + os.sep for folder in self.folder_paths)
+        adopted = []
+        for job in jobs:
+            if job is None or job.is_terminal or not os.path.abspath(job.file_path).startswith(prefixes):
+                continue
+            with self._lock:
+                self._in_flight[job.file_path] = job.job_id
+            adopted.append(job)
+        for job in adopted:
+            self._scheduler.add_done_callback(job.job_id, self._on_job_done)
+        if adopted:
+            logger.info(f"Resumed {len(adopted)} monitored jobs already in queue")
+
+    # --- 状態 ---
+
+    def get_status(self) -> Dict[str, int]:
+        """待機中・in-flight・完了・失敗・重複として出力を再利用したジョブの件数"""
+        current = self._scheduler.current_job()
+        with self._lock:
+            in_flight = len(self._in_flight)
+            running = 1 if current is not None and current.job_id in self._in_flight.values() else 0
+            return {
+                "queued_files": in_flight - running,
+                "in_flight_files": in_flight,
+                "total_processed": self._completed,
+                "total_failed": self._failed_count,
+                "duplicate_jobs": self._duplicate_count,
+            }
@@ -0,0 +1,236 @@
+"""
+リアルタイム下書きの高精度リファイン
+faster-whisper による下書きセグメントを発話単位にまとめ、誰も話していない間に
+TranscriptionEngine（kotoba-whisper）で再文字起こしして refined_text イベントを発行する。
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+import wave
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, Optional
+
+import numpy as np
+
+from api.audio_spool import AudioSpool
+from api.event_bus import EventBus, get_event_bus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Utterance:
+    """リファイン待ちの発話（連続する下書きセグメントの集まり）"""
+    segment_ids: List[int] = field(default_factory=list)
+    draft_texts: List[str] = field(default_factory=list)
+    duration: float = 0.0
+    # セグメント単位で再文字起こし済みのテキスト（途中で譲った場合は続きから再開）
+    refined_texts: List[str] = field(default_factory=list)
+
+
+class UtteranceRefiner(threading.Thread):
+    """
+    アイドル時のみ動く再文字起こしスレッド。
+
+    - add_segment() で下書きセグメントを蓄積し、close_utterance() で発話を確定
+    - 発話は最後の音声検出から idle_seconds 経過し、エンジンが空いている時のみ処理
+      （engine_lock を渡すと非ブロッキングで取得できた時だけエンジンを使う）
+    - engine_lock はセグメント1つ分の再文字起こしの間だけ保持し、セグメント間で解放する。
+      その時点で is_engine_busy() が True（ジョブ待ちあり）なら残りを後回しにして譲る。
+      スレッド優先度は下げない（ロック保持中に低優先度だと待っているジョブが遅れるため）
+    - 結果は refined_text イベント（segment_ids, text, draft_text）で通知
+    - finish() 後は残りの発話を処理してから終了し、スプールを削除
+    """
+
+    MAX_PENDING_UTTERANCES = 256
+
+    def __init__(self,
+                 spool: AudioSpool,
+                 engine_getter: Callable[[], object],
+                 event_bus: Optional[EventBus] = None,
+                 is_engine_busy: Optional[Callable[[], bool]] = None,
+                 engine_lock: Optional[threading.Lock] = None,
+                 idle_seconds: float = 1.0,
+                 max_utterance_seconds: float = 30.0):
+        super().__init__(daemon=True)
+        self._spool = spool
+        self._engine_getter = engine_getter
+        self._bus = event_bus or get_event_bus()
+        self._is_engine_busy = is_engine_busy or (lambda: False)
+        self._engine_lock = engine_lock
+        self.idle_seconds = idle_seconds
+        self.max_utterance_seconds = max_utterance_seconds
+
+        self._cond = threading.Condition()
+        self._pending: Deque[_Utterance] = deque()
+        self._current = _Utterance()
+        self._last_activity = time.monotonic()
+        self._finishing = False
+        self._cancelled = False
+
+        self.refined_count = 0
+        self.skipped_count = 0
+
+    def notify_activity(self) -> None:
+        """音声検出を通知（話している間はリファインを保留）"""
+        self._last_activity = time.monotonic()
+
+    def add_segment(self, segment_id: int, audio: np.ndarray, draft_text: str) -> bool:
+        """
+        下書きセグメントの音声をスプールし、現在の発話に追加
+
+        Returns:
+            スプールに保存できた場合True
+        """
+        if not self._spool.append(segment_id, audio):
+            return False
+        duration = len(audio) / self._spool.sample_rate
+        with self._cond:
+            self._current.segment_ids.append(segment_id)
+            self._current.draft_texts.append(draft_text)
+            self._current.duration += duration
+            if self._current.duration >= self.max_utterance_seconds:
+                self._close_current_locked()
+        return True
+
+    def close_utterance(self) -> None:
+        """現在の発話を確定してリファイン待ちに追加"""
+        with self._cond:
+            self._close_current_locked()
+
+    def _close_current_locked(self) -> None:
+        if not self._current.segment_ids:
+            return
+        if len(self._pending) >= self.MAX_PENDING_UTTERANCES:
+            dropped = self._pending.popleft()
+            self.skipped_count += 1
+            for seg_id in dropped.segment_ids:
+                self._spool.discard(seg_id)
+            logger.warning("Refinement backlog full, dropped oldest utterance")
+        self._pending.append(self._current)
+        self._current = _Utterance()
+        self._cond.notify()
+
+    def finish(self) -> None:
+        """新規受付を終了（残りの発話は処理してから終了）"""
+        with self._cond:
+            self._close_current_locked()
+            self._finishing = True
+            self._cond.notify()
+
+    def cancel(self) -> None:
+        """未処理の発話を破棄して即座に終了"""
+        with self._cond:
+            self._cancelled = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def pending_count(self) -> int:
+        """リファイン待ちの発話数"""
+        with self._cond:
+            return len(self._pending)
+
+    def _is_idle(self) -> bool:
+        if self._is_engine_busy():
+            return False
+        return self._finishing or time.monotonic() - self._last_activity >= self.idle_seconds
+
+    def run(self):
+        """リファインループ"""
+        try:
+            while True:
+                with self._cond:
+                    while not self._cancelled and not self._pending and not self._finishing:
+                        self._cond.wait(timeout=0.5)
+                    if self._cancelled or (self._finishing and not self._pending):
+                        break
+                if not self._is_idle():
+                    time.sleep(0.2)
+                    continue
+                with self._cond:
+                    if not self._pending:
+                        continue
+                    utterance = self._pending.popleft()
+                if not self._refine(utterance):
+                    # ジョブがエンジンを使う — 先頭に戻して続きを後で再開
+                    with self._cond:
+                        self._pending.appendleft(utterance)
+                    time.sleep(0.2)
+        finally:
+            self._spool.close()
+
+    def _refine(self, utterance: _Utterance) -> bool:
+        """
+        1発話をセグメント単位で再文字起こしし、全セグメント完了後に refined_text を発行
+
+        Returns:
+            エンジンを譲るため途中で処理を見送った場合False（utterance に進捗が残る）
+        """
+        while len(utterance.refined_texts) < len(utterance.segment_ids):
+            if utterance.refined_texts and self._is_engine_busy():
+                return False
+            if self._engine_lock is not None and not self._engine_lock.acquire(blocking=False):
+                return False
+            try:
+                text = self._refine_segment_locked(utterance)
+            finally:
+                if self._engine_lock is not None:
+                    self._engine_lock.release()
+            if text is None:
+                self.skipped_count += 1
+                for seg_id in utterance.segment_ids:
+                    self._spool.discard(seg_id)
+                return True
+            utterance.refined_texts.append(text)
+
+        self.refined_count += 1
+        self._bus.emit("refined_text", {
+            "segment_ids": utterance.segment_ids,
+            "text": " ".join(t for t in utterance.refined_texts if t),
+            "draft_text": " ".join(utterance.draft_texts),
+        })
+        return True
+
+    def _refine_segment_locked(self, utterance: _Utterance) -> Optional[str]:
+        """次の未処理セグメントを再文字起こし（スプール上書き済み・失敗時は None）"""
+        seg_id = utterance.segment_ids[len(utterance.refined_texts)]
+        audio = self._spool.read(seg_id)
+        self._spool.discard(seg_id)
+        if audio is None:
+            # スプールのリングで上書き済み — 発話全体を下書きのまま残す
+            logger.debug(f"Refinement skipped (audio evicted): {utterance.segment_ids}")
+            return None
+
+        wav_path = None
+        try:
+            wav_path = self._write_wav(audio)
+            engine = self._engine_getter()
+            if not engine.is_loaded:
+                engine.load_model()
+            result = engine.transcribe(wav_path, return_timestamps=False)
+            return (result.get("text") or "").strip()
+        except Exception as e:
+            logger.warning(f"Refinement failed: {type(e).__name__} - {e}")
+            return None
+        finally:
+            if wav_path:
+                try:
+                    os.unlink(wav_path)
+                except OSError:
+                    pass
+
+    def _write_wav(self, audio: np.ndarray) -> str:
+        """float32 音声を一時 WAV ファイルに書き出す"""
+        fd, path = tempfile.mkstemp(suffix=".wav", prefix="refine_")
+        os.close(fd)
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16)
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self._spool.sample_rate)
+            wf.writeframes(pcm.tobytes())
+        return path
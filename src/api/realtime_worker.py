@@ -4,13 +4,17 @@ threading.Thread + EventBus による音声キャプチャ・リアルタイム
 """
 
 import logging
+import queue
 import threading
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 import numpy as np
 
+from api.adaptive_decoding import AdaptiveDecodingController, DecodingProfile
+from api.audio_spool import AudioSpool
 from api.event_bus import EventBus, get_event_bus
+from api.realtime_refiner import UtteranceRefiner
 
 logger = logging.getLogger(__name__)
 
@@ -31,11 +35,29 @@ except ImportError:
     PYAUDIO_AVAILABLE = False
     logger.warning("pyaudio or webrtcvad not available")
 
+# デコード待ちチャンクの上限（超過時は最古のチャンクを破棄）
+MAX_PENDING_CHUNKS = 16
+
+# 停止時に残りのチャンクを文字起こしし終えるまで待つ上限（秒）
+DECODE_DRAIN_TIMEOUT_SECONDS = 60.0
+
+# デコードキューの終端（これより前に投入されたチャンクを処理し終えたらデコードスレッドを終了）
+_DECODE_STOP = None
+
 
 class RealtimeWorker(threading.Thread):
     """
     リアルタイム文字起こしワーカー（Qt非依存）。
-    EventBus 経由で text_ready / volume_changed / status_changed / error イベントを発行。
+    EventBus 経由で text_ready / volume_changed / status_changed / error /
+    decoding_profile_changed / refined_text イベントを発行。
+
+    音声キャプチャと推論は別スレッドで行い、確定したバッファはキュー経由で
+    デコードスレッドへ渡す。adaptive=True の場合は AdaptiveDecodingController が
+    キュー遅延と RTF からビームサイズ・バッファ長・フォールバックモデルを切り替える。
+
+    enable_refinement=True の場合、下書きテキストを出した発話の音声を AudioSpool に保存し、
+    UtteranceRefiner が無音の間に高精度エンジンで再文字起こしして refined_text を発行する。
+    text_ready / refined_text は segment_id で対応付ける。
     """
 
     def __init__(self,
@@ -44,7 +66,14 @@ class RealtimeWorker(threading.Thread):
                  sample_rate: int = 16000,
                  buffer_duration: float = 3.0,
                  vad_threshold: float = 0.5,
-                 event_bus: Optional[EventBus] = None):
+                 event_bus: Optional[EventBus] = None,
+                 adaptive: bool = True,
+                 target_latency: float = 2.0,
+                 fallback_model_size: Optional[str] = None,
+                 enable_refinement: bool = False,
+                 refine_engine_getter: Optional[Callable[[], object]] = None,
+                 is_refine_engine_busy: Optional[Callable[[], bool]] = None,
+                 refine_engine_lock: Optional[threading.Lock] = None):
         super().__init__(daemon=True)
 
         self.model_size = model_size
@@ -52,8 +81,16 @@ class RealtimeWorker(threading.Thread):
         self.sample_rate = sample_rate
         self.buffer_duration = buffer_duration
         self.vad_threshold = vad_threshold
+        self.fallback_model_size = fallback_model_size
+        self.enable_refinement = enable_refinement and refine_engine_getter is not None
+        self._refine_engine_getter = refine_engine_getter
+        self._is_refine_engine_busy = is_refine_engine_busy
+        self._refine_engine_lock = refine_engine_lock
+        self._refiner: Optional[UtteranceRefiner] = None
+        self._next_segment_id = 0
 
         self.engine: Optional[FasterWhisperEngine] = None
+        self._fallback_engine: Optional[FasterWhisperEngine] = None
         self._running_event = threading.Event()
         self._paused_event = threading.Event()
 
@@ -71,6 +108,20 @@ class RealtimeWorker(threading.Thread):
         self._bus = event_bus or get_event_bus()
         self._last_volume_emit = 0.0  # volume_changed スロットリング用
 
+        # キャプチャ → デコードスレッド間のキュー: (音声, 確定時刻 monotonic, segment_id, 発話終端か)
+        self._decode_queue: "queue.Queue" = queue.Queue(maxsize=MAX_PENDING_CHUNKS)
+        self._decode_thread: Optional[threading.Thread] = None
+        self.dropped_chunks = 0
+
+        self._controller: Optional[AdaptiveDecodingController] = None
+        if adaptive:
+            self._controller = AdaptiveDecodingController(
+                target_latency=target_latency,
+                allow_fallback_model=bool(fallback_model_size) and fallback_model_size != model_size,
+                on_transition=self._on_profile_transition,
+            )
+            self._apply_profile(self._controller.current)
+
     def initialize(self) -> bool:
         """エンジンとオーディオを初期化"""
         try:
@@ -121,6 +172,9 @@ class RealtimeWorker(threading.Thread):
 
         self._paused_event.clear()  # 前回の一時停止状態をリセット
         self._running_event.set()
+        self._decode_thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._decode_thread.start()
+        self._start_refiner()
         self._bus.emit("status_changed", {"status": "録音中..."})
 
         try:
@@ -173,12 +227,14 @@ class RealtimeWorker(threading.Thread):
                                 self._write_pos = self._max_buffer_samples
 
                     is_speech = self._check_vad(data)
+                    if is_speech and self._refiner is not None:
+                        self._refiner.notify_activity()
 
                     with self._buffer_lock:
                         buf_len = self._write_pos
                     if buf_len >= self.buffer_samples or (not is_speech and buf_len > self.sample_rate * 0.5):
                         if buf_len > self.sample_rate * 0.3:
-                            self._process_buffer()
+                            self._process_buffer(utterance_end=not is_speech)
                         else:
                             with self._buffer_lock:
                                 self._write_pos = 0
@@ -190,6 +246,7 @@ class RealtimeWorker(threading.Thread):
             logger.error(f"録音エラー: {e}", exc_info=True)
             self._bus.emit("error", {"message": "録音エラーが発生しました"})
         finally:
+            self._running_event.clear()
             try:
                 if self.stream:
                     self.stream.stop_stream()
@@ -201,11 +258,17 @@ class RealtimeWorker(threading.Thread):
                     self.audio.terminate()
             except Exception as e:
                 logger.debug(f"Audio cleanup failed: {e}")
-            try:
-                if self.engine is not None:
-                    self.engine.unload_model()
-            except Exception as e:
-                logger.debug(f"Engine unload failed: {e}")
+            # 推論中にモデルを解放しないよう、投入済みチャンクを処理し終えるまで待つ
+            self._stop_decode_thread()
+            if self._refiner is not None:
+                # 残りの発話はリファインスレッドが無音時間に処理し、終了時にスプールを削除
+                self._refiner.finish()
+            for engine in (self.engine, self._fallback_engine):
+                try:
+                    if engine is not None:
+                        engine.unload_model()
+                except Exception as e:
+                    logger.debug(f"Engine unload failed: {e}")
 
         self._bus.emit("status_changed", {"status": "停止しました"})
 
@@ -218,8 +281,26 @@ class RealtimeWorker(threading.Thread):
         except Exception:
             return True
 
-    def _process_buffer(self):
-        """バッファの音声を処理"""
+    def _start_refiner(self):
+        """高精度リファインスレッドを開始（有効時のみ）"""
+        if not self.enable_refinement:
+            return
+        try:
+            spool = AudioSpool(sample_rate=self.sample_rate)
+        except OSError as e:
+            logger.warning(f"Audio spool unavailable, refinement disabled: {e}")
+            return
+        self._refiner = UtteranceRefiner(
+            spool=spool,
+            engine_getter=self._refine_engine_getter,
+            event_bus=self._bus,
+            is_engine_busy=self._is_refine_engine_busy,
+            engine_lock=self._refine_engine_lock,
+        )
+        self._refiner.start()
+
+    def _process_buffer(self, utterance_end: bool = True):
+        """バッファの音声を確定し、デコードキューへ渡す"""
         if not self.engine:
             return
 
@@ -229,18 +310,124 @@ class RealtimeWorker(threading.Thread):
             audio_data = self._ring_buffer[:self._write_pos].copy()
             self._write_pos = 0
 
+        self._next_segment_id += 1
+        item = (audio_data, time.monotonic(), self._next_segment_id, utterance_end)
+        try:
+            self._decode_queue.put_nowait(item)
+        except queue.Full:
+            # 推論が追いつかない場合: 最古のチャンクを破棄して最新を優先
+            try:
+                self._decode_queue.get_nowait()
+                self.dropped_chunks += 1
+                logger.warning(f"Realtime decode queue full, dropped oldest chunk (total: {self.dropped_chunks})")
+            except queue.Empty:
+                pass
+            try:
+                self._decode_queue.put_nowait(item)
+            except queue.Full:
+                self.dropped_chunks += 1
+
+    def _stop_decode_thread(self, timeout: float = DECODE_DRAIN_TIMEOUT_SECONDS):
+        """終端を投入し、デコードスレッドが残りのチャンクを処理して終了するのを待つ"""
+        if self._decode_thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._decode_queue.put(_DECODE_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Realtime decode queue did not drain, stop marker not queued")
+        self._decode_thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        if self._decode_thread.is_alive():
+            logger.warning("Realtime decode thread did not stop within timeout")
+
+    def _decode_loop(self):
+        """
+        デコードスレッド: キューからチャンクを取り出して文字起こし。
+        停止後も終端（_DECODE_STOP）までの投入済みチャンクは処理する
+        """
+        while True:
+            item = self._decode_queue.get()
+            if item is _DECODE_STOP:
+                break
+            audio_data, enqueued_at, segment_id, utterance_end = item
+            try:
+                self._transcribe_chunk(audio_data, enqueued_at, segment_id, utterance_end)
+            except Exception as e:
+                logger.error(f"Transcription error: {e}", exc_info=True)
+
+    def _transcribe_chunk(self, audio_data: np.ndarray, enqueued_at: float,
+                          segment_id: int = 0, utterance_end: bool = True):
+        """1チャンクを現在のデコード段階で文字起こし（下書き）"""
+        profile = self._controller.current if self._controller else None
+        engine = self._engine_for(profile)
+        if engine is None:
+            return
+
+        queue_lag = time.monotonic() - enqueued_at
+        start = time.monotonic()
         try:
-            result = self.engine.transcribe(
+            result = engine.transcribe(
                 audio_data,
                 sample_rate=self.sample_rate,
-                beam_size=1,
+                beam_size=profile.beam_size if profile else 1,
+                best_of=profile.best_of if profile else 5,
                 temperature=0.0
             )
             text = result.get("text", "").strip()
             if text:
-                self._bus.emit("text_ready", {"text": text})
+                self._bus.emit("text_ready", {"text": text, "segment_id": segment_id})
+                if self._refiner is not None:
+                    self._refiner.add_segment(segment_id, audio_data, text)
         except Exception as e:
             logger.error(f"Transcription error: {e}", exc_info=True)
+        finally:
+            if utterance_end and self._refiner is not None:
+                self._refiner.close_utterance()
+            processing_time = time.monotonic() - start
+            if self._controller:
+                audio_duration = len(audio_data) / self.sample_rate
+                next_profile = self._controller.observe(audio_duration, processing_time, queue_lag)
+                self._apply_profile(next_profile)
+
+    def _engine_for(self, profile: Optional[DecodingProfile]) -> Optional["FasterWhisperEngine"]:
+        """デコード段階に応じたエンジンを返す（フォールバックモデルは遅延ロード）"""
+        if profile is None or not profile.use_fallback_model:
+            return self.engine
+        if self._fallback_engine is None:
+            try:
+                engine = FasterWhisperEngine(
+                    model_size=self.fallback_model_size,
+                    device=self.device,
+                    language="ja"
+                )
+                engine.load_model()
+                self._fallback_engine = engine
+            except Exception as e:
+                logger.warning(f"Fallback model load failed ({self.fallback_model_size}): {e}")
+                self._controller.disable_fallback_model()
+                return self.engine
+        return self._fallback_engine
+
+    def _apply_profile(self, profile: DecodingProfile):
+        """デコード段階のバッファ長を反映（キャプチャスレッドは次の判定から使用）"""
+        duration = max(0.5, self.buffer_duration * profile.buffer_scale)
+        self.buffer_samples = int(self.sample_rate * duration)
+
+    def _on_profile_transition(self, old: DecodingProfile, new: DecodingProfile, reason: str):
+        """デコード段階の変更を通知"""
+        self._bus.emit("decoding_profile_changed", {
+            "from": old.name,
+            "to": new.name,
+            "reason": reason,
+            "beam_size": new.beam_size,
+            "best_of": new.best_of,
+            "buffer_duration": max(0.5, self.buffer_duration * new.buffer_scale),
+            "fallback_model": new.use_fallback_model,
+        })
+
+    def get_decoding_profile(self) -> Optional[str]:
+        """現在のデコード段階名（適応制御無効時は None）"""
+        return self._controller.current.name if self._controller else None
 
     def stop(self):
         """停止"""
@@ -250,6 +437,11 @@ class RealtimeWorker(threading.Thread):
             if self.is_alive():
                 logger.warning("RealtimeWorker did not stop within timeout")
 
+    def cancel_refinement(self):
+        """未処理のリファインを破棄（アプリ終了時用）"""
+        if self._refiner is not None:
+            self._refiner.cancel()
+
     def is_paused(self) -> bool:
         """一時停止中かどうか"""
         return self._paused_event.is_set()
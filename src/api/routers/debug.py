@@ -0,0 +1,28 @@
+"""デバッグ用ルーター（ジョブのプロファイル）"""
+
+import logging
+
+from fastapi import APIRouter
+
+from api.schemas import ProfileRequest, ProfileStatusResponse
+from profiling import get_job_profiler
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/debug/profile", response_model=ProfileStatusResponse)
+async def get_profile_status():
+    """プロファイラの状態と直近の出力一覧"""
+    return ProfileStatusResponse(**get_job_profiler().status())
+
+
+@router.post("/debug/profile", response_model=ProfileStatusResponse)
+async def arm_profiler(req: ProfileRequest):
+    """
+    次の N ジョブ（API 文字起こし・バッチ・監視）をプロファイルする。
+    出力は <output_dir>/<job_id>.folded（sample）または .prof / .txt（cprofile）。
+    """
+    profiler = get_job_profiler()
+    profiler.arm(req.jobs, mode=req.mode, interval=req.interval_ms / 1000.0)
+    return ProfileStatusResponse(**profiler.status())
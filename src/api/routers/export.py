@@ -3,10 +3,17 @@
 import asyncio
 import logging
 import os
+import time
 
 from fastapi import APIRouter, HTTPException
 
-from api.schemas import ExportRequest, ExportResponse
+from api.schemas import (
+    ExportRequest, ExportResponse,
+    ExportBundleRequest, ExportBundleResponse, ExportBundleItem,
+    ArchiveReadRequest, ArchiveReadResponse,
+)
+import tracing
+from metrics import EXPORT_ERRORS, EXPORT_SECONDS
 from validators import Validator, ValidationError
 
 logger = logging.getLogger(__name__)
@@ -20,6 +27,7 @@ _FORMAT_EXTENSIONS = {
     "srt": ".srt",
     "vtt": ".vtt",
     "json": ".json",
+    "ktb": ".ktb",
 }
 
 
@@ -38,6 +46,83 @@ def _get_segments(req: ExportRequest):
     return [{"text": req.text, "start": 0, "end": 0, "speaker": ""}]
 
 
+def _run_bundle(req: ExportBundleRequest) -> ExportBundleResponse:
+    """正規化 → 各形式の並行書き出し（スレッドプール内で実行）"""
+    from export.bundle import NormalizedTranscript, export_bundle
+    start = time.perf_counter()
+    with tracing.span("normalize", segments=len(req.segments)):
+        transcript = NormalizedTranscript.from_segments(req.text, req.segments)
+    normalize_seconds = time.perf_counter() - start
+    results = export_bundle(transcript, req.output_base, req.formats)
+    return ExportBundleResponse(
+        success=all(r.success for r in results),
+        results=[ExportBundleItem(**r.to_dict()) for r in results],
+        normalize_seconds=round(normalize_seconds, 4),
+        total_seconds=round(time.perf_counter() - start, 4),
+    )
+
+
+@router.post("/export/bundle", response_model=ExportBundleResponse)
+async def export_bundle_files(req: ExportBundleRequest):
+    """
+    複数形式を1リクエストで一括エクスポート
+
+    セグメントを一度だけ正規化・検証し、時刻整形を形式間で共有したうえで
+    各形式をスレッドプールで並行して書き出す。形式ごとの成否・所要時間・パスを返す。
+    """
+    _validate_output_path(req.output_base)
+    if {"srt", "vtt"} & set(req.formats) and not req.segments:
+        raise HTTPException(status_code=400, detail="字幕エクスポートにはセグメント情報が必要です")
+
+    try:
+        with tracing.trace("export_bundle", formats=",".join(req.formats)) as root:
+            response = await asyncio.to_thread(_run_bundle, req)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Bundle export rejected: {e}")
+        raise HTTPException(status_code=400, detail="エクスポート対象が不正です")
+    response.trace = root.to_dict()
+    if tracing.trace_output_dir():
+        name = os.path.splitext(os.path.basename(req.output_base))[0]
+        await asyncio.to_thread(tracing.save_trace, root, f"export_{name}")
+    return response
+
+
+def _read_archive(req: ArchiveReadRequest) -> ArchiveReadResponse:
+    """アーカイブの索引から範囲内のブロックだけを読み込む（スレッドプール内で実行）"""
+    from export.transcript_archive import TranscriptArchive
+    with TranscriptArchive(req.path) as archive:
+        return ArchiveReadResponse(
+            text=archive.text() if req.include_text else None,
+            segments=archive.read_segments(req.start, req.end),
+            metadata=archive.metadata,
+            engine_config=archive.engine_config,
+            total_segments=len(archive),
+            duration=archive.duration,
+        )
+
+
+@router.post("/export/archive/read", response_model=ArchiveReadResponse)
+async def read_archive_file(req: ArchiveReadRequest):
+    """
+    書き起こしアーカイブ（ktb）を読み込む
+
+    start / end を指定すると、その時間範囲と重なるセグメントだけを返す。
+    """
+    from export.transcript_archive import ArchiveFormatError
+    try:
+        Validator.validate_file_path(req.path, allowed_extensions={".ktb"}, must_exist=True)
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="アーカイブのパスが不正です")
+    if req.start is not None and req.end is not None and req.end < req.start:
+        raise HTTPException(status_code=400, detail="終了時刻が開始時刻より前です")
+    try:
+        with tracing.trace("archive_read", path=os.path.basename(req.path)):
+            return await asyncio.to_thread(_read_archive, req)
+    except ArchiveFormatError as e:
+        logger.warning(f"Archive read rejected: {e}")
+        raise HTTPException(status_code=400, detail="アーカイブの形式が不正です")
+
+
 @router.post("/export/{format}", response_model=ExportResponse)
 async def export_file(format: str, req: ExportRequest):
     """文字起こし結果をエクスポート"""
@@ -50,24 +135,26 @@ async def export_file(format: str, req: ExportRequest):
         if actual_ext and actual_ext != expected_ext:
             raise HTTPException(status_code=400, detail="出力パスの拡張子がフォーマットと一致しません")
 
+    exporter = _EXPORTERS.get(format)
+    if exporter is None:
+        raise HTTPException(status_code=400, detail="未対応のフォーマットです")
+
     try:
-        if format == "txt":
-            return await asyncio.to_thread(_export_txt, req)
-        elif format == "docx":
-            return await asyncio.to_thread(_export_docx, req)
-        elif format == "xlsx":
-            return await asyncio.to_thread(_export_xlsx, req)
-        elif format == "srt":
-            return await asyncio.to_thread(_export_srt, req)
-        elif format == "vtt":
-            return await asyncio.to_thread(_export_vtt, req)
-        elif format == "json":
-            return await asyncio.to_thread(_export_json, req)
-        else:
-            raise HTTPException(status_code=400, detail="未対応のフォーマットです")
-    except HTTPException:
+        # to_thread はコンテキストを引き継ぐため、エクスポータ内のスパンもこのトレースに入る
+        with tracing.trace("export", format=format, segments=len(req.segments)) as root, \
+                EXPORT_SECONDS.labels(format).time():
+            response = await asyncio.to_thread(exporter, req)
+        response.trace = root.to_dict()
+        if tracing.trace_output_dir():
+            name = os.path.splitext(os.path.basename(req.output_path))[0]
+            await asyncio.to_thread(tracing.save_trace, root, f"export_{name}")
+        return response
+    except HTTPException as e:
+        if e.status_code >= 500:
+            EXPORT_ERRORS.labels(format).inc()
         raise
     except Exception as e:
+        EXPORT_ERRORS.labels(format).inc()
         logger.error(f"Export failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="エクスポート処理中にエラーが発生しました")
 
@@ -145,3 +232,23 @@ def _export_json(req: ExportRequest) -> ExportResponse:
     }
     atomic_write_text(req.output_path, json.dumps(data, ensure_ascii=False, indent=2))
     return ExportResponse(success=True, output_path=req.output_path, message="JSONエクスポート完了")
+
+
+def _export_ktb(req: ExportRequest) -> ExportResponse:
+    """書き起こしアーカイブ（ktb）としてエクスポート"""
+    from export.transcript_archive import write_archive
+    write_archive(req.output_path, req.text, _get_segments(req),
+                  metadata=req.metadata, engine_config=req.engine_config)
+    return ExportResponse(success=True, output_path=req.output_path, message="KTBエクスポート完了")
+
+
+# フォーマット → エクスポート関数
+_EXPORTERS = {
+    "txt": _export_txt,
+    "docx": _export_docx,
+    "xlsx": _export_xlsx,
+    "srt": _export_srt,
+    "vtt": _export_vtt,
+    "json": _export_json,
+    "ktb": _export_ktb,
+}
@@ -1,15 +1,28 @@
 """ヘルスチェックルーター"""
 
+import asyncio
 import logging
 import os
 import signal
 import threading
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
 from api.schemas import HealthResponse, MessageResponse
+from metrics import PROMETHEUS_CONTENT_TYPE, get_metrics_registry
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
+
+# 収集時に更新するキュー深さ等のゲージ
+_registry = get_metrics_registry()
+_JOB_QUEUE_DEPTH = _registry.gauge("kotoba_job_queue_depth", "Queued jobs", ["priority"])
+_JOB_RUNNING = _registry.gauge("kotoba_job_running", "1 while a job is running")
+_EVENT_SUBSCRIBERS = _registry.gauge("kotoba_event_subscribers", "EventBus subscribers")
+_EVENT_QUEUE_DEPTH = _registry.gauge("kotoba_event_queue_depth", "Undelivered events across subscribers")
+_WS_CONNECTIONS = _registry.gauge("kotoba_websocket_connections", "Open WebSocket connections")
+_WS_SEND_QUEUE_DEPTH = _registry.gauge("kotoba_websocket_send_queue_depth",
+                                       "Unsent events across WebSocket connections")
 _shutdown_lock = threading.Lock()
 _shutdown_requested = False
 
@@ -38,6 +51,46 @@ async def health_check():
     )
 
 
+def _update_job_gauges():
+    """
+    ジョブキュー深さを現在値に更新。
+    メトリクス取得でスケジューラ・ジョブストア（DB ファイル）を生成しないよう、
+    未生成の場合は 0 を報告する
+    """
+    from api.job_scheduler import peek_job_scheduler
+    from api.job_store import JOB_PRIORITIES
+
+    scheduler = peek_job_scheduler()
+    store = scheduler.opened_store if scheduler is not None else None
+    for priority in JOB_PRIORITIES:
+        _JOB_QUEUE_DEPTH.labels(priority).set(len(store.queued_ids(priority)) if store else 0)
+    _JOB_RUNNING.set(1 if scheduler is not None and scheduler.current_job() is not None else 0)
+
+
+def _update_runtime_gauges():
+    """イベント購読者数・接続数を現在値に更新"""
+    from api.event_bus import get_event_bus
+    from api.websocket import manager
+
+    subscriber_stats = get_event_bus().get_stats()
+    _EVENT_SUBSCRIBERS.set(len(subscriber_stats))
+    _EVENT_QUEUE_DEPTH.set(sum(s["queue_size"] for s in subscriber_stats))
+
+    _WS_CONNECTIONS.set(manager.connection_count())
+    _WS_SEND_QUEUE_DEPTH.set(sum(c["queue_size"] for c in manager.get_stats()))
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus テキスト形式のメトリクス"""
+    try:
+        await asyncio.to_thread(_update_job_gauges)
+        _update_runtime_gauges()
+    except Exception as e:
+        logger.debug(f"Runtime gauge update failed: {e}")
+    return Response(content=_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @router.post("/shutdown", response_model=MessageResponse)
 async def shutdown():
     """グレースフルシャットダウン — Tauri sidecar から呼び出される"""
@@ -0,0 +1,102 @@
+"""ジョブキュールーター"""
+
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from api.job_scheduler import JobScheduler, get_job_scheduler
+from api.job_store import Job
+from api.schemas import JobSubmitRequest, JobResponse, JobListResponse, JobStatus
+from validators import Validator, ValidationError
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+def validate_audio_path(file_path: str):
+    """ファイルパスの存在とセキュリティを検証（音声/動画拡張子チェック付き）"""
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="指定されたファイルが見つかりません")
+    try:
+        Validator.validate_file_path(
+            file_path, must_exist=True,
+            allowed_extensions=Validator.ALLOWED_AUDIO_EXTENSIONS
+        )
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="ファイルパスが不正です")
+
+
+def get_running_scheduler() -> JobScheduler:
+    """起動済みの JobScheduler を取得"""
+    scheduler = get_job_scheduler()
+    scheduler.ensure_started()
+    return scheduler
+
+
+def to_job_response(scheduler: JobScheduler, job: Job) -> JobResponse:
+    """Job → JobResponse"""
+    return JobResponse(
+        **job.to_dict(),
+        cancel_requested=job.status == "running" and scheduler.is_cancel_requested(job.job_id),
+    )
+
+
+@router.post("/jobs", response_model=JobResponse)
+async def submit_job(req: JobSubmitRequest):
+    """
+    文字起こしジョブを投入。
+    エンジンが使用中でも拒否せずキューに追加し、優先度順に実行する。
+    """
+    validate_audio_path(req.file_path)
+    scheduler = get_running_scheduler()
+    job = await asyncio.to_thread(
+        scheduler.submit,
+        req.file_path,
+        priority=req.priority,
+        options=req.model_dump(exclude={"file_path", "priority"}),
+    )
+    return to_job_response(scheduler, job)
+
+
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs(
+    status: Optional[JobStatus] = Query(None, description="ステータスで絞り込み"),
+    batch_id: Optional[str] = Query(None, description="バッチIDで絞り込み"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """ジョブ一覧（新しい順）"""
+    scheduler = get_running_scheduler()
+    jobs = await asyncio.to_thread(scheduler.list, status=status, batch_id=batch_id, limit=limit)
+    queued = await asyncio.to_thread(scheduler.store.queued_ids)
+    current = scheduler.current_job()
+    return JobListResponse(
+        jobs=[to_job_response(scheduler, job) for job in jobs],
+        queued=len(queued),
+        running_job_id=current.job_id if current else None,
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """ジョブ状態を取得"""
+    scheduler = get_running_scheduler()
+    job = await asyncio.to_thread(scheduler.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return to_job_response(scheduler, job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """
+    ジョブをキャンセル。
+    待機中のジョブは即座に cancelled、実行中のジョブはエンジン処理の区切りで破棄される。
+    """
+    scheduler = get_running_scheduler()
+    job = await asyncio.to_thread(scheduler.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return to_job_response(scheduler, job)
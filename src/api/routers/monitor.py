@@ -10,6 +10,7 @@ from api.schemas import MonitorRequest, MonitorStatusResponse, MessageResponse
 from api.dependencies import get_worker_state
 from api.event_bus import get_event_bus
 from api.folder_monitor_service import FolderMonitorService
+from api.routers.jobs import get_running_scheduler
 from validators import Validator, ValidationError
 
 logger = logging.getLogger(__name__)
@@ -18,15 +19,16 @@ router = APIRouter()
 
 @router.post("/monitor/start", response_model=MessageResponse)
 async def start_monitor(req: MonitorRequest):
-    """フォルダ監視を開始"""
-    if not os.path.isdir(req.folder_path):
-        raise HTTPException(status_code=404, detail="指定されたフォルダが見つかりません")
+    """フォルダ監視を開始（準備完了ファイルは monitor 優先度のジョブとして自動投入）"""
+    for folder in [req.folder_path, *req.additional_folders]:
+        if not os.path.isdir(folder):
+            raise HTTPException(status_code=404, detail="指定されたフォルダが見つかりません")
 
-    # フォルダパスバリデーション
-    try:
-        Validator.validate_file_path(req.folder_path, must_exist=True)
-    except ValidationError as e:
-        raise HTTPException(status_code=400, detail="フォルダパスが不正です")
+        # フォルダパスバリデーション
+        try:
+            Validator.validate_file_path(folder, must_exist=True)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail="フォルダパスが不正です")
 
     state = get_worker_state()
     bus = get_event_bus()
@@ -34,6 +36,12 @@ async def start_monitor(req: MonitorRequest):
         folder_path=req.folder_path,
         check_interval=req.check_interval,
         event_bus=bus,
+        stable_seconds=req.stable_seconds,
+        scheduler=get_running_scheduler(),
+        job_options={"enable_diarization": req.enable_diarization},
+        max_in_flight=req.max_in_flight,
+        additional_folders=req.additional_folders,
+        recursive=req.recursive,
     )
     if not state.try_set_folder_monitor(monitor):
         raise HTTPException(status_code=409, detail="フォルダ監視が既に実行中です")
@@ -71,13 +79,16 @@ async def get_monitor_status():
     return MonitorStatusResponse(
         is_running=True,
         folder_path=monitor.folder_path,
+        folder_paths=monitor.folder_paths,
+        recursive=monitor.recursive,
         check_interval=monitor.check_interval,
+        **monitor.get_status(),
     )
 
 
 @router.post("/monitor/mark-processed", response_model=MessageResponse)
 async def mark_processed(file_path: str = Body(..., embed=True)):
-    """ファイルを処理済みとしてマーク"""
+    """ファイルを処理済みとしてマーク（監視が投入したジョブは完了時に自動でマークされる）"""
     # パスバリデーション（パストラバーサル防止）
     try:
         Validator.validate_file_path(file_path, must_exist=False)
@@ -6,7 +6,7 @@ import logging
 from fastapi import APIRouter, HTTPException
 
 from api.schemas import RealtimeControlRequest, RealtimeStatusResponse, MessageResponse
-from api.dependencies import get_worker_state
+from api.dependencies import get_engine_lock, get_transcription_engine, get_worker_state, is_engine_busy
 from api.event_bus import get_event_bus
 from api.realtime_worker import RealtimeWorker
 
@@ -25,6 +25,13 @@ async def start_realtime(req: RealtimeControlRequest):
         buffer_duration=req.buffer_duration,
         vad_threshold=req.vad_threshold,
         event_bus=bus,
+        adaptive=req.adaptive,
+        target_latency=req.target_latency,
+        fallback_model_size=req.fallback_model_size,
+        enable_refinement=req.enable_refinement,
+        refine_engine_getter=get_transcription_engine,
+        is_refine_engine_busy=is_engine_busy,
+        refine_engine_lock=get_engine_lock(),
     )
     if not state.try_set_realtime_worker(worker):
         raise HTTPException(status_code=409, detail="リアルタイム文字起こしが既に実行中です")
@@ -83,4 +90,5 @@ async def get_realtime_status():
         is_running=True,
         is_paused=worker.is_paused(),
         model_size=worker.model_size,
+        decoding_profile=worker.get_decoding_profile(),
     )
@@ -1,182 +1,289 @@
 """文字起こしルーター"""
 
 import asyncio
+import json
 import logging
 import os
+import tempfile
 import threading
 import time
+from collections import deque
+from typing import IO, Any, AsyncIterator, Deque, Dict, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from api.schemas import (
     TranscribeRequest, TranscribeResponse,
     BatchTranscribeRequest, BatchTranscribeResponse,
     MessageResponse,
 )
-from api.dependencies import (
-    get_transcription_engine, get_text_formatter, get_worker_state,
-)
-from api.event_bus import get_event_bus
-from api.workers import BatchTranscriptionWorker
-from constants import normalize_segments as _normalize_segments
-from validators import Validator, ValidationError
+from api.dependencies import get_engine_lock
+from audio_metadata import probe_durations
+from api.routers.jobs import get_running_scheduler, validate_audio_path
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# エンジン排他ロック（同時に1つの文字起こしのみ許可）
-_engine_lock = threading.Lock()
+# 後方互換: エンジン排他ロック（実際の排他は JobScheduler が保持）
+_engine_lock = get_engine_lock()
 
+# 後方互換: 旧名でもアクセス可能
+_validate_file_path = validate_audio_path
 
-class _EngineBusyError(Exception):
-    """エンジンがビジー状態（ロック取得失敗）"""
-    pass
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
+# ストリーミング応答でメモリに保持する未送信レコードの上限（超えた分は一時ファイルへ退避）
+STREAM_MAX_PENDING_RECORDS = 256
 
-def _validate_file_path(file_path: str):
-    """ファイルパスの存在とセキュリティを検証（音声/動画拡張子チェック付き）"""
-    if not os.path.isfile(file_path):
-        raise HTTPException(status_code=404, detail="指定されたファイルが見つかりません")
-    try:
-        Validator.validate_file_path(
-            file_path, must_exist=True,
-            allowed_extensions=Validator.ALLOWED_AUDIO_EXTENSIONS
-        )
-    except ValidationError as e:
-        raise HTTPException(status_code=400, detail="ファイルパスが不正です")
 
+class _RecordChannel:
+    """
+    ジョブスレッド → レスポンス生成コルーチンへのチャネル。
+    push() はジョブ（スケジューラー）スレッドを決して待たせない。メモリ上の未送信
+    レコードが上限に達したら以降は一時ファイルへ追記し、受信側は読み出し順を
+    保ったままメモリ → 一時ファイルの順に取り出す。受信側が閉じた後のレコードは破棄する。
+    """
 
-def _do_transcribe(engine, file_path: str, bus, req):
-    """同期コンテキストで文字起こしを実行（スレッドプール用）"""
-    if not _engine_lock.acquire(timeout=1):
-        raise _EngineBusyError()
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 maxsize: int = STREAM_MAX_PENDING_RECORDS):
+        self._loop = loop
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._spill: Optional[IO[bytes]] = None
+        self._spill_read_pos = 0
+        self._spill_count = 0
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.spilled = 0
+
+    def push(self, kind: str, data: Dict[str, Any]) -> None:
+        """ジョブスレッドから呼ばれる（ブロックしない）"""
+        record = {"type": kind, **data}
+        with self._lock:
+            if self._closed:
+                return
+            if self._spill_count == 0 and len(self._pending) < self._maxsize:
+                self._pending.append(record)
+            else:
+                # 退避中は後続もファイルへ書き、送信順を保つ
+                try:
+                    if self._spill is None:
+                        self._spill = tempfile.TemporaryFile(prefix="ndjson_spool_")
+                    self._spill.seek(0, os.SEEK_END)
+                    self._spill.write(_ndjson_line(record))
+                except OSError as e:
+                    logger.warning(f"NDJSON spill failed, dropping record: {e}")
+                    return
+                self._spill_count += 1
+                self.spilled += 1
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # イベントループ終了済み
+
+    def _pop(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._pending:
+                return self._pending.popleft()
+            if self._spill_count == 0 or self._spill is None:
+                return None
+            self._spill.seek(self._spill_read_pos)
+            line = self._spill.readline()
+            self._spill_read_pos = self._spill.tell()
+            self._spill_count -= 1
+            if self._spill_count == 0:
+                # 退避分を読み切ったらファイルを空にしてメモリ側へ戻る
+                self._spill.seek(0)
+                self._spill.truncate()
+                self._spill_read_pos = 0
+        return json.loads(line)
+
+    async def get(self) -> Dict[str, Any]:
+        while True:
+            record = self._pop()
+            if record is not None:
+                return record
+            self._ready.clear()
+            record = self._pop()
+            if record is not None:
+                return record
+            await self._ready.wait()
+
+    def get_nowait(self) -> Dict[str, Any]:
+        record = self._pop()
+        if record is None:
+            raise asyncio.QueueEmpty
+        return record
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+            self._spill_count = 0
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+def _ndjson_line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _stream_job_records(scheduler, job_id: str, channel: _RecordChannel,
+                              start_time: float) -> AsyncIterator[bytes]:
+    """
+    NDJSON レコードを生成:
+    job → segment* → speaker* → text → done / error / cancelled
+    """
+    done = asyncio.ensure_future(scheduler.wait(job_id))
     try:
-        if not engine.is_loaded:
-            engine.load_model()
-        bus.emit("progress", {"value": 20})
-
-        bus.emit("progress", {"value": 40})
-        result = engine.transcribe(file_path, return_timestamps=True)
-        text = result.get("text", "")
-        segments = _normalize_segments(result)
-        bus.emit("progress", {"value": 70})
+        yield _ndjson_line({"type": "job", "job_id": job_id})
+        while True:
+            getter = asyncio.ensure_future(channel.get())
+            await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield _ndjson_line(getter.result())
+                continue
+            getter.cancel()
+            break
+
+        # ジョブ終了前に投入済みのレコードを送り切る
+        while True:
+            try:
+                record = channel.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            yield _ndjson_line(record)
+
+        finished = done.result()
+        if finished.status == "completed":
+            result = finished.result or {}
+            yield _ndjson_line({
+                "type": "done",
+                "job_id": job_id,
+                "segment_count": result.get("segment_count", 0),
+                "duration": time.time() - start_time,
+                "trace": result.get("trace"),
+            })
+        elif finished.status == "cancelled":
+            yield _ndjson_line({"type": "cancelled", "job_id": job_id,
+                                "message": "文字起こしがキャンセルされました"})
+        else:
+            yield _ndjson_line({"type": "error", "job_id": job_id,
+                                "message": finished.error or "文字起こし処理中にエラーが発生しました"})
     finally:
-        _engine_lock.release()
-
-    # 話者分離（オプション）— エンジンロック外で実行
-    if req.enable_diarization:
-        try:
-            from speaker_diarization_free import FreeSpeakerDiarizer
-            diarizer = FreeSpeakerDiarizer()
-            bus.emit("progress", {"value": 75})
-            diar_segments = diarizer.diarize(file_path)
-            bus.emit("progress", {"value": 85})
-            text = diarizer.format_with_speakers(segments, diar_segments)
-        except Exception as e:
-            logger.warning(f"Speaker diarization failed: {e}", exc_info=True)
-
-    # テキストフォーマット
-    if req.remove_fillers or req.add_punctuation or req.format_paragraphs:
-        formatter = get_text_formatter()
-        text = formatter.format_all(
-            text,
-            remove_fillers=req.remove_fillers,
-            add_punctuation=req.add_punctuation,
-            format_paragraphs=req.format_paragraphs,
-        )
-
-    bus.emit("progress", {"value": 100})
-    return text, segments
+        channel.close()
+        if not done.done():
+            # クライアント切断 — ジョブを破棄
+            done.cancel()
+            await asyncio.to_thread(scheduler.cancel, job_id)
 
 
 @router.post("/transcribe", response_model=TranscribeResponse)
-async def transcribe_file(req: TranscribeRequest):
+async def transcribe_file(req: TranscribeRequest, request: Request):
     """
     単一ファイル文字起こし。
-    重い処理はスレッドプールで実行し、進捗は WebSocket 経由で配信。
-    排他制御は _engine_lock で行う（409を返す）。
+    interactive 優先度のジョブとして投入し、完了まで待って結果を返す。
+    エンジン使用中は 409 を返さずキューで待機する。進捗は WebSocket 経由で配信。
+
+    Accept: application/x-ndjson の場合は、セグメント・話者区間・整形済みテキストを
+    生成され次第1行1レコードで返すストリーミング応答になる（全セグメントを保持しない）。
     """
     _validate_file_path(req.file_path)
 
-    bus = get_event_bus()
-    engine = get_transcription_engine()
-    start_time = time.time()
+    scheduler = get_running_scheduler()
+    if _wants_ndjson(request):
+        channel = _RecordChannel(asyncio.get_running_loop())
+        job = await asyncio.to_thread(
+            scheduler.submit,
+            req.file_path,
+            priority="interactive",
+            options=req.model_dump(exclude={"file_path"}),
+            record_listener=channel.push,
+        )
+        return StreamingResponse(
+            _stream_job_records(scheduler, job.job_id, channel, time.time()),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
 
+    start_time = time.time()
+    job = await asyncio.to_thread(
+        scheduler.submit,
+        req.file_path,
+        priority="interactive",
+        options=req.model_dump(exclude={"file_path"}),
+    )
     try:
-        text, segments = await asyncio.to_thread(
-            _do_transcribe, engine, req.file_path, bus, req
+        finished = await scheduler.wait(job.job_id)
+    except BaseException:
+        # クライアント切断等 — 待機中のジョブは実行しない
+        await asyncio.to_thread(scheduler.cancel, job.job_id)
+        raise
+
+    if finished.status == "completed":
+        result = finished.result or {}
+        return TranscribeResponse(
+            text=result.get("text", ""),
+            segments=result.get("segments", []),
+            duration=time.time() - start_time,
+            job_id=finished.job_id,
+            trace=result.get("trace"),
         )
-        duration = time.time() - start_time
-        bus.emit("finished", {"text": text})
-
-        return TranscribeResponse(text=text, segments=segments, duration=duration)
-
-    except _EngineBusyError:
-        raise HTTPException(status_code=409, detail="別の文字起こし処理が実行中です")
-    except Exception as e:
-        logger.error(f"Transcription failed: {e}", exc_info=True)
-        bus.emit("error", {"message": "文字起こし処理中にエラーが発生しました"})
-        raise HTTPException(status_code=500, detail="文字起こし処理中にエラーが発生しました")
+    if finished.status == "cancelled":
+        raise HTTPException(status_code=409, detail="文字起こしがキャンセルされました")
+    raise HTTPException(status_code=500, detail="文字起こし処理中にエラーが発生しました")
 
 
 @router.post("/batch-transcribe", response_model=BatchTranscribeResponse)
 async def batch_transcribe(req: BatchTranscribeRequest):
     """
     バッチ文字起こし（非同期開始）。
-    進捗は WebSocket 経由で配信。
+    各ファイルを batch 優先度のジョブとして投入する（実行中のバッチがあっても拒否しない）。
+    進捗は WebSocket 経由で配信（各ファイルの長さで重み付けした進捗・残り時間を含む）。
     """
     for fp in req.file_paths:
         _validate_file_path(fp)
 
-    state = get_worker_state()
-    formatter = get_text_formatter() if (req.remove_fillers or req.add_punctuation) else None
-    bus = get_event_bus()
-
-    worker = BatchTranscriptionWorker(
-        audio_paths=req.file_paths,
-        enable_diarization=req.enable_diarization,
-        max_workers=req.max_workers,
-        formatter=formatter,
-        event_bus=bus,
+    formatting = req.remove_fillers or req.add_punctuation
+    options = {
+        "enable_diarization": req.enable_diarization,
+        "remove_fillers": formatting,
+        "add_punctuation": formatting,
+        "format_paragraphs": formatting,
+        "clean_repeated": formatting,
+        "write_output": True,
+    }
+    scheduler = get_running_scheduler()
+    durations = await asyncio.to_thread(probe_durations, req.file_paths)
+    batch_id, _ = await asyncio.to_thread(
+        scheduler.submit_batch, req.file_paths, priority="batch", options=options,
+        durations=durations, order=req.order,
     )
-    if not state.try_set_batch_worker(worker):
-        raise HTTPException(status_code=409, detail="別のバッチ処理が実行中です")
-    worker.start()
-
-    # 終了後のクリーンアップを登録
-    def cleanup():
-        try:
-            worker.join(timeout=1)
-        except Exception:
-            pass
-        finally:
-            state.clear_batch_worker()
-
-    threading.Thread(target=cleanup, daemon=True).start()
 
     return BatchTranscribeResponse(
-        message="バッチ処理を開始しました",
+        message="バッチ処理をキューに追加しました",
         total_files=len(req.file_paths),
+        batch_id=batch_id,
     )
 
 
 @router.post("/cancel-transcription", response_model=MessageResponse)
 async def cancel_transcription():
-    """実行中の文字起こしをキャンセル"""
-    state = get_worker_state()
-    worker = state.get_transcription_worker()
-    if worker and worker.is_alive():
-        worker.cancel()
+    """実行中・待機中の単一ファイル文字起こし（interactive ジョブ）をキャンセル"""
+    if await asyncio.to_thread(get_running_scheduler().cancel_where, priority="interactive"):
         return MessageResponse(message="キャンセルリクエストを送信しました")
     return MessageResponse(message="実行中の処理はありません")
 
 
 @router.post("/cancel-batch", response_model=MessageResponse)
 async def cancel_batch():
-    """実行中のバッチ処理をキャンセル"""
-    state = get_worker_state()
-    worker = state.get_batch_worker()
-    if worker and worker.is_alive():
-        worker.cancel()
+    """実行中・待機中のバッチジョブをキャンセル"""
+    if await asyncio.to_thread(get_running_scheduler().cancel_where, priority="batch"):
         return MessageResponse(message="バッチキャンセルリクエストを送信しました")
     return MessageResponse(message="実行中のバッチ処理はありません")
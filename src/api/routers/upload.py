@@ -0,0 +1,117 @@
+"""ストリーミングアップロードルーター"""
+
+import asyncio
+import logging
+import os
+import uuid
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from api.routers.jobs import get_running_scheduler
+from api.schemas import UploadResponse
+from api.upload_stream import UploadAborted, default_upload_dir, get_upload_registry
+from validators import Validator
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+# アップロードサイズ上限（環境変数 KOTOBA_MAX_UPLOAD_BYTES で上書き可能）
+MAX_UPLOAD_BYTES = int(os.environ.get("KOTOBA_MAX_UPLOAD_BYTES", str(4 * 1024 ** 3)))
+
+
+@router.post("/upload", response_model=UploadResponse)
+async def upload_and_transcribe(
+    request: Request,
+    filename: str = Query(..., description="元のファイル名（拡張子で形式を判定）"),
+    enable_diarization: bool = Query(False, description="話者分離を有効にする"),
+    remove_fillers: bool = Query(True, description="フィラー除去"),
+    add_punctuation: bool = Query(True, description="句読点付与"),
+    format_paragraphs: bool = Query(True, description="段落整形"),
+    wait: bool = Query(False, description="文字起こし完了まで待って結果を返す"),
+):
+    """
+    音声/動画ファイルをリクエストボディ（application/octet-stream）で受け取り文字起こし。
+
+    ボディはチャンク単位でディスクに書き出し、受信と並行して interactive ジョブが
+    ffmpeg で逐次デコード → 確定した発話区間から文字起こしを進める。
+    区間ごとの結果は WebSocket の job_segment イベントで配信される。
+    """
+    ext = os.path.splitext(os.path.basename(filename))[1].lower()
+    if ext not in Validator.ALLOWED_AUDIO_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="対応していないファイル形式です")
+
+    content_length = request.headers.get("content-length")
+    expected = int(content_length) if content_length and content_length.isdigit() else None
+    if expected is not None and expected > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="ファイルサイズが上限を超えています")
+
+    upload_id = uuid.uuid4().hex
+    registry = get_upload_registry()
+    spool = registry.create(upload_id, os.path.join(default_upload_dir(), f"{upload_id}{ext}"),
+                            expected_bytes=expected)
+
+    scheduler = get_running_scheduler()
+    # スプール作成後に投入する（ジョブは受信途中のファイルを読み始める）
+    job = await asyncio.to_thread(
+        scheduler.submit,
+        spool.path,
+        priority="interactive",
+        kind="upload",
+        options={
+            "upload_id": upload_id,
+            "filename": os.path.basename(filename),
+            "enable_diarization": enable_diarization,
+            "remove_fillers": remove_fillers,
+            "add_punctuation": add_punctuation,
+            "format_paragraphs": format_paragraphs,
+        },
+    )
+
+    def _discard_unstarted(finished) -> None:
+        # 開始前にキャンセルされたジョブ（切断・サイズ超過・待機中断・ジョブAPIからの取り消し）は
+        # スプールを削除する者がいないためここで片付ける。開始済みならジョブ側が削除する
+        if finished.started_at is None:
+            registry.remove(upload_id)
+            spool.remove()
+
+    await asyncio.to_thread(scheduler.add_done_callback, job.job_id, _discard_unstarted)
+
+    try:
+        async for chunk in request.stream():
+            if spool.bytes_written + len(chunk) > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="ファイルサイズが上限を超えています")
+            await asyncio.to_thread(spool.write, chunk)
+    except UploadAborted:
+        # ジョブ側がキャンセル・失敗でスプールを閉じた
+        await asyncio.to_thread(scheduler.cancel, job.job_id)
+        raise HTTPException(status_code=409, detail="アップロード先のジョブが終了しました")
+    except BaseException:
+        # クライアント切断・サイズ超過 — 読み手を解放してジョブを破棄
+        spool.abort()
+        registry.remove(upload_id)
+        await asyncio.to_thread(scheduler.cancel, job.job_id)
+        raise
+    spool.finish()
+    logger.info(f"Upload {upload_id} received: {spool.bytes_written} bytes")
+
+    if not wait:
+        current = await asyncio.to_thread(scheduler.get, job.job_id) or job
+        return UploadResponse(upload_id=upload_id, job_id=job.job_id,
+                              bytes_received=spool.bytes_written, status=current.status)
+
+    try:
+        finished = await scheduler.wait(job.job_id)
+    except BaseException:
+        await asyncio.to_thread(scheduler.cancel, job.job_id)
+        raise
+    if finished.status == "failed":
+        raise HTTPException(status_code=500, detail="文字起こし処理中にエラーが発生しました")
+    if finished.status == "cancelled":
+        raise HTTPException(status_code=409, detail="文字起こしがキャンセルされました")
+    result = finished.result or {}
+    return UploadResponse(
+        upload_id=upload_id, job_id=job.job_id, bytes_received=spool.bytes_written,
+        status=finished.status, text=result.get("text", ""),
+        segments=result.get("segments", []),
+        trace=result.get("trace"),
+    )
@@ -24,6 +24,8 @@ class TranscribeResponse(BaseModel):
     text: str = Field("", description="文字起こしテキスト")
     segments: List[Dict[str, Any]] = Field(default_factory=list, description="セグメント情報")
     duration: Optional[float] = Field(None, description="処理時間（秒）")
+    job_id: Optional[str] = Field(None, description="ジョブID")
+    trace: Optional[Dict[str, Any]] = Field(None, description="処理段階ごとのスパンツリー")
 
 
 class BatchTranscribeRequest(BaseModel):
@@ -33,12 +35,67 @@ class BatchTranscribeRequest(BaseModel):
     max_workers: int = Field(1, ge=1, le=1, description="ワーカー数（エンジン排他のため常に1）")
     remove_fillers: bool = Field(True, description="フィラー除去")
     add_punctuation: bool = Field(True, description="句読点付与")
+    order: Literal["submission", "longest_first", "shortest_first"] = Field(
+        "submission", description="処理順（投入順 / 長い順 / 短い順）")
 
 
 class BatchTranscribeResponse(BaseModel):
     """バッチ文字起こし開始応答"""
     message: str = "バッチ処理を開始しました"
     total_files: int = Field(..., description="総ファイル数")
+    batch_id: Optional[str] = Field(None, description="バッチID（各ジョブの batch_id）")
+
+
+# --- Jobs ---
+
+JobPriority = Literal["interactive", "monitor", "batch"]
+JobStatus = Literal["queued", "running", "completed", "failed", "cancelled"]
+
+
+class JobSubmitRequest(BaseModel):
+    """ジョブ投入リクエスト"""
+    file_path: str = Field(..., description="音声/動画ファイルパス")
+    priority: JobPriority = Field("batch", description="優先度（interactive > monitor > batch）")
+    enable_diarization: bool = Field(False, description="話者分離を有効にする")
+    remove_fillers: bool = Field(True, description="フィラー除去")
+    add_punctuation: bool = Field(True, description="句読点付与")
+    format_paragraphs: bool = Field(True, description="段落整形")
+    write_output: bool = Field(False, description="結果を <ファイル名>_文字起こし.txt に保存")
+
+
+class JobResponse(BaseModel):
+    """ジョブ状態"""
+    job_id: str
+    kind: str = "transcribe"
+    priority: JobPriority
+    file_path: str
+    status: JobStatus
+    progress: float = 0.0
+    result: Optional[Dict[str, Any]] = Field(None, description="結果（text, segments, output_path）")
+    error: Optional[str] = None
+    batch_id: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: bool = Field(False, description="実行中ジョブにキャンセル要求済み")
+
+
+class JobListResponse(BaseModel):
+    """ジョブ一覧"""
+    jobs: List[JobResponse] = Field(default_factory=list)
+    queued: int = Field(0, description="待機中ジョブ数")
+    running_job_id: Optional[str] = None
+
+
+class UploadResponse(BaseModel):
+    """ストリーミングアップロード結果"""
+    upload_id: str
+    job_id: str
+    bytes_received: int = Field(0, description="受信バイト数")
+    status: JobStatus = Field(..., description="応答時点のジョブ状態")
+    text: Optional[str] = Field(None, description="文字起こしテキスト（wait=true で完了時のみ）")
+    segments: List[Dict[str, Any]] = Field(default_factory=list, description="セグメント情報（wait=true で完了時のみ）")
+    trace: Optional[Dict[str, Any]] = Field(None, description="処理段階ごとのスパンツリー（wait=true で完了時のみ）")
 
 
 # --- Realtime ---
@@ -49,6 +106,12 @@ class RealtimeControlRequest(BaseModel):
     device: str = Field("auto", description="デバイス (auto/cpu/cuda)")
     buffer_duration: float = Field(3.0, ge=1.0, le=10.0, description="バッファ時間（秒）")
     vad_threshold: float = Field(0.5, ge=0.0, le=1.0, description="VAD閾値")
+    adaptive: bool = Field(True, description="負荷に応じてデコード設定を自動調整")
+    target_latency: float = Field(2.0, ge=0.5, le=30.0, description="目標遅延（秒）")
+    fallback_model_size: Optional[Literal["tiny", "base", "small"]] = Field(
+        None, description="高負荷時に切り替える軽量モデル（未指定時は切り替えない）"
+    )
+    enable_refinement: bool = Field(False, description="無音時に高精度エンジンで再文字起こし（refined_text）")
 
 
 class RealtimeStatusResponse(BaseModel):
@@ -56,6 +119,7 @@ class RealtimeStatusResponse(BaseModel):
     is_running: bool = False
     is_paused: bool = False
     model_size: Optional[str] = None
+    decoding_profile: Optional[str] = None
 
 
 # --- Models ---
@@ -121,9 +185,11 @@ class ExportRequest(BaseModel):
     text: str = Field(..., max_length=10_000_000, description="エクスポート対象テキスト")
     segments: List[Dict[str, Any]] = Field(default_factory=list, max_length=100_000, description="セグメント情報")
     output_path: str = Field(..., description="出力ファイルパス")
-    format: Literal["txt", "docx", "xlsx", "srt", "vtt", "json"] = Field("txt", description="出力フォーマット")
+    format: Literal["txt", "docx", "xlsx", "srt", "vtt", "json", "ktb"] = Field("txt", description="出力フォーマット")
     include_timestamps: bool = Field(True, description="タイムスタンプを含める")
     include_speakers: bool = Field(False, description="話者情報を含める")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="アーカイブ（ktb）に保存するメタデータ")
+    engine_config: Dict[str, Any] = Field(default_factory=dict, description="アーカイブ（ktb）に保存するエンジン設定")
 
 
 class ExportResponse(BaseModel):
@@ -131,6 +197,54 @@ class ExportResponse(BaseModel):
     success: bool = True
     output_path: str = ""
     message: str = ""
+    trace: Optional[Dict[str, Any]] = Field(None, description="処理段階ごとのスパンツリー")
+
+
+ExportFormat = Literal["txt", "docx", "xlsx", "srt", "vtt", "json", "ktb"]
+
+
+class ExportBundleRequest(BaseModel):
+    """複数形式の一括エクスポートリクエスト"""
+    text: str = Field(..., max_length=10_000_000, description="エクスポート対象テキスト")
+    segments: List[Dict[str, Any]] = Field(default_factory=list, max_length=100_000, description="セグメント情報")
+    output_base: str = Field(..., description="拡張子を除いた出力パス（<output_base>.<format> に出力）")
+    formats: List[ExportFormat] = Field(..., min_length=1, max_length=7, description="出力フォーマット")
+
+
+class ExportBundleItem(BaseModel):
+    """一括エクスポートの形式ごとの結果"""
+    format: ExportFormat
+    output_path: str
+    success: bool
+    seconds: float = Field(0.0, description="書き出し時間（秒）")
+    error: Optional[str] = None
+
+
+class ExportBundleResponse(BaseModel):
+    """一括エクスポート結果"""
+    success: bool = Field(True, description="全形式が成功したか")
+    results: List[ExportBundleItem] = Field(default_factory=list)
+    normalize_seconds: float = Field(0.0, description="セグメント正規化時間（秒）")
+    total_seconds: float = Field(0.0, description="全体の処理時間（秒）")
+    trace: Optional[Dict[str, Any]] = Field(None, description="処理段階ごとのスパンツリー")
+
+
+class ArchiveReadRequest(BaseModel):
+    """書き起こしアーカイブ（ktb）の読み込みリクエスト"""
+    path: str = Field(..., description="アーカイブのパス")
+    start: Optional[float] = Field(None, ge=0, description="開始時刻（秒）。省略時は先頭から")
+    end: Optional[float] = Field(None, ge=0, description="終了時刻（秒）。省略時は末尾まで")
+    include_text: bool = Field(True, description="全文を含める")
+
+
+class ArchiveReadResponse(BaseModel):
+    """書き起こしアーカイブの読み込み結果"""
+    text: Optional[str] = None
+    segments: List[Dict[str, Any]] = Field(default_factory=list, description="範囲内のセグメント")
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    engine_config: Dict[str, Any] = Field(default_factory=dict)
+    total_segments: int = Field(0, description="アーカイブ全体のセグメント数")
+    duration: float = Field(0.0, description="アーカイブ全体の長さ（秒）")
 
 
 # --- Monitor ---
@@ -139,6 +253,10 @@ class MonitorRequest(BaseModel):
     """フォルダ監視リクエスト"""
     folder_path: str = Field(..., description="監視フォルダパス")
     check_interval: int = Field(10, ge=5, le=9999, description="チェック間隔（秒、上限なし）")
+    stable_seconds: float = Field(2.0, ge=0, le=600, description="サイズ・更新時刻がこの秒数変化しなければ準備完了とみなす")
+    max_in_flight: int = Field(8, ge=1, le=100, description="文字起こしキューに同時に投入しておくファイル数の上限")
+    additional_folders: List[str] = Field(default_factory=list, max_length=16, description="追加の監視フォルダ")
+    recursive: bool = Field(False, description="サブフォルダ以下も監視する")
     enable_diarization: bool = Field(False, description="話者分離を有効にする")
     auto_move: bool = Field(False, description="完了ファイルを自動移動")
     completed_folder: Optional[str] = Field(None, description="完了フォルダパス")
@@ -148,9 +266,20 @@ class MonitorStatusResponse(BaseModel):
     """フォルダ監視状態"""
     is_running: bool = False
     folder_path: Optional[str] = None
+    folder_paths: List[str] = Field(default_factory=list, description="監視フォルダ（folder_path と追加フォルダ）")
+    recursive: bool = False
     check_interval: int = 10
     total_processed: int = 0
     total_failed: int = 0
+    mode: Optional[Literal["events", "polling"]] = Field(None, description="events: ファイルシステムイベント / polling: 定期スキャン")
+    pending_files: int = Field(0, description="準備完了待ちのファイル数")
+    detected_files: int = Field(0, description="起動後に検出したファイル数（初回スキャンを除く）")
+    last_detection_latency: Optional[float] = Field(None, description="直近の検出遅延（最終更新から検出まで、秒）")
+    avg_detection_latency: Optional[float] = Field(None, description="平均検出遅延（秒）")
+    queued_files: int = Field(0, description="文字起こしキューで実行待ちのファイル数")
+    in_flight_files: int = Field(0, description="投入済みで未完了のファイル数（実行中を含む）")
+    deferred_files: int = Field(0, description="キューが上限に達したため投入を保留しているファイル数")
+    duplicate_files: int = Field(0, description="内容が同一の文字起こし済みファイルの出力を再利用した件数")
 
 
 # --- Common ---
@@ -167,3 +296,21 @@ class HealthResponse(BaseModel):
     status: str = "ok"
     version: str = "2.2"
     engines: Dict[str, bool] = Field(default_factory=dict)
+
+
+# --- Debug ---
+
+class ProfileRequest(BaseModel):
+    """プロファイル予約リクエスト"""
+    jobs: int = Field(1, ge=0, le=100, description="プロファイルするジョブ数（0で解除）")
+    mode: Literal["sample", "cprofile"] = Field("sample", description="sample: サンプリング / cprofile: 決定論的")
+    interval_ms: float = Field(5.0, ge=1.0, le=1000.0, description="サンプリング間隔（ミリ秒）")
+
+
+class ProfileStatusResponse(BaseModel):
+    """プロファイラ状態"""
+    configured_mode: Optional[str] = Field(None, description="KOTOBA_PROFILE / debug.profile による常時モード")
+    armed_remaining: int = Field(0, description="残りの予約ジョブ数")
+    armed_mode: str = "sample"
+    output_dir: str = Field("", description="出力先ディレクトリ")
+    recent: List[Dict[str, Any]] = Field(default_factory=list, description="直近の出力（job_id, mode, files 等）")
@@ -0,0 +1,499 @@
+"""
+ストリーミングアップロード
+リクエストボディをチャンク単位でディスクに書き出し（ファイル全体をメモリに保持しない）、
+書き込み途中のファイルを ffmpeg にパイプで流してデコードする。
+無音で区切られた確定区間から順に取り出せるため、アップロード完了前に文字起こしを開始できる。
+"""
+
+import logging
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from exceptions import AudioFormatError
+
+logger = logging.getLogger(__name__)
+
+# オプション: WebRTC VAD（無い場合はエネルギー閾値で判定）
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+
+# デコード出力のサンプリングレート（Whisper要求）
+DECODE_SAMPLE_RATE = 16000
+
+# ffmpeg へ流す読み出し単位
+UPLOAD_READ_SIZE = 64 * 1024
+
+# 受信完了時にスプールの隣へ書く完了マーカー（中身は受信バイト数）の拡張子
+UPLOAD_COMPLETE_SUFFIX = ".complete"
+
+# データが途絶えたアップロードを打ち切るまでの秒数（環境変数 KOTOBA_UPLOAD_IDLE_TIMEOUT で上書き可能）
+UPLOAD_IDLE_TIMEOUT_SECONDS = float(os.environ.get("KOTOBA_UPLOAD_IDLE_TIMEOUT", "60"))
+
+
+class UploadAborted(Exception):
+    """アップロードが中断された"""
+    pass
+
+
+class UploadStalled(UploadAborted):
+    """一定時間データが届かず、アップロードを打ち切った"""
+    pass
+
+
+def default_upload_dir() -> str:
+    """アップロードの保存先（環境変数 KOTOBA_UPLOAD_DIR で上書き可能）"""
+    return os.environ.get("KOTOBA_UPLOAD_DIR") or os.path.join(
+        os.path.expanduser("~"), ".kotoba_transcriber", "uploads"
+    )
+
+
+class UploadSpool:
+    """
+    アップロード中のファイル（スレッドセーフ）。
+
+    - write() はディスクへ追記するだけで、受信済みバイト数を読み手に通知する
+    - open_reader() の読み手は、未到着の範囲を読もうとすると到着（または終了）まで待つ
+    - finish() は受信バイト数を完了マーカーに書き出す。再起動後は completed() が
+      マーカーとファイルサイズを照合し、受信途中で止まったファイルを完了扱いしない
+    - 最後の受信から idle_timeout 秒を過ぎると読み手は UploadStalled を受け取り、
+      スプールは中断状態になる（止まったアップロードがスケジューラを占有しない）
+    """
+
+    def __init__(self, path: str, expected_bytes: Optional[int] = None,
+                 idle_timeout: float = UPLOAD_IDLE_TIMEOUT_SECONDS):
+        self.path = path
+        self.expected_bytes = expected_bytes
+        self.idle_timeout = idle_timeout
+        self._last_activity = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb")
+        self._cond = threading.Condition()
+        self.bytes_written = 0
+        self.complete = False
+        self.aborted = False
+
+    @staticmethod
+    def marker_path(path: str) -> str:
+        """完了マーカーのパス"""
+        return path + UPLOAD_COMPLETE_SUFFIX
+
+    @classmethod
+    def completed(cls, path: str) -> "UploadSpool":
+        """
+        受信を完了したファイルを完了状態のスプールとして開く
+
+        Raises:
+            UploadAborted: 完了マーカーが無い、またはファイルサイズが一致しない場合
+        """
+        try:
+            with open(cls.marker_path(path), "r", encoding="ascii") as f:
+                expected = int(f.read().strip())
+        except (OSError, ValueError) as e:
+            raise UploadAborted(f"upload was not completed: {path}") from e
+        size = os.path.getsize(path)
+        if size != expected:
+            raise UploadAborted(f"upload size mismatch: {size} != {expected} bytes ({path})")
+        spool = cls.__new__(cls)
+        spool.path = path
+        spool.expected_bytes = None
+        spool.idle_timeout = UPLOAD_IDLE_TIMEOUT_SECONDS
+        spool._last_activity = time.monotonic()
+        spool._file = None
+        spool._cond = threading.Condition()
+        spool.bytes_written = size
+        spool.complete = True
+        spool.aborted = False
+        return spool
+
+    def write(self, data: bytes) -> None:
+        """受信チャンクを追記"""
+        if not data:
+            return
+        with self._cond:
+            f = self._file
+        if f is None:
+            raise UploadAborted("upload already closed")
+        # ディスク書き込みはロック外（読み手は bytes_written までしか読まない）
+        try:
+            f.write(data)
+            f.flush()
+        except ValueError as e:
+            raise UploadAborted("upload closed while writing") from e
+        with self._cond:
+            self.bytes_written += len(data)
+            self._last_activity = time.monotonic()
+            self._cond.notify_all()
+
+    def finish(self) -> None:
+        """アップロード完了"""
+        self._close(aborted=False)
+
+    def abort(self) -> None:
+        """アップロード中断（読み手は UploadAborted を受け取る）"""
+        self._close(aborted=True)
+
+    def _close(self, aborted: bool) -> None:
+        with self._cond:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except OSError as e:
+                    logger.debug(f"Upload spool close failed: {e}")
+                self._file = None
+            if aborted:
+                self.aborted = True
+            elif not self.complete:
+                self.complete = True
+                self._write_marker()
+            self._cond.notify_all()
+
+    def _write_marker(self) -> None:
+        """完了マーカーを原子的に書き出す（失敗しても受信中の読み手には影響しない）"""
+        marker = self.marker_path(self.path)
+        tmp_path = marker + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="ascii") as f:
+                f.write(str(self.bytes_written))
+            os.replace(tmp_path, marker)
+        except OSError as e:
+            logger.warning(f"Upload completion marker not written: {e}")
+
+    def wait_until(self, offset: int, timeout: Optional[float] = None) -> int:
+        """
+        offset より先のデータが到着するか、アップロードが終了するまで待つ
+
+        Returns:
+            現在の受信済みバイト数
+
+        Raises:
+            UploadAborted: アップロードが中断された場合
+            UploadStalled: idle_timeout 秒以上データが届かない場合
+        """
+        with self._cond:
+            self._wait(lambda: self.bytes_written > offset or self.complete, timeout)
+            return self.bytes_written
+
+    def wait_complete(self, timeout: Optional[float] = None) -> bool:
+        """
+        アップロード完了を待つ（完了していればTrue）
+
+        Raises:
+            UploadAborted: アップロードが中断された場合
+            UploadStalled: idle_timeout 秒以上データが届かない場合
+        """
+        with self._cond:
+            self._wait(lambda: self.complete, timeout)
+            return self.complete
+
+    def _wait(self, predicate: Callable[[], bool], timeout: Optional[float]) -> None:
+        """_cond 保持中に呼ぶ。timeout 経過時はそのまま戻り、受信が途絶えたら打ち切る"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.aborted:
+                raise UploadAborted("upload aborted")
+            if predicate():
+                return
+            now = time.monotonic()
+            idle_deadline = self._last_activity + self.idle_timeout
+            if now >= idle_deadline:
+                self._stall()
+            if deadline is not None and now >= deadline:
+                return
+            self._cond.wait(min(idle_deadline, deadline or idle_deadline) - now)
+
+    def _stall(self) -> None:
+        """_cond 保持中に呼ぶ。書き手にも中断を伝える"""
+        self._close(aborted=True)
+        logger.warning(f"Upload stalled: no data for {self.idle_timeout:.0f}s ({self.path})")
+        raise UploadStalled(f"no upload data for {self.idle_timeout:.0f}s")
+
+    def open_reader(self) -> "GrowingFileReader":
+        return GrowingFileReader(self)
+
+    def remove(self) -> None:
+        """スプールファイル（と完了マーカー）を削除"""
+        self._close(aborted=not self.complete)
+        for path in (self.path, self.marker_path(self.path)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"Upload spool remove failed: {e}")
+
+
+class GrowingFileReader:
+    """書き込み途中の UploadSpool を先頭から読む（未到着分は待機）"""
+
+    def __init__(self, spool: UploadSpool):
+        self._spool = spool
+        self._file = open(spool.path, "rb")
+        self.offset = 0
+
+    def read(self, size: int = UPLOAD_READ_SIZE) -> bytes:
+        """
+        最大 size バイトを読む。アップロード完了後に末尾まで読み切ると b"" を返す
+
+        Raises:
+            UploadAborted: アップロードが中断された場合
+        """
+        available = self._spool.wait_until(self.offset)
+        if available <= self.offset:
+            return b""
+        data = self._file.read(min(size, available - self.offset))
+        self.offset += len(data)
+        return data
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class StreamingDecoder:
+    """
+    ffmpeg による逐次デコーダ。
+
+    入力ファイルを stdin へ流し込み（供給スレッド）、stdout から 16kHz モノラル
+    s16le PCM をフレーム単位で読み出す。ffmpeg はヘッダが読めた時点で出力を
+    開始するため、アップロード中でもデコードが進む。
+    """
+
+    def __init__(self, source: GrowingFileReader, sample_rate: int = DECODE_SAMPLE_RATE,
+                 frame_seconds: float = 0.5, command: Optional[Sequence[str]] = None):
+        self.source = source
+        self.sample_rate = sample_rate
+        self.frame_bytes = int(sample_rate * frame_seconds) * 2
+        self.command = list(command) if command else [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ac", "1", "-ar", str(sample_rate),
+            "pipe:1",
+        ]
+        self._proc: Optional[subprocess.Popen] = None
+        self._feed_error: Optional[BaseException] = None
+        self.samples_decoded = 0
+
+    def _feed(self) -> None:
+        """供給スレッド: 到着したバイトを ffmpeg の stdin へ書き込む"""
+        try:
+            while True:
+                chunk = self.source.read(UPLOAD_READ_SIZE)
+                if not chunk:
+                    break
+                self._proc.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg 側が終了（エラーは stdout 側で検出）
+        except BaseException as e:
+            self._feed_error = e
+        finally:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+
+    def frames(self) -> Iterator[np.ndarray]:
+        """
+        float32 音声フレームを順に返す
+
+        Raises:
+            AudioFormatError: ffmpeg が無い、またはデコードに失敗した場合
+            UploadAborted: アップロードが中断された場合
+        """
+        try:
+            self._proc = subprocess.Popen(
+                self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, bufsize=0,
+            )
+        except FileNotFoundError as e:
+            raise AudioFormatError("ffmpeg not found") from e
+
+        feeder = threading.Thread(target=self._feed, daemon=True, name="UploadDecoderFeed")
+        feeder.start()
+        pending = b""
+        try:
+            while True:
+                data = self._proc.stdout.read(self.frame_bytes - len(pending))
+                if not data:
+                    break
+                pending += data
+                if len(pending) >= self.frame_bytes:
+                    yield self._to_float(pending)
+                    pending = b""
+            if len(pending) >= 2:
+                yield self._to_float(pending[:len(pending) - len(pending) % 2])
+
+            returncode = self._proc.wait()
+            feeder.join()
+            if self._feed_error is not None:
+                raise self._feed_error
+            if returncode != 0:
+                stderr = self._proc.stderr.read().decode("utf-8", errors="replace")
+                raise AudioFormatError(f"ffmpeg streaming decode failed (exit {returncode}): {stderr[-500:]}")
+        finally:
+            self.close()
+
+    def _to_float(self, pcm: bytes) -> np.ndarray:
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        self.samples_decoded += len(audio)
+        return audio
+
+    def close(self) -> None:
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        self.source.close()
+
+
+@dataclass
+class SpeechRegion:
+    """確定した発話区間（start は入力先頭からの秒）"""
+    start: float
+    audio: np.ndarray
+    sample_rate: int = DECODE_SAMPLE_RATE
+
+    @property
+    def end(self) -> float:
+        return self.start + len(self.audio) / self.sample_rate
+
+
+class SpeechRegionSegmenter:
+    """
+    逐次入力される音声を発話区間に切り出す。
+
+    発話の後に min_silence_s 以上の無音が続いた時点、または区間が max_region_s に
+    達した時点で区間を確定する。区間外の無音は捨てるため、保持するのは
+    最大でも max_region_s 分の音声のみ。
+    """
+
+    def __init__(self, sample_rate: int = DECODE_SAMPLE_RATE, frame_ms: int = 30,
+                 energy_threshold: float = 0.01, min_silence_s: float = 0.6,
+                 max_region_s: float = 30.0, min_speech_s: float = 0.3,
+                 is_speech: Optional[Callable[[np.ndarray], bool]] = None):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.energy_threshold = energy_threshold
+        self.min_silence_frames = max(1, int(min_silence_s * 1000 / frame_ms))
+        self.max_region_frames = max(1, int(max_region_s * 1000 / frame_ms))
+        self.min_speech_frames = max(1, int(min_speech_s * 1000 / frame_ms))
+        self._is_speech = is_speech or self._default_is_speech()
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._frames: List[np.ndarray] = []
+        self._region_start_frame = 0
+        self._speech_frames = 0
+        self._silence_run = 0
+        self._frame_index = 0
+
+    def _default_is_speech(self) -> Callable[[np.ndarray], bool]:
+        if WEBRTCVAD_AVAILABLE and self.sample_rate in (8000, 16000, 32000, 48000):
+            vad = webrtcvad.Vad(2)
+
+            def _webrtc(frame: np.ndarray) -> bool:
+                pcm = (np.clip(frame, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+                return vad.is_speech(pcm, self.sample_rate)
+            return _webrtc
+        return lambda frame: float(np.sqrt(np.mean(frame * frame))) >= self.energy_threshold
+
+    def feed(self, audio: np.ndarray) -> List[SpeechRegion]:
+        """音声を追加し、確定した区間を返す"""
+        if len(self._carry):
+            audio = np.concatenate([self._carry, audio])
+        regions: List[SpeechRegion] = []
+        n_frames = len(audio) // self.frame_samples
+        for i in range(n_frames):
+            frame = audio[i * self.frame_samples:(i + 1) * self.frame_samples]
+            region = self._push_frame(frame)
+            if region is not None:
+                regions.append(region)
+        self._carry = audio[n_frames * self.frame_samples:].copy()
+        return regions
+
+    def flush(self) -> List[SpeechRegion]:
+        """入力終了 — 未確定の区間を確定して返す"""
+        if len(self._carry) and self._frames:
+            self._frames.append(self._carry)
+        self._carry = np.zeros(0, dtype=np.float32)
+        region = self._close_region()
+        return [region] if region is not None else []
+
+    def _push_frame(self, frame: np.ndarray) -> Optional[SpeechRegion]:
+        speech = self._is_speech(frame)
+        index = self._frame_index
+        self._frame_index += 1
+
+        if not self._frames:
+            if not speech:
+                return None
+            self._region_start_frame = index
+        self._frames.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.min_silence_frames or len(self._frames) >= self.max_region_frames:
+            return self._close_region()
+        return None
+
+    def _close_region(self) -> Optional[SpeechRegion]:
+        frames, speech_frames = self._frames, self._speech_frames
+        self._frames, self._speech_frames, self._silence_run = [], 0, 0
+        if not frames or speech_frames < self.min_speech_frames:
+            return None
+        start = self._region_start_frame * self.frame_samples / self.sample_rate
+        return SpeechRegion(start=start, audio=np.concatenate(frames), sample_rate=self.sample_rate)
+
+
+class UploadRegistry:
+    """進行中のアップロード（upload_id → UploadSpool）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spools: Dict[str, UploadSpool] = {}
+
+    def create(self, upload_id: str, path: str,
+               expected_bytes: Optional[int] = None,
+               idle_timeout: float = UPLOAD_IDLE_TIMEOUT_SECONDS) -> UploadSpool:
+        spool = UploadSpool(path, expected_bytes=expected_bytes, idle_timeout=idle_timeout)
+        with self._lock:
+            self._spools[upload_id] = spool
+        return spool
+
+    def get(self, upload_id: Optional[str]) -> Optional[UploadSpool]:
+        with self._lock:
+            return self._spools.get(upload_id) if upload_id else None
+
+    def remove(self, upload_id: Optional[str]) -> None:
+        with self._lock:
+            self._spools.pop(upload_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._spools)
+
+
+# グローバルシングルトン
+_upload_registry: Optional[UploadRegistry] = None
+_upload_registry_lock = threading.Lock()
+
+
+def get_upload_registry() -> UploadRegistry:
+    """UploadRegistry シングルトンを取得"""
+    global _upload_registry
+    if _upload_registry is None:
+        with _upload_registry_lock:
+            if _upload_registry is None:
+                _upload_registry = UploadRegistry()
+    return _upload_registry
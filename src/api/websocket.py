@@ -1,26 +1,150 @@
 """
 WebSocket 接続管理
 EventBus → WebSocket ブリッジ。
+
+接続ごとに送信キューと送信タスク（ClientConnection）を持ち、遅いクライアントが
+他の接続の配信を妨げないようにする。エンコード（json / msgpack）とフラッシュ間隔は
+接続時のクエリパラメータでネゴシエートする。
 """
 
+import asyncio
 import json
 import logging
-from typing import Set
+from typing import Dict, List, Optional, Set, Union
 
 from fastapi import WebSocket
 
 from .auth import verify_websocket_token_from_header
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+SUPPORTED_ENCODINGS = ("json", "msgpack")
+
+# フラッシュ間隔の上限（ミリ秒）と1フレームあたりの最大イベント数
+MAX_FLUSH_INTERVAL_MS = 200
+MAX_BATCH_EVENTS = 256
+
+
+def available_encodings() -> List[str]:
+    """利用可能なエンコード一覧"""
+    return [e for e in SUPPORTED_ENCODINGS if e != "msgpack" or MSGPACK_AVAILABLE]
+
+
+def encode_events(events: List[dict], encoding: str = "json",
+                  batched: bool = False) -> Union[str, bytes]:
+    """
+    イベントを1フレームにエンコード
+
+    Args:
+        events: イベントリスト（batched=False の場合は先頭1件のみ使用）
+        encoding: "json"（テキストフレーム）または "msgpack"（バイナリフレーム）
+        batched: True の場合はイベント配列として、False の場合は単一イベントとしてエンコード
+    """
+    payload = events if batched else events[0]
+    if encoding == "msgpack":
+        return msgpack.packb(payload, use_bin_type=True, default=str)
+    return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class ClientConnection:
+    """
+    WebSocket 1接続分の送信キューと送信ループ。
+
+    - put() はキュー満杯時に待機する（上流の EventBus 購読キューでコアレス・破棄される）
+    - flush_interval > 0 の場合、最初のイベントから flush_interval 秒の間に溜まった
+      イベントをまとめて1フレーム（配列）で送信する
+    """
+
+    def __init__(self, websocket: WebSocket, encoding: str = "json",
+                 flush_interval: float = 0.0, max_pending: int = MAX_BATCH_EVENTS):
+        if encoding not in available_encodings():
+            raise ValueError(f"Unsupported encoding: {encoding}")
+        self.websocket = websocket
+        self.encoding = encoding
+        self.flush_interval = max(0.0, min(flush_interval, MAX_FLUSH_INTERVAL_MS / 1000.0))
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.frames_sent = 0
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+
+    @property
+    def batched(self) -> bool:
+        return self.flush_interval > 0
+
+    async def put(self, event: dict) -> None:
+        """イベントを送信キューに追加（満杯時は空くまで待機）"""
+        await self._queue.put(event)
+
+    def put_nowait(self, event: dict) -> bool:
+        """イベントを送信キューに追加（満杯時は破棄してFalse）"""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def run_sender(self) -> None:
+        """送信ループ（送信失敗で終了）"""
+        try:
+            while True:
+                events = [await self._queue.get()]
+                if self.batched:
+                    await asyncio.sleep(self.flush_interval)
+                    while len(events) < MAX_BATCH_EVENTS:
+                        try:
+                            events.append(self._queue.get_nowait())
+                        except asyncio.QueueEmpty:
+                            break
+                await self._send(events)
+        except Exception:
+            logger.debug("WebSocket send failed, closing connection")
+        finally:
+            # put() で待機中の送り手を解放する
+            while not self._queue.empty():
+                self._queue.get_nowait()
+
+    async def _send(self, events: List[dict]) -> None:
+        frame = encode_events(events, self.encoding, self.batched)
+        if isinstance(frame, bytes):
+            await self.websocket.send_bytes(frame)
+        else:
+            await self.websocket.send_text(frame)
+        self.frames_sent += 1
+        self.events_sent += len(events)
+        self.bytes_sent += len(frame)
+
+    def get_stats(self) -> dict:
+        return {
+            "encoding": self.encoding,
+            "flush_interval_ms": round(self.flush_interval * 1000),
+            "queue_size": self.qsize(),
+            "frames_sent": self.frames_sent,
+            "events_sent": self.events_sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+        }
+
 
 class ConnectionManager:
-    """WebSocket 接続管理（接続トラッキングのみ）"""
+    """WebSocket 接続管理（接続トラッキングと接続ごとの送信キュー）"""
 
     MAX_CONNECTIONS = 10  # 最大同時接続数
 
     def __init__(self):
         self.active_connections: Set[WebSocket] = set()
+        self._clients: Dict[WebSocket, ClientConnection] = {}
 
     async def connect(self, websocket: WebSocket) -> bool:
         """
@@ -45,20 +169,40 @@ class ConnectionManager:
         logger.info(f"WebSocket connected. Active: {len(self.active_connections)}")
         return True
 
+    def open_stream(self, websocket: WebSocket, encoding: str = "json",
+                    flush_interval: float = 0.0) -> ClientConnection:
+        """接続済み WebSocket に送信キューを割り当てる"""
+        client = ClientConnection(websocket, encoding=encoding, flush_interval=flush_interval)
+        self._clients[websocket] = client
+        return client
+
     def disconnect(self, websocket: WebSocket):
         """WebSocket接続を削除"""
         self.active_connections.discard(websocket)
+        self._clients.pop(websocket, None)
         logger.info(f"WebSocket disconnected. Active: {len(self.active_connections)}")
 
     async def broadcast(self, event_type: str, data: dict):
-        """全接続にイベントをブロードキャスト"""
+        """
+        全接続にイベントをブロードキャスト
+
+        送信キューを持つ接続にはキュー投入のみ行い（満杯なら破棄）、
+        遅い接続の送信完了を待たない。
+        """
         if not self.active_connections:
             return
 
-        message = json.dumps({"type": event_type, "data": data}, ensure_ascii=False)
+        event = {"type": event_type, "data": data}
+        message = None
         disconnected = set()
 
         for connection in self.active_connections.copy():
+            client = self._clients.get(connection)
+            if client is not None:
+                client.put_nowait(event)
+                continue
+            if message is None:
+                message = json.dumps(event, ensure_ascii=False)
             try:
                 await connection.send_text(message)
             except Exception:
@@ -67,6 +211,14 @@ class ConnectionManager:
         for conn in disconnected:
             self.active_connections.discard(conn)
 
+    def get_client(self, websocket: WebSocket) -> Optional[ClientConnection]:
+        """送信キューを取得"""
+        return self._clients.get(websocket)
+
+    def get_stats(self) -> List[dict]:
+        """接続ごとの送信統計"""
+        return [client.get_stats() for client in list(self._clients.values())]
+
     def connection_count(self) -> int:
         """アクティブ接続数"""
         return len(self.active_connections)
@@ -8,7 +8,7 @@ import os
 import logging
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional, List
+from typing import Any, Callable, Dict, Optional, List, Tuple
 
 from constants import SharedConstants, normalize_segments
 from transcription_engine import TranscriptionEngine
@@ -24,6 +24,8 @@ from exceptions import (
 )
 from api.event_bus import EventBus, get_event_bus
 from transcription_worker_base import TranscriptionLogic
+import tracing
+from profiling import get_job_profiler
 
 logger = logging.getLogger(__name__)
 
@@ -166,6 +168,8 @@ class BatchTranscriptionWorker(threading.Thread):
         self._shared_engine = None
         self._engine_lock = threading.Lock()
         self._bus = event_bus or get_event_bus()
+        # ファイルパス → スパンツリー（file_finished イベントに添付）
+        self.traces: Dict[str, Dict[str, Any]] = {}
 
     def cancel(self):
         """バッチ処理をキャンセル"""
@@ -180,7 +184,17 @@ class BatchTranscriptionWorker(threading.Thread):
                 logger.debug("Executor shutdown requested")
 
     def process_single_file(self, audio_path: str):
-        """単一ファイルを処理"""
+        """単一ファイルを処理（段階ごとのスパンを self.traces に記録）"""
+        name = os.path.splitext(os.path.basename(audio_path))[0]
+        with tracing.trace("file", file=os.path.basename(audio_path)) as root, \
+                get_job_profiler().profile(f"batch_{name}", kind="batch_file", file_path=audio_path):
+            outcome = self._process_single_file(audio_path)
+            root.set(success=outcome[2])
+        self.traces[audio_path] = root.to_dict()
+        tracing.save_trace(root, name)
+        return outcome
+
+    def _process_single_file(self, audio_path: str):
         if self._cancel_event.is_set():
             return audio_path, "処理がキャンセルされました", False
 
@@ -196,8 +210,9 @@ class BatchTranscriptionWorker(threading.Thread):
             try:
                 with self._engine_lock:
                     if self._shared_engine is None:
-                        self._shared_engine = TranscriptionEngine()
-                        self._shared_engine.load_model()
+                        with tracing.span("model_load"):
+                            self._shared_engine = TranscriptionEngine()
+                            self._shared_engine.load_model()
                     result = self._shared_engine.transcribe(str(validated_path), return_timestamps=True)
                     text = result.get("text", "")
             except ModelLoadError as e:
@@ -220,20 +235,22 @@ class BatchTranscriptionWorker(threading.Thread):
             # 話者分離（非クリティカル）
             if self.enable_diarization:
                 try:
-                    diarizer = FreeSpeakerDiarizer()
-                    diar_segments = diarizer.diarize(str(validated_path))
-                    trans_segments = _normalize_segments(result)
-                    text = diarizer.format_with_speakers(trans_segments, diar_segments)
+                    with tracing.span("diarization"):
+                        diarizer = FreeSpeakerDiarizer()
+                        diar_segments = diarizer.diarize(str(validated_path))
+                        trans_segments = _normalize_segments(result)
+                        text = diarizer.format_with_speakers(trans_segments, diar_segments)
                 except Exception as e:
                     logger.warning(f"Speaker diarization failed for '{audio_path}': {e}", exc_info=True)
 
             # テキストフォーマット
             try:
                 if self.formatter:
-                    formatted_text = self.formatter.format_all(
-                        text, remove_fillers=True, add_punctuation=True,
-                        format_paragraphs=True, clean_repeated=True
-                    )
+                    with tracing.span("text_format", chars=len(text)):
+                        formatted_text = self.formatter.format_all(
+                            text, remove_fillers=True, add_punctuation=True,
+                            format_paragraphs=True, clean_repeated=True
+                        )
                 else:
                     formatted_text = text
             except Exception as e:
@@ -248,7 +265,8 @@ class BatchTranscriptionWorker(threading.Thread):
                 validated_output = Validator.validate_file_path(
                     output_file, allowed_extensions=[".txt"], must_exist=False
                 )
-                atomic_write_text(str(validated_output), formatted_text)
+                with tracing.span("write_output"):
+                    atomic_write_text(str(validated_output), formatted_text)
                 return audio_path, formatted_text, True
             except ValidationError as e:
                 raise FileProcessingError(f"出力パスが不正です: {audio_path}") from e
@@ -301,6 +319,7 @@ class BatchTranscriptionWorker(threading.Thread):
                             "file_path": audio_path,
                             "text": result_text,
                             "success": success,
+                            "trace": self.traces.get(audio_path),
                         })
 
                     except Exception as future_error:
@@ -349,3 +368,269 @@ class BatchTranscriptionWorker(threading.Thread):
                     self._shared_engine = None
             except Exception as e:
                 logger.debug(f"Shared engine unload failed: {e}")
+
+
+# --- ジョブスケジューラ用の文字起こし処理 ---
+
+def transcribe_file(engine, file_path: str, options: Dict[str, Any],
+                    progress_callback: Optional[Callable[[int], None]] = None,
+                    engine_lock=None,
+                    record_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                    ) -> Tuple[str, List[dict]]:
+    """
+    単一ファイルを文字起こし（モデルロード・話者分離・テキスト整形を含む）
+
+    Args:
+        engine: TranscriptionEngine
+        file_path: 音声/動画ファイルパス
+        options: enable_diarization / remove_fillers / add_punctuation /
+                 format_paragraphs / clean_repeated
+        progress_callback: 進捗コールバック（0〜100）
+        engine_lock: エンジン使用区間のみ保持するロック（空くまで待機）
+        record_callback: 部分結果コールバック (種別, データ)。
+                 "segment"（1セグメントずつ）→ "speaker"（話者区間ごと）→ "text"（整形済み全文）の順に呼ばれる
+
+    Returns:
+        (テキスト, 正規化済みセグメント)
+    """
+    progress = progress_callback or (lambda value: None)
+    with tracing.span("engine_lock_wait"):
+        if engine_lock is not None:
+            engine_lock.acquire()
+    try:
+        if not engine.is_loaded:
+            with tracing.span("model_load"):
+                engine.load_model()
+        progress(SharedConstants.PROGRESS_MODEL_LOAD)
+        progress(SharedConstants.PROGRESS_BEFORE_TRANSCRIBE)
+        result = engine.transcribe(file_path, return_timestamps=True)
+        text = result.get("text", "")
+        segments = normalize_segments(result)
+        progress(SharedConstants.PROGRESS_AFTER_TRANSCRIBE)
+    finally:
+        if engine_lock is not None:
+            engine_lock.release()
+
+    # 部分結果の通知はエンジンロック外で行う（遅い受信側が次のジョブを止めないように）
+    if record_callback is not None:
+        with tracing.span("stream_segments", count=len(segments)):
+            for index, seg in enumerate(segments):
+                record_callback("segment", _segment_record(index, seg))
+
+    text = finalize_transcript(file_path, text, segments, options, progress, record_callback)
+    return text, segments
+
+
+def _segment_record(index: int, seg: dict) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "start": seg.get("start", 0),
+        "end": seg.get("end", 0),
+        "text": seg.get("text", ""),
+    }
+
+
+def finalize_transcript(file_path: str, text: str, segments: List[dict],
+                        options: Dict[str, Any],
+                        progress: Callable[[int], None],
+                        record_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                        ) -> str:
+    """
+    文字起こし後の処理（話者分離・テキスト整形）を行い、最終テキストを返す
+
+    Args:
+        file_path: 音声/動画ファイルパス（話者分離に使用）
+        text: 文字起こしテキスト
+        segments: 正規化済みセグメント
+        options: transcribe_file と同じ
+        progress: 進捗コールバック（0〜100）
+        record_callback: 部分結果コールバック（"speaker" / "text"）
+    """
+    # 話者分離（オプション）— エンジンロック外で実行
+    if options.get("enable_diarization"):
+        try:
+            with tracing.span("diarization"):
+                diarizer = FreeSpeakerDiarizer()
+                progress(SharedConstants.PROGRESS_DIARIZATION_START)
+                diar_segments = diarizer.diarize(file_path)
+                progress(SharedConstants.PROGRESS_DIARIZATION_END)
+                if record_callback is not None:
+                    for turn in diar_segments:
+                        record_callback("speaker", dict(turn))
+                text = diarizer.format_with_speakers(segments, diar_segments)
+        except Exception as e:
+            logger.warning(f"Speaker diarization failed: {e}", exc_info=True)
+
+    # テキストフォーマット
+    remove_fillers = options.get("remove_fillers", False)
+    add_punctuation = options.get("add_punctuation", False)
+    format_paragraphs = options.get("format_paragraphs", False)
+    if remove_fillers or add_punctuation or format_paragraphs:
+        from api.dependencies import get_text_formatter
+        try:
+            with tracing.span("text_format", chars=len(text)):
+                text = get_text_formatter().format_all(
+                    text,
+                    remove_fillers=remove_fillers,
+                    add_punctuation=add_punctuation,
+                    format_paragraphs=format_paragraphs,
+                    clean_repeated=options.get("clean_repeated", True),
+                )
+        except Exception as e:
+            logger.warning(f"Text formatting failed for '{file_path}': {e}", exc_info=True)
+
+    if record_callback is not None:
+        record_callback("text", {"text": text})
+    progress(SharedConstants.PROGRESS_COMPLETE)
+    return text
+
+
+def write_transcript_file(audio_path: str, text: str) -> str:
+    """文字起こし結果を <音声ファイル名>_文字起こし.txt にアトミック保存し、パスを返す"""
+    from export.common import atomic_write_text
+    base_name = os.path.splitext(audio_path)[0]
+    output_file = f"{base_name}_文字起こし.txt"
+    validated_output = Validator.validate_file_path(
+        output_file, allowed_extensions=[".txt"], must_exist=False
+    )
+    atomic_write_text(str(validated_output), text)
+    return str(validated_output)
+
+
+def run_transcription_job(job, ctx) -> Dict[str, Any]:
+    """
+    JobScheduler の "transcribe" ジョブハンドラ
+
+    options["write_output"] が真の場合は結果をテキストファイルにも保存する。このとき内容が同一で
+    同じ出力オプション（話者分離・整形）の文字起こし済みファイルがあれば、エンジンを実行せずに
+    その出力を再利用する（結果に duplicate_of）。
+    ストリーミング受信者がいるジョブ（ctx.streaming）はセグメントを逐次送出し、
+    ジョブ結果にはセグメントを保持しない（長時間ファイルでもメモリ・DBを肥大させない）。
+    """
+    from api.dependencies import get_engine_lock, get_transcription_engine
+
+    try:
+        validated_path = str(Validator.validate_file_path(job.file_path, must_exist=True))
+    except ValidationError as e:
+        raise FileProcessingError(f"ファイルパスが不正です: {job.file_path}") from e
+
+    content_index, fingerprint = None, None
+    if job.options.get("write_output"):
+        from content_index import get_content_index
+        content_index = get_content_index()
+        with tracing.span("dedup"):
+            try:
+                fingerprint = content_index.fingerprint(validated_path)
+            except OSError as e:
+                logger.warning(f"Failed to fingerprint {validated_path}: {e}")
+            match = (content_index.find_duplicate(validated_path, fingerprint, job.options)
+                     if fingerprint else None)
+            if match is not None:
+                return content_index.reuse(match, job.file_path)
+
+    text, segments = transcribe_file(
+        get_transcription_engine(), validated_path, job.options,
+        progress_callback=ctx.progress, engine_lock=get_engine_lock(),
+        record_callback=ctx.record if ctx.streaming else None,
+    )
+    ctx.raise_if_cancelled()
+
+    if ctx.streaming:
+        result: Dict[str, Any] = {"text": text, "segment_count": len(segments)}
+    else:
+        result = {"text": text, "segments": segments}
+    if job.options.get("write_output"):
+        with tracing.span("write_output"):
+            result["output_path"] = write_transcript_file(job.file_path, text)
+        if content_index is not None and fingerprint:
+            content_index.record(validated_path, fingerprint, job.options)
+    return result
+
+
+def run_upload_transcription_job(job, ctx) -> Dict[str, Any]:
+    """
+    JobScheduler の "upload" ジョブハンドラ（ストリーミングアップロード）
+
+    受信中のファイルを ffmpeg で逐次デコードし、無音で確定した発話区間から順に
+    文字起こしする。区間ごとのセグメントは job_segment イベント（および NDJSON
+    受信者）へ即座に送出する。ヘッダ末尾配置の MP4 などパイプでデコードできない
+    形式は、アップロード完了を待ってファイル全体を処理する。
+    受信が途絶えた場合はスプールの待機が UploadStalled で打ち切られ、ジョブは失敗する
+    （後続のジョブを止めない）。
+    """
+    from api.dependencies import get_engine_lock, get_transcription_engine
+    from api.upload_stream import (
+        StreamingDecoder, SpeechRegionSegmenter, UploadAborted, UploadSpool, get_upload_registry,
+    )
+
+    upload_id = job.options.get("upload_id")
+    registry = get_upload_registry()
+    spool = registry.get(upload_id)
+    if spool is None:
+        # 再起動後の再実行 — 受信を完了していたファイルのみ完了状態として扱う
+        if not os.path.isfile(job.file_path):
+            raise FileProcessingError(f"アップロードファイルが見つかりません: {upload_id}")
+        try:
+            spool = UploadSpool.completed(job.file_path)
+        except UploadAborted as e:
+            raise FileProcessingError(f"アップロードが完了していません: {upload_id}") from e
+
+    engine = get_transcription_engine()
+    engine_lock = get_engine_lock()
+    segments: List[dict] = []
+    texts: List[str] = []
+
+    def _transcribe_region(region) -> None:
+        ctx.raise_if_cancelled()
+        with engine_lock, tracing.span("transcribe_region", start=round(region.start, 3),
+                                       end=round(region.end, 3)):
+            if not engine.is_loaded:
+                engine.load_model()
+            result = engine.transcribe_audio(region.audio, sample_rate=region.sample_rate)
+        texts.append(result.get("text", ""))
+        for seg in normalize_segments(result):
+            seg = dict(seg, start=region.start + (seg.get("start") or 0),
+                       end=region.start + (seg.get("end") or 0))
+            record = _segment_record(len(segments), seg)
+            segments.append(seg)
+            ctx.emit("job_segment", record)
+            ctx.record("segment", record)
+
+    try:
+        ctx.progress(SharedConstants.PROGRESS_BEFORE_TRANSCRIBE)
+        segmenter = SpeechRegionSegmenter()
+        try:
+            for frame in StreamingDecoder(spool.open_reader()).frames():
+                for region in segmenter.feed(frame):
+                    _transcribe_region(region)
+            for region in segmenter.flush():
+                _transcribe_region(region)
+            text = "".join(texts)
+        except AudioFormatError as e:
+            if segments:
+                raise
+            logger.info(f"Streaming decode unavailable for upload {upload_id}, "
+                        f"falling back to whole-file transcription: {e}")
+            spool.wait_complete()
+            with engine_lock:
+                if not engine.is_loaded:
+                    engine.load_model()
+                result = engine.transcribe(job.file_path, return_timestamps=True)
+            text = result.get("text", "")
+            for seg in normalize_segments(result):
+                record = _segment_record(len(segments), seg)
+                segments.append(seg)
+                ctx.emit("job_segment", record)
+                ctx.record("segment", record)
+        ctx.raise_if_cancelled()
+        ctx.progress(SharedConstants.PROGRESS_AFTER_TRANSCRIBE)
+
+        # 話者分離にはファイル全体が必要
+        with tracing.span("upload_wait"):
+            spool.wait_complete()
+        text = finalize_transcript(job.file_path, text, segments, job.options,
+                                   ctx.progress, ctx.record if ctx.streaming else None)
+        return {"text": text, "segments": segments}
+    finally:
+        registry.remove(upload_id)
+        spool.remove()
@@ -0,0 +1,249 @@
+"""
+音声ファイルのメタデータ（長さ・サンプルレート・チャンネル数）の取得
+バッチの並び替えと、長さで重み付けした進捗・残り時間の見積もりに使う。
+
+WAV / FLAC はヘッダを直接読み、それ以外は ffprobe で取得する。
+結果は（パス, サイズ, 更新時刻）をキーにキャッシュする。
+Qt非依存。
+"""
+
+import os
+import json
+import struct
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['AudioMetadata', 'AudioProbe', 'BATCH_ORDERS', 'get_audio_probe',
+           'probe_durations', 'fill_unknown_durations', 'order_by_duration']
+
+# バッチの処理順
+# submission: 投入順 / longest_first: 長い順（並列時に長いファイルが最後に残らない）/
+# shortest_first: 短い順（1ファイルずつ処理する場合に結果が早く揃う）
+BATCH_ORDERS = ("submission", "longest_first", "shortest_first")
+
+# ffprobe の待ち時間上限（秒）
+FFPROBE_TIMEOUT_SECONDS = 30.0
+
+# キャッシュの上限件数
+PROBE_CACHE_SIZE = 4096
+
+# probe_many の並列数（ffprobe の起動待ちを重ねる）
+PROBE_WORKERS = 4
+
+
+@dataclass(frozen=True)
+class AudioMetadata:
+    """音声ファイルのメタデータ"""
+    duration: float             # 秒
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+
+def _parse_wav(f, file_size: int) -> Optional[AudioMetadata]:
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+    channels = sample_rate = byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        if chunk_id == b'fmt ':
+            fmt = f.read(size)
+            if len(fmt) < 16:
+                return None
+            _, channels, sample_rate, byte_rate = struct.unpack('<HHII', fmt[:12])
+            if size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            # 録音中・ストリーム書き出しのファイルは data のサイズが未確定（0 / 0xFFFFFFFF）
+            available = file_size - f.tell()
+            if size == 0 or size > available:
+                size = available
+            return AudioMetadata(size / byte_rate, sample_rate, channels)
+        else:
+            f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def _parse_flac(f) -> Optional[AudioMetadata]:
+    if f.read(4) != b'fLaC':
+        return None
+    block = f.read(4)
+    if len(block) < 4 or block[0] & 0x7F != 0:  # 先頭は STREAMINFO
+        return None
+    info = f.read(34)
+    if len(info) < 34:
+        return None
+    packed = int.from_bytes(info[10:18], 'big')
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    return AudioMetadata(total_samples / sample_rate, sample_rate, channels)
+
+
+def read_header_metadata(file_path: str) -> Optional[AudioMetadata]:
+    """WAV / FLAC のヘッダからメタデータを読む（対応外・破損時は None）"""
+    with open(file_path, 'rb') as f:
+        magic = f.read(4)
+        f.seek(0)
+        if magic == b'RIFF':
+            return _parse_wav(f, os.fstat(f.fileno()).st_size)
+        if magic == b'fLaC':
+            return _parse_flac(f)
+    return None
+
+
+class AudioProbe:
+    """
+    メタデータ取得（キャッシュ付き・スレッドセーフ）
+
+    Usage:
+        probe = get_audio_probe()
+        meta = probe.probe(path)          # 取得できない場合 None
+        durations = probe.probe_many(paths)
+    """
+
+    def __init__(self, ffprobe_command: str = "ffprobe", cache_size: int = PROBE_CACHE_SIZE):
+        self.ffprobe_command = ffprobe_command
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        # パス -> ((サイズ, 更新時刻), メタデータ)。取得できなかった結果もキャッシュする
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, int], Optional[AudioMetadata]]]" = OrderedDict()
+        self._ffprobe_available = True
+
+    def probe(self, file_path: str) -> Optional[AudioMetadata]:
+        """メタデータを取得（ファイルが無い・読めない場合 None）"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._cache.get(file_path)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(file_path)
+                return cached[1]
+
+        metadata = self._read(file_path)
+        with self._lock:
+            self._cache[file_path] = (signature, metadata)
+            self._cache.move_to_end(file_path)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return metadata
+
+    def probe_many(self, file_paths: Iterable[str]) -> Dict[str, Optional[AudioMetadata]]:
+        """複数ファイルのメタデータを並列に取得"""
+        paths = list(dict.fromkeys(file_paths))
+        if len(paths) <= 1:
+            return {p: self.probe(p) for p in paths}
+        with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(paths)),
+                                thread_name_prefix="audio_probe") as executor:
+            return dict(zip(paths, executor.map(self.probe, paths)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _read(self, file_path: str) -> Optional[AudioMetadata]:
+        try:
+            metadata = read_header_metadata(file_path)
+        except (OSError, struct.error) as e:
+            logger.debug(f"Header parse failed for {file_path}: {e}")
+            metadata = None
+        return metadata if metadata is not None else self._ffprobe(file_path)
+
+    def _ffprobe(self, file_path: str) -> Optional[AudioMetadata]:
+        if not self._ffprobe_available:
+            return None
+        command = [
+            self.ffprobe_command, "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "format=duration:stream=duration,sample_rate,channels",
+            "-of", "json", file_path,
+        ]
+        try:
+            completed = subprocess.run(command, capture_output=True, timeout=FFPROBE_TIMEOUT_SECONDS)
+        except FileNotFoundError:
+            logger.warning("ffprobe not found; durations are only read from WAV/FLAC headers")
+            self._ffprobe_available = False
+            return None
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"ffprobe failed for {file_path}: {e}")
+            return None
+        if completed.returncode != 0:
+            return None
+        try:
+            data = json.loads(completed.stdout or b"{}")
+            streams = data.get("streams") or [{}]
+            stream = streams[0]
+            duration = float(data.get("format", {}).get("duration") or stream.get("duration"))
+        except (ValueError, TypeError, AttributeError):
+            return None
+        sample_rate = stream.get("sample_rate")
+        channels = stream.get("channels")
+        return AudioMetadata(duration,
+                             int(sample_rate) if sample_rate else None,
+                             int(channels) if channels else None)
+
+
+def probe_durations(file_paths: Iterable[str],
+                    probe: Optional[AudioProbe] = None) -> Dict[str, Optional[float]]:
+    """ファイルごとの長さ（秒）。取得できないファイルは None"""
+    metadata = (probe or get_audio_probe()).probe_many(file_paths)
+    return {path: meta.duration if meta else None for path, meta in metadata.items()}
+
+
+def fill_unknown_durations(durations: Mapping[str, Optional[float]]) -> Dict[str, float]:
+    """
+    長さが不明なファイルを、判明している長さの平均で補う
+
+    1件も判明していなければ全て 1.0（ファイル数での進捗と同じになる）。
+    """
+    known = [d for d in durations.values() if d is not None and d > 0]
+    default = sum(known) / len(known) if known else 1.0
+    return {key: d if d is not None and d > 0 else default for key, d in durations.items()}
+
+
+def order_by_duration(file_paths: List[str],
+                      durations: Mapping[str, Optional[float]],
+                      order: str = "submission") -> List[str]:
+    """
+    長さに基づいて処理順を並び替える（同じ長さは投入順を保つ）
+
+    Raises:
+        ValueError: order が BATCH_ORDERS にない場合
+    """
+    if order not in BATCH_ORDERS:
+        raise ValueError(f"Unknown batch order: {order}")
+    if order == "submission":
+        return list(file_paths)
+    estimates = fill_unknown_durations({p: durations.get(p) for p in file_paths})
+    return sorted(file_paths, key=estimates.__getitem__, reverse=(order == "longest_first"))
+
+
+# グローバルシングルトン
+_audio_probe: Optional[AudioProbe] = None
+_audio_probe_lock = threading.Lock()
+
+
+def get_audio_probe() -> AudioProbe:
+    """AudioProbe シングルトンを取得"""
+    global _audio_probe
+    if _audio_probe is None:
+        with _audio_probe_lock:
+            if _audio_probe is None:
+                _audio_probe = AudioProbe()
+    return _audio_probe
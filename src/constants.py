@@ -28,6 +28,20 @@ class SharedConstants:
     # 処理中ファイルTTL（秒）
     PROCESSING_FILES_TTL = 3600  # 1時間
 
+    # ファイル準備判定: サイズ・更新時刻がこの秒数変化しなければ書き込み完了とみなす
+    FILE_STABLE_SECONDS = 2.0
+
+    # フォルダ監視から文字起こしキューへ同時に投入しておくファイル数の上限
+    MONITOR_MAX_IN_FLIGHT = 8
+
+    # バッチのデコードを先行させるファイル数
+    BATCH_PREFETCH_FILES = 2
+    # これより長いファイルは先行デコードせず、推論時にエンジン側で読み込む（メモリ節約）
+    BATCH_PREDECODE_MAX_SECONDS = 30 * 60
+    # 先行デコードで同時に保持するデコード済み音声の合計上限（float32 16kHz で約70分）。
+    # 超える分はデコードせず推論時にエンジン側で読み込む
+    BATCH_PREDECODE_MAX_BYTES = 256 * 1024 * 1024
+
     # ボタンスタイル（Qt UI用）
     BUTTON_STYLE_NORMAL = "font-size: 12px; padding: 5px; background-color: #4CAF50; color: white; font-weight: bold;"
     BUTTON_STYLE_MONITOR = "font-size: 12px; padding: 5px; background-color: #FF9800; color: white; font-weight: bold;"
@@ -0,0 +1,254 @@
+"""
+内容フィンガープリントによる重複録音の検出
+同じ録音が別名で再アップロードされたり、監視フォルダとバッチの両方に置かれた場合に、
+文字起こし済みの出力を再利用してエンジンの再実行を省く。
+
+フィンガープリントは「サイズ + 先頭・中間・末尾のサンプルブロックのハッシュ」で、
+数ブロックの読み込みで計算できる。一致した場合だけ全体のハッシュで同一性を確認する。
+記録は ProcessedLedger（追記型ジャーナル）に、フィンガープリントと出力に影響する
+オプション（話者分離・整形）の組をキーとして保存する。オプションが異なれば再利用しない。
+Qt非依存。
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from processed_ledger import ProcessedLedger
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['ContentIndex', 'DuplicateMatch', 'quick_fingerprint', 'full_hash',
+           'output_options_key', 'transcript_output_path', 'default_index_path',
+           'get_content_index']
+
+# サンプルブロックの大きさと個数（先頭・末尾と、その間の等間隔の位置）
+SAMPLE_BLOCK_SIZE = 64 * 1024
+SAMPLE_BLOCKS = 4
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# 出力テキストに影響するジョブオプションと既定値（api.workers.finalize_transcript と同じ）
+OUTPUT_OPTION_DEFAULTS: Dict[str, bool] = {
+    "enable_diarization": False,
+    "remove_fillers": False,
+    "add_punctuation": False,
+    "format_paragraphs": False,
+    "clean_repeated": True,
+}
+
+
+def transcript_output_path(audio_path: str) -> str:
+    """音声ファイルの文字起こし出力パス（<音声ファイル名>_文字起こし.txt）"""
+    return f"{os.path.splitext(audio_path)[0]}_文字起こし.txt"
+
+
+def quick_fingerprint(file_path: str) -> str:
+    """
+    サイズとサンプルブロックのハッシュによるフィンガープリント
+
+    小さいファイル（サンプル合計以下）はファイル全体のハッシュになる。
+
+    Raises:
+        OSError: ファイルを読めない場合
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= SAMPLE_BLOCK_SIZE * SAMPLE_BLOCKS:
+            digest.update(f.read())
+        else:
+            last = size - SAMPLE_BLOCK_SIZE
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(last * i // (SAMPLE_BLOCKS - 1))
+                digest.update(f.read(SAMPLE_BLOCK_SIZE))
+    return f"{size:x}-{digest.hexdigest()}"
+
+
+def output_options_key(options: Optional[Mapping[str, Any]] = None) -> str:
+    """出力に影響するオプションの組を OUTPUT_OPTION_DEFAULTS の順に 0/1 で並べた文字列"""
+    options = options or {}
+    return "".join(str(int(bool(options.get(name, default))))
+                   for name, default in OUTPUT_OPTION_DEFAULTS.items())
+
+
+def full_hash(file_path: str) -> str:
+    """ファイル全体のハッシュ"""
+    digest = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class DuplicateMatch:
+    """内容が同一の文字起こし済みファイル"""
+    original_path: str
+    output_path: str
+    fingerprint: str
+    options_key: str = ""
+
+    @property
+    def key(self) -> str:
+        return _index_key(self.fingerprint, self.options_key)
+
+
+def _index_key(fingerprint: str, options_key: str) -> str:
+    return f"{fingerprint}/{options_key}"
+
+
+class ContentIndex:
+    """
+    文字起こし済みファイルの内容フィンガープリント索引
+
+    Usage:
+        index = get_content_index()
+        fingerprint = index.fingerprint(path)
+        match = index.find_duplicate(path, fingerprint, options)
+        if match:
+            result = index.reuse(match, path)   # 出力をコピー
+        else:
+            ...                                 # 文字起こし・出力
+            index.record(path, fingerprint, options)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._ledger = ProcessedLedger(path or default_index_path())
+        self._lock = threading.Lock()
+        self._loaded = False
+        # 全体ハッシュのキャッシュ: パス -> ((サイズ, 更新時刻), ハッシュ)
+        self._full_hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                self._ledger.load()
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load content index: {e}")
+            self._loaded = True
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._ledger)
+
+    def fingerprint(self, file_path: str) -> str:
+        return quick_fingerprint(file_path)
+
+    def find_duplicate(self, file_path: str, fingerprint: Optional[str] = None,
+                       options: Optional[Mapping[str, Any]] = None) -> Optional[DuplicateMatch]:
+        """
+        内容が同一で、同じオプションで出力され、出力が残っている文字起こし済みファイルを探す
+
+        フィンガープリントが一致した場合だけ両方の全体ハッシュを比較する。
+        候補は新しく記録した順に調べ、元ファイルが消えていて確認できない候補は
+        索引から外して次の候補へ進む。
+        """
+        self._ensure_loaded()
+        try:
+            fingerprint = fingerprint or quick_fingerprint(file_path)
+        except OSError:
+            return None
+        options_key = output_options_key(options)
+        abs_path = os.path.abspath(file_path)
+        for entry in self._ledger.find_all_by_hash(_index_key(fingerprint, options_key)):
+            if entry.path == abs_path:
+                continue
+            output_path = transcript_output_path(entry.path)
+            if not os.path.isfile(output_path):
+                continue
+            try:
+                candidate_hash = self._full_hash(entry.path)
+            except OSError:
+                logger.info(f"Dropping stale content index entry: {entry.path}")
+                self._forget(entry.path)
+                continue
+            try:
+                if candidate_hash != self._full_hash(abs_path):
+                    logger.info(f"Fingerprint collision without identical content: {file_path}")
+                    continue
+            except OSError:
+                return None
+            return DuplicateMatch(entry.path, output_path, fingerprint, options_key)
+        return None
+
+    def _forget(self, path: str) -> None:
+        """消えたファイルの記録を索引から外す"""
+        try:
+            self._ledger.remove(path)
+        except OSError as e:
+            logger.warning(f"Failed to drop content index entry for {path}: {e}")
+        with self._lock:
+            self._full_hashes.pop(path, None)
+
+    def record(self, file_path: str, fingerprint: Optional[str] = None,
+               options: Optional[Mapping[str, Any]] = None) -> Optional[str]:
+        """文字起こし済みとして記録（出力は transcript_output_path に options で書き出した前提）"""
+        self._ensure_loaded()
+        try:
+            fingerprint = fingerprint or quick_fingerprint(file_path)
+            self._ledger.mark(os.path.abspath(file_path),
+                              content_hash=_index_key(fingerprint, output_options_key(options)))
+        except OSError as e:
+            logger.warning(f"Failed to record content fingerprint for {file_path}: {e}")
+            return None
+        return fingerprint
+
+    def reuse(self, match: DuplicateMatch, file_path: str) -> Dict[str, Any]:
+        """
+        重複元の出力を file_path の出力としてコピーし、記録する
+
+        Returns:
+            ジョブ結果（text / output_path / duplicate_of）
+        """
+        from export.common import atomic_write_text
+
+        with open(match.output_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        output_path = transcript_output_path(file_path)
+        atomic_write_text(output_path, text)
+        self._ensure_loaded()
+        self._ledger.mark(os.path.abspath(file_path), content_hash=match.key)
+        logger.info(f"Reused transcript of {match.original_path} for duplicate {file_path}")
+        return {"text": text, "output_path": output_path, "duplicate_of": match.original_path}
+
+    def _full_hash(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._full_hashes.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        digest = full_hash(file_path)
+        with self._lock:
+            self._full_hashes[file_path] = (signature, digest)
+        return digest
+
+    def close(self) -> None:
+        self._ledger.close()
+
+
+def default_index_path() -> str:
+    """既定の索引パス（環境変数 KOTOBA_CONTENT_INDEX で上書き可能）"""
+    return os.environ.get("KOTOBA_CONTENT_INDEX") or os.path.join(
+        os.path.expanduser("~"), ".kotoba_transcriber", "content_index.jsonl"
+    )
+
+
+# グローバルシングルトン
+_content_index: Optional[ContentIndex] = None
+_content_index_lock = threading.Lock()
+
+
+def get_content_index() -> ContentIndex:
+    """ContentIndex シングルトンを取得"""
+    global _content_index
+    if _content_index is None:
+        with _content_index_lock:
+            if _content_index is None:
+                _content_index = ContentIndex()
+    return _content_index
@@ -1,6 +1,13 @@
 """
 強化バッチプロセッサー
 100ファイル以上対応・チェックポイント機能・動的ワーカー調整
+
+チェックポイントはスナップショット（JSON）と差分ジャーナル（JSON Lines）の組で、
+1ファイルの完了はジャーナルへの1行追記で記録する。スナップショットの書き直しは
+ジャーナルがスナップショットと同程度の件数に達したときだけ行う。
+
+処理順と進捗・残り時間の見積もりには、事前に取得した各ファイルの長さを使う
+（audio_metadata）。
 """
 
 import os
@@ -12,12 +19,15 @@ try:
     PSUTIL_AVAILABLE = True
 except ImportError:
     PSUTIL_AVAILABLE = False
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Deque, TextIO
+from collections import deque
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import threading
 
+from audio_metadata import AudioProbe, fill_unknown_durations, order_by_duration, probe_durations
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,6 +35,10 @@ class CheckpointManager:
     """チェックポイント管理クラス"""
 
     CHECKPOINT_FILE = "batch_checkpoint.json"
+    JOURNAL_FILE = "batch_checkpoint.journal"
+
+    # ジャーナルの行数がこの値とスナップショットの件数の大きい方に達したら書き直す
+    COMPACT_MIN_RECORDS = 100
 
     def __init__(self, checkpoint_dir: Optional[str] = None):
         """
@@ -39,6 +53,12 @@ class CheckpointManager:
         self.checkpoint_dir = Path(checkpoint_dir)
         self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
         self.checkpoint_file = self.checkpoint_dir / self.CHECKPOINT_FILE
+        self.journal_file = self.checkpoint_dir / self.JOURNAL_FILE
+
+        self._journal_lock = threading.Lock()
+        self._journal: Optional[TextIO] = None
+        self._journal_records = 0
+        self._snapshot_size = 0
 
     def save(self,
              batch_id: str,
@@ -47,7 +67,7 @@ class CheckpointManager:
              remaining_files: List[str],
              stats: Dict[str, Any]) -> bool:
         """
-        チェックポイントを保存
+        チェックポイント（スナップショット）を保存し、差分ジャーナルを空にする
 
         Args:
             batch_id: バッチID
@@ -75,6 +95,9 @@ class CheckpointManager:
                 json.dump(checkpoint, f, ensure_ascii=False, indent=2)
 
             temp_file.replace(self.checkpoint_file)
+            # スナップショットの置き換え後に空にする（間で中断しても再生は冪等）
+            self._truncate_journal()
+            self._snapshot_size = len(processed_files) + len(failed_files) + len(remaining_files)
 
             logger.info(f"Checkpoint saved: {len(processed_files)} processed, {len(remaining_files)} remaining")
             return True
@@ -119,6 +142,8 @@ class CheckpointManager:
                 logger.warning(f"Checkpoint batch_id mismatch: {checkpoint.get('batch_id')} != {batch_id}")
                 return None
 
+            self._replay_journal(checkpoint)
+
             logger.info(f"Checkpoint loaded: {len(checkpoint.get('processed_files', []))} files processed")
             return checkpoint
 
@@ -167,9 +192,96 @@ class CheckpointManager:
 
         return True
 
+    def record(self, batch_id: str, file_path: str, error: Optional[str] = None) -> None:
+        """
+        1ファイルの完了（error 指定時は失敗）をジャーナルに追記（O(1)）
+
+        クラッシュ後も記録が残るよう、追記ごとにディスクへ同期する。
+
+        Raises:
+            OSError: 書き込みに失敗した場合
+        """
+        entry: Dict[str, Any] = {
+            "batch_id": batch_id,
+            "file": file_path,
+            "timestamp": datetime.now().isoformat(),
+        }
+        if error is not None:
+            entry["error"] = error
+        with self._journal_lock:
+            if self._journal is None:
+                self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal_records += 1
+
+    @property
+    def needs_compaction(self) -> bool:
+        """ジャーナルをスナップショットへ書き直す時期か（書き直しのコストを追記件数で償却する）"""
+        return self._journal_records >= max(self.COMPACT_MIN_RECORDS, self._snapshot_size)
+
+    def _replay_journal(self, checkpoint: Dict[str, Any]) -> None:
+        """スナップショット以降にジャーナルへ記録された完了を反映する（途中で切れた行は無視）"""
+        if not self.journal_file.exists():
+            return
+        if self.journal_file.stat().st_size > self.MAX_CHECKPOINT_SIZE:
+            logger.error(f"Checkpoint journal too large, ignoring: {self.journal_file}")
+            return
+
+        remaining = checkpoint["remaining_files"]
+        pending = set(remaining)
+        done = set()
+        with open(self.journal_file, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    file_path = entry["file"]
+                    if entry["batch_id"] != checkpoint["batch_id"] or not isinstance(file_path, str):
+                        continue
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if file_path not in pending or file_path in done:
+                    continue
+                done.add(file_path)
+                if "error" in entry:
+                    checkpoint["failed_files"].append({
+                        "file": file_path,
+                        "error": entry["error"],
+                        "timestamp": entry.get("timestamp"),
+                    })
+                else:
+                    checkpoint["processed_files"].append(file_path)
+        if done:
+            checkpoint["remaining_files"] = [p for p in remaining if p not in done]
+            logger.info(f"Replayed {len(done)} completions from checkpoint journal")
+
+    def _truncate_journal(self) -> None:
+        with self._journal_lock:
+            self._close_journal()
+            with open(self.journal_file, 'w', encoding='utf-8'):
+                pass
+            self._journal_records = 0
+
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            try:
+                self._journal.close()
+            except OSError:
+                pass
+            self._journal = None
+
+    def close(self) -> None:
+        """ジャーナルを閉じる"""
+        with self._journal_lock:
+            self._close_journal()
+
     def clear(self) -> bool:
         """チェックポイントを削除"""
         try:
+            self.close()
+            if self.journal_file.exists():
+                self.journal_file.unlink()
             if self.checkpoint_file.exists():
                 self.checkpoint_file.unlink()
                 logger.info("Checkpoint cleared")
@@ -211,15 +323,19 @@ class EnhancedBatchProcessor:
     - メモリ監視
     """
 
-    # バッチサイズ計算用の乗数（ワーカー数 × この値）
+    # 旧実装でプールに先読み投入していた件数の乗数（現在は current_workers を超えて投入しない）
     BATCH_SIZE_MULTIPLIER = 2
+    # チェックポイントの書き込みがこの回数連続で失敗したら無効化する
+    MAX_CHECKPOINT_FAILURES = 3
 
     def __init__(self,
                  max_workers: int = 1,  # FIXED: TranscriptionEngine is not thread-safe
                  auto_adjust_workers: bool = False,  # FIXED: Disable auto-adjustment
                  enable_checkpoint: bool = True,
                  memory_limit_mb: int = 4096,
-                 checkpoint_interval: int = 10):
+                 checkpoint_interval: int = 10,
+                 order: str = "submission",
+                 probe: Optional[AudioProbe] = None):
         """
         初期化
 
@@ -229,6 +345,8 @@ class EnhancedBatchProcessor:
             enable_checkpoint: チェックポイントを有効化
             memory_limit_mb: メモリ制限（MB）
             checkpoint_interval: チェックポイント保存間隔（ファイル数）
+            order: 処理順（submission / longest_first / shortest_first）
+            probe: 長さの取得に使う AudioProbe（None で共有インスタンス）
         """
         # CRITICAL: TranscriptionEngineはスレッドセーフではないため、max_workersを強制的に1に設定
         self.max_workers = 1
@@ -237,14 +355,20 @@ class EnhancedBatchProcessor:
         self.enable_checkpoint = enable_checkpoint
         self.memory_limit_mb = memory_limit_mb
         self.checkpoint_interval = checkpoint_interval
+        self.order = order
+        self.probe = probe
 
         self.checkpoint_manager = CheckpointManager() if enable_checkpoint else None
 
         # 処理状態
         self.processed_files: List[str] = []
         self.failed_files: List[Dict] = []
-        self.remaining_files: List[str] = []
-        self._remaining_set: set = set()  # O(1) membership test 用
+        self.remaining_files: Deque[str] = deque()  # 未投入のファイル（先頭から投入）
+        self._remaining_set: set = set()  # 未完了（未投入＋実行中）のファイル
+        self._in_flight: Dict[Future, str] = {}  # 投入済み・未完了のファイル
+        self._checkpoint_failures = 0
+        self._durations: Dict[str, float] = {}  # ファイル -> 長さ（秒、不明分は推定値）
+        self._run_done_duration = 0.0  # 今回の実行で処理した長さ（残り時間の見積もり用）
         self.is_running = False
         self._pause_event = threading.Event()   # スレッドセーフな一時停止フラグ
         self._cancel_event = threading.Event()  # スレッドセーフなキャンセルフラグ
@@ -260,6 +384,8 @@ class EnhancedBatchProcessor:
             "start_time": None,
             "elapsed_time": 0,
             "estimated_remaining": 0,
+            "total_duration": 0.0,
+            "processed_duration": 0.0,
             "current_workers": max_workers,
             "memory_usage_mb": 0
         }
@@ -289,60 +415,41 @@ class EnhancedBatchProcessor:
             self._pause_event.clear()
             self.stats["start_time"] = time.time()
             self.stats["total_files"] = len(file_paths)
+            self.processed_files = []
+            self.failed_files = []
+            pending = file_paths
 
-            # チェックポイントから再開
+            # チェックポイントから再開（ジャーナルの記録まで反映済み）
             if self.enable_checkpoint and batch_id:
                 checkpoint = self.checkpoint_manager.load(batch_id)
                 if checkpoint:
                     self.processed_files = checkpoint.get("processed_files", [])
                     self.failed_files = checkpoint.get("failed_files", [])
-                    self.remaining_files = checkpoint.get("remaining_files", [])
-                    self._remaining_set = set(self.remaining_files)
+                    pending = checkpoint.get("remaining_files", [])
                     logger.info(f"Resuming from checkpoint: {len(self.processed_files)} files already processed")
-                else:
-                    self.remaining_files = file_paths.copy()
-                    self._remaining_set = set(self.remaining_files)
-            else:
-                self.remaining_files = file_paths.copy()
-                self._remaining_set = set(self.remaining_files)
-                self.processed_files = []
-                self.failed_files = []
+
+            # 各ファイルの長さを先に取得して処理順を決める
+            self._durations = fill_unknown_durations(probe_durations(file_paths, self.probe))
+            pending = order_by_duration(pending, self._durations, self.order)
+
+            self.remaining_files = deque(pending)
+            self._remaining_set = set(pending)
+            self._in_flight = {}
+            self.stats["processed_count"] = len(self.processed_files)
+            self.stats["failed_count"] = len(self.failed_files)
+            self.stats["total_duration"] = sum(self._durations.values())
+            self.stats["processed_duration"] = self.stats["total_duration"] - sum(
+                self._durations.get(p, 0.0) for p in pending)
+            self._run_done_duration = 0.0
 
         batch_id = batch_id or f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        checkpoint_failures = 0
-        MAX_CHECKPOINT_FAILURES = 3
+        self._checkpoint_failures = 0
 
         try:
-            while not self._cancel_event.is_set():
-                with self._lock:
-                    if not self.remaining_files:
-                        break
-                # 一時停止チェック（キャンセルも監視）
-                while self._pause_event.is_set() and not self._cancel_event.is_set():
-                    time.sleep(0.5)
-
-                # ワーカー数を調整
-                if self.auto_adjust_workers:
-                    self._adjust_workers()
-
-                # 現在のバッチを処理
-                batch_size = self.current_workers * self.BATCH_SIZE_MULTIPLIER
-                with self._lock:
-                    current_batch = self.remaining_files[:batch_size]
-
-                self._process_batch(current_batch, processor_func, progress_callback, batch_id)
-
-                # チェックポイント保存
-                if self.enable_checkpoint and self.checkpoint_manager:
-                    try:
-                        self._save_checkpoint(batch_id)
-                        checkpoint_failures = 0
-                    except Exception as e:
-                        checkpoint_failures += 1
-                        logger.warning(f"Failed to save checkpoint ({checkpoint_failures}/{MAX_CHECKPOINT_FAILURES}): {e}")
-                        if checkpoint_failures >= MAX_CHECKPOINT_FAILURES:
-                            logger.error("Checkpoint saving failed repeatedly, disabling checkpoints")
-                            self.enable_checkpoint = False
+            # ジャーナルの起点となるスナップショット
+            self._write_checkpoint(lambda: self._save_checkpoint(batch_id))
+            self._run_pool(processor_func, progress_callback, batch_id)
+            self._write_checkpoint(lambda: self._save_checkpoint(batch_id))
 
             # 完了
             self.stats["elapsed_time"] = time.time() - self.stats["start_time"]
@@ -362,59 +469,120 @@ class EnhancedBatchProcessor:
             raise
 
         finally:
+            if self.checkpoint_manager:
+                self.checkpoint_manager.close()
             self.is_running = False
 
-    def _process_batch(self,
-                      batch: List[str],
-                      processor_func: Callable,
-                      progress_callback: Optional[Callable],
-                      batch_id: str):
+    def _run_pool(self,
+                  processor_func: Callable,
+                  progress_callback: Optional[Callable],
+                  batch_id: str):
         """
-        バッチを並列処理
+        常駐ワーカープールで残りのファイルを処理
+
+        プールはバッチ全体で1つだけ作り、完了ごとに remaining_files の先頭から補充する
+        （投入は current_workers 件まで。ワーカー数を減らすと、実行中の分が終わるにつれて
+        同時実行数も下がる）。
+        キャンセル時は未開始の分を取り消して残りに戻し、実行中の分の完了を待つ。
 
         Args:
-            batch: ファイルリスト
             processor_func: 処理関数
             progress_callback: 進捗コールバック
             batch_id: バッチID
         """
-        with ThreadPoolExecutor(max_workers=self.current_workers) as executor:
-            future_to_file = {
-                executor.submit(self._process_single_file, file_path, processor_func): file_path
-                for file_path in batch
-            }
-
-            for future in as_completed(future_to_file):
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch_worker")
+        try:
+            while True:
                 if self._cancel_event.is_set():
-                    break
+                    self._withdraw_pending()
+                elif not self._pause_event.is_set():
+                    # ワーカー数を調整
+                    if self.auto_adjust_workers:
+                        self._adjust_workers()
+                    self._fill(executor, processor_func)
+
+                if not self._in_flight:
+                    if self._cancel_event.is_set() or not self.remaining_files:
+                        break
+                    # 一時停止中（キャンセルも監視）
+                    time.sleep(0.5)
+                    continue
 
-                file_path = future_to_file[future]
+                done, _ = wait(list(self._in_flight), timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._complete(future, progress_callback, batch_id)
+        finally:
+            self._withdraw_pending()
+            executor.shutdown(wait=True)
 
-                try:
-                    result = future.result()
-                    with self._lock:
-                        self.processed_files.append(file_path)
-                        if file_path in self._remaining_set:
-                            self._remaining_set.discard(file_path)
-                            self.remaining_files.remove(file_path)
-                        self.stats["processed_count"] += 1
-
-                except Exception as e:
-                    with self._lock:
-                        self.failed_files.append({
-                            "file": file_path,
-                            "error": str(e),
-                            "timestamp": datetime.now().isoformat()
-                        })
-                        if file_path in self._remaining_set:
-                            self._remaining_set.discard(file_path)
-                            self.remaining_files.remove(file_path)
-                        self.stats["failed_count"] += 1
-
-                # 進捗コールバック
-                if progress_callback:
-                    self._update_stats()
-                    progress_callback(self.stats.copy())
+    def _fill(self, executor: ThreadPoolExecutor, processor_func: Callable):
+        """空きの分だけ remaining_files の先頭からプールに投入"""
+        # プールのスレッド数は max_workers のまま。投入数で同時実行数を current_workers に抑える
+        limit = self.current_workers
+        with self._lock:
+            while self.remaining_files and len(self._in_flight) < limit:
+                file_path = self.remaining_files.popleft()
+                future = executor.submit(self._process_single_file, file_path, processor_func)
+                self._in_flight[future] = file_path
+
+    def _withdraw_pending(self):
+        """未開始の投入分を取り消し、元の順序で remaining_files の先頭に戻す"""
+        with self._lock:
+            for future, file_path in reversed(list(self._in_flight.items())):
+                if future.cancel():
+                    del self._in_flight[future]
+                    self.remaining_files.appendleft(file_path)
+
+    def _complete(self,
+                  future: Future,
+                  progress_callback: Optional[Callable],
+                  batch_id: str):
+        """1ファイルの完了を反映し、ジャーナルに記録"""
+        error = None
+        try:
+            future.result()
+        except Exception as e:
+            error = str(e)
+
+        with self._lock:
+            file_path = self._in_flight.pop(future)
+            self._remaining_set.discard(file_path)
+            duration = self._durations.get(file_path, 0.0)
+            self.stats["processed_duration"] += duration
+            self._run_done_duration += duration
+            if error is None:
+                self.processed_files.append(file_path)
+                self.stats["processed_count"] += 1
+            else:
+                self.failed_files.append({
+                    "file": file_path,
+                    "error": error,
+                    "timestamp": datetime.now().isoformat()
+                })
+                self.stats["failed_count"] += 1
+
+        self._write_checkpoint(lambda: self.checkpoint_manager.record(batch_id, file_path, error))
+        if self.checkpoint_manager and self.checkpoint_manager.needs_compaction:
+            self._write_checkpoint(lambda: self._save_checkpoint(batch_id))
+
+        # 進捗コールバック
+        if progress_callback:
+            self._update_stats()
+            progress_callback(self.stats.copy())
+
+    def _write_checkpoint(self, write: Callable[[], None]):
+        """チェックポイントを書き込む（連続して失敗したらチェックポイントを無効化）"""
+        if not (self.enable_checkpoint and self.checkpoint_manager):
+            return
+        try:
+            write()
+            self._checkpoint_failures = 0
+        except Exception as e:
+            self._checkpoint_failures += 1
+            logger.warning(f"Failed to save checkpoint ({self._checkpoint_failures}/{self.MAX_CHECKPOINT_FAILURES}): {e}")
+            if self._checkpoint_failures >= self.MAX_CHECKPOINT_FAILURES:
+                logger.error("Checkpoint saving failed repeatedly, disabling checkpoints")
+                self.enable_checkpoint = False
 
     def _process_single_file(self,
                             file_path: str,
@@ -477,7 +645,7 @@ class EnhancedBatchProcessor:
             logger.error(f"Error adjusting workers: {e}")
 
     def _update_stats(self):
-        """統計情報を更新"""
+        """統計情報を更新（長さが分かっていれば、処理済みの長さあたりの時間で残り時間を見積もる）"""
         start_time = self.stats.get("start_time")
         if start_time is None:
             return
@@ -485,7 +653,10 @@ class EnhancedBatchProcessor:
         self.stats["elapsed_time"] = elapsed
 
         processed = self.stats["processed_count"]
-        if processed > 0:
+        if self._run_done_duration > 0:
+            remaining_duration = self.stats["total_duration"] - self.stats["processed_duration"]
+            self.stats["estimated_remaining"] = elapsed / self._run_done_duration * max(0.0, remaining_duration)
+        elif processed > 0:
             avg_time = elapsed / processed
             remaining = self.stats["total_files"] - processed
             self.stats["estimated_remaining"] = avg_time * remaining
@@ -495,12 +666,19 @@ class EnhancedBatchProcessor:
         if not self.checkpoint_manager:
             return
 
+        with self._lock:
+            # 実行中のファイルも未完了として残す（再開時に処理し直す）
+            remaining = list(self._in_flight.values()) + list(self.remaining_files)
+            processed = self.processed_files.copy()
+            failed = self.failed_files.copy()
+            stats = self.stats.copy()
+
         self.checkpoint_manager.save(
             batch_id=batch_id,
-            processed_files=self.processed_files.copy(),
-            failed_files=self.failed_files.copy(),
-            remaining_files=self.remaining_files.copy(),
-            stats=self.stats.copy()
+            processed_files=processed,
+            failed_files=failed,
+            remaining_files=remaining,
+            stats=stats
         )
 
     def cancel(self):
@@ -530,12 +708,16 @@ class EnhancedBatchProcessor:
 
             total = self.stats["total_files"]
             processed = self.stats["processed_count"]
-            failed = self.stats["failed_count"]
+            total_duration = self.stats["total_duration"]
+            if total_duration > 0:
+                progress = self.stats["processed_duration"] / total_duration * 100
+            else:
+                progress = (processed / total * 100) if total > 0 else 0
 
             return {
                 **self.stats,
-                "progress_percent": (processed / total * 100) if total > 0 else 0,
-                "remaining_files": len(self.remaining_files),
+                "progress_percent": progress,
+                "remaining_files": len(self._remaining_set),
                 "is_running": self.is_running,
                 "is_paused": self._pause_event.is_set()
             }
@@ -11,7 +11,6 @@ import logging
 from typing import List, Set, Callable, Optional, Dict, Any
 from pathlib import Path
 from dataclasses import dataclass, asdict
-from datetime import datetime
 from threading import Lock
 
 try:
@@ -29,6 +28,7 @@ except ImportError:
 
 from PySide6.QtCore import QObject, Signal, QTimer
 from constants import SharedConstants
+from processed_ledger import ProcessedLedger
 
 logger = logging.getLogger(__name__)
 
@@ -79,7 +79,6 @@ class AsyncFolderMonitor(QObject):
         self.check_interval = check_interval
         self._observer: Optional[Observer] = None
         self._pending_files: Dict[Path, FileEvent] = {}
-        self._processed_files: Set[str] = set()
         self._processing: Set[Path] = set()
         self._lock = Lock()
         
@@ -88,8 +87,12 @@ class AsyncFolderMonitor(QObject):
         self._ready_check_timer.timeout.connect(self._check_pending_files)
         self._ready_check_timer.start(int(check_interval * 1000))
         
-        # 保存済みリストのパス
-        self._processed_list_path = Path.home() / ".kotoba_transcriber" / "processed_files.json"
+        # 処理済み台帳（追記型。旧 processed_files.json は初回読み込み時に取り込む）
+        state_dir = Path.home() / ".kotoba_transcriber"
+        self._processed_files = ProcessedLedger(
+            str(state_dir / "processed_ledger.jsonl"),
+            legacy_path=str(state_dir / "processed_files.json"),
+        )
         
         self._load_processed_files()
     
@@ -314,11 +317,13 @@ class AsyncFolderMonitor(QObject):
         abs_path = str(path.resolve())
         
         with self._lock:
-            self._processed_files.add(abs_path)
             self._processing.discard(path)
+        try:
+            self._processed_files.mark(abs_path)
+        except OSError as e:
+            logger.warning(f"Failed to record processed file: {e}")
         
         self.file_processed.emit(file_path, success)
-        self._save_processed_files()
         
         logger.info(f"Marked as processed: {path.name} (success={success})")
     
@@ -332,55 +337,23 @@ class AsyncFolderMonitor(QObject):
         path = Path(file_path)
         abs_path = str(path.resolve())
         
-        with self._lock:
-            self._processed_files.discard(abs_path)
-        
-        self._save_processed_files()
+        try:
+            self._processed_files.remove(abs_path)
+        except OSError as e:
+            logger.warning(f"Failed to record processed file removal: {e}")
         logger.info(f"Marked as unprocessed: {path.name}")
     
     def _load_processed_files(self):
-        """処理済みリストを読み込み"""
+        """処理済み台帳を読み込み（旧 processed_files.json は初回に取り込む）"""
         try:
-            if self._processed_list_path.exists():
-                # ファイルサイズ制限 (50MB)
-                MAX_PROCESSED_SIZE = 50 * 1024 * 1024
-                file_size = self._processed_list_path.stat().st_size
-                if file_size > MAX_PROCESSED_SIZE:
-                    logger.error(f"Processed files list too large: {file_size} bytes, skipping")
-                    self._processed_files = set()
-                    return
-                import json
-                data = json.loads(self._processed_list_path.read_text(encoding='utf-8'))
-                self._processed_files = set(data.get('files', []))
-                logger.info(f"Loaded {len(self._processed_files)} processed files")
+            self._processed_files.load()
         except Exception as e:
             logger.warning(f"Failed to load processed files: {e}")
-            self._processed_files = set()
-    
+
     def _save_processed_files(self):
-        """処理済みリストを保存（アトミック書き込み）"""
+        """処理済み台帳を有効な記録だけで書き直す（アトミック書き込み）"""
         try:
-            import json
-            import tempfile
-            self._processed_list_path.parent.mkdir(parents=True, exist_ok=True)
-            data = {
-                'files': list(self._processed_files),
-                'updated': datetime.now().isoformat()
-            }
-            content = json.dumps(data, ensure_ascii=False, indent=2)
-            fd, tmp_path = tempfile.mkstemp(
-                dir=str(self._processed_list_path.parent), suffix='.tmp'
-            )
-            try:
-                with os.fdopen(fd, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                os.replace(tmp_path, str(self._processed_list_path))
-            except BaseException:
-                try:
-                    os.unlink(tmp_path)
-                except OSError:
-                    pass
-                raise
+            self._processed_files.compact()
         except Exception as e:
             logger.warning(f"Failed to save processed files: {e}")
     
@@ -397,9 +370,10 @@ class AsyncFolderMonitor(QObject):
     
     def clear_history(self):
         """処理履歴をクリア"""
-        with self._lock:
+        try:
             self._processed_files.clear()
-        self._save_processed_files()
+        except OSError as e:
+            logger.warning(f"Failed to clear processed files: {e}")
         logger.info("Processing history cleared")
     
     def _start_polling(self):
@@ -7,12 +7,13 @@ SRT/VTT/JSON/DOCX形式へのエクスポートをサポート
 import html
 import json
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from abc import ABC, abstractmethod
 from pathlib import Path
 import logging
 from time_utils import format_time_srt, format_time_vtt
 from export.common import (
+    atomic_write_iter,
     atomic_write_text,
     validate_export_path,
     validate_segments,
@@ -49,16 +50,18 @@ class SubtitleFormatter(ABC):
         """ヘッダーを生成"""
         pass
     
-    def format_segments(self, segments: List[Dict]) -> str:
+    def format_segments(self, segments: Iterable[Dict]) -> str:
         """全セグメントをフォーマット"""
-        lines = [self.generate_header()]
-        
+        return ''.join(self.iter_segments(segments))
+
+    def iter_segments(self, segments: Iterable[Dict]) -> Iterator[str]:
+        """ヘッダーとセグメントを1件ずつフォーマット（連結すると format_segments と同じ）"""
+        yield self.generate_header()
+
         for i, segment in enumerate(segments, 1):
             formatted = self.format_segment(segment, i)
             if formatted:
-                lines.append(formatted)
-        
-        return '\n'.join(lines)
+                yield '\n' + formatted
 
 
 class SRTFormatter(SubtitleFormatter):
@@ -151,7 +154,7 @@ class TXTFormatter:
     
     def format(
         self, 
-        segments: List[Dict],
+        segments: Iterable[Dict],
         include_timestamps: bool = True,
         include_speakers: bool = True
     ) -> str:
@@ -166,8 +169,17 @@ class TXTFormatter:
         Returns:
             テキスト文字列
         """
-        lines = []
-        
+        return ''.join(self.iter_lines(segments, include_timestamps, include_speakers))
+
+    def iter_lines(
+        self,
+        segments: Iterable[Dict],
+        include_timestamps: bool = True,
+        include_speakers: bool = True
+    ) -> Iterator[str]:
+        """1行ずつ出力（連結すると format と同じ）"""
+        separator = ''
+
         for segment in segments:
             parts = []
             
@@ -181,9 +193,8 @@ class TXTFormatter:
             parts.append(segment.get('text', '').strip())
             
             if parts:
-                lines.append(' '.join(parts))
-        
-        return '\n'.join(lines)
+                yield separator + ' '.join(parts)
+                separator = '\n'
 
 
 class DOCXFormatter:
@@ -308,12 +319,11 @@ class EnhancedSubtitleExporter:
                 return True
 
             elif format_type == 'txt':
-                content = self.txt_formatter.format(
+                atomic_write_iter(output_path, self.txt_formatter.iter_lines(
                     segments,
                     include_timestamps=options.get('include_timestamps', True),
                     include_speakers=options.get('include_speakers', True)
-                )
-                atomic_write_text(output_path, content)
+                ))
                 return True
             
             elif format_type == 'docx':
@@ -340,8 +350,7 @@ class EnhancedSubtitleExporter:
         """字幕ファイルをエクスポート"""
         formatter_class = self.FORMATTERS[format_type]
         formatter = formatter_class()
-        content = formatter.format_segments(segments)
-        atomic_write_text(output_path, content)
+        atomic_write_iter(output_path, formatter.iter_segments(segments))
         return True
     
     def export_auto(
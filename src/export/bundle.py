@@ -0,0 +1,257 @@
+"""
+複数形式の一括エクスポート
+セグメントを一度だけ正規化し、各形式の書き出しで共有する
+"""
+
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import tracing
+from exceptions import ExportError
+from export.common import (
+    atomic_write_iter, atomic_write_text, validate_export_path, validate_segments,
+)
+from metrics import EXPORT_ERRORS, EXPORT_SECONDS
+from time_utils import format_time_hms, format_time_srt, format_time_vtt
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'NormalizedTranscript', 'BundleResult', 'BUNDLE_WRITERS', 'BUNDLE_EXTENSIONS',
+    'export_bundle',
+]
+
+# 一括エクスポートの同時書き出し数
+BUNDLE_MAX_WORKERS = 4
+
+# 話者なしセグメントの表示名（docx / xlsx の既定と同じ）
+UNKNOWN_SPEAKER = "Unknown"
+
+
+class NormalizedTranscript:
+    """
+    正規化済みの書き起こし（列指向の不変タプル）
+
+    各形式で使う時刻文字列は初回アクセス時に一度だけ整形してキャッシュする。
+    """
+
+    def __init__(self, text: str, starts: Sequence[float], ends: Sequence[float],
+                 texts: Sequence[str], speakers: Sequence[Optional[str]],
+                 raw_segments: Optional[List[Dict[str, Any]]] = None):
+        self.text = text
+        self.starts: Tuple[float, ...] = tuple(starts)
+        self.ends: Tuple[float, ...] = tuple(ends)
+        self.texts: Tuple[str, ...] = tuple(texts)
+        self.speakers: Tuple[Optional[str], ...] = tuple(speakers)
+        # JSON 出力は入力セグメントをそのまま保存する（単一形式エクスポートと同じ）
+        self.raw_segments = raw_segments if raw_segments is not None else []
+
+    @classmethod
+    def from_segments(cls, text: str, segments: List[Dict[str, Any]]) -> "NormalizedTranscript":
+        """
+        セグメント辞書のリストから生成（検証もここで一度だけ行う）
+
+        セグメントが空の場合はテキスト全体を1セグメントとして扱う。
+
+        Raises:
+            TypeError / ValueError: セグメントが不正な場合
+        """
+        validate_segments(segments)
+        source = segments or [{"text": text, "start": 0, "end": 0, "speaker": ""}]
+        starts, ends, texts, speakers = [], [], [], []
+        for seg in source:
+            starts.append(float(seg.get("start") or 0))
+            ends.append(float(seg.get("end") or 0))
+            texts.append(str(seg.get("text") or ""))
+            speaker = seg.get("speaker", None)
+            speakers.append(None if speaker is None else str(speaker))
+        return cls(text, starts, ends, texts, speakers, raw_segments=segments)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def speaker_or_unknown(self, index: int) -> str:
+        speaker = self.speakers[index]
+        return UNKNOWN_SPEAKER if speaker is None else speaker
+
+    @cached_property
+    def hms_starts(self) -> Tuple[str, ...]:
+        return tuple(format_time_hms(t) for t in self.starts)
+
+    @cached_property
+    def hms_ends(self) -> Tuple[str, ...]:
+        return tuple(format_time_hms(t) for t in self.ends)
+
+    @cached_property
+    def srt_ranges(self) -> Tuple[str, ...]:
+        return tuple(f"{format_time_srt(s)} --> {format_time_srt(e)}"
+                     for s, e in zip(self.starts, self.ends))
+
+    @cached_property
+    def vtt_ranges(self) -> Tuple[str, ...]:
+        return tuple(f"{format_time_vtt(s)} --> {format_time_vtt(e)}"
+                     for s, e in zip(self.starts, self.ends))
+
+
+def _write_txt(transcript: NormalizedTranscript, output_path: str) -> None:
+    atomic_write_text(output_path, transcript.text)
+
+
+def _write_json(transcript: NormalizedTranscript, output_path: str) -> None:
+    data = {"text": transcript.text, "segments": transcript.raw_segments}
+    atomic_write_text(output_path, json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def _iter_srt(transcript: NormalizedTranscript) -> Iterator[str]:
+    index = 1
+    separator = ""
+    for text, time_range in zip(transcript.texts, transcript.srt_ranges):
+        text = text.strip()
+        if not text:
+            continue
+        yield f"{separator}{index}\n{time_range}\n{text}\n"
+        separator = "\n"
+        index += 1
+
+
+def _write_srt(transcript: NormalizedTranscript, output_path: str) -> None:
+    atomic_write_iter(output_path, _iter_srt(transcript))
+
+
+def _iter_vtt(transcript: NormalizedTranscript) -> Iterator[str]:
+    yield "WEBVTT\n"
+    for text, time_range in zip(transcript.texts, transcript.vtt_ranges):
+        text = text.strip()
+        if text:
+            yield f"\n{time_range}\n{text}\n"
+
+
+def _write_vtt(transcript: NormalizedTranscript, output_path: str) -> None:
+    atomic_write_iter(output_path, _iter_vtt(transcript))
+
+
+def _write_xlsx(transcript: NormalizedTranscript, output_path: str) -> None:
+    from export.excel_exporter import ExcelExporter
+    exporter = ExcelExporter()
+    if not exporter.has_openpyxl:
+        raise ExportError("openpyxlがインストールされていません")
+    rows = (
+        (i + 1, transcript.hms_starts[i], transcript.hms_ends[i],
+         transcript.speaker_or_unknown(i), transcript.texts[i])
+        for i in range(len(transcript))
+    )
+    if not exporter.export_rows(rows, output_path):
+        raise ExportError("XLSXエクスポートに失敗しました")
+
+
+def _write_ktb(transcript: NormalizedTranscript, output_path: str) -> None:
+    from export.transcript_archive import write_archive
+    write_archive(output_path, transcript.text, transcript.raw_segments)
+
+
+def _write_docx(transcript: NormalizedTranscript, output_path: str) -> None:
+    from export.word_exporter import WordExporter
+    exporter = WordExporter()
+    if not exporter.has_python_docx:
+        raise ExportError("python-docxがインストールされていません")
+    entries = [
+        (transcript.speaker_or_unknown(i), transcript.hms_starts[i], transcript.texts[i])
+        for i in range(len(transcript))
+    ]
+    if not exporter.export_entries(entries, output_path):
+        raise ExportError("DOCXエクスポートに失敗しました")
+
+
+# フォーマット → 書き出し関数
+BUNDLE_WRITERS: Dict[str, Callable[[NormalizedTranscript, str], None]] = {
+    "txt": _write_txt,
+    "docx": _write_docx,
+    "xlsx": _write_xlsx,
+    "srt": _write_srt,
+    "vtt": _write_vtt,
+    "json": _write_json,
+    "ktb": _write_ktb,
+}
+
+BUNDLE_EXTENSIONS: Dict[str, str] = {fmt: f".{fmt}" for fmt in BUNDLE_WRITERS}
+
+
+class BundleResult:
+    """1形式分の書き出し結果"""
+
+    __slots__ = ("format", "output_path", "success", "seconds", "error")
+
+    def __init__(self, format: str, output_path: str, success: bool,
+                 seconds: float, error: Optional[str] = None):
+        self.format = format
+        self.output_path = output_path
+        self.success = success
+        self.seconds = seconds
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": self.format,
+            "output_path": self.output_path,
+            "success": self.success,
+            "seconds": round(self.seconds, 4),
+            "error": self.error,
+        }
+
+
+def _run_writer(fmt: str, transcript: NormalizedTranscript, output_path: str) -> BundleResult:
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"export.{fmt}"), EXPORT_SECONDS.labels(fmt).time():
+            BUNDLE_WRITERS[fmt](transcript, output_path)
+        return BundleResult(fmt, output_path, True, time.perf_counter() - start)
+    except ExportError as e:
+        EXPORT_ERRORS.labels(fmt).inc()
+        return BundleResult(fmt, output_path, False, time.perf_counter() - start, str(e))
+    except Exception as e:
+        EXPORT_ERRORS.labels(fmt).inc()
+        logger.error(f"Bundle export failed for {fmt}: {e}", exc_info=True)
+        return BundleResult(fmt, output_path, False, time.perf_counter() - start,
+                            "エクスポート処理中にエラーが発生しました")
+
+
+def export_bundle(transcript: NormalizedTranscript, output_base: str,
+                  formats: Sequence[str],
+                  max_workers: int = BUNDLE_MAX_WORKERS) -> List[BundleResult]:
+    """
+    正規化済みの書き起こしを複数形式で並行して書き出す
+
+    Args:
+        transcript: 正規化済みの書き起こし
+        output_base: 拡張子を除いた出力パス（<output_base>.<format> に書き出す）
+        formats: 出力形式のリスト（重複は除去）
+        max_workers: 同時書き出し数
+
+    Returns:
+        formats の順に並べた各形式の結果
+
+    Raises:
+        ValueError: 不明な形式、または出力パスが不正な場合
+    """
+    unique = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in unique if fmt not in BUNDLE_WRITERS]
+    if unknown:
+        raise ValueError(f"Unsupported export formats: {unknown}")
+    paths = {fmt: output_base + BUNDLE_EXTENSIONS[fmt] for fmt in unique}
+    for path in paths.values():
+        validate_export_path(path)
+    if len(unique) == 1:
+        return [_run_writer(unique[0], transcript, paths[unique[0]])]
+
+    # 時刻整形は形式間で共有するため、書き出し前に一度だけ行う（スレッド間での重複計算を避ける）
+    if {"xlsx", "docx"} & set(unique):
+        _ = (transcript.hms_starts, transcript.hms_ends)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique)),
+                            thread_name_prefix="export-bundle") as pool:
+        futures = [pool.submit(tracing.bind_context(_run_writer), fmt, transcript, paths[fmt])
+                   for fmt in unique]
+        return [future.result() for future in futures]
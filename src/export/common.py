@@ -2,13 +2,17 @@
 エクスポート共通定義
 """
 
+import bisect
+import heapq
 import logging
 import os
 import re
 import tempfile
 from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional
+
+import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +43,9 @@ def atomic_save(output_path: str):
     tmp_fd, tmp_path = tempfile.mkstemp(dir=output_dir)
     os.close(tmp_fd)
     try:
-        yield tmp_path
-        os.replace(tmp_path, output_path)
+        with tracing.span("file_write", file=os.path.basename(output_path)):
+            yield tmp_path
+            os.replace(tmp_path, output_path)
     except BaseException:
         try:
             os.unlink(tmp_path)
@@ -61,15 +66,99 @@ def atomic_write_text(output_path: str, content: str, encoding: str = 'utf-8') -
     output_dir = os.path.dirname(output_path) or '.'
     tmp_fd, tmp_path = tempfile.mkstemp(dir=output_dir)
     try:
-        with os.fdopen(tmp_fd, 'w', encoding=encoding) as f:
-            f.write(content)
-        os.replace(tmp_path, output_path)
+        with tracing.span("file_write", file=os.path.basename(output_path), chars=len(content)):
+            with os.fdopen(tmp_fd, 'w', encoding=encoding) as f:
+                f.write(content)
+            os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_iter(output_path: str, chunks: Iterable[str], encoding: str = 'utf-8') -> int:
+    """
+    文字列チャンクのイテラブルを一時ファイルへ逐次書き込み、アトミックに置き換える
+
+    ジェネレータを渡せば出力全体をメモリに保持しない（長時間の書き起こし向け）。
+
+    Args:
+        output_path: 出力ファイルパス
+        chunks: 書き込む文字列のイテラブル
+        encoding: エンコーディング
+
+    Returns:
+        書き込んだ文字数
+    """
+    output_dir = os.path.dirname(output_path) or '.'
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=output_dir)
+    written = 0
+    try:
+        with tracing.span("file_write", file=os.path.basename(output_path)) as span:
+            with os.fdopen(tmp_fd, 'w', encoding=encoding) as f:
+                write = f.write
+                for chunk in chunks:
+                    written += write(chunk)
+            os.replace(tmp_path, output_path)
+            if span is not None:
+                span.set(chars=written)
     except BaseException:
         try:
             os.unlink(tmp_path)
         except OSError:
             pass
         raise
+    return written
+
+
+class SpeakerIndex:
+    """
+    話者分離セグメントの時刻→話者検索（開始時刻でソートした索引）
+
+    線形走査と同じく「時刻を含むセグメントのうちリスト上で最初のもの」を返す。
+    字幕の並び（時刻の単調増加）で問い合わせれば、開始済みセグメントを
+    ヒープで管理するだけなので全体で O((n + m) log n)。時刻が戻った場合は
+    先頭から走査し直す。
+    """
+
+    def __init__(self, speaker_segments: Optional[List[Dict]]):
+        entries = sorted(
+            (seg.get("start", 0), order, seg.get("end", 0), seg.get("speaker"))
+            for order, seg in enumerate(speaker_segments or [])
+        )
+        self._starts = [entry[0] for entry in entries]
+        self._entries = entries
+        self._reset()
+
+    def _reset(self) -> None:
+        self._next = 0
+        self._active: List[tuple] = []  # (リスト上の順序, end, speaker) のヒープ
+        self._last_time = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def speaker_at(self, time: float) -> Optional[str]:
+        """指定時刻の話者（該当なしなら None）"""
+        if not self._entries:
+            return None
+        if time < self._last_time:
+            self._reset()
+        self._last_time = time
+
+        # 開始時刻が time 以下のセグメントを有効化
+        started = bisect.bisect_right(self._starts, time, lo=self._next)
+        for _, order, end, speaker in self._entries[self._next:started]:
+            heapq.heappush(self._active, (order, end, speaker))
+        self._next = started
+
+        # 終了済みのセグメントは以降の（より後の）時刻にも該当しないので捨てる
+        active = self._active
+        while active and active[0][1] < time:
+            heapq.heappop(active)
+        return active[0][2] if active else None
 
 
 # --- Validation ---
@@ -183,6 +272,49 @@ def merge_short_segments(
     return merged
 
 
+def split_text_by_sentence(
+    text: str,
+    start: float,
+    end: float,
+    max_chars: int = 40,
+) -> List[tuple]:
+    """
+    テキストを文単位で max_chars 以内にまとめ、時間を文字数で按分する
+
+    Args:
+        text: 分割するテキスト（前後の空白は除去済み）
+        start: 開始時刻（秒）
+        end: 終了時刻（秒）
+        max_chars: 最大文字数（1文がこれを超える場合はその文だけで1件）
+
+    Returns:
+        [(開始, 終了, テキスト), ...]
+    """
+    sentences = re.split(r'([。！？\.!?])', text)
+    sentences = [s for s in sentences if s]
+
+    pieces = []
+    current_text = ""
+    current_start = start
+    time_per_char = (end - start) / len(text) if text else 0
+
+    for sentence in sentences:
+        if not current_text:
+            current_text = sentence
+        elif len(current_text) + len(sentence) <= max_chars:
+            current_text += sentence
+        else:
+            current_end = current_start + (len(current_text) * time_per_char)
+            pieces.append((current_start, min(current_end, end), current_text))
+            current_text = sentence
+            current_start = current_end
+
+    if current_text:
+        pieces.append((current_start, end, current_text))
+
+    return pieces
+
+
 def split_long_segments(
     segments: List[Dict],
     max_chars: int = 40,
@@ -212,34 +344,11 @@ def split_long_segments(
             continue
 
         # 文で分割
-        sentences = re.split(r'([。！？\.!?])', text)
-        sentences = [s for s in sentences if s]
-
-        current_text = ""
-        current_start = start
-        time_per_char = duration / len(text) if text else 0
-
-        for sentence in sentences:
-            if not current_text:
-                current_text = sentence
-            elif len(current_text) + len(sentence) <= max_chars:
-                current_text += sentence
-            else:
-                current_end = current_start + (len(current_text) * time_per_char)
-                result.append({
-                    "start": current_start,
-                    "end": min(current_end, end),
-                    "text": current_text,
-                    "speaker": segment.get("speaker"),
-                })
-                current_text = sentence
-                current_start = current_end
-
-        if current_text:
+        for piece_start, piece_end, piece_text in split_text_by_sentence(text, start, end, max_chars):
             result.append({
-                "start": current_start,
-                "end": end,
-                "text": current_text,
+                "start": piece_start,
+                "end": piece_end,
+                "text": piece_text,
                 "speaker": segment.get("speaker"),
             })
 
@@ -1,18 +1,130 @@
 """
 Excelエクスポートモジュール
 議事録・書き起こしのExcel形式出力
+
+openpyxl の write-only モードで行を逐次書き出す（ワークブック全体をメモリに保持しない）。
+セルの書式は名前付きスタイルとしてワークブックに1度だけ登録し、各セルは名前で参照する。
 """
 
 import logging
+import os
 import threading
+from copy import copy
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 from datetime import datetime
 from time_utils import format_time_hms
 from export.common import ExportOptions, atomic_save
 
 logger = logging.getLogger(__name__)
 
+# 書き起こしシートの列幅（A〜E）
+TRANSCRIPT_COLUMN_WIDTHS = (6, 12, 12, 15, 60)
+
+# 議事録シートの列幅（A〜E）
+MINUTES_COLUMN_WIDTHS = (12, 50, 15, 15, 12)
+
+# 名前付きスタイル定義: 名前 → (フォント, 塗りつぶし色, 配置)
+# すべて細線の枠付き（従来の「値のあるセルに枠線」と同じ見た目）
+_STYLE_SPECS: Dict[str, tuple] = {
+    "kotoba_header": ({"bold": True, "color": "FFFFFF"}, "4472C4", {"horizontal": "center", "vertical": "center"}),
+    "kotoba_cell": (None, None, None),
+    "kotoba_wrap": (None, None, {"wrap_text": True, "vertical": "top"}),
+    "kotoba_title": ({"bold": True, "size": 16}, None, {"horizontal": "center", "vertical": "center"}),
+    "kotoba_label": ({"bold": True}, None, None),
+    "kotoba_label_decision": ({"bold": True}, "E7E6E6", None),
+    "kotoba_label_confirmation": ({"bold": True}, "FFF2CC", None),
+    "kotoba_label_action": ({"bold": True}, "D9EAD3", None),
+    "kotoba_speaker": ({"bold": True, "color": "4472C4"}, None, None),
+}
+
+# 発言種別 → 議事内容の接頭辞
+_STATEMENT_PREFIXES = {
+    "決定事項": "【決定】",
+    "アクションアイテム": "【TODO】",
+    "確認事項": "【確認】",
+}
+
+
+def _register_styles(wb, names: Sequence[str]) -> None:
+    """ワークブックに名前付きスタイルを登録"""
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.styles.fonts import DEFAULT_FONT
+
+    side = Side(style="thin")
+    border = Border(left=side, right=side, top=side, bottom=side)
+    base_font = {"name": DEFAULT_FONT.name, "sz": DEFAULT_FONT.sz,
+                 "family": DEFAULT_FONT.family, "scheme": DEFAULT_FONT.scheme}
+    for name in names:
+        font, fill, alignment = _STYLE_SPECS[name]
+        style = NamedStyle(name=name, border=border)
+        # 既定フォント（Calibri 11pt）を基に上書きする
+        style.font = Font(**{**base_font, **(font or {})})
+        if fill:
+            style.fill = PatternFill(start_color=fill, end_color=fill, fill_type="solid")
+        if alignment:
+            style.alignment = Alignment(**alignment)
+        wb.add_named_style(style)
+
+
+def _set_column_widths(ws, widths: Sequence[float]) -> None:
+    from openpyxl.utils import get_column_letter
+    for index, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+
+def _discard_write_only(wb) -> None:
+    """失敗時に write-only シートのストリームを閉じ、一時ファイルを削除する"""
+    for ws in wb.worksheets:
+        try:
+            ws.close()
+            os.remove(ws._writer.out)
+        except Exception:
+            pass
+
+
+class _RowWriter:
+    """write-only シートへ行を追記するヘルパー（行番号と結合セルを管理）"""
+
+    def __init__(self, ws):
+        from openpyxl.cell import WriteOnlyCell
+        self._ws = ws
+        self._cell_cls = WriteOnlyCell
+        # 名前付きスタイルの解決済みスタイル配列（セルごとの名前検索を避ける）
+        self._style_arrays: Dict[str, Any] = {}
+        self.row = 0
+
+    def cell(self, value: Any, style: Optional[str] = "kotoba_cell", keep_empty: bool = False):
+        """値とスタイル名からセルを生成（keep_empty=False なら空値は枠線なしの空セル）"""
+        if not keep_empty and (value is None or value == ""):
+            return None
+        cell = self._cell_cls(self._ws, value=value)
+        if style:
+            array = self._style_arrays.get(style)
+            if array is None:
+                cell.style = style
+                self._style_arrays[style] = copy(cell._style)
+            else:
+                cell._style = copy(array)
+        return cell
+
+    def append(self, cells: Sequence[Any] = (), merge_to: Optional[str] = None) -> None:
+        """
+        1行を追記
+
+        Args:
+            cells: A列からのセル（None は空セル）
+            merge_to: 指定時は B列からこの列までを結合（例: "E"）
+        """
+        self.row += 1
+        self._ws.append(list(cells))
+        if merge_to:
+            self._ws.merged_cells.add(f"B{self.row}:{merge_to}{self.row}")
+
+    def blank(self, count: int = 1) -> None:
+        for _ in range(count):
+            self.append()
+
 
 class ExcelExporter:
     """Excel形式エクスポーター（.xlsx）"""
@@ -31,7 +143,7 @@ class ExcelExporter:
 
     def export_transcription(
         self,
-        segments: List[Dict],
+        segments: Iterable[Dict],
         output_path: str,
         options: Optional[ExportOptions] = None,
     ) -> bool:
@@ -39,10 +151,31 @@ class ExcelExporter:
         書き起こしをExcel形式でエクスポート
 
         Args:
-            segments: 書き起こしセグメント
+            segments: 書き起こしセグメント（イテレータ可: 逐次書き出すため全件を保持しない）
             output_path: 出力ファイルパス
             options: エクスポートオプション
 
+        Returns:
+            成功したかどうか
+        """
+        def rows() -> Iterator[tuple]:
+            for i, segment in enumerate(segments, 1):
+                yield (i, self._format_time(segment.get("start", 0)),
+                       self._format_time(segment.get("end", 0)),
+                       segment.get("speaker", "Unknown"), segment.get("text", ""))
+
+        return self.export_rows(rows(), output_path)
+
+    def export_rows(self, rows: Iterable[Sequence], output_path: str) -> bool:
+        """
+        整形済みの行（No., 開始時間, 終了時間, 話者, テキスト）を書き起こしシートとして出力
+
+        複数形式の一括エクスポートで、時刻の整形を形式間で共有するためにも使用。
+
+        Args:
+            rows: 行タプルのイテラブル（ジェネレータ可）
+            output_path: 出力ファイルパス
+
         Returns:
             成功したかどうか
         """
@@ -51,62 +184,33 @@ class ExcelExporter:
             return False
 
         import openpyxl
-        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
+        wb = openpyxl.Workbook(write_only=True)
         try:
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "書き起こし"
+            _register_styles(wb, ("kotoba_header", "kotoba_cell", "kotoba_wrap"))
+            ws = wb.create_sheet("書き起こし")
+            # write-only モードでは列幅を行より先に設定する
+            _set_column_widths(ws, TRANSCRIPT_COLUMN_WIDTHS)
+            writer = _RowWriter(ws)
 
             # ヘッダー行
-            headers = ["No.", "開始時間", "終了時間", "話者", "テキスト"]
-            ws.append(headers)
-
-            # ヘッダースタイル
-            header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF")
-            for cell in ws[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-
-            # データ行
-            for i, segment in enumerate(segments, 1):
-                start_time = self._format_time(segment.get("start", 0))
-                end_time = self._format_time(segment.get("end", 0))
-                speaker = segment.get("speaker", "Unknown")
-                text = segment.get("text", "")
-                ws.append([i, start_time, end_time, speaker, text])
-
-            # 列幅調整
-            ws.column_dimensions["A"].width = 6
-            ws.column_dimensions["B"].width = 12
-            ws.column_dimensions["C"].width = 12
-            ws.column_dimensions["D"].width = 15
-            ws.column_dimensions["E"].width = 60
-
-            # 枠線
-            thin_border = Border(
-                left=Side(style="thin"),
-                right=Side(style="thin"),
-                top=Side(style="thin"),
-                bottom=Side(style="thin"),
-            )
-            for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=5):
-                for cell in row:
-                    cell.border = thin_border
-
-            # 自動折り返し
-            for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=5, max_col=5):
-                for cell in row:
-                    cell.alignment = Alignment(wrap_text=True, vertical="top")
+            writer.append([writer.cell(h, "kotoba_header")
+                           for h in ("No.", "開始時間", "終了時間", "話者", "テキスト")])
+
+            # データ行（全セル枠線、テキスト列のみ折り返し）
+            make_cell = writer.cell
+            for no, start, end, speaker, text in rows:
+                writer.append((make_cell(no, keep_empty=True), make_cell(start, keep_empty=True),
+                               make_cell(end, keep_empty=True), make_cell(speaker, keep_empty=True),
+                               make_cell(text, "kotoba_wrap", keep_empty=True)))
 
             with atomic_save(output_path) as tmp_path:
                 wb.save(tmp_path)
-            logger.info(f"Excel transcription exported to {output_path}")
+            logger.info(f"Excel transcription exported to {output_path} ({writer.row - 1} rows)")
             return True
 
         except Exception as e:
+            _discard_write_only(wb)
             logger.error(f"Failed to export Excel transcription: {e}", exc_info=True)
             return False
 
@@ -120,7 +224,7 @@ class ExcelExporter:
         議事録をExcel形式でエクスポート（AGEC社内テンプレート対応）
 
         Args:
-            minutes_data: 議事録データ
+            minutes_data: 議事録データ（statements はイテレータ可）
             output_path: 出力ファイルパス
             options: エクスポートオプション
 
@@ -132,162 +236,79 @@ class ExcelExporter:
             return False
 
         import openpyxl
-        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
+        wb = openpyxl.Workbook(write_only=True)
         try:
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "議事録"
+            _register_styles(wb, ("kotoba_cell", "kotoba_title", "kotoba_label",
+                                  "kotoba_label_decision", "kotoba_label_confirmation",
+                                  "kotoba_label_action", "kotoba_speaker"))
+            ws = wb.create_sheet("議事録")
+            _set_column_widths(ws, MINUTES_COLUMN_WIDTHS)
+            ws.row_dimensions[1].height = 30
+            w = _RowWriter(ws)
+            c = w.cell
 
             options = options or ExportOptions()
             company = options.company_name
 
             # タイトル
-            ws.merge_cells("A1:E1")
-            title_cell = ws["A1"]
-            title_cell.value = f"{company} 議事録"
-            title_cell.font = Font(bold=True, size=16)
-            title_cell.alignment = Alignment(horizontal="center", vertical="center")
-            ws.row_dimensions[1].height = 30
+            w.append([c(f"{company} 議事録", "kotoba_title")])
+            ws.merged_cells.add("A1:E1")
+            w.blank()
 
             # 基本情報
-            row = 3
-            ws[f"A{row}"] = "会議名"
-            ws[f"B{row}"] = minutes_data.get("title", "")
-            ws.merge_cells(f"B{row}:E{row}")
-            row += 1
-
-            ws[f"A{row}"] = "日時"
-            ws[f"B{row}"] = minutes_data.get("date", "")
-            ws[f"C{row}"] = "場所"
-            ws[f"D{row}"] = minutes_data.get("location", "")
-            ws.merge_cells(f"D{row}:E{row}")
-            row += 1
+            w.append([c("会議名"), c(minutes_data.get("title", ""))], merge_to="E")
+            w.append([c("日時"), c(minutes_data.get("date", "")),
+                      c("場所"), c(minutes_data.get("location", ""))])
+            ws.merged_cells.add(f"D{w.row}:E{w.row}")
 
             # 出席者
-            ws[f"A{row}"] = "出席者"
             attendees = minutes_data.get("attendees", [])
-            ws[f"B{row}"] = ", ".join(attendees) if attendees else ""
-            ws.merge_cells(f"B{row}:E{row}")
-            row += 2
+            w.append([c("出席者"), c(", ".join(attendees) if attendees else "")], merge_to="E")
+            w.blank()
 
             # 議題
             if minutes_data.get("agenda"):
-                ws[f"A{row}"] = "議題"
-                ws[f"A{row}"].font = Font(bold=True)
-                row += 1
+                w.append([c("議題", "kotoba_label")])
                 for agenda_item in minutes_data["agenda"]:
-                    ws[f"B{row}"] = f"• {agenda_item}"
-                    ws.merge_cells(f"B{row}:E{row}")
-                    row += 1
-                row += 1
-
-            # 決定事項
-            if minutes_data.get("decisions"):
-                ws[f"A{row}"] = "決定事項"
-                ws[f"A{row}"].font = Font(bold=True)
-                ws[f"A{row}"].fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
-                row += 1
-                for i, decision in enumerate(minutes_data["decisions"], 1):
-                    ws[f"A{row}"] = f"{i}."
-                    ws[f"B{row}"] = decision
-                    ws.merge_cells(f"B{row}:E{row}")
-                    row += 1
-                row += 1
-
-            # 確認事項
-            if minutes_data.get("confirmations"):
-                ws[f"A{row}"] = "確認事項"
-                ws[f"A{row}"].font = Font(bold=True)
-                ws[f"A{row}"].fill = PatternFill(start_color="FFF2CC", end_color="FFF2CC", fill_type="solid")
-                row += 1
-                for i, confirmation in enumerate(minutes_data["confirmations"], 1):
-                    ws[f"A{row}"] = f"{i}."
-                    ws[f"B{row}"] = confirmation
-                    ws.merge_cells(f"B{row}:E{row}")
-                    row += 1
-                row += 1
+                    w.append([None, c(f"• {agenda_item}")], merge_to="E")
+                w.blank()
+
+            # 決定事項・確認事項
+            for key, label, style in (("decisions", "決定事項", "kotoba_label_decision"),
+                                      ("confirmations", "確認事項", "kotoba_label_confirmation")):
+                if minutes_data.get(key):
+                    w.append([c(label, style)])
+                    for i, item in enumerate(minutes_data[key], 1):
+                        w.append([c(f"{i}."), c(item)], merge_to="E")
+                    w.blank()
 
             # アクションアイテム
             if minutes_data.get("action_items"):
-                ws[f"A{row}"] = "アクションアイテム"
-                ws[f"A{row}"].font = Font(bold=True)
-                ws[f"A{row}"].fill = PatternFill(start_color="D9EAD3", end_color="D9EAD3", fill_type="solid")
-                ws[f"B{row}"] = "内容"
-                ws[f"C{row}"] = "担当"
-                ws[f"D{row}"] = "期限"
-                ws[f"E{row}"] = "優先度"
-                for cell in ws[row]:
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="D9EAD3", end_color="D9EAD3", fill_type="solid")
-                row += 1
-
+                w.append([c(h, "kotoba_label_action")
+                          for h in ("アクションアイテム", "内容", "担当", "期限", "優先度")])
                 for item in minutes_data["action_items"]:
-                    ws[f"A{row}"] = "☐"
-                    ws[f"B{row}"] = item.get("description", "")
-                    ws[f"C{row}"] = item.get("assignee", "")
-                    ws[f"D{row}"] = item.get("due_date", "")
-                    ws[f"E{row}"] = item.get("priority", "中")
-                    row += 1
-                row += 1
-
-            # 議事内容
-            if minutes_data.get("statements"):
-                ws[f"A{row}"] = "議事内容"
-                ws[f"A{row}"].font = Font(bold=True)
-                row += 1
+                    w.append([c("☐"), c(item.get("description", "")), c(item.get("assignee", "")),
+                              c(item.get("due_date", "")), c(item.get("priority", "中"))])
+                w.blank()
 
+            # 議事内容（発言は逐次書き出す）
+            if minutes_data.get("statements"):
+                w.append([c("議事内容", "kotoba_label")])
                 current_speaker = None
                 for stmt in minutes_data["statements"]:
                     speaker = stmt.get("speaker", "Unknown")
-                    text = stmt.get("text", "")
-                    stmt_type = stmt.get("statement_type", "")
-
+                    speaker_cell = None
                     if speaker != current_speaker:
-                        ws[f"A{row}"] = speaker
-                        ws[f"A{row}"].font = Font(bold=True, color="4472C4")
+                        speaker_cell = c(speaker, "kotoba_speaker")
                         current_speaker = speaker
-                    else:
-                        ws[f"A{row}"] = ""
-
-                    prefix = ""
-                    if stmt_type == "決定事項":
-                        prefix = "【決定】"
-                    elif stmt_type == "アクションアイテム":
-                        prefix = "【TODO】"
-                    elif stmt_type == "確認事項":
-                        prefix = "【確認】"
-
-                    ws[f"B{row}"] = f"{prefix}{text}"
-                    ws.merge_cells(f"B{row}:E{row}")
-                    row += 1
+                    prefix = _STATEMENT_PREFIXES.get(stmt.get("statement_type", ""), "")
+                    w.append([speaker_cell, c(f"{prefix}{stmt.get('text', '')}")], merge_to="E")
 
             # 次回会議
             if minutes_data.get("next_meeting"):
-                row += 1
-                ws[f"A{row}"] = "次回会議"
-                ws[f"A{row}"].font = Font(bold=True)
-                ws[f"B{row}"] = minutes_data["next_meeting"]
-                ws.merge_cells(f"B{row}:E{row}")
-
-            # 列幅調整
-            ws.column_dimensions["A"].width = 12
-            ws.column_dimensions["B"].width = 50
-            ws.column_dimensions["C"].width = 15
-            ws.column_dimensions["D"].width = 15
-            ws.column_dimensions["E"].width = 12
-
-            # 枠線
-            thin_border = Border(
-                left=Side(style="thin"),
-                right=Side(style="thin"),
-                top=Side(style="thin"),
-                bottom=Side(style="thin"),
-            )
-            for row_cells in ws.iter_rows():
-                for cell in row_cells:
-                    if cell.value:
-                        cell.border = thin_border
+                w.blank()
+                w.append([c("次回会議", "kotoba_label"), c(minutes_data["next_meeting"])], merge_to="E")
 
             with atomic_save(output_path) as tmp_path:
                 wb.save(tmp_path)
@@ -295,6 +316,7 @@ class ExcelExporter:
             return True
 
         except Exception as e:
+            _discard_write_only(wb)
             logger.error(f"Failed to export Excel meeting minutes: {e}", exc_info=True)
             return False
 
@@ -0,0 +1,442 @@
+"""
+書き起こしアーカイブ（.ktb）
+
+長い会議の書き起こしを再読み込み・再エクスポートするための圧縮バイナリ形式。
+セグメントを一定行数ごとのブロックに分けて列単位で格納し、末尾のヘッダーに
+ブロックごとの時間範囲（索引）を持つため、時間範囲を指定した読み込みでは
+該当ブロックだけを展開する。
+
+ファイル構成（数値はリトルエンディアン）:
+    "KTBA" | version u16 | reserved u16
+    本文テキストブロック（zlib）
+    セグメントブロック × N（zlib）
+    ヘッダー（zlib 圧縮 JSON: メタデータ・エンジン設定・話者表・ブロック索引）
+    トレーラー: ヘッダー位置 u64 | ヘッダー長 u32 | "KTBA"
+
+セグメントブロック（展開後）:
+    rows u32 | flags u32（bit0: 単語タイミングあり）
+    start f64[rows] | end f64[rows] | speaker_id i32[rows] | confidence f32[rows]
+    テキスト（文字数 u32[rows] | バイト長 u32 | UTF-8）
+    単語タイミングありの場合: 単語数 u32[rows] | start f64[W] | end f64[W]
+    | probability f32[W] | 単語（文字数 u32[W] | バイト長 u32 | UTF-8）
+"""
+
+import json
+import logging
+import struct
+import time
+import zlib
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import tracing
+from exceptions import ExportError
+from export.common import atomic_save, validate_export_path, validate_segments
+from segment_table import SegmentTable
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'ARCHIVE_EXTENSION', 'ARCHIVE_VERSION', 'ArchiveFormatError', 'TranscriptArchive',
+    'write_archive', 'read_archive',
+]
+
+ARCHIVE_EXTENSION = ".ktb"
+ARCHIVE_VERSION = 1
+
+_MAGIC = b"KTBA"
+_PREAMBLE = struct.Struct("<4sHH")
+_TRAILER = struct.Struct("<QI4s")
+_BLOCK_HEADER = struct.Struct("<II")
+_U32 = struct.Struct("<I")
+_FLAG_WORDS = 0x1
+
+# 1ブロックあたりの既定行数（時間範囲読み込みの粒度）
+DEFAULT_BLOCK_ROWS = 512
+
+# zlib 圧縮レベル（速度と圧縮率の中間）
+COMPRESSION_LEVEL = 6
+
+
+class ArchiveFormatError(ExportError):
+    """アーカイブの形式が不正、または未対応のバージョン"""
+    pass
+
+
+# --- ブロックの符号化 ---
+
+def _encode_strings(strings: Sequence[str]) -> bytes:
+    """文字列列を（文字数配列 | バイト長 | UTF-8 連結）に符号化"""
+    lengths = np.fromiter((len(s) for s in strings), dtype="<u4", count=len(strings))
+    blob = "".join(strings).encode("utf-8")
+    return lengths.tobytes() + _U32.pack(len(blob)) + blob
+
+
+def _encode_block(table: SegmentTable, words: Optional[List[Optional[List[Dict]]]]) -> bytes:
+    parts = [
+        _BLOCK_HEADER.pack(len(table), _FLAG_WORDS if words is not None else 0),
+        table.starts.astype("<f8").tobytes(),
+        table.ends.astype("<f8").tobytes(),
+        table.speaker_ids.astype("<i4").tobytes(),
+        table.confidences.astype("<f4").tobytes(),
+        _encode_strings(table.texts),
+    ]
+    if words is not None:
+        flat = [word for segment_words in words if segment_words for word in segment_words]
+        parts.extend([
+            np.asarray([len(w) if w else 0 for w in words], dtype="<u4").tobytes(),
+            np.asarray([w.get("start") or 0 for w in flat], dtype="<f8").tobytes(),
+            np.asarray([w.get("end") or 0 for w in flat], dtype="<f8").tobytes(),
+            np.asarray([np.nan if w.get("probability") is None else w["probability"] for w in flat],
+                       dtype="<f4").tobytes(),
+            _encode_strings([str(w.get("word", "")) for w in flat]),
+        ])
+    return zlib.compress(b"".join(parts), COMPRESSION_LEVEL)
+
+
+class _BlockReader:
+    """展開済みブロックの先頭から順に列を読み出す（配列はバッファのビュー）"""
+
+    def __init__(self, buffer: bytes):
+        self._buffer = buffer
+        self._offset = 0
+
+    def _advance(self, size: int) -> int:
+        offset = self._offset
+        if offset + size > len(self._buffer):
+            raise ArchiveFormatError("Archive block is truncated")
+        self._offset += size
+        return offset
+
+    def array(self, dtype: str, count: int) -> np.ndarray:
+        offset = self._advance(np.dtype(dtype).itemsize * count)
+        return np.frombuffer(self._buffer, dtype=dtype, count=count, offset=offset)
+
+    def u32(self) -> int:
+        return _U32.unpack_from(self._buffer, self._advance(_U32.size))[0]
+
+    def strings(self, count: int) -> List[str]:
+        lengths = self.array("<u4", count)
+        size = self.u32()
+        offset = self._advance(size)
+        # 連結文字列を1回だけデコードして文字数で切り出す
+        joined = self._buffer[offset:offset + size].decode("utf-8")
+        ends = np.cumsum(lengths, dtype=np.int64).tolist()
+        return [joined[a:b] for a, b in zip([0] + ends[:-1], ends)]
+
+
+def _decode_block(data: bytes, speaker_names: List[Any]) -> Tuple[SegmentTable, Optional[List[List[Dict]]]]:
+    try:
+        buffer = zlib.decompress(data)
+        reader = _BlockReader(buffer)
+        rows, flags = reader.u32(), reader.u32()
+        starts = reader.array("<f8", rows)
+        ends = reader.array("<f8", rows)
+        speaker_ids = reader.array("<i4", rows)
+        confidences = reader.array("<f4", rows)
+        texts = reader.strings(rows)
+        table = SegmentTable(starts, ends, np.arange(rows), texts,
+                             speaker_ids, speaker_names, confidences)
+
+        words = None
+        if flags & _FLAG_WORDS:
+            counts = reader.array("<u4", rows).tolist()
+            total = sum(counts)
+            word_starts = reader.array("<f8", total).tolist()
+            word_ends = reader.array("<f8", total).tolist()
+            probabilities = reader.array("<f4", total).tolist()
+            word_texts = reader.strings(total)
+            words = []
+            position = 0
+            for count in counts:
+                segment_words = []
+                for k in range(position, position + count):
+                    word = {"word": word_texts[k], "start": word_starts[k], "end": word_ends[k]}
+                    if probabilities[k] == probabilities[k]:  # NaN は確率なし
+                        word["probability"] = probabilities[k]
+                    segment_words.append(word)
+                words.append(segment_words)
+                position += count
+        return table, words
+    except (zlib.error, struct.error, UnicodeDecodeError, ValueError) as e:
+        raise ArchiveFormatError(f"Archive block is corrupted: {e}") from e
+
+
+# --- 書き込み ---
+
+def write_archive(
+    output_path: str,
+    text: str,
+    segments: List[Dict[str, Any]],
+    metadata: Optional[Dict[str, Any]] = None,
+    engine_config: Optional[Dict[str, Any]] = None,
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+) -> int:
+    """
+    書き起こしをアーカイブとして書き出す（アトミック）
+
+    Args:
+        output_path: 出力ファイルパス（.ktb）
+        text: 整形済みの全文
+        segments: セグメントリスト（"words" があれば単語タイミングも格納）
+        metadata: 任意のメタデータ（元ファイル名・作成日時など、JSON 化可能な値）
+        engine_config: 書き起こし時のエンジン設定（JSON 化可能な値）
+        block_rows: 1ブロックあたりの行数
+
+    Returns:
+        書き出したバイト数
+
+    Raises:
+        ValueError / TypeError: パス・セグメントが不正な場合
+    """
+    validate_export_path(output_path)
+    validate_segments(segments)
+    if block_rows < 1:
+        raise ValueError("block_rows must be >= 1")
+
+    table = SegmentTable.from_dicts(segments)
+    has_words = any(seg.get("words") for seg in segments)
+
+    with tracing.span("archive_write", segments=len(table)):
+        blocks = []
+        body = [_PREAMBLE.pack(_MAGIC, ARCHIVE_VERSION, 0)]
+        offset = _PREAMBLE.size
+
+        text_block = zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+        body.append(text_block)
+        text_entry = [offset, len(text_block)]
+        offset += len(text_block)
+
+        for first in range(0, len(table), block_rows):
+            part = table[first:first + block_rows]
+            words = ([seg.get("words") for seg in segments[first:first + block_rows]]
+                     if has_words else None)
+            data = _encode_block(part, words)
+            body.append(data)
+            blocks.append([offset, len(data), first, len(part),
+                           float(part.starts.min()), float(part.ends.max())])
+            offset += len(data)
+
+        header = {
+            "version": ARCHIVE_VERSION,
+            "created_at": time.time(),
+            "segment_count": len(table),
+            "duration": float(table.ends.max()) if len(table) else 0.0,
+            "speakers": table.speaker_names,
+            "has_words": has_words,
+            "metadata": metadata or {},
+            "engine": engine_config or {},
+            "text": text_entry,
+            "blocks": blocks,
+        }
+        header_data = zlib.compress(
+            json.dumps(header, ensure_ascii=False, default=str).encode("utf-8"), COMPRESSION_LEVEL)
+        body.append(header_data)
+        body.append(_TRAILER.pack(offset, len(header_data), _MAGIC))
+
+        with atomic_save(output_path) as tmp_path:
+            with open(tmp_path, "wb") as f:
+                for chunk in body:
+                    f.write(chunk)
+    size = offset + len(header_data) + _TRAILER.size
+    logger.info(f"Transcript archive written: {output_path} ({len(table)} segments, {size} bytes)")
+    return size
+
+
+# --- 読み込み ---
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_extent(value: Any, size: int) -> bool:
+    """先頭2要素が (offset, length) の非負整数で、長さ size 以上の数値リストか"""
+    return (isinstance(value, list) and len(value) >= size
+            and all(_is_number(v) for v in value)
+            and all(isinstance(v, int) and v >= 0 for v in value[:2]))
+
+
+def _validate_header(header: Any) -> None:
+    """必須キーと型を検証（欠けたヘッダーで KeyError 等にならないよう ArchiveFormatError にする）"""
+    if not isinstance(header, dict):
+        raise ArchiveFormatError("Archive header is not an object")
+    for key in ("version", "segment_count", "duration", "text", "blocks"):
+        if key not in header:
+            raise ArchiveFormatError(f"Archive header is missing '{key}'")
+    if not isinstance(header["version"], int) or not isinstance(header["segment_count"], int):
+        raise ArchiveFormatError("Archive header has invalid counts")
+    if not _is_number(header["duration"]):
+        raise ArchiveFormatError("Archive header has invalid duration")
+    if not _is_extent(header["text"], 2):
+        raise ArchiveFormatError("Archive header has invalid text entry")
+    if not isinstance(header["blocks"], list) or not all(_is_extent(b, 6) for b in header["blocks"]):
+        raise ArchiveFormatError("Archive header has invalid block index")
+    for key, kind in (("speakers", list), ("metadata", dict), ("engine", dict)):
+        if key in header and not isinstance(header[key], kind):
+            raise ArchiveFormatError(f"Archive header has invalid '{key}'")
+
+
+class TranscriptArchive:
+    """
+    アーカイブの読み込み（ヘッダーのみ先に読み、ブロックは必要時に展開）
+
+    Usage:
+        with TranscriptArchive(path) as archive:
+            table = archive.read_table(start=600, end=900)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: BinaryIO = open(path, "rb")
+        try:
+            self._header = self._read_header()
+        except Exception:
+            self._file.close()
+            raise
+        self.speakers: List[Any] = self._header.get("speakers", [])
+        self._block_starts = np.array([b[4] for b in self._header["blocks"]], dtype=np.float64)
+        self._block_ends = np.array([b[5] for b in self._header["blocks"]], dtype=np.float64)
+
+    def _read_header(self) -> Dict[str, Any]:
+        f = self._file
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ArchiveFormatError("Not a transcript archive")
+        magic, version, _ = _PREAMBLE.unpack(preamble)
+        if magic != _MAGIC:
+            raise ArchiveFormatError("Not a transcript archive")
+        if version > ARCHIVE_VERSION:
+            raise ArchiveFormatError(f"Unsupported archive version: {version}")
+
+        f.seek(0, 2)
+        file_size = f.tell()
+        if file_size < _PREAMBLE.size + _TRAILER.size:
+            raise ArchiveFormatError("Archive is truncated")
+        f.seek(file_size - _TRAILER.size)
+        header_offset, header_length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+        if magic != _MAGIC or header_offset + header_length > file_size - _TRAILER.size:
+            raise ArchiveFormatError("Archive trailer is corrupted")
+        try:
+            header = json.loads(zlib.decompress(self._read_at(header_offset, header_length)))
+        except (zlib.error, ValueError) as e:
+            raise ArchiveFormatError(f"Archive header is corrupted: {e}") from e
+        _validate_header(header)
+        return header
+
+    def _read_at(self, offset: int, length: int) -> bytes:
+        self._file.seek(offset)
+        data = self._file.read(length)
+        if len(data) != length:
+            raise ArchiveFormatError("Archive is truncated")
+        return data
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "TranscriptArchive":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self._header["segment_count"])
+
+    @property
+    def version(self) -> int:
+        return int(self._header["version"])
+
+    @property
+    def duration(self) -> float:
+        return float(self._header["duration"])
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self._header.get("metadata", {})
+
+    @property
+    def engine_config(self) -> Dict[str, Any]:
+        return self._header.get("engine", {})
+
+    @property
+    def has_words(self) -> bool:
+        return bool(self._header.get("has_words"))
+
+    def text(self) -> str:
+        """全文"""
+        offset, length = self._header["text"]
+        try:
+            return zlib.decompress(self._read_at(offset, length)).decode("utf-8")
+        except (zlib.error, UnicodeDecodeError) as e:
+            raise ArchiveFormatError(f"Archive text is corrupted: {e}") from e
+
+    def _blocks_for(self, start: Optional[float], end: Optional[float]) -> List[int]:
+        """時間範囲 [start, end) と重なり得るブロック（索引のみで判定）"""
+        mask = np.ones(len(self._block_starts), dtype=bool)
+        if start is not None:
+            mask &= self._block_ends > start
+        if end is not None:
+            mask &= self._block_starts < end
+        return np.flatnonzero(mask).tolist()
+
+    def _read_blocks(self, start: Optional[float], end: Optional[float]):
+        block_indices = self._blocks_for(start, end)
+        with tracing.span("archive_read", blocks=len(block_indices)):
+            for i in block_indices:
+                offset, length = self._header["blocks"][i][:2]
+                table, words = _decode_block(self._read_at(offset, length), self.speakers)
+                if start is not None or end is not None:
+                    mask = np.ones(len(table), dtype=bool)
+                    if start is not None:
+                        mask &= table.ends > start
+                    if end is not None:
+                        mask &= table.starts < end
+                    if not mask.all():
+                        rows = np.flatnonzero(mask)
+                        table = table[rows]
+                        words = [words[r] for r in rows.tolist()] if words is not None else None
+                yield table, words
+
+    def read_table(self, start: Optional[float] = None, end: Optional[float] = None) -> SegmentTable:
+        """
+        時間範囲 [start, end) と重なるセグメントをテーブルとして読み込む（省略時は全件）
+
+        索引で該当ブロックだけを展開する。単語タイミングは含まない。
+        """
+        tables = [table for table, _ in self._read_blocks(start, end)]
+        if not tables:
+            return SegmentTable([], [], [], [], speaker_names=self.speakers)
+        if len(tables) == 1:
+            return tables[0]
+        texts = [text for table in tables for text in table.texts]
+        return SegmentTable(
+            np.concatenate([t.starts for t in tables]), np.concatenate([t.ends for t in tables]),
+            np.arange(len(texts)), texts,
+            np.concatenate([t.speaker_ids for t in tables]), self.speakers,
+            np.concatenate([t.confidences for t in tables]),
+        )
+
+    def read_segments(self, start: Optional[float] = None,
+                      end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """時間範囲 [start, end) と重なるセグメントを辞書のリストで読み込む（単語タイミング付き）"""
+        segments: List[Dict[str, Any]] = []
+        for table, words in self._read_blocks(start, end):
+            rows = table.to_dicts()
+            if words is not None:
+                for row, segment_words in zip(rows, words):
+                    if segment_words:
+                        row["words"] = segment_words
+            segments.extend(rows)
+        return segments
+
+
+def read_archive(path: str) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    アーカイブ全体を読み込む
+
+    Returns:
+        (全文, セグメントリスト, メタデータ)
+    """
+    with TranscriptArchive(path) as archive:
+        return archive.text(), archive.read_segments(), archive.metadata
@@ -43,6 +43,30 @@ class WordExporter:
             output_path: 出力ファイルパス
             options: エクスポートオプション
 
+        Returns:
+            成功したかどうか
+        """
+        try:
+            entries = [
+                (segment.get("speaker", "Unknown"), self._format_time(segment.get("start", 0)),
+                 segment.get("text", ""))
+                for segment in segments
+            ]
+        except Exception as e:
+            logger.error(f"Failed to export Word transcription: {e}", exc_info=True)
+            return False
+        return self.export_entries(entries, output_path)
+
+    def export_entries(self, entries: List[tuple], output_path: str) -> bool:
+        """
+        整形済みのエントリ（話者, 開始時刻文字列, テキスト）を書き起こし文書として出力
+
+        複数形式の一括エクスポートで、時刻の整形を形式間で共有するために使用。
+
+        Args:
+            entries: エントリタプルのリスト
+            output_path: 出力ファイルパス
+
         Returns:
             成功したかどうか
         """
@@ -70,11 +94,7 @@ class WordExporter:
 
             # 内容
             current_speaker = None
-            for segment in segments:
-                speaker = segment.get("speaker", "Unknown")
-                text = segment.get("text", "")
-                start = segment.get("start", 0)
-
+            for speaker, time_str, text in entries:
                 if speaker != current_speaker:
                     speaker_para = doc.add_paragraph()
                     speaker_run = speaker_para.add_run(f"【{speaker}】")
@@ -83,7 +103,6 @@ class WordExporter:
                     speaker_run.font.color.rgb = RGBColor(0x44, 0x72, 0xC4)
                     current_speaker = speaker
 
-                time_str = self._format_time(start)
                 text_para = doc.add_paragraph(style="List Bullet")
                 text_para.add_run(f"[{time_str}] ").bold = True
                 text_para.add_run(text)
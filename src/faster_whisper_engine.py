@@ -9,6 +9,7 @@ import numpy.typing as npt
 from typing import Optional, Dict, List, Any, Literal
 import time
 
+import metrics
 from base_engine import BaseTranscriptionEngine
 from exceptions import (
     ModelLoadError,
@@ -97,6 +98,7 @@ class FasterWhisperEngine(BaseTranscriptionEngine):
 
             load_time = time.time() - start_time
             self.is_loaded = True
+            metrics.MODEL_LOAD_SECONDS.labels("faster_whisper").observe(load_time)
 
             logger.info(f"Model loaded successfully in {load_time:.2f}s")
             return True
@@ -194,6 +196,8 @@ class FasterWhisperEngine(BaseTranscriptionEngine):
                 "realtime_factor": processing_time / audio_duration if audio_duration > 0 else 0
             }
 
+            metrics.record_transcription("faster_whisper", processing_time, audio_duration)
+
             logger.info(f"Transcription completed: {audio_duration:.2f}s audio in {processing_time:.2f}s "
                        f"(RTF: {result['realtime_factor']:.2f}x)")
 
@@ -201,18 +205,23 @@ class FasterWhisperEngine(BaseTranscriptionEngine):
 
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
+            metrics.TRANSCRIPTION_ERRORS.labels("faster_whisper").inc()
             audio_duration = len(audio) / sample_rate if sample_rate > 0 else 0.0
             raise TranscriptionFailedError(str(e), audio_duration)
 
     def transcribe_stream(self,
                          audio_chunk: npt.NDArray[np.float32],
-                         sample_rate: int = 16000) -> Optional[str]:
+                         sample_rate: int = 16000,
+                         beam_size: int = 1,
+                         best_of: int = 1) -> Optional[str]:
         """
         音声チャンクを文字起こし（ストリーミング用・簡易版）
 
         Args:
             audio_chunk: 音声データ
             sample_rate: サンプリングレート
+            beam_size: ビームサーチのサイズ（既定は高速化のため1、負荷に応じて呼び出し側が調整）
+            best_of: 候補数
 
         Returns:
             文字起こし結果のテキスト（Noneの場合はエラー）
@@ -220,7 +229,8 @@ class FasterWhisperEngine(BaseTranscriptionEngine):
         result = self.transcribe(
             audio_chunk,
             sample_rate=sample_rate,
-            beam_size=1,  # 高速化のためビームサイズを小さく
+            beam_size=beam_size,
+            best_of=best_of,
             vad_filter=False  # 外部VADを使用するため無効化
         )
 
@@ -0,0 +1,177 @@
+"""
+ファイル準備判定（ノンブロッキング）
+コピー・録音中のファイルを、サイズと更新時刻が一定時間変化しないことで判定する。
+スキャンやイベントをまたいで状態を保持するため、待機（sleep）は行わない。
+Qt非依存。
+"""
+
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['ReadinessTracker', 'is_file_unlocked']
+
+
+def is_file_unlocked(file_path: str) -> bool:
+    """
+    他プロセスが書き込み中でないか（排他ロックと1バイト読み取りで確認）
+
+    Windows: msvcrt、Unix: fcntl を使用する。
+    """
+    try:
+        with open(file_path, 'r+b') as f:
+            if os.name == 'nt':
+                import msvcrt
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                except IOError:
+                    return False
+            else:
+                import fcntl
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                except IOError:
+                    return False
+            f.read(1)
+        return True
+    except (OSError, IOError):
+        return False
+
+
+@dataclass
+class _Entry:
+    signature: Tuple[int, int]  # (size, mtime_ns)
+    stable_since: float
+    ready: bool = False
+
+
+class ReadinessTracker:
+    """
+    追跡中ファイルの準備状態
+
+    (size, mtime) が stable_seconds 以上変化せず、空でなく、ロックされていない
+    ファイルを準備完了とする。1回の check() で全候補を stat するだけで、待機はしない。
+    準備完了後も追跡を続け、再び変化したら準備中に戻す。
+
+    Usage:
+        tracker = ReadinessTracker(stable_seconds=2.0)
+        ready = tracker.update(candidates)   # スキャンごと
+    """
+
+    def __init__(self, stable_seconds: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 lock_check: Callable[[str], bool] = is_file_unlocked):
+        self.stable_seconds = stable_seconds
+        self._clock = clock
+        self._lock_check = lock_check
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Optional[_Entry]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            return path in self._entries
+
+    @property
+    def pending_count(self) -> int:
+        """まだ準備できていない追跡中ファイル数"""
+        with self._lock:
+            return sum(1 for entry in self._entries.values() if entry is None or not entry.ready)
+
+    def ready_paths(self) -> List[str]:
+        """準備完了として追跡中のパス"""
+        with self._lock:
+            return [path for path, entry in self._entries.items() if entry is not None and entry.ready]
+
+    def add(self, paths: Iterable[str]) -> None:
+        """追跡対象に加える（既に追跡中なら状態を保持）"""
+        with self._lock:
+            for path in paths:
+                self._entries.setdefault(path, None)
+
+    def discard(self, path: str) -> None:
+        """追跡をやめる"""
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def update(self, paths: Iterable[str]) -> List[str]:
+        """
+        追跡対象を paths に置き換えて判定する（フォルダ全体のスキャン結果を渡す用途）
+
+        Returns:
+            準備完了のパス（以前から準備完了のものを含む、paths の順）
+        """
+        paths = list(paths)
+        with self._lock:
+            self._entries = {path: self._entries.get(path) for path in paths}
+        self.check()
+        with self._lock:
+            return [path for path in paths if self._entries.get(path) is not None
+                    and self._entries[path].ready]
+
+    def check(self) -> List[str]:
+        """
+        追跡中の全ファイルを1回ずつ判定する（stat のみ、待機なし）
+
+        初回に見たファイルは、更新時刻からの経過時間を安定時間として数える。
+        消えたファイルは追跡から外す。
+
+        Returns:
+            今回新たに準備完了になったパス
+        """
+        with self._lock:
+            items = list(self._entries.items())
+
+        now = self._clock()
+        wall_now = time.time()
+        newly_ready: List[str] = []
+        updates: Dict[str, Optional[_Entry]] = {}
+        for path, entry in items:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                updates[path] = None
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if entry is None:
+                age = max(0.0, wall_now - stat.st_mtime)
+                entry = _Entry(signature, now - age)
+            elif entry.signature != signature:
+                # 変化あり → 安定時間の計測をやり直す
+                entry = _Entry(signature, now)
+            if not entry.ready and stat.st_size > 0 and now - entry.stable_since >= self.stable_seconds:
+                entry.ready = self._lock_check(path)
+                if entry.ready:
+                    newly_ready.append(path)
+            updates[path] = entry
+
+        with self._lock:
+            for path, entry in updates.items():
+                if path not in self._entries:
+                    continue  # 判定中に discard された
+                if entry is None:
+                    del self._entries[path]
+                else:
+                    self._entries[path] = entry
+        return newly_ready
+
+    def next_check_delay(self) -> Optional[float]:
+        """準備中のファイルが安定時間に達するまでの最短秒数（準備中がなければ None）"""
+        now = self._clock()
+        with self._lock:
+            delays = [
+                max(0.0, self.stable_seconds - (now - entry.stable_since)) if entry else 0.0
+                for entry in self._entries.values()
+                if entry is None or not entry.ready
+            ]
+        return min(delays) if delays else None
@@ -6,12 +6,12 @@
 import os
 import time
 import logging
-import tempfile
 import threading
-from typing import List, Set, Callable
+from typing import List, Callable
 from pathlib import Path
 from PySide6.QtCore import QThread, Signal
 from constants import SharedConstants
+from processed_ledger import ProcessedLedger
 
 logger = logging.getLogger(__name__)
 
@@ -39,53 +39,34 @@ class FolderMonitor(QThread):
         self.check_interval = check_interval
         self._stop_event = threading.Event()
         self._processed_lock = threading.Lock()
-        self.processed_files: Set[str] = set()
+        self._ledger = ProcessedLedger.for_folder(folder_path)
         self.load_processed_files()
 
         logger.info(f"FolderMonitor initialized: {folder_path}, interval: {check_interval}s")
 
+    @property
+    def processed_files(self) -> ProcessedLedger:
+        """処理済みファイル（台帳）"""
+        return self._ledger
+
+    @processed_files.setter
+    def processed_files(self, paths):
+        self._ledger.replace(paths)
+
     def load_processed_files(self):
-        """処理済みファイルリストを読み込み"""
+        """処理済みファイル台帳を読み込み（旧 .processed_files.txt は初回に取り込む）"""
         try:
-            # 監視フォルダ内の.processed_filesファイルから読み込み
-            processed_file_path = os.path.join(self.folder_path, '.processed_files.txt')
-            if os.path.exists(processed_file_path):
-                # ファイルサイズ制限 (50MB)
-                MAX_PROCESSED_SIZE = 50 * 1024 * 1024
-                file_size = os.path.getsize(processed_file_path)
-                if file_size > MAX_PROCESSED_SIZE:
-                    logger.error(f"Processed files list too large: {file_size} bytes, skipping")
-                    self.processed_files = set()
-                    return
-                with open(processed_file_path, 'r', encoding='utf-8') as f:
-                    self.processed_files = set(line.strip() for line in f if line.strip())
-                logger.info(f"Loaded {len(self.processed_files)} processed files")
-        except (IOError, OSError, UnicodeDecodeError) as e:
+            self._ledger.load()
+        except (IOError, OSError, UnicodeDecodeError, ValueError) as e:
             logger.error(f"Failed to load processed files (I/O): {e}")
-            self.processed_files = set()
         except Exception as e:
             logger.error(f"Failed to load processed files: {e}")
-            self.processed_files = set()
 
     def save_processed_files(self):
-        """処理済みファイルリストを保存（アトミック書き込み）"""
+        """処理済みファイル台帳を有効な記録だけで書き直す（アトミック書き込み）"""
         try:
-            with self._processed_lock:
-                files_copy = sorted(self.processed_files)
-            processed_file_path = os.path.join(self.folder_path, '.processed_files.txt')
-            fd, tmp_path = tempfile.mkstemp(dir=self.folder_path, suffix='.tmp')
-            try:
-                with os.fdopen(fd, 'w', encoding='utf-8') as f:
-                    for file_path in files_copy:
-                        f.write(f"{file_path}\n")
-                os.replace(tmp_path, processed_file_path)
-            except BaseException:
-                try:
-                    os.unlink(tmp_path)
-                except OSError:
-                    pass
-                raise
-            logger.debug(f"Saved {len(files_copy)} processed files")
+            self._ledger.compact()
+            logger.debug(f"Saved {len(self._ledger)} processed files")
         except (IOError, OSError) as e:
             logger.error(f"Failed to save processed files (I/O): {e}")
         except Exception as e:
@@ -215,11 +196,13 @@ class FolderMonitor(QThread):
         ファイルを処理済みとしてマーク
         フルパスで記録（ファイル名衝突を防止）
         """
-        # フルパスを記録
+        # フルパスを記録（台帳への1行追記）
         abs_path = os.path.abspath(file_path)
-        with self._processed_lock:
-            self.processed_files.add(abs_path)
-        self.save_processed_files()
+        try:
+            with self._processed_lock:
+                self._ledger.mark(abs_path)
+        except (IOError, OSError) as e:
+            logger.error(f"Failed to record processed file (I/O): {e}")
         logger.info(f"Marked as processed: {abs_path}")
 
     def remove_from_processed(self, file_path: str):
@@ -227,16 +210,15 @@ class FolderMonitor(QThread):
         処理済みリストからファイルを削除（移動時に使用）
         フルパスで削除
         """
-        # フルパスで削除
+        # フルパスで削除（台帳への削除行の追記）
         abs_path = os.path.abspath(file_path)
-        with self._processed_lock:
-            if abs_path in self.processed_files:
-                self.processed_files.remove(abs_path)
-                needs_save = True
-            else:
-                needs_save = False
-        if needs_save:
-            self.save_processed_files()
+        try:
+            with self._processed_lock:
+                removed = self._ledger.remove(abs_path)
+        except (IOError, OSError) as e:
+            logger.error(f"Failed to record processed file removal (I/O): {e}")
+            return
+        if removed:
             logger.info(f"Removed from processed list: {abs_path}")
 
     def run(self):
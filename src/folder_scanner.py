@@ -0,0 +1,135 @@
+"""
+監視フォルダの再帰スキャン
+os.scandir の DirEntry（種別はディレクトリ読み込み時に取得済み）を使い、エントリごとの stat を省く。
+前回から更新時刻が変わっていないディレクトリは読み直さずに前回の一覧を使う。
+
+ディレクトリの更新時刻は直下のエントリの追加・削除・改名でしか変わらないため、
+サブツリー全体は省略できない。下位ディレクトリは1回の stat で個別に確認する
+（変化が少なければ、再スキャンのコストはディレクトリ数回の stat だけになる）。
+Qt非依存。
+"""
+
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['DirectoryScanner']
+
+# 更新時刻の粒度（FAT / SMB 共有は最大2秒）。一覧取得の直前・直後に更新されたディレクトリは
+# 同じ更新時刻のまま内容が変わりうるため、この秒数が経つまでは次回も読み直す
+RACY_SECONDS = 2.0
+
+
+@dataclass(frozen=True)
+class _DirState:
+    mtime_ns: int
+    listed_at: float
+    files: Tuple[str, ...]      # 対象拡張子のファイル名
+    names: FrozenSet[str]       # 全エントリ名（出力ファイルの有無の確認用）
+    subdirs: Tuple[str, ...]
+
+
+class DirectoryScanner:
+    """
+    複数ルートの対象ファイルを列挙する（ディレクトリ一覧をスキャン間でキャッシュ）
+
+    隠しディレクトリ（. で始まる）とシンボリックリンクのディレクトリは辿らない。
+
+    Usage:
+        scanner = DirectoryScanner([root1, root2], {'.wav', '.mp3'}, recursive=True)
+        files = scanner.scan()
+    """
+
+    def __init__(self, roots: Iterable[str], extensions: Iterable[str], recursive: bool = True,
+                 clock: Callable[[], float] = time.time):
+        self.roots = list(dict.fromkeys(roots))
+        self.extensions = frozenset(ext.lower() for ext in extensions)
+        self.recursive = recursive
+        self._clock = clock
+        self._dirs: Dict[str, _DirState] = {}
+        # 直近のスキャンで確認したディレクトリ数・読み直したディレクトリ数・ファイル数
+        self.last_stats: Dict[str, int] = {"directories": 0, "listed": 0, "files": 0}
+
+    def scan(self) -> List[str]:
+        """全ルートを走査して対象ファイルのパスを返す（存在しなくなったディレクトリはキャッシュから外す）"""
+        visited: Dict[str, _DirState] = {}
+        files = self._walk(self.roots, visited)
+        self._dirs = visited
+        return files
+
+    def scan_tree(self, directory: str) -> List[str]:
+        """1つのディレクトリ以下だけを走査する（イベントで新しいディレクトリが現れたとき用）"""
+        visited: Dict[str, _DirState] = {}
+        files = self._walk([directory], visited)
+        self._dirs.update(visited)
+        return files
+
+    def has_entry(self, directory: str, name: str) -> bool:
+        """directory に name のエントリがあるか（前回の一覧を使い、未取得なら stat する）"""
+        state = self._dirs.get(directory)
+        if state is None:
+            return os.path.exists(os.path.join(directory, name))
+        return name in state.names
+
+    def invalidate(self, directory: Optional[str] = None) -> None:
+        """キャッシュを破棄（None で全体）"""
+        if directory is None:
+            self._dirs.clear()
+        else:
+            self._dirs.pop(directory, None)
+
+    # --- 内部 ---
+
+    def _walk(self, tops: List[str], visited: Dict[str, _DirState]) -> List[str]:
+        files: Dict[str, None] = {}
+        listed = 0
+        stack = list(reversed(tops))
+        while stack:
+            directory = stack.pop()
+            if directory in visited:
+                continue
+            try:
+                stat = os.stat(directory)
+            except OSError:
+                continue
+            state = self._dirs.get(directory)
+            if (state is None or state.mtime_ns != stat.st_mtime_ns
+                    or stat.st_mtime >= state.listed_at - RACY_SECONDS):
+                state = self._list(directory, stat.st_mtime_ns)
+                if state is None:
+                    continue
+                listed += 1
+            visited[directory] = state
+            for name in state.files:
+                files[os.path.join(directory, name)] = None
+            stack.extend(os.path.join(directory, name) for name in reversed(state.subdirs))
+
+        self.last_stats = {"directories": len(visited), "listed": listed, "files": len(files)}
+        return list(files)
+
+    def _list(self, directory: str, mtime_ns: int) -> Optional[_DirState]:
+        # 一覧取得中の変更を見逃さないよう、時刻は読み込み前に取る
+        listed_at = self._clock()
+        files, names, subdirs = [], set(), []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    names.add(entry.name)
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive and not entry.name.startswith('.'):
+                                subdirs.append(entry.name)
+                        elif (os.path.splitext(entry.name)[1].lower() in self.extensions
+                              and entry.is_file()):
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Cannot list directory {directory}: {e}")
+            return None
+        return _DirState(mtime_ns, listed_at, tuple(sorted(files)), frozenset(names),
+                         tuple(sorted(subdirs)))
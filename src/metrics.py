@@ -0,0 +1,399 @@
+"""
+メトリクスレジストリ - Prometheus テキスト形式で出力可能な軽量メトリクス
+
+カウンタ・ヒストグラムの更新はスレッドごとのセルへ書き込むだけでロックを取らない
+（集計時のみ全セルを合算）。ヒストグラムは固定バケットで、観測は二分探索1回。
+外部ライブラリ（prometheus_client）には依存しない。
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# オプション: プロセスRSS取得
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+__all__ = [
+    'Counter', 'Gauge', 'Histogram', 'MetricsRegistry', 'get_metrics_registry',
+    'record_transcription', 'record_cache',
+    'DURATION_BUCKETS', 'RTF_BUCKETS', 'PROMETHEUS_CONTENT_TYPE',
+]
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 処理時間（秒）: 1ms 〜 30分
+DURATION_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0, 120.0, 300.0, 600.0, 1800.0,
+)
+
+# リアルタイム係数（処理時間 / 音声長）
+RTF_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape_label(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _ThreadCells:
+    """
+    スレッドごとの値セル。
+
+    各スレッドは自分専用のリストにのみ書き込むため更新時のロックは不要。
+    セルの登録（スレッドごとに初回1回）と集計時のみロックを取る。
+    終了したスレッドのセルは集計時に retired へ合算して破棄する
+    （スレッドを使い捨てるワーカーでもセルが増え続けない）。
+    """
+
+    __slots__ = ("_local", "_cells", "_retired", "_lock", "_size")
+
+    def __init__(self, size: int):
+        self._local = threading.local()
+        self._cells: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+        self._size = size
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0.0] * self._size
+            with self._lock:
+                self._cells.append((threading.current_thread(), cell))
+            self._local.cell = cell
+            return cell
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            live = []
+            for thread, cell in self._cells:
+                if thread.is_alive():
+                    live.append((thread, cell))
+                else:
+                    # 終了済みスレッドはもう書き込まない
+                    for i, value in enumerate(cell):
+                        self._retired[i] += value
+            self._cells = live
+            totals = list(self._retired)
+        for _, cell in live:
+            for i, value in enumerate(cell):
+                totals[i] += value
+        return totals
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cells)
+
+
+class _Metric:
+    """ラベル付きメトリクスの基底（子はラベル値ごとに1つ）"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._children_lock = threading.Lock()
+
+    def labels(self, *values: str, **kwargs: str):
+        """ラベル値を指定した子メトリクスを取得（初回のみロック）"""
+        if kwargs:
+            values = tuple(str(kwargs[n]) for n in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            with self._children_lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[Tuple[Tuple[str, ...], "_Metric"]]:
+        if not self.labelnames:
+            yield (), self
+            return
+        with self._children_lock:
+            children = list(self._children.items())
+        yield from children
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in self._samples():
+            lines.extend(child._render_child(self.name, self.labelnames, values))
+        return lines
+
+    def _render_child(self, name: str, labelnames, values) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """単調増加カウンタ（inc はロックフリー）"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._cells = _ThreadCells(1)
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        self._cells.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+    def _render_child(self, name, labelnames, values) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """現在値ゲージ（set は単一代入。callback 指定時は集計時に評価）"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+        self._callback = callback
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def set_callback(self, callback: Optional[Callable[[], float]]) -> None:
+        self._callback = callback
+
+    @property
+    def value(self) -> float:
+        if self._callback is not None:
+            try:
+                return float(self._callback())
+            except Exception as e:
+                logger.debug(f"Gauge callback failed for {self.name}: {e}")
+                return float("nan")
+        return self._value
+
+    def _render_child(self, name, labelnames, values) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Histogram(_Metric):
+    """固定バケットのヒストグラム（observe はロックフリー）"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # セル: [バケット別件数..., +Inf 件数, 合計, 件数]
+        self._cells = _ThreadCells(len(self.buckets) + 3)
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self):
+        """with ブロックの経過時間を観測"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return int(self._cells.totals()[-1])
+
+    @property
+    def sum(self) -> float:
+        return self._cells.totals()[-2]
+
+    def _render_child(self, name, labelnames, values) -> List[str]:
+        totals = self._cells.totals()
+        lines = []
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), totals):
+            cumulative += count
+            labels = _format_labels(labelnames, values, ("le", _format_value(bound)))
+            lines.append(f"{name}_bucket{labels} {_format_value(cumulative)}")
+        base = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{base} {_format_value(totals[-2])}")
+        lines.append(f"{name}_count{base} {_format_value(totals[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録と Prometheus テキスト形式への出力"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered as {existing.type_name}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        gauge = self._register(Gauge(name, documentation, labelnames))
+        if callback is not None:
+            gauge.set_callback(callback)
+        return gauge
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        """全メトリクスを Prometheus テキスト形式（0.0.4）で出力"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes() -> float:
+    """プロセスの常駐メモリ（RSS）バイト数"""
+    if PSUTIL_AVAILABLE:
+        return float(psutil.Process().memory_info().rss)
+    try:
+        with open("/proc/self/statm") as f:
+            return float(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError, IndexError):
+        return float("nan")
+
+
+# グローバルシングルトン
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """MetricsRegistry シングルトンを取得"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+# --- 標準メトリクス（各コンポーネントが記録） ---
+
+_default = get_metrics_registry()
+
+TRANSCRIPTION_SECONDS = _default.histogram(
+    "kotoba_transcription_seconds", "Wall time of one transcription call", ["engine"])
+TRANSCRIPTION_RTF = _default.histogram(
+    "kotoba_transcription_realtime_factor", "Processing time divided by audio duration",
+    ["engine"], buckets=RTF_BUCKETS)
+AUDIO_SECONDS = _default.counter(
+    "kotoba_audio_seconds_total", "Audio seconds transcribed", ["engine"])
+TRANSCRIPTION_ERRORS = _default.counter(
+    "kotoba_transcription_errors_total", "Failed transcription calls", ["engine"])
+MODEL_LOAD_SECONDS = _default.histogram(
+    "kotoba_model_load_seconds", "Model load time", ["engine"])
+DIARIZATION_SECONDS = _default.histogram(
+    "kotoba_diarization_seconds", "Speaker diarization time")
+TEXT_FORMAT_SECONDS = _default.histogram(
+    "kotoba_text_format_seconds", "TextFormatter.format_all time")
+CACHE_REQUESTS = _default.counter(
+    "kotoba_cache_requests_total", "Cache lookups", ["cache", "result"])
+EXPORT_SECONDS = _default.histogram(
+    "kotoba_export_seconds", "Export time per format", ["format"])
+EXPORT_ERRORS = _default.counter(
+    "kotoba_export_errors_total", "Failed exports", ["format"])
+EVENTS_EMITTED = _default.counter(
+    "kotoba_events_emitted_total", "Events emitted on the EventBus")
+EVENTS_DROPPED = _default.counter(
+    "kotoba_events_dropped_total", "Events dropped for full subscriber queues")
+EVENTS_COALESCED = _default.counter(
+    "kotoba_events_coalesced_total", "Events merged into a pending event")
+FOLDER_SCAN_SECONDS = _default.histogram(
+    "kotoba_folder_scan_seconds", "Folder monitor scan time")
+FOLDER_FILES_DETECTED = _default.counter(
+    "kotoba_folder_files_detected_total", "Unprocessed files found by the folder monitor")
+FOLDER_DETECTION_SECONDS = _default.histogram(
+    "kotoba_folder_detection_seconds", "Time from last file modification to folder monitor detection")
+PROCESS_RSS = _default.gauge(
+    "process_resident_memory_bytes", "Resident memory size in bytes", callback=process_rss_bytes)
+
+
+def record_transcription(engine: str, processing_time: float,
+                         audio_duration: Optional[float] = None) -> None:
+    """文字起こし1回分の処理時間・音声長・リアルタイム係数を記録"""
+    TRANSCRIPTION_SECONDS.labels(engine).observe(processing_time)
+    if audio_duration:
+        AUDIO_SECONDS.labels(engine).inc(audio_duration)
+        TRANSCRIPTION_RTF.labels(engine).observe(processing_time / audio_duration)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """キャッシュのヒット/ミスを記録"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
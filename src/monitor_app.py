@@ -23,6 +23,7 @@ import logging
 
 from text_formatter import TextFormatter
 from folder_monitor import FolderMonitor
+from processed_ledger import ProcessedLedger
 from app_settings import AppSettings
 from workers import (
     BatchTranscriptionWorker,
@@ -829,19 +830,11 @@ class MonitorWindow(QMainWindow):
                 all_files.extend(list(folder_path.glob(f'*{ext}')))
                 all_files.extend(list(folder_path.glob(f'*{ext.upper()}')))
 
-            processed_files_path = folder_path / ".processed_files.txt"
-            processed_files = set()
-            if processed_files_path.exists():
-                try:
-                    MAX_PROCESSED_SIZE = 50 * 1024 * 1024  # 50MB
-                    file_size = processed_files_path.stat().st_size
-                    if file_size > MAX_PROCESSED_SIZE:
-                        logger.error(f"Processed files list too large: {file_size} bytes, skipping")
-                    else:
-                        with open(processed_files_path, 'r', encoding='utf-8') as f:
-                            processed_files = set(line.strip() for line in f if line.strip())
-                except Exception as e:
-                    logger.warning(f"Failed to load processed files list: {e}")
+            processed_files = ProcessedLedger.for_folder(str(folder_path))
+            try:
+                processed_files.load()
+            except Exception as e:
+                logger.warning(f"Failed to load processed files list: {e}")
 
             unprocessed_files = [str(f) for f in all_files if str(f) not in processed_files]
 
@@ -1,17 +1,26 @@
 """
 処理パイプライン最適化モジュール
 KotobaTranscriber v2.2 - パフォーマンス改善
+
+StagedPipeline はステージごとのスレッドを上限付きキューで繋ぎ、デコード・推論・
+後処理を別々のファイルについて同時に進める。
 """
 
 import os
 import gc
 import time
 import logging
+import subprocess
 import threading
-from typing import Optional, Dict, Any, List, Callable
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Callable, Sequence, Tuple, Union
 from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from queue import Queue, Empty
+from queue import Queue, Empty, Full
+
+import numpy as np
+
+from metrics import record_cache
+
 try:
     import psutil
     PSUTIL_AVAILABLE = True
@@ -254,7 +263,9 @@ class OptimizedPipeline:
         if not self.enable_caching:
             return False
         cache_path = self.get_cache_path(file_path, suffix)
-        return os.path.exists(cache_path)
+        hit = os.path.exists(cache_path)
+        record_cache("pipeline_result", hit)
+        return hit
     
     def get_stats(self) -> ProcessingStats:
         """統計情報を取得"""
@@ -279,16 +290,19 @@ class PipelineStage:
     
     def process(self, data: Any) -> Any:
         """データを処理"""
-        if not self._enabled:
-            return data
-        
-        result = self._process_impl(data)
+        result = self.process_one(data)
         
         if self.next_stage:
             return self.next_stage.process(result)
         
         return result
     
+    def process_one(self, data: Any) -> Any:
+        """このステージだけ処理（次のステージへは渡さない）"""
+        if not self._enabled:
+            return data
+        return self._process_impl(data)
+    
     def _process_impl(self, data: Any) -> Any:
         """実装クラスでオーバーライド"""
         raise NotImplementedError
@@ -302,6 +316,109 @@ class PipelineStage:
         self._enabled = False
 
 
+class CallableStage(PipelineStage):
+    """関数をそのままステージにする"""
+    
+    def __init__(self, name: str, func: Callable[[Any], Any]):
+        super().__init__(name)
+        self.func = func
+    
+    def _process_impl(self, data: Any) -> Any:
+        return self.func(data)
+
+
+def decode_audio(file_path: str, sample_rate: int = 16000, timeout: float = 600.0) -> np.ndarray:
+    """
+    ffmpeg で音声をデコード（float32 モノラル、-1.0〜1.0）
+
+    Raises:
+        FileNotFoundError: ffmpeg が無い場合
+        subprocess.TimeoutExpired: タイムアウトした場合
+        ValueError: デコードに失敗した場合
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", file_path,
+        "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    completed = subprocess.run(cmd, capture_output=True, timeout=timeout, shell=False)
+    if completed.returncode != 0:
+        stderr = completed.stderr.decode("utf-8", errors="replace")
+        logger.debug(f"ffmpeg stderr (exit {completed.returncode}): {stderr[-500:]}")
+        raise ValueError(f"ffmpeg decode failed (exit {completed.returncode})")
+    pcm = completed.stdout[:len(completed.stdout) - len(completed.stdout) % 2]
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class AudioDecodeStage(PipelineStage):
+    """
+    音声デコードステージ（パス、または audio_path を持つ辞書 → "audio" / "sample_rate" を追加）
+
+    ffmpeg が無い・デコードできない場合は音声を付けずに渡し、推論側でファイルから読み込ませる。
+    max_buffered_bytes を指定すると、下流に渡して未解放のデコード済み音声の合計をその値までに
+    抑える（超える分はデコードせず推論側でファイルから読み込ませる）。下流は使用後に release() を呼ぶ。
+    """
+    
+    def __init__(self, sample_rate: int = 16000,
+                 should_decode: Optional[Callable[[str], bool]] = None,
+                 max_buffered_bytes: Optional[int] = None):
+        super().__init__("AudioDecode")
+        self.sample_rate = sample_rate
+        self.should_decode = should_decode
+        self.max_buffered_bytes = max_buffered_bytes
+        self._ffmpeg_available = True
+        self._buffered_bytes = 0
+        self._budget_lock = threading.Lock()
+
+    @property
+    def available_bytes(self) -> Optional[int]:
+        """追加で保持できるデコード済み音声のバイト数（上限なしの場合None）"""
+        if self.max_buffered_bytes is None:
+            return None
+        with self._budget_lock:
+            return max(0, self.max_buffered_bytes - self._buffered_bytes)
+
+    def release(self, item: Dict[str, Any]) -> None:
+        """デコード済み音声を破棄して保持枠を返す（複数回呼んでもよい）"""
+        item.pop("audio", None)
+        nbytes = item.pop("audio_nbytes", 0)
+        if nbytes:
+            with self._budget_lock:
+                self._buffered_bytes -= nbytes
+
+    def _reserve(self, nbytes: int) -> bool:
+        with self._budget_lock:
+            if (self.max_buffered_bytes is not None
+                    and self._buffered_bytes + nbytes > self.max_buffered_bytes):
+                return False
+            self._buffered_bytes += nbytes
+            return True
+    
+    def _process_impl(self, data: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+        item: Dict[str, Any] = {"audio_path": data} if isinstance(data, str) else data
+        path = item["audio_path"]
+        if not self._ffmpeg_available or (self.should_decode and not self.should_decode(path)):
+            return item
+        if self.available_bytes == 0:
+            return item
+        try:
+            audio = decode_audio(path, self.sample_rate)
+            if not self._reserve(audio.nbytes):
+                logger.info(f"Decoded audio budget exhausted, {path} will be decoded by the engine")
+                return item
+            item["audio"] = audio
+            item["audio_nbytes"] = audio.nbytes
+            item["sample_rate"] = self.sample_rate
+        except FileNotFoundError:
+            logger.warning("ffmpeg not found; audio will be decoded by the engine")
+            self._ffmpeg_available = False
+        except (subprocess.TimeoutExpired, ValueError, OSError) as e:
+            logger.warning(f"Pre-decode failed for {path}, falling back to engine decode: {e}")
+        return item
+
+
 class AudioPreprocessingStage(PipelineStage):
     """音声前処理ステージ"""
     
@@ -320,14 +437,30 @@ class AudioPreprocessingStage(PipelineStage):
 class TranscriptionStage(PipelineStage):
     """文字起こしステージ"""
     
-    def __init__(self, engine: Any):
+    def __init__(self, engine: Any, decode_stage: Optional[AudioDecodeStage] = None):
+        """
+        Args:
+            decode_stage: 音声を供給する AudioDecodeStage（推論後に保持枠を返す）
+        """
         super().__init__("Transcription")
         self.engine = engine
-    
-    def _process_impl(self, data: str) -> Dict[str, Any]:
-        """文字起こし実行"""
-        result = self.engine.transcribe(data, return_timestamps=True)
-        return {"audio_path": data, "transcription": result}
+        self.decode_stage = decode_stage
+    
+    def _process_impl(self, data: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """文字起こし実行（AudioDecodeStage の出力ならデコード済み音声を使う）"""
+        if isinstance(data, str):
+            data = {"audio_path": data}
+        audio = data.pop("audio", None)
+        try:
+            if audio is not None:
+                result = self.engine.transcribe_audio(audio, data["sample_rate"], return_timestamps=True)
+            else:
+                result = self.engine.transcribe(data["audio_path"], return_timestamps=True)
+        finally:
+            if self.decode_stage is not None:
+                self.decode_stage.release(data)
+        data["transcription"] = result
+        return data
 
 
 class TextFormattingStage(PipelineStage):
@@ -411,6 +544,176 @@ class ExportStage(PipelineStage):
         return data
 
 
+@dataclass
+class StageUtilization:
+    """StagedPipeline の1ステージの稼働状況"""
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0      # 処理中
+    starved_seconds: float = 0.0   # 前段からの入力待ち
+    blocked_seconds: float = 0.0   # 後段のキューの空き待ち
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "starved_seconds": round(self.starved_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "utilization": round(self.busy_seconds / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        }
+
+
+class _StagedItem:
+    __slots__ = ("source", "data", "error")
+
+    def __init__(self, source: Any):
+        self.source = source
+        self.data = source
+        self.error: Optional[BaseException] = None
+
+
+_END = object()
+
+
+class StagedPipeline:
+    """
+    ステージごとにスレッドを1つ持ち、上限付きキューで繋いだパイプライン
+
+    各ステージ（set_next で繋いだ連鎖はまとめて1ステージ）は入力順に1件ずつ処理し、
+    後段が詰まるとキューの上限で前段が待つ（先行するのは queue_sizes の件数まで）。
+    例外の起きた項目は以降のステージを飛ばして結果に渡す。結果は入力順。
+
+    Usage:
+        pipeline = StagedPipeline([AudioDecodeStage(), TranscriptionStage(engine), export],
+                                  queue_sizes=[2, 1])
+        for source, result, error in pipeline.run(paths):
+            ...
+        pipeline.get_utilization()
+    """
+
+    # 停止要求を確認する間隔（秒）
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, stages: Sequence[PipelineStage],
+                 queue_sizes: Union[int, Sequence[int]] = 1):
+        if not stages:
+            raise ValueError("StagedPipeline requires at least one stage")
+        self.stages = list(stages)
+        if isinstance(queue_sizes, int):
+            queue_sizes = [queue_sizes] * len(self.stages)
+        # i 番目のキューは stages[i] の出力（最後は結果）
+        self.queue_sizes = [max(1, queue_sizes[min(i, len(queue_sizes) - 1)])
+                            for i in range(len(self.stages))]
+        self._queues: List[Queue] = []
+        self._stop_event = threading.Event()
+        self._stats = [StageUtilization(stage.name) for stage in self.stages]
+        self._stats_lock = threading.Lock()
+        self._start_time: Optional[float] = None
+        self._end_time: Optional[float] = None
+
+    def run(self, inputs: Iterable[Any]) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """
+        入力を流し、(入力, 結果, 例外) を入力順に返す
+
+        途中でイテレーションをやめた場合も、ステージのスレッドを止めてから戻る。
+        """
+        self._stop_event.clear()
+        self._queues = [Queue(maxsize=size) for size in self.queue_sizes]
+        with self._stats_lock:
+            self._stats = [StageUtilization(stage.name) for stage in self.stages]
+        self._start_time = time.perf_counter()
+        self._end_time = None
+        threads = [
+            threading.Thread(target=self._run_stage, args=(i, inputs), daemon=True,
+                             name=f"Pipeline-{stage.name}")
+            for i, stage in enumerate(self.stages)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._get(self._queues[-1])
+                if item is None or item is _END:
+                    break
+                yield item.source, item.data if item.error is None else None, item.error
+        finally:
+            self._stop_event.set()
+            for thread in threads:
+                thread.join()
+            self._end_time = time.perf_counter()
+
+    def stop(self) -> None:
+        """実行中の run に停止を要求（処理中の項目はそのステージの処理が終わるまで止まらない）"""
+        self._stop_event.set()
+
+    @property
+    def is_stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def get_utilization(self) -> Dict[str, Dict[str, Any]]:
+        """ステージ名 -> 稼働状況（utilization は経過時間に対する処理中の割合）"""
+        if self._start_time is None:
+            wall = 0.0
+        else:
+            wall = (self._end_time or time.perf_counter()) - self._start_time
+        with self._stats_lock:
+            return {stat.name: stat.to_dict(wall) for stat in self._stats}
+
+    # --- 内部 ---
+
+    def _run_stage(self, index: int, inputs: Iterable[Any]) -> None:
+        stage = self.stages[index]
+        stat = self._stats[index]
+        source = iter(inputs) if index == 0 else None
+        out_queue = self._queues[index]
+        while not self._stop_event.is_set():
+            waited = time.perf_counter()
+            if source is not None:
+                try:
+                    item = _StagedItem(next(source))
+                except StopIteration:
+                    item = _END
+            else:
+                item = self._get(self._queues[index - 1])
+                if item is None:
+                    return
+            started = time.perf_counter()
+            if item is not _END and item.error is None:
+                try:
+                    item.data = stage.process(item.data)
+                except Exception as e:
+                    logger.debug(f"Pipeline stage {stage.name} failed for {item.source}: {e}")
+                    item.error = e
+            finished = time.perf_counter()
+            if not self._put(out_queue, item):
+                return
+            with self._stats_lock:
+                stat.starved_seconds += started - waited
+                stat.blocked_seconds += time.perf_counter() - finished
+                if item is not _END:
+                    stat.busy_seconds += finished - started
+                    stat.items += 1
+            if item is _END:
+                return
+
+    def _get(self, queue: Queue) -> Any:
+        while not self._stop_event.is_set():
+            try:
+                return queue.get(timeout=self.POLL_INTERVAL)
+            except Empty:
+                continue
+        return None
+
+    def _put(self, queue: Queue, item: Any) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                queue.put(item, timeout=self.POLL_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+
 def create_optimized_pipeline(
     transcription_engine: Any,
     text_formatter: Any,
@@ -0,0 +1,310 @@
+"""
+処理済みファイル台帳（追記型ジャーナル）
+FolderMonitor / AsyncFolderMonitor / FolderMonitorService で共有する。
+
+1件の処理済みマークはジャーナル（JSON Lines）への1行追記で済ませ、
+不要な行が増えたときだけ全体を書き直して圧縮する。参照はメモリ上の辞書で O(1)。
+旧形式（.processed_files.txt の1行1パス、processed_files.json）は初回読み込み時に取り込む。
+Qt非依存。
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['LedgerEntry', 'ProcessedLedger', 'LEDGER_FILENAME', 'LEGACY_FILENAME']
+
+# 監視フォルダ内の台帳ファイル名
+LEDGER_FILENAME = '.processed_ledger.jsonl'
+# 旧形式の処理済みリスト（1行1パス）
+LEGACY_FILENAME = '.processed_files.txt'
+
+# 読み込むジャーナルの上限サイズ（旧実装の処理済みリストと同じ 50MB）
+MAX_LEDGER_BYTES = 50 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class LedgerEntry:
+    """処理済みファイル1件"""
+    path: str
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+    content_hash: Optional[str] = None
+    processed_at: float = 0.0
+
+    def to_record(self) -> Dict:
+        record = {"path": self.path, "at": round(self.processed_at, 3)}
+        if self.size is not None:
+            record["size"] = self.size
+        if self.mtime is not None:
+            record["mtime"] = self.mtime
+        if self.content_hash:
+            record["hash"] = self.content_hash
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict) -> "LedgerEntry":
+        return cls(
+            path=record["path"],
+            size=record.get("size"),
+            mtime=record.get("mtime"),
+            content_hash=record.get("hash"),
+            processed_at=record.get("at", 0.0),
+        )
+
+
+class ProcessedLedger:
+    """
+    処理済みファイル台帳
+
+    Usage:
+        ledger = ProcessedLedger.for_folder(folder)
+        ledger.load()
+        ledger.mark(path)          # 1行追記
+        if path in ledger: ...     # O(1)
+    """
+
+    # ジャーナル行数がこの値と「有効件数の2倍」の大きい方を超えたら圧縮する
+    COMPACT_MIN_RECORDS = 1000
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._entries: Dict[str, LedgerEntry] = {}
+        # 内容ハッシュ → そのハッシュを持つパス（挿入順 = 記録の古い順）
+        self._by_hash: Dict[str, Dict[str, None]] = {}
+        self._records = 0
+        self._journal: Optional[TextIO] = None
+
+    @classmethod
+    def for_folder(cls, folder_path: str) -> "ProcessedLedger":
+        """監視フォルダ内の台帳（旧 .processed_files.txt を取り込む）"""
+        return cls(os.path.join(folder_path, LEDGER_FILENAME),
+                   legacy_path=os.path.join(folder_path, LEGACY_FILENAME))
+
+    # --- 参照 ---
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def get(self, path: str) -> Optional[LedgerEntry]:
+        return self._entries.get(path)
+
+    def find_by_hash(self, content_hash: str) -> Optional[LedgerEntry]:
+        """内容ハッシュが一致する処理済みファイル（複数ある場合は最後に記録したもの）"""
+        entries = self.find_all_by_hash(content_hash)
+        return entries[0] if entries else None
+
+    def find_all_by_hash(self, content_hash: str) -> List[LedgerEntry]:
+        """内容ハッシュが一致する処理済みファイル（新しく記録した順）"""
+        with self._lock:
+            paths = self._by_hash.get(content_hash, {})
+            return [self._entries[path] for path in reversed(list(paths))]
+
+    # --- 読み込み ---
+
+    def load(self) -> int:
+        """
+        ジャーナルを読み込む（なければ旧形式を取り込む）
+
+        途中で書き込みが中断された行は読み飛ばす。
+
+        Returns:
+            有効件数
+        """
+        with self._lock:
+            self._close_journal()
+            self._entries.clear()
+            self._by_hash.clear()
+            self._records = 0
+            if os.path.exists(self.path):
+                self._load_journal()
+            elif self.legacy_path and os.path.exists(self.legacy_path):
+                self._load_legacy()
+            return len(self._entries)
+
+    def _load_journal(self) -> None:
+        file_size = os.path.getsize(self.path)
+        if file_size > MAX_LEDGER_BYTES:
+            logger.error(f"Processed ledger too large: {file_size} bytes, skipping")
+            return
+        skipped = 0
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    if record.get("removed"):
+                        self._drop(record["path"])
+                    else:
+                        self._put(LedgerEntry.from_record(record))
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    skipped += 1
+                    continue
+                self._records += 1
+        if skipped:
+            logger.warning(f"Skipped {skipped} unreadable ledger records in {self.path}")
+        logger.info(f"Loaded {len(self._entries)} processed files")
+
+    def _load_legacy(self) -> None:
+        file_size = os.path.getsize(self.legacy_path)
+        if file_size > MAX_LEDGER_BYTES:
+            logger.error(f"Processed files list too large: {file_size} bytes, skipping")
+            return
+        with open(self.legacy_path, 'r', encoding='utf-8') as f:
+            if self.legacy_path.endswith('.json'):
+                paths = json.load(f).get('files', [])
+            else:
+                paths = [line.strip() for line in f if line.strip()]
+        for path in paths:
+            self._put(LedgerEntry(path=path))
+        logger.info(f"Imported {len(self._entries)} processed files from {self.legacy_path}")
+        try:
+            self.compact()
+        except OSError as e:
+            logger.warning(f"Failed to write processed ledger {self.path}: {e}")
+
+    # --- 更新 ---
+
+    def mark(self, path: str, size: Optional[int] = None, mtime: Optional[float] = None,
+             content_hash: Optional[str] = None) -> LedgerEntry:
+        """
+        処理済みとして記録（ジャーナルへ1行追記）
+
+        size / mtime を省略した場合はファイルから取得する（存在しなければ記録しない）。
+        """
+        if size is None or mtime is None:
+            try:
+                stat = os.stat(path)
+                size = stat.st_size if size is None else size
+                mtime = stat.st_mtime if mtime is None else mtime
+            except OSError:
+                pass
+        entry = LedgerEntry(path, size, mtime, content_hash, time.time())
+        with self._lock:
+            self._put(entry)
+            self._append(entry.to_record())
+        return entry
+
+    def remove(self, path: str) -> bool:
+        """記録を削除（ジャーナルへ削除行を追記）"""
+        with self._lock:
+            if path not in self._entries:
+                return False
+            self._drop(path)
+            self._append({"path": path, "removed": True})
+            return True
+
+    def replace(self, paths: Iterable[str]) -> None:
+        """記録を paths だけに置き換える（既存の記録は属性を保持、書き直して圧縮）"""
+        with self._lock:
+            kept = {path: self._entries.get(path) or LedgerEntry(path=path) for path in paths}
+            self._entries.clear()
+            self._by_hash.clear()
+            for entry in kept.values():
+                self._put(entry)
+            self.compact()
+
+    def clear(self) -> None:
+        """全記録を削除"""
+        self.replace([])
+
+    def compact(self) -> None:
+        """有効な記録だけでジャーナルを書き直す（アトミック）"""
+        with self._lock:
+            self._close_journal()
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    for entry in self._entries.values():
+                        f.write(json.dumps(entry.to_record(), ensure_ascii=False) + "\n")
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self._records = len(self._entries)
+            logger.debug(f"Compacted processed ledger: {self._records} entries")
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_journal()
+
+    # --- 内部 ---
+
+    def _put(self, entry: LedgerEntry) -> None:
+        previous = self._entries.get(entry.path)
+        if previous is not None:
+            self._unindex_hash(previous)
+        self._entries[entry.path] = entry
+        if entry.content_hash:
+            self._by_hash.setdefault(entry.content_hash, {})[entry.path] = None
+
+    def _drop(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._unindex_hash(entry)
+
+    def _unindex_hash(self, entry: LedgerEntry) -> None:
+        if not entry.content_hash:
+            return
+        paths = self._by_hash.get(entry.content_hash)
+        if paths is not None:
+            paths.pop(entry.path, None)
+            if not paths:
+                del self._by_hash[entry.content_hash]
+
+    def _append(self, record: Dict) -> None:
+        if self._journal is None:
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            self._journal = open(self.path, 'a', encoding='utf-8')
+            if self._ends_with_torn_line():
+                # 書きかけの行の後ろに続けて書くと次の記録まで壊れるため、行を閉じてから追記
+                self._journal.write("\n")
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self._records += 1
+        if self._records > max(self.COMPACT_MIN_RECORDS, 2 * len(self._entries)):
+            self.compact()
+
+    def _ends_with_torn_line(self) -> bool:
+        """ジャーナル末尾が改行で終わっていない（前回の書き込みが中断された）か"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:
+            return False
+
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            try:
+                self._journal.close()
+            except OSError:
+                pass
+            self._journal = None
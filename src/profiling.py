@@ -0,0 +1,268 @@
+"""
+ジョブ単位のプロファイラ（オプトイン）
+
+環境変数 KOTOBA_PROFILE（または設定 debug.profile）に "sample" / "cprofile" を指定すると
+全ジョブを、`JobProfiler.arm()`（/api/debug/profile）を呼ぶと次の N ジョブをプロファイルする。
+
+- sample: 別スレッドから対象スレッドのスタックを一定間隔で採取し、
+  collapsed stack 形式（flamegraph.pl / speedscope で表示可能）で <job_id>.folded に出力
+- cprofile: cProfile の結果を <job_id>.prof（pstats）と <job_id>.txt（上位関数）に出力
+
+出力先は KOTOBA_PROFILE_DIR、未設定ならログファイルと同じディレクトリの profiles/。
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'PROFILE_MODES', 'SamplingProfiler', 'JobProfiler', 'get_job_profiler',
+    'default_profile_dir',
+]
+
+PROFILE_MODES = ("sample", "cprofile")
+
+# サンプリング間隔の既定値（秒）
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# 1スタックあたりの最大フレーム数（深い再帰で出力が肥大しないように）
+MAX_STACK_DEPTH = 128
+
+# pstats テキスト出力の関数数
+PSTATS_TOP_N = 60
+
+# 直近のプロファイル出力の保持件数
+RECENT_PROFILES_LIMIT = 50
+
+
+def default_profile_dir() -> str:
+    """プロファイル出力先ディレクトリ"""
+    env_dir = os.environ.get("KOTOBA_PROFILE_DIR")
+    if env_dir:
+        return env_dir
+    try:
+        from config_manager import get_config
+        log_file = get_config().get("logging.file", default="logs/app.log")
+    except Exception:
+        log_file = "logs/app.log"
+    return os.path.join(os.path.dirname(log_file) or ".", "profiles")
+
+
+def _configured_mode() -> Optional[str]:
+    """環境変数・設定ファイルで常時有効化されたモード（無効なら None）"""
+    mode = os.environ.get("KOTOBA_PROFILE")
+    if mode is None:
+        try:
+            from config_manager import get_config
+            mode = get_config().get("debug.profile", default=None)
+        except Exception:
+            mode = None
+    mode = (mode or "").strip().lower()
+    if mode in ("1", "true", "on"):
+        return "sample"
+    return mode if mode in PROFILE_MODES else None
+
+
+def _safe_name(name: str) -> str:
+    """出力ファイル名に使えない文字を置換"""
+    return re.sub(r"[^\w.-]", "_", name)[:120] or "job"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    1スレッドを対象とするサンプリングプロファイラ
+
+    sys._current_frames() で対象スレッドのスタックを採取するため、対象側に
+    フックを入れない（計測対象の処理速度にほぼ影響しない）。
+    """
+
+    def __init__(self, thread_id: Optional[int] = None,
+                 interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="kotoba-profiler")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels: List[str] = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            # collapsed 形式はルート→リーフの順
+            self.stacks[";".join(reversed(labels))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """collapsed stack 形式（1行: "frame;frame;... count"）"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class JobProfiler:
+    """
+    ジョブのプロファイル要否を判定し、実行をプロファイルして結果を書き出す
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._armed_remaining = 0
+        self._armed_mode = "sample"
+        self._armed_interval = DEFAULT_SAMPLE_INTERVAL
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_PROFILES_LIMIT)
+
+    def arm(self, jobs: int, mode: str = "sample",
+            interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        """
+        次の jobs 件のジョブをプロファイルする（0 で解除）
+
+        Raises:
+            ValueError: 不明なモード、または負の件数
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if jobs < 0:
+            raise ValueError("jobs must be >= 0")
+        with self._lock:
+            self._armed_remaining = jobs
+            self._armed_mode = mode
+            self._armed_interval = interval
+        logger.info(f"Profiler armed for next {jobs} job(s) (mode={mode})")
+
+    def status(self) -> Dict[str, Any]:
+        """現在の設定と直近の出力一覧"""
+        with self._lock:
+            return {
+                "configured_mode": _configured_mode(),
+                "armed_remaining": self._armed_remaining,
+                "armed_mode": self._armed_mode,
+                "output_dir": os.path.abspath(default_profile_dir()),
+                "recent": list(self._recent),
+            }
+
+    def _take(self) -> Optional[tuple]:
+        """このジョブをプロファイルするなら (モード, 間隔) を返す"""
+        with self._lock:
+            if self._armed_remaining > 0:
+                self._armed_remaining -= 1
+                return self._armed_mode, self._armed_interval
+        mode = _configured_mode()
+        if mode is not None:
+            return mode, DEFAULT_SAMPLE_INTERVAL
+        return None
+
+    @contextmanager
+    def profile(self, job_id: str, **info: Any) -> Iterator[None]:
+        """
+        対象ならブロック内の処理をプロファイルする（対象外なら何もしない）
+
+        Args:
+            job_id: 出力ファイル名に使う識別子
+            **info: 出力一覧に記録する付加情報（kind, file_path 等）
+        """
+        selected = self._take()
+        if selected is None:
+            yield
+            return
+
+        mode, interval = selected
+        start = time.perf_counter()
+        sampler = None
+        profiler = None
+        if mode == "sample":
+            sampler = SamplingProfiler(interval=interval)
+            sampler.start()
+        else:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # 他のプロファイラが有効（同時実行ジョブ等）— このジョブは計測しない
+                logger.warning(f"cProfile unavailable for job {job_id}: {e}")
+                yield
+                return
+        try:
+            yield
+        finally:
+            if sampler is not None:
+                sampler.stop()
+            if profiler is not None:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+            try:
+                paths = self._write(job_id, sampler, profiler)
+                entry = {"job_id": job_id, "mode": mode, "seconds": round(elapsed, 3),
+                         "files": paths, "created_at": time.time(), **info}
+                if sampler is not None:
+                    entry["samples"] = sampler.sample_count
+                with self._lock:
+                    self._recent.append(entry)
+                logger.info(f"Profile written for job {job_id}: {paths}")
+            except Exception as e:
+                logger.warning(f"Failed to write profile for job {job_id}: {e}")
+
+    @staticmethod
+    def _write(job_id: str, sampler: Optional[SamplingProfiler],
+               profiler: Optional[cProfile.Profile]) -> List[str]:
+        from export.common import atomic_write_text
+        out_dir = default_profile_dir()
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, _safe_name(job_id))
+        paths = []
+        if sampler is not None:
+            atomic_write_text(f"{base}.folded", sampler.collapsed())
+            paths.append(f"{base}.folded")
+        if profiler is not None:
+            profiler.dump_stats(f"{base}.prof")
+            paths.append(f"{base}.prof")
+            buf = io.StringIO()
+            pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(PSTATS_TOP_N)
+            atomic_write_text(f"{base}.txt", buf.getvalue())
+            paths.append(f"{base}.txt")
+        return paths
+
+
+# グローバルシングルトン
+_job_profiler: Optional[JobProfiler] = None
+_job_profiler_lock = threading.Lock()
+
+
+def get_job_profiler() -> JobProfiler:
+    """JobProfiler シングルトンを取得"""
+    global _job_profiler
+    if _job_profiler is None:
+        with _job_profiler_lock:
+            if _job_profiler is None:
+                _job_profiler = JobProfiler()
+    return _job_profiler
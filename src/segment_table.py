@@ -0,0 +1,442 @@
+"""
+列指向のセグメントテーブル
+
+書き起こしセグメントを辞書のリストではなく、開始・終了・話者ID・信頼度の
+NumPy 配列と、テキストのプール（同じ文字列は1つにまとめ、行はIDで参照）で保持する。
+
+- スライスは配列のビュー（コピーなし）で、テキスト・話者プールも共有する
+- 話者割り当て・重なり計算・時間範囲の抽出はベクトル化
+- 既存の辞書ベースの呼び出し側には SegmentRow（読み取り専用の Mapping）と
+  to_dicts() で互換性を保つ
+"""
+
+import logging
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['SegmentTable', 'SegmentRow', 'speaker_indices_at', 'NO_SPEAKER']
+
+# 話者なしを表す話者ID
+NO_SPEAKER = -1
+
+# to_dicts() の既定キー順
+_BASE_FIELDS = ("start", "end", "text")
+
+
+def speaker_indices_at(times: Any, speaker_segments: Optional[Sequence[Mapping]]) -> np.ndarray:
+    """
+    各時刻を含む話者セグメントの位置を一括で求める
+
+    線形走査と同じく「時刻を含むセグメントのうちリスト上で最初のもの」を返す。
+    開始時刻でソートした区間が重ならない（境界の接触は可）場合は searchsorted による
+    ベクトル化で求め、重なりがある場合は export.common.SpeakerIndex のスイープで求める。
+
+    Args:
+        times: 時刻の配列（秒）
+        speaker_segments: 話者セグメント [{"speaker", "start", "end"}, ...]
+
+    Returns:
+        speaker_segments 上の位置の配列（該当なしは -1）
+    """
+    times = np.asarray(times, dtype=np.float64)
+    result = np.full(len(times), -1, dtype=np.int64)
+    if not speaker_segments or len(times) == 0:
+        return result
+
+    seg_starts = np.array([seg.get("start", 0) for seg in speaker_segments], dtype=np.float64)
+    seg_ends = np.array([seg.get("end", 0) for seg in speaker_segments], dtype=np.float64)
+    order = np.lexsort((np.arange(len(seg_starts)), seg_starts))
+    starts = seg_starts[order]
+    ends = seg_ends[order]
+
+    if np.all(starts < ends) and np.all(ends[:-1] <= starts[1:]):
+        # 重なりなし: 時刻を含み得るのは開始が時刻以下の最後の区間と、
+        # 境界で接するその直前の区間だけ
+        last = np.searchsorted(starts, times, side="right") - 1
+        last_c = np.maximum(last, 0)
+        covers_last = (last >= 0) & (ends[last_c] >= times)
+        prev = last - 1
+        prev_c = np.maximum(prev, 0)
+        covers_prev = (prev >= 0) & (ends[prev_c] >= times)
+        use_prev = covers_prev & (~covers_last | (order[prev_c] < order[last_c]))
+        result[covers_last] = order[last_c[covers_last]]
+        result[use_prev] = order[prev_c[use_prev]]
+        return result
+
+    from export.common import SpeakerIndex
+    index = SpeakerIndex([
+        {"start": float(s), "end": float(e), "speaker": position}
+        for position, (s, e) in enumerate(zip(seg_starts, seg_ends))
+    ])
+    # 時刻順に問い合わせるとスイープが後戻りしない
+    for i in np.argsort(times, kind="stable").tolist():
+        position = index.speaker_at(float(times[i]))
+        if position is not None:
+            result[i] = position
+    return result
+
+
+class SegmentRow(Mapping):
+    """
+    テーブルの1行を辞書として参照するビュー（読み取り専用）
+
+    start / end / text は常に、speaker / confidence は値がある場合のみキーを持つ。
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "SegmentTable", index: int):
+        self._table = table
+        self._index = index
+
+    def _keys(self) -> List[str]:
+        keys = list(_BASE_FIELDS)
+        if self._table.speaker_ids[self._index] != NO_SPEAKER:
+            keys.append("speaker")
+        if not np.isnan(self._table.confidences[self._index]):
+            keys.append("confidence")
+        return keys
+
+    def __getitem__(self, key: str) -> Any:
+        table, i = self._table, self._index
+        if key == "start":
+            return float(table.starts[i])
+        if key == "end":
+            return float(table.ends[i])
+        if key == "text":
+            return table.text_pool[table.text_ids[i]]
+        if key == "speaker":
+            speaker_id = int(table.speaker_ids[i])
+            if speaker_id != NO_SPEAKER:
+                return table.speaker_names[speaker_id]
+        elif key == "confidence":
+            confidence = float(table.confidences[i])
+            if not np.isnan(confidence):
+                return confidence
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return f"SegmentRow({dict(self)!r})"
+
+
+class SegmentTable:
+    """
+    セグメントの列指向テーブル
+
+    Attributes:
+        starts / ends: 開始・終了時刻（float64, 秒）
+        speaker_ids: speaker_names の添字（int32, 話者なしは NO_SPEAKER）
+        confidences: 信頼度（float32, なしは NaN）
+        text_ids: text_pool の添字（int32）
+        text_pool: テキストのプール（同一文字列は1件）
+        speaker_names: 話者名のプール
+    """
+
+    __slots__ = ("starts", "ends", "speaker_ids", "confidences", "text_ids",
+                 "text_pool", "speaker_names")
+
+    def __init__(self, starts: Any, ends: Any, text_ids: Any, text_pool: List[str],
+                 speaker_ids: Any = None, speaker_names: Optional[List[Any]] = None,
+                 confidences: Any = None):
+        # 既に同じ dtype の配列（スライスのビュー等）ならコピーしない
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.text_ids = np.asarray(text_ids, dtype=np.int32)
+        n = len(self.starts)
+        self.speaker_ids = (np.full(n, NO_SPEAKER, dtype=np.int32) if speaker_ids is None
+                            else np.asarray(speaker_ids, dtype=np.int32))
+        self.confidences = (np.full(n, np.nan, dtype=np.float32) if confidences is None
+                            else np.asarray(confidences, dtype=np.float32))
+        self.text_pool = text_pool
+        self.speaker_names = speaker_names if speaker_names is not None else []
+        if not (len(self.ends) == len(self.text_ids) == len(self.speaker_ids)
+                == len(self.confidences) == n):
+            raise ValueError("SegmentTable columns must have the same length")
+
+    # --- 生成・変換 ---
+
+    @classmethod
+    def empty(cls) -> "SegmentTable":
+        return cls([], [], [], [])
+
+    @classmethod
+    def from_dicts(cls, segments: Iterable[Mapping]) -> "SegmentTable":
+        """
+        セグメント辞書のイテラブルから生成
+
+        start / end の欠落・None は 0、text の欠落・None は空文字として扱う。
+        """
+        text_pool: List[str] = []
+        text_index: Dict[str, int] = {}
+        speaker_names: List[Any] = []
+        speaker_index: Dict[Any, int] = {}
+        starts: List[float] = []
+        ends: List[float] = []
+        text_ids: List[int] = []
+        speaker_ids: List[int] = []
+        confidences: List[float] = []
+
+        for seg in segments:
+            starts.append(seg.get("start") or 0)
+            ends.append(seg.get("end") or 0)
+
+            text = seg.get("text")
+            text = "" if text is None else str(text)
+            text_id = text_index.get(text)
+            if text_id is None:
+                text_id = text_index[text] = len(text_pool)
+                text_pool.append(text)
+            text_ids.append(text_id)
+
+            speaker = seg.get("speaker")
+            if speaker is None:
+                speaker_ids.append(NO_SPEAKER)
+            else:
+                speaker_id = speaker_index.get(speaker)
+                if speaker_id is None:
+                    speaker_id = speaker_index[speaker] = len(speaker_names)
+                    speaker_names.append(speaker)
+                speaker_ids.append(speaker_id)
+
+            confidence = seg.get("confidence")
+            confidences.append(np.nan if confidence is None else confidence)
+
+        return cls(starts, ends, text_ids, text_pool, speaker_ids, speaker_names, confidences)
+
+    @classmethod
+    def from_engine_result(cls, result: dict) -> "SegmentTable":
+        """エンジン出力（chunks / segments / timestamp タプル）から生成"""
+        from constants import normalize_segments
+        return cls.from_dicts(normalize_segments(result))
+
+    def to_dicts(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        辞書のリストに変換
+
+        Args:
+            fields: 出力するキー（指定時は値がなくても None で出力）。
+                    None なら start / end / text と、値のある speaker / confidence
+        """
+        starts = self.starts.tolist()
+        ends = self.ends.tolist()
+        texts = self.texts
+        speakers = self.speakers
+        confidences = [None if c != c else c for c in self.confidences.tolist()]
+        columns = {"start": starts, "end": ends, "text": texts,
+                   "speaker": speakers, "confidence": confidences}
+
+        if fields is not None:
+            selected = [(key, columns[key]) for key in fields]
+            return [{key: column[i] for key, column in selected} for i in range(len(self))]
+
+        result = []
+        for i in range(len(self)):
+            row = {"start": starts[i], "end": ends[i], "text": texts[i]}
+            if speakers[i] is not None:
+                row["speaker"] = speakers[i]
+            if confidences[i] is not None:
+                row["confidence"] = confidences[i]
+            result.append(row)
+        return result
+
+    # --- シーケンスとしての振る舞い ---
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[SegmentRow]:
+        return (SegmentRow(self, i) for i in range(len(self)))
+
+    def __getitem__(self, key: Any) -> Any:
+        """
+        整数なら行ビュー、スライスならビューを共有するテーブル、
+        ブール配列・整数配列なら該当行のテーブル（列はコピー、プールは共有）
+        """
+        if isinstance(key, (int, np.integer)):
+            n = len(self)
+            index = int(key) + n if key < 0 else int(key)
+            if not 0 <= index < n:
+                raise IndexError("SegmentTable index out of range")
+            return SegmentRow(self, index)
+        return SegmentTable(self.starts[key], self.ends[key], self.text_ids[key], self.text_pool,
+                            self.speaker_ids[key], self.speaker_names, self.confidences[key])
+
+    def __repr__(self) -> str:
+        return f"SegmentTable({len(self)} segments, {len(self.text_pool)} texts)"
+
+    # --- 列の参照 ---
+
+    @property
+    def texts(self) -> List[str]:
+        pool = self.text_pool
+        return [pool[i] for i in self.text_ids.tolist()]
+
+    @property
+    def speakers(self) -> List[Any]:
+        names = self.speaker_names
+        return [None if i == NO_SPEAKER else names[i] for i in self.speaker_ids.tolist()]
+
+    @property
+    def durations(self) -> np.ndarray:
+        return self.ends - self.starts
+
+    def is_sorted(self) -> bool:
+        """開始時刻の昇順に並んでいるか"""
+        return bool(np.all(self.starts[:-1] <= self.starts[1:]))
+
+    # --- ベクトル化された操作 ---
+
+    def window(self, start: float, end: float) -> "SegmentTable":
+        """
+        [start, end) と重なる行を抽出
+
+        開始時刻順なら重なりの先頭・末尾を二分探索してスライス（ビュー）を返す。
+        """
+        if self.is_sorted():
+            # 重なるのは start_i < end の行のうち end_i > start のもの
+            hi = int(np.searchsorted(self.starts, end, side="left"))
+            candidates = self[:hi]
+            overlapping = np.flatnonzero(candidates.ends > start)
+            if len(overlapping) == 0:
+                return self[0:0]
+            lo = int(overlapping[0])
+            if np.all(candidates.ends[lo:] > start):
+                return self[lo:hi]
+            return candidates[candidates.ends > start]
+        return self[(self.starts < end) & (self.ends > start)]
+
+    def overlap_seconds(self, start: float, end: float) -> np.ndarray:
+        """各行と区間 [start, end] の重なり（秒）"""
+        return np.clip(np.minimum(self.ends, end) - np.maximum(self.starts, start), 0.0, None)
+
+    def assign_speakers(self, speaker_segments: Optional[Sequence[Mapping]]) -> "SegmentTable":
+        """
+        各行の開始時刻を含む話者セグメントの話者を割り当てたテーブルを返す
+
+        該当する話者セグメントがない行は話者なしになる。
+        """
+        positions = speaker_indices_at(self.starts, speaker_segments)
+        speaker_names: List[Any] = []
+        name_index: Dict[Any, int] = {}
+        position_ids = np.full(len(speaker_segments or ()), NO_SPEAKER, dtype=np.int32)
+        for position, seg in enumerate(speaker_segments or ()):
+            speaker = seg.get("speaker")
+            if speaker is None:
+                continue
+            speaker_id = name_index.get(speaker)
+            if speaker_id is None:
+                speaker_id = name_index[speaker] = len(speaker_names)
+                speaker_names.append(speaker)
+            position_ids[position] = speaker_id
+        speaker_ids = np.where(positions >= 0, position_ids[np.maximum(positions, 0)], NO_SPEAKER)
+        return SegmentTable(self.starts, self.ends, self.text_ids, self.text_pool,
+                            speaker_ids, speaker_names, self.confidences)
+
+    def speaker_durations(self) -> Dict[Any, float]:
+        """話者ごとの合計時間（秒）"""
+        has_speaker = self.speaker_ids != NO_SPEAKER
+        totals = np.bincount(self.speaker_ids[has_speaker], weights=self.durations[has_speaker],
+                             minlength=len(self.speaker_names))
+        return {name: float(total) for name, total in zip(self.speaker_names, totals) if total}
+
+    def merge_short(self, min_duration: float = 1.0, max_chars: int = 40) -> "SegmentTable":
+        """
+        短いセグメントをマージ（export.common.merge_short_segments と同じ規則）
+
+        同じ話者で、グループ先頭からの長さが min_duration 未満かつ
+        結合後の文字数が max_chars 以下なら前の行に結合する。グループ分けは
+        文字数と時刻の数値だけで決め、テキストの結合はグループごとに1回だけ行う。
+        信頼度はグループ内の最小値。
+        """
+        n = len(self)
+        if n == 0:
+            return SegmentTable.empty()
+
+        pool = self.text_pool
+        stripped = [pool[i].strip() for i in self.text_ids.tolist()]
+        lengths = [len(text) for text in stripped]
+        starts = self.starts.tolist()
+        ends = self.ends.tolist()
+        speaker_ids = self.speaker_ids.tolist()
+
+        group_starts = [0]
+        group = 0
+        current_length = lengths[0]
+        for i in range(1, n):
+            combined_length = current_length + 1 + lengths[i]
+            if (ends[i] - starts[group] < min_duration
+                    and combined_length <= max_chars
+                    and speaker_ids[i] == speaker_ids[group]):
+                current_length = combined_length
+            else:
+                group_starts.append(i)
+                group = i
+                current_length = lengths[i]
+
+        firsts = np.asarray(group_starts, dtype=np.intp)
+        lasts = np.append(firsts[1:], n) - 1
+        bounds = group_starts + [n]
+        texts = [" ".join(stripped[bounds[g]:bounds[g + 1]]) for g in range(len(group_starts))]
+        return SegmentTable(
+            self.starts[firsts], self.ends[lasts], np.arange(len(texts)), texts,
+            self.speaker_ids[firsts], self.speaker_names,
+            np.fmin.reduceat(self.confidences, firsts),
+        )
+
+    def split_long(self, max_chars: int = 40, max_duration: float = 5.0) -> "SegmentTable":
+        """
+        長いセグメントを文単位で分割（export.common.split_long_segments と同じ規則）
+
+        分割が必要な行は文字数・長さの配列演算で判定し、それ以外の行は
+        連続区間ごとにまとめて列をコピーする（分割対象がなければ自身を返す）。
+        """
+        from export.common import split_text_by_sentence
+
+        pool = self.text_pool
+        lengths = np.fromiter((len(pool[i].strip()) for i in self.text_ids.tolist()),
+                              dtype=np.int64, count=len(self))
+        needs_split = np.flatnonzero((lengths > max_chars) | (self.durations > max_duration))
+        if len(needs_split) == 0:
+            return self
+
+        text_pool = list(pool)
+        parts: List[Tuple[np.ndarray, ...]] = []
+        previous = 0
+        for i in needs_split.tolist():
+            if previous < i:
+                parts.append(self._columns(slice(previous, i)))
+            pieces = split_text_by_sentence(pool[self.text_ids[i]].strip(),
+                                            float(self.starts[i]), float(self.ends[i]), max_chars)
+            count = len(pieces)
+            text_ids = np.arange(len(text_pool), len(text_pool) + count)
+            text_pool.extend(text for _, _, text in pieces)
+            parts.append((
+                np.array([start for start, _, _ in pieces], dtype=np.float64),
+                np.array([end for _, end, _ in pieces], dtype=np.float64),
+                text_ids,
+                np.full(count, self.speaker_ids[i], dtype=np.int32),
+                np.full(count, self.confidences[i], dtype=np.float32),
+            ))
+            previous = i + 1
+        if previous < len(self):
+            parts.append(self._columns(slice(previous, len(self))))
+
+        starts, ends, text_ids, speaker_ids, confidences = (
+            np.concatenate(column) for column in zip(*parts)
+        )
+        return SegmentTable(starts, ends, text_ids, text_pool,
+                            speaker_ids, self.speaker_names, confidences)
+
+    def _columns(self, key: Any) -> Tuple[np.ndarray, ...]:
+        return (self.starts[key], self.ends[key], self.text_ids[key],
+                self.speaker_ids[key], self.confidences[key])
@@ -7,6 +7,7 @@ import logging
 from typing import List, Dict, Optional
 import numpy as np
 from speaker_diarization_utils import SpeakerFormatterMixin, ClusteringMixin
+from metrics import DIARIZATION_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -112,13 +113,14 @@ class FreeSpeakerDiarizer(SpeakerFormatterMixin, ClusteringMixin):
         try:
             logger.info(f"Running speaker diarization on: {audio_path}")
 
-            if self.method == "speechbrain":
-                return self._diarize_speechbrain(audio_path, num_speakers)
-            elif self.method == "resemblyzer":
-                return self._diarize_resemblyzer(audio_path, num_speakers)
-            else:
-                logger.warning(f"No diarization method available (method={self.method})")
-                return []
+            with DIARIZATION_SECONDS.time():
+                if self.method == "speechbrain":
+                    return self._diarize_speechbrain(audio_path, num_speakers)
+                elif self.method == "resemblyzer":
+                    return self._diarize_resemblyzer(audio_path, num_speakers)
+                else:
+                    logger.warning(f"No diarization method available (method={self.method})")
+                    return []
 
         except Exception as e:
             logger.error(f"Speaker diarization failed: {e}")
@@ -212,17 +212,22 @@ class SpeakerFormatterMixin:
         if not speaker_segments:
             return "\n".join(seg.get("text", "") for seg in text_segments)
 
+        from segment_table import SegmentTable, speaker_indices_at
+
+        table = SegmentTable.from_dicts(text_segments)
+        # 各セグメント開始時刻の話者を一括で特定
+        positions = speaker_indices_at(table.starts, speaker_segments).tolist()
+
         lines = []
         current_speaker = None
 
-        for seg in text_segments:
-            start = seg.get("start", 0)
-            text = seg.get("text", "").strip()
+        for text, position in zip(table.texts, positions):
+            text = text.strip()
             if not text:
                 continue
 
-            # この時刻の話者を特定
-            speaker = self._find_speaker_at_time(start, speaker_segments)
+            speaker = ("UNKNOWN" if position < 0
+                       else speaker_segments[position].get("speaker", "UNKNOWN"))
 
             if speaker != current_speaker:
                 if lines:
@@ -4,12 +4,13 @@ SRT/VTT形式の字幕ファイル生成
 """
 
 import html
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from pathlib import Path
 import logging
 from time_utils import format_time_srt, format_time_vtt
 from export.common import (
-    atomic_write_text,
+    SpeakerIndex,
+    atomic_write_iter,
     merge_short_segments as _merge_short_segments,
     split_long_segments as _split_long_segments,
 )
@@ -42,7 +43,7 @@ class SubtitleExporter:
         SRT字幕ファイルをエクスポート
 
         Args:
-            segments: 文字起こしセグメントリスト
+            segments: 文字起こしセグメント（イテレータ可: 逐次書き出す）
                      [{"start": float, "end": float, "text": str}, ...]
             output_path: 出力ファイルパス
             speaker_segments: 話者分離結果（オプション）
@@ -51,8 +52,7 @@ class SubtitleExporter:
             成功時True
         """
         try:
-            srt_content = self.generate_srt_content(segments, speaker_segments)
-            atomic_write_text(output_path, srt_content)
+            atomic_write_iter(output_path, self.iter_srt_content(segments, speaker_segments))
 
             logger.info(f"SRT exported: {output_path}")
             return True
@@ -80,8 +80,7 @@ class SubtitleExporter:
             成功時True
         """
         try:
-            vtt_content = self.generate_vtt_content(segments, speaker_segments)
-            atomic_write_text(output_path, vtt_content)
+            atomic_write_iter(output_path, self.iter_vtt_content(segments, speaker_segments))
 
             logger.info(f"VTT exported: {output_path}")
             return True
@@ -94,7 +93,7 @@ class SubtitleExporter:
             return False
 
     def generate_srt_content(self,
-                            segments: List[Dict[str, Any]],
+                            segments: Iterable[Dict[str, Any]],
                             speaker_segments: Optional[List[Dict]] = None) -> str:
         """
         SRT形式のコンテンツを生成
@@ -106,8 +105,24 @@ class SubtitleExporter:
         Returns:
             SRT形式の文字列
         """
-        lines = []
+        return "".join(self.iter_srt_content(segments, speaker_segments))
+
+    def iter_srt_content(self,
+                         segments: Iterable[Dict[str, Any]],
+                         speaker_segments: Optional[List[Dict]] = None) -> Iterator[str]:
+        """
+        SRT形式のコンテンツを字幕1件ずつ生成（ファイルへの逐次書き出し用）
+
+        Args:
+            segments: 文字起こしセグメント（イテレータ可）
+            speaker_segments: 話者分離結果（オプション）
+
+        Yields:
+            字幕1件分の文字列（連結すると generate_srt_content と同じ）
+        """
+        speakers = SpeakerIndex(speaker_segments)
         subtitle_index = 1
+        separator = ""
 
         for segment in segments:
             start = segment.get("start", 0)
@@ -118,21 +133,19 @@ class SubtitleExporter:
                 continue
 
             # 話者情報を追加
-            speaker = self._get_speaker_for_time(start, speaker_segments)
+            speaker = speakers.speaker_at(start)
             if speaker:
                 text = f"[{html.escape(speaker)}] {text}"
 
-            lines.append(str(subtitle_index))
-            lines.append(f"{self.format_srt_time(start)} --> {self.format_srt_time(end)}")
-            lines.append(text)
-            lines.append("")  # 空行
-
+            # 字幕間は空行で区切る
+            yield (f"{separator}{subtitle_index}\n"
+                   f"{self.format_srt_time(start)} --> {self.format_srt_time(end)}\n"
+                   f"{text}\n")
+            separator = "\n"
             subtitle_index += 1
 
-        return "\n".join(lines)
-
     def generate_vtt_content(self,
-                            segments: List[Dict[str, Any]],
+                            segments: Iterable[Dict[str, Any]],
                             speaker_segments: Optional[List[Dict]] = None) -> str:
         """
         VTT形式のコンテンツを生成
@@ -144,7 +157,23 @@ class SubtitleExporter:
         Returns:
             VTT形式の文字列
         """
-        lines = ["WEBVTT", ""]
+        return "".join(self.iter_vtt_content(segments, speaker_segments))
+
+    def iter_vtt_content(self,
+                         segments: Iterable[Dict[str, Any]],
+                         speaker_segments: Optional[List[Dict]] = None) -> Iterator[str]:
+        """
+        VTT形式のコンテンツをヘッダー・字幕1件ずつ生成（ファイルへの逐次書き出し用）
+
+        Args:
+            segments: 文字起こしセグメント（イテレータ可）
+            speaker_segments: 話者分離結果（オプション）
+
+        Yields:
+            ヘッダーまたは字幕1件分の文字列（連結すると generate_vtt_content と同じ）
+        """
+        speakers = SpeakerIndex(speaker_segments)
+        yield "WEBVTT\n"
 
         for segment in segments:
             start = segment.get("start", 0)
@@ -155,21 +184,17 @@ class SubtitleExporter:
                 continue
 
             # 話者情報を追加
-            speaker = self._get_speaker_for_time(start, speaker_segments)
+            speaker = speakers.speaker_at(start)
             if speaker:
                 text = f"<v {html.escape(speaker)}>{html.escape(text)}</v>"
 
-            lines.append(f"{self.format_vtt_time(start)} --> {self.format_vtt_time(end)}")
-            lines.append(text)
-            lines.append("")  # 空行
-
-        return "\n".join(lines)
+            yield f"\n{self.format_vtt_time(start)} --> {self.format_vtt_time(end)}\n{text}\n"
 
     def _get_speaker_for_time(self,
                              time: float,
                              speaker_segments: Optional[List[Dict]]) -> Optional[str]:
         """
-        指定時刻の話者を取得
+        指定時刻の話者を取得（単発の問い合わせ用。字幕生成では SpeakerIndex を使う）
 
         Args:
             time: 時刻（秒）
@@ -178,14 +203,7 @@ class SubtitleExporter:
         Returns:
             話者名（該当なしの場合None）
         """
-        if not speaker_segments:
-            return None
-
-        for seg in speaker_segments:
-            if seg.get("start", 0) <= time <= seg.get("end", 0):
-                return seg.get("speaker")
-
-        return None
+        return SpeakerIndex(speaker_segments).speaker_at(time)
 
     def merge_short_segments(self,
                             segments: List[Dict[str, Any]],
@@ -247,11 +265,10 @@ class SubtitleExporter:
     def _export_txt(self, segments: List[Dict[str, Any]], output_path: str) -> bool:
         """プレーンテキストでエクスポート"""
         try:
-            content = ''.join(
+            atomic_write_iter(output_path, (
                 f"[{segment.get('start', 0):.2f}s] {segment.get('text', '')}\n"
                 for segment in segments
-            )
-            atomic_write_text(output_path, content)
+            ))
 
             return True
         except (IOError, OSError) as e:
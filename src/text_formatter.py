@@ -8,6 +8,7 @@ import threading
 from typing import List, Dict
 import logging
 from validators import Validator, ValidationError
+from metrics import TEXT_FORMAT_SECONDS, record_cache
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +77,18 @@ class RegexPatterns:
     _pattern_cache: Dict[str, re.Pattern] = {}
     _cache_lock = threading.Lock()
 
+    @classmethod
+    def _get_or_compile(cls, key: str, pattern: str, flags: int = 0) -> re.Pattern:
+        """キャッシュ済みパターンを返す（無ければコンパイルして登録）"""
+        with cls._cache_lock:
+            compiled = cls._pattern_cache.get(key)
+            hit = compiled is not None
+            if not hit:
+                compiled = re.compile(pattern, flags)
+                cls._pattern_cache[key] = compiled
+        record_cache("text_pattern", hit)
+        return compiled
+
     @classmethod
     def get_filler_pattern(cls, filler: str) -> re.Pattern:
         """
@@ -91,13 +104,10 @@ class RegexPatterns:
             Compiled regex pattern
         """
         key = f"filler_{filler}"
-        with cls._cache_lock:
-            if key not in cls._pattern_cache:
-                # Japanese text has no word boundaries between characters,
-                # so use lookaround-free pattern with optional trailing punctuation
-                pattern = re.escape(filler) + r'[、。]?\s*'
-                cls._pattern_cache[key] = re.compile(pattern, re.IGNORECASE)
-            return cls._pattern_cache[key]
+        # Japanese text has no word boundaries between characters,
+        # so use lookaround-free pattern with optional trailing punctuation
+        pattern = re.escape(filler) + r'[、。]?\s*'
+        return cls._get_or_compile(key, pattern, re.IGNORECASE)
 
     @classmethod
     def get_conjunction_pattern(cls, conjunction: str) -> re.Pattern:
@@ -111,11 +121,8 @@ class RegexPatterns:
             Compiled regex pattern
         """
         key = f"conj_{conjunction}"
-        with cls._cache_lock:
-            if key not in cls._pattern_cache:
-                pattern = r'([^、。！？\n])(' + re.escape(conjunction) + r')'
-                cls._pattern_cache[key] = re.compile(pattern)
-            return cls._pattern_cache[key]
+        pattern = r'([^、。！？\n])(' + re.escape(conjunction) + r')'
+        return cls._get_or_compile(key, pattern)
 
     @classmethod
     def get_quote_verb_pattern(cls, verb: str) -> re.Pattern:
@@ -129,11 +136,8 @@ class RegexPatterns:
             Compiled regex pattern
         """
         key = f"quote_{verb}"
-        with cls._cache_lock:
-            if key not in cls._pattern_cache:
-                pattern = r'と(' + re.escape(verb) + ')'
-                cls._pattern_cache[key] = re.compile(pattern)
-            return cls._pattern_cache[key]
+        pattern = r'と(' + re.escape(verb) + ')'
+        return cls._get_or_compile(key, pattern)
 
     @classmethod
     def get_polite_ending_pattern(cls, ending: str) -> re.Pattern:
@@ -147,11 +151,8 @@ class RegexPatterns:
             Compiled regex pattern
         """
         key = f"polite_{ending}"
-        with cls._cache_lock:
-            if key not in cls._pattern_cache:
-                pattern = r'(' + re.escape(ending) + r')([^。！？\n])'
-                cls._pattern_cache[key] = re.compile(pattern)
-            return cls._pattern_cache[key]
+        pattern = r'(' + re.escape(ending) + r')([^。！？\n])'
+        return cls._get_or_compile(key, pattern)
 
 
 class TextFormatter:
@@ -487,17 +488,18 @@ class TextFormatter:
         """
         result = text
 
-        if remove_fillers:
-            result = self.remove_fillers(result)
+        with TEXT_FORMAT_SECONDS.time():
+            if remove_fillers:
+                result = self.remove_fillers(result)
 
-        if clean_repeated:
-            result = self.clean_repeated_words(result)
+            if clean_repeated:
+                result = self.clean_repeated_words(result)
 
-        if add_punctuation:
-            result = self.add_punctuation(result)
+            if add_punctuation:
+                result = self.add_punctuation(result)
 
-        if format_paragraphs:
-            result = self.format_paragraphs(result)
+            if format_paragraphs:
+                result = self.format_paragraphs(result)
 
         return result
 
@@ -0,0 +1,228 @@
+"""
+スパントレーサー - ジョブ単位の処理段階の所要時間を記録
+
+contextvars で現在のスパンを保持し、`span()` で子スパンを積む。トレースが
+開始されていないスレッド/コンテキストでは `span()` は何もしない（ほぼゼロコスト）。
+記録したスパンツリーは API 応答用の辞書、または Chrome トレース JSON
+（chrome://tracing / Perfetto で表示可能）として出力できる。外部サービスには依存しない。
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'Span', 'trace', 'span', 'current_span', 'bind_context',
+    'to_chrome_trace', 'write_chrome_trace', 'trace_output_dir', 'save_trace',
+    'MAX_SPANS_PER_TRACE',
+]
+
+# 1トレースあたりのスパン数上限（区間ごとの処理が長時間ファイルで肥大しないように）
+MAX_SPANS_PER_TRACE = 2000
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "kotoba_current_span", default=None
+)
+
+
+class _TraceState:
+    """1トレース内で共有する状態（スパン数カウント）"""
+
+    __slots__ = ("lock", "span_count", "dropped")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.span_count = 1
+        self.dropped = 0
+
+    def reserve(self) -> bool:
+        with self.lock:
+            if self.span_count >= MAX_SPANS_PER_TRACE:
+                self.dropped += 1
+                return False
+            self.span_count += 1
+            return True
+
+
+class Span:
+    """処理段階1つ分の計測区間"""
+
+    __slots__ = ("name", "attrs", "start", "end", "children", "thread_id", "_state")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None,
+                 state: Optional[_TraceState] = None):
+        self.name = name
+        self.attrs: Dict[str, Any] = dict(attrs or {})
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+        self.thread_id = threading.get_ident()
+        self._state = state or _TraceState()
+
+    @property
+    def duration(self) -> float:
+        """所要時間（秒）。未終了なら現在までの経過時間"""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attrs: Any) -> None:
+        """属性を追加"""
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """
+        API 応答用の辞書に変換
+
+        Args:
+            origin: 開始時刻の基準（Noneの場合は自身の開始時刻）
+
+        Returns:
+            name / start_ms（基準からの相対）/ duration_ms / attrs / children
+        """
+        if origin is None:
+            origin = self.start
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        attrs = dict(self.attrs)
+        if origin == self.start and self._state.dropped:
+            attrs["dropped_spans"] = self._state.dropped
+        if attrs:
+            data["attrs"] = attrs
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in list(self.children)]
+        return data
+
+    def walk(self) -> Iterator["Span"]:
+        """自身と全子孫を深さ優先で列挙"""
+        yield self
+        for child in list(self.children):
+            yield from child.walk()
+
+
+def current_span() -> Optional[Span]:
+    """現在のコンテキストで有効なスパン（トレース外なら None）"""
+    return _current.get()
+
+
+@contextmanager
+def _activate(s: Span) -> Iterator[Span]:
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+
+@contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Span]:
+    """
+    新しいトレース（ルートスパン）を開始
+
+    既にトレース中であっても独立したルートを作る（ジョブ単位で切り離すため）。
+    """
+    root = Span(name, attrs)
+    with _activate(root):
+        yield root
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """
+    現在のスパンの子スパンを記録
+
+    トレース外、または上限に達した場合は何も記録せず None を渡す。
+    """
+    parent = _current.get()
+    if parent is None or not parent._state.reserve():
+        yield None
+        return
+    child = Span(name, attrs, parent._state)
+    parent.children.append(child)
+    with _activate(child):
+        yield child
+
+
+def bind_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    現在のコンテキスト（スパン）を引き継いで fn を実行する関数を返す
+
+    ThreadPoolExecutor.submit 等、contextvars を自動で引き継がない実行先に渡す場合に使用。
+    """
+    ctx = contextvars.copy_context()
+
+    def _run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return _run
+
+
+def to_chrome_trace(root: Span) -> Dict[str, Any]:
+    """スパンツリーを Chrome トレースイベント形式（完了イベント "X"）に変換"""
+    pid = os.getpid()
+    events = []
+    for s in root.walk():
+        event: Dict[str, Any] = {
+            "name": s.name,
+            "cat": "kotoba",
+            "ph": "X",
+            "ts": round((s.start - root.start) * 1_000_000, 1),
+            "dur": round(s.duration * 1_000_000, 1),
+            "pid": pid,
+            "tid": s.thread_id,
+        }
+        if s.attrs:
+            event["args"] = {k: v if isinstance(v, (int, float, bool)) or v is None else str(v)
+                             for k, v in s.attrs.items()}
+        events.append(event)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def trace_output_dir() -> Optional[str]:
+    """Chrome トレース JSON の出力先（環境変数 KOTOBA_TRACE_DIR、未設定なら None）"""
+    return os.environ.get("KOTOBA_TRACE_DIR") or None
+
+
+def write_chrome_trace(root: Span, path: str) -> str:
+    """
+    Chrome トレース JSON をアトミックに書き出す
+
+    Returns:
+        書き出したファイルパス
+    """
+    from export.common import atomic_write_text
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    atomic_write_text(path, json.dumps(to_chrome_trace(root), ensure_ascii=False))
+    logger.debug(f"Chrome trace written: {path}")
+    return path
+
+
+def save_trace(root: Span, name: str) -> Optional[str]:
+    """
+    KOTOBA_TRACE_DIR が設定されていれば <name>.trace.json として書き出す
+
+    書き出し失敗は処理結果に影響させない（警告ログのみ）。
+
+    Returns:
+        書き出したファイルパス（無効・失敗時は None）
+    """
+    trace_dir = trace_output_dir()
+    if not trace_dir:
+        return None
+    try:
+        return write_chrome_trace(root, os.path.join(trace_dir, f"{name}.trace.json"))
+    except Exception as e:
+        logger.warning(f"Failed to write trace '{name}': {e}")
+        return None
@@ -8,6 +8,7 @@ import atexit
 import subprocess
 import tempfile
 import threading
+import time
 import torch
 from transformers import pipeline
 from typing import Optional, Dict, Any, List
@@ -17,6 +18,8 @@ from base_engine import BaseTranscriptionEngine
 from validators import Validator, ValidationError
 from config_manager import get_config
 from exceptions import ModelLoadError, TranscriptionFailedError, AudioFormatError
+import metrics
+import tracing
 
 # オプション: 音声前処理とカスタム語彙
 try:
@@ -37,10 +40,23 @@ config = get_config()
 # ロガーを早期に初期化（ffmpeg検証で使用するため）
 logger = logging.getLogger(__name__)
 
+# メトリクスのエンジンラベル
+ENGINE_METRIC_LABEL = "kotoba_whisper"
+
 # 動画コンテナ拡張子（ffmpegで事前に音声抽出が必要）
 VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.3gp'}
 
 
+def _result_audio_duration(result: Dict[str, Any]) -> Optional[float]:
+    """パイプライン出力の最終チャンク終了時刻から音声長（秒）を推定"""
+    chunks = result.get("chunks") or []
+    for chunk in reversed(chunks):
+        timestamp = chunk.get("timestamp") or ()
+        if len(timestamp) > 1 and timestamp[1] is not None:
+            return float(timestamp[1])
+    return None
+
+
 def _validate_ffmpeg_path(path: str) -> bool:
     """
     ffmpegパスの安全性を検証（PATHインジェクション対策）
@@ -268,6 +284,7 @@ class TranscriptionEngine(BaseTranscriptionEngine):
 
             try:
                 logger.info(f"Loading model: {self.model_name}")
+                load_start = time.perf_counter()
 
                 try:
                     # 設定されたデバイスでロード試行
@@ -284,6 +301,8 @@ class TranscriptionEngine(BaseTranscriptionEngine):
                         raise
 
                 self.is_loaded = True
+                metrics.MODEL_LOAD_SECONDS.labels(ENGINE_METRIC_LABEL).observe(
+                    time.perf_counter() - load_start)
                 return True
 
             except ModelLoadError:
@@ -412,6 +431,84 @@ class TranscriptionEngine(BaseTranscriptionEngine):
         logger.info(f"Audio extracted to: {temp_wav_path}")
         return temp_wav_path
 
+    def _build_generate_kwargs(self) -> Dict[str, Any]:
+        """設定とホットワードから generate_kwargs を構築"""
+        generate_kwargs = {
+            "language": config.get("model.whisper.language", default="ja"),
+            "task": config.get("model.whisper.task", default="transcribe"),
+        }
+
+        # ホットワード（初期プロンプト）を追加（有効な場合）
+        if self.vocabulary is not None:
+            prompt = self.vocabulary.get_whisper_prompt()
+            if prompt:
+                generate_kwargs["initial_prompt"] = prompt
+                logger.info(f"Using hotwords prompt: {prompt[:100]}...")
+        return generate_kwargs
+
+    def _apply_vocabulary(self, result: Dict[str, Any]) -> None:
+        """後処理: カスタム語彙の置換を適用"""
+        if self.vocabulary is None:
+            return
+        original_text = result.get("text", "")
+        corrected_text = self.vocabulary.apply_replacements(original_text)
+        if corrected_text != original_text:
+            result["text"] = corrected_text
+            logger.info("Applied vocabulary replacements")
+
+    def transcribe_audio(
+        self,
+        audio,
+        sample_rate: int = 16000,
+        return_timestamps: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        デコード済み音声（float32 モノラル配列）を文字起こし
+
+        ストリーミングアップロードのように、ファイル全体が揃う前に
+        確定した音声区間から処理する場合に使用する。
+
+        Args:
+            audio: 音声データ（NumPy配列、float32、-1.0〜1.0）
+            sample_rate: サンプリングレート
+            return_timestamps: タイムスタンプを返すか（Noneの場合は設定ファイルから取得）
+
+        Returns:
+            文字起こし結果（text, chunks を含む辞書。タイムスタンプは区間先頭からの相対秒）
+
+        Raises:
+            TranscriptionFailedError: 文字起こし処理失敗時
+        """
+        if return_timestamps is None:
+            return_timestamps = config.get("model.whisper.return_timestamps", default=True)
+        chunk_length_s = Validator.validate_chunk_length(
+            config.get("model.whisper.chunk_length_s", default=15)
+        )
+
+        start = time.perf_counter()
+        try:
+            with self._model_lock:
+                if self.model is None:
+                    self.load_model()
+                with tracing.span("inference", audio_seconds=round(len(audio) / sample_rate, 3)):
+                    result = self.model(
+                        {"raw": audio, "sampling_rate": sample_rate},
+                        chunk_length_s=chunk_length_s,
+                        return_timestamps=return_timestamps,
+                        generate_kwargs=self._build_generate_kwargs()
+                    )
+            self._apply_vocabulary(result)
+            metrics.record_transcription(ENGINE_METRIC_LABEL, time.perf_counter() - start,
+                                         len(audio) / sample_rate)
+            return result
+        except Exception as e:
+            logger.error(f"Transcription failed: {e}")
+            metrics.TRANSCRIPTION_ERRORS.labels(ENGINE_METRIC_LABEL).inc()
+            raise TranscriptionFailedError(f"Transcription failed for audio region: {e}") from e
+        finally:
+            if self.device == "cuda" and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
     def transcribe(
         self,
         audio_path: str,
@@ -466,7 +563,8 @@ class TranscriptionEngine(BaseTranscriptionEngine):
         file_ext = Path(validated_path).suffix.lower()
         if file_ext in VIDEO_EXTENSIONS:
             try:
-                temp_wav = self._extract_audio_ffmpeg(str(validated_path))
+                with tracing.span("ffmpeg_extract"):
+                    temp_wav = self._extract_audio_ffmpeg(str(validated_path))
                 temp_ascii_path = temp_wav
                 validated_path = Path(temp_wav)
                 logger.info(f"Video audio extracted to WAV: {temp_wav}")
@@ -490,7 +588,7 @@ class TranscriptionEngine(BaseTranscriptionEngine):
                         temp_fd, temp_ascii_path = tempfile.mkstemp(suffix=file_ext, prefix="transcribe_")
 
                         # バイナリモードで完全コピー（メタデータも含む）
-                        with open(validated_path, 'rb') as src:
+                        with tracing.span("ascii_temp_copy"), open(validated_path, 'rb') as src:
                             with os.fdopen(temp_fd, 'wb') as dst:
                                 # 大きなファイルにも対応するためチャンク単位でコピー
                                 chunk_size = 1024 * 1024  # 1MB
@@ -521,7 +619,8 @@ class TranscriptionEngine(BaseTranscriptionEngine):
         if self.preprocessor is not None:
             try:
                 logger.info("Applying audio preprocessing...")
-                processed_audio_path = self.preprocessor.preprocess(str(validated_path))
+                with tracing.span("preprocess"):
+                    processed_audio_path = self.preprocessor.preprocess(str(validated_path))
                 # 一時ファイルを追跡リストに追加
                 with self._temp_files_lock:
                     self._temp_files.append(str(processed_audio_path))
@@ -532,53 +631,42 @@ class TranscriptionEngine(BaseTranscriptionEngine):
 
         try:
             logger.info(f"Transcribing audio: {processed_audio_path}")
-            # 設定ファイルから言語とタスクを取得
-            language = config.get("model.whisper.language", default="ja")
-            task = config.get("model.whisper.task", default="transcribe")
-
-            # generate_kwargsを構築
-            generate_kwargs = {
-                "language": language,
-                "task": task
-            }
-
-            # ホットワード（初期プロンプト）を追加（有効な場合）
-            if self.vocabulary is not None:
-                prompt = self.vocabulary.get_whisper_prompt()
-                if prompt:
-                    generate_kwargs["initial_prompt"] = prompt
-                    logger.info(f"Using hotwords prompt: {prompt[:100]}...")
+            generate_kwargs = self._build_generate_kwargs()
+            start = time.perf_counter()
 
             # CRITICAL: モデルロード〜推論をアトミックに実行（PyTorchモデルの内部状態保護）
             # RLockにより load_model() 内での再入は安全
             with self._model_lock:
                 # モデル未ロードなら load_model() を呼び出す（ダブルチェックロッキング）
                 if self.model is None:
-                    self.load_model()
+                    with tracing.span("model_load"):
+                        self.load_model()
 
                 # 推論実行（ロック保持したまま）
-                result = self.model(
-                    str(processed_audio_path),  # Pathオブジェクトを文字列に変換
-                    chunk_length_s=chunk_length_s,
-                    return_timestamps=return_timestamps,
-                    generate_kwargs=generate_kwargs
-                )
-
-            # 後処理: カスタム語彙の置換を適用
-            if self.vocabulary is not None:
-                original_text = result.get("text", "")
-                corrected_text = self.vocabulary.apply_replacements(original_text)
-                if corrected_text != original_text:
-                    result["text"] = corrected_text
-                    logger.info("Applied vocabulary replacements")
+                with tracing.span("inference", chunk_length_s=chunk_length_s) as inference_span:
+                    result = self.model(
+                        str(processed_audio_path),  # Pathオブジェクトを文字列に変換
+                        chunk_length_s=chunk_length_s,
+                        return_timestamps=return_timestamps,
+                        generate_kwargs=generate_kwargs
+                    )
+                    if inference_span is not None:
+                        inference_span.set(audio_seconds=_result_audio_duration(result))
+
+            with tracing.span("vocabulary"):
+                self._apply_vocabulary(result)
+            metrics.record_transcription(ENGINE_METRIC_LABEL, time.perf_counter() - start,
+                                         _result_audio_duration(result))
 
             logger.info("Transcription completed successfully")
             return result
 
         except TranscriptionFailedError:
+            metrics.TRANSCRIPTION_ERRORS.labels(ENGINE_METRIC_LABEL).inc()
             raise
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
+            metrics.TRANSCRIPTION_ERRORS.labels(ENGINE_METRIC_LABEL).inc()
             raise TranscriptionFailedError(f"Transcription failed for '{audio_path}': {e}") from e
 
         finally:
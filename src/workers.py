@@ -7,7 +7,6 @@ main.py と monitor_app.py の両方から使用される
 import os
 import logging
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from PySide6.QtCore import QThread, Signal
 
@@ -25,6 +24,10 @@ from exceptions import (
 # SharedConstants / normalize_segments は constants.py から再エクスポート（後方互換性）
 from constants import SharedConstants, normalize_segments
 from transcription_worker_base import TranscriptionLogic
+from audio_metadata import get_audio_probe
+from optimized_pipeline import (
+    AudioDecodeStage, CallableStage, StagedPipeline, TranscriptionStage,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +74,7 @@ def stop_worker(worker, name: str, timeout: int = 10000,
 
 
 class BatchTranscriptionWorker(QThread):
-    """複数ファイルの並列文字起こし処理"""
+    """複数ファイルの文字起こし処理（デコード・推論・後処理を重ねて実行）"""
     progress = Signal(int, int, str)  # (完了数, 総数, ファイル名)
     file_finished = Signal(str, str, bool)  # (ファイルパス, 結果テキスト, 成功/失敗)
     all_finished = Signal(int, int)  # (成功数, 失敗数)
@@ -103,7 +106,11 @@ class BatchTranscriptionWorker(QThread):
         self.failed_count = 0
         self.lock = threading.Lock()
         self._cancel_event = threading.Event()  # スレッドセーフなキャンセルフラグ
-        self._executor = None  # ThreadPoolExecutor参照保持
+        self._pipeline = None  # StagedPipeline参照保持（キャンセル用）
+        self._transcription_stage = None
+        self._decode_stage = None  # 先行デコード段（デコード済み音声の保持枠を管理）
+        # 直近のバッチのステージ別稼働状況（StagedPipeline.get_utilization）
+        self.stage_utilization = {}
 
         # 共有TranscriptionEngineインスタンス（並列処理での再利用）
         self._shared_engine = None
@@ -113,221 +120,280 @@ class BatchTranscriptionWorker(QThread):
         """バッチ処理をキャンセル"""
         logger.info("Batch processing cancellation requested")
         self._cancel_event.set()
-        # ThreadPoolExecutorのシャットダウン（実行中のタスクは完了を待つ）
-        if self._executor:
-            self._executor.shutdown(wait=False)
+        # パイプラインの停止（各ステージは処理中のファイルを終えてから止まる）
+        if self._pipeline:
+            self._pipeline.stop()
 
     def process_single_file(self, audio_path: str):
-        """単一ファイルを処理"""
+        """単一ファイルを処理（デコード・推論・後処理を順に実行）"""
         # キャンセルチェック
         if self._cancel_event.is_set():
             return audio_path, "処理がキャンセルされました", False
 
         try:
             logger.info(f"Processing file: {audio_path}")
+            item = self._validate_item(audio_path)
+            return self._postprocess_item(self._infer_item(item))
+        except Exception as e:
+            return self._failure_result(audio_path, e)
 
-            # Validate file path first
-            try:
-                validated_path = Validator.validate_file_path(
-                    audio_path,
-                    must_exist=True
-                )
-            except ValidationError as e:
-                error_msg = f"ファイルパスが不正です: {audio_path}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
+    # --- パイプラインの各段 ---
+
+    def _validate_item(self, audio_path: str) -> dict:
+        """パスを検証（デコード段）"""
+        try:
+            validated_path = Validator.validate_file_path(
+                audio_path,
+                must_exist=True
+            )
+        except ValidationError as e:
+            error_msg = f"ファイルパスが不正です: {audio_path}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+        return {"source_path": audio_path, "audio_path": str(validated_path)}
+
+    def _should_predecode(self, path: str) -> bool:
+        """先行デコードするか（エンジン側で前処理する場合と長すぎるファイルは除く）"""
+        engine = self._shared_engine
+        if engine is not None and getattr(engine, "preprocessor", None) is not None:
+            return False
+        metadata = get_audio_probe().probe(path)
+        if metadata is None:
+            return True
+        if metadata.duration > SharedConstants.BATCH_PREDECODE_MAX_SECONDS:
+            return False
+        stage = self._decode_stage
+        available = stage.available_bytes if stage is not None else None
+        if available is None:
+            return True
+        # デコード後に保持枠へ入らない見込みならデコード自体を省く（float32 モノラル）
+        return metadata.duration * stage.sample_rate * 4 <= available
+
+    def _release_audio(self, item: dict) -> None:
+        """デコード済み音声を破棄し、先行デコードの保持枠を返す"""
+        if self._decode_stage is not None:
+            self._decode_stage.release(item)
+        else:
+            item.pop("audio", None)
+
+    def _infer_item(self, item: dict) -> dict:
+        """文字起こし（推論段）"""
+        audio_path = item["source_path"]
+        try:
+            # エンジンロックを取得（1つのファイルのみが同時にモデルを使用）
+            with self._engine_lock:
+                # 共有エンジンが未初期化の場合はロード
+                if self._shared_engine is None:
+                    logger.info("Initializing shared transcription engine...")
+                    self._shared_engine = TranscriptionEngine()
+                if self._shared_engine.model is None:
+                    self._shared_engine.load_model()
+                    logger.info("Shared transcription engine loaded successfully")
+                if self._shared_engine.preprocessor is not None:
+                    self._release_audio(item)  # 前処理はファイルから行う
+
+                if (self._transcription_stage is None
+                        or self._transcription_stage.engine is not self._shared_engine
+                        or self._transcription_stage.decode_stage is not self._decode_stage):
+                    self._transcription_stage = TranscriptionStage(self._shared_engine,
+                                                                   decode_stage=self._decode_stage)
+
+                # 文字起こし実行（ロック内で実行して並列実行を防ぐ）
+                return self._transcription_stage.process_one(item)
+        except ModelLoadError as e:
+            error_msg = f"モデルのロードに失敗しました: {audio_path}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+        except TranscriptionFailedError as e:
+            error_msg = f"文字起こしに失敗しました: {audio_path}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+        except FileNotFoundError as e:
+            error_msg = f"ファイルが見つかりません: {audio_path}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+        except PermissionError as e:
+            error_msg = f"ファイルへのアクセス権限がありません: {audio_path}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+        except MemoryError as e:
+            error_msg = f"メモリ不足です: {audio_path}"
+            logger.error(error_msg, exc_info=True)
+            raise InsufficientMemoryError(message=error_msg) from e
+        except (IOError, OSError) as e:
+            error_msg = f"ファイル読み込みエラー: {audio_path} - {e}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+        except ValueError as e:
+            error_msg = f"音声フォーマットエラー: {audio_path} - {e}"
+            logger.error(error_msg, exc_info=True)
+            raise AudioFormatError(error_msg) from e
+        except Exception as e:
+            error_msg = f"予期しないエラー ({type(e).__name__}): {audio_path}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+        finally:
+            self._release_audio(item)
+
+    def _postprocess_item(self, item: dict):
+        """話者分離・整形・保存（後処理段）"""
+        audio_path = item["source_path"]
+        result = item["transcription"]
+        text = result.get("text", "")
 
-            # Load transcription engine (shared instance with locking)
+        # Optional speaker diarization (failure is non-critical)
+        if self.enable_diarization:
             try:
-                # エンジンロックを取得（1つのファイルのみが同時にモデルを使用）
-                with self._engine_lock:
-                    # 共有エンジンが未初期化の場合はロード
-                    if self._shared_engine is None:
-                        logger.info("Initializing shared transcription engine...")
-                        self._shared_engine = TranscriptionEngine()
-                        self._shared_engine.load_model()
-                        logger.info("Shared transcription engine loaded successfully")
-
-                    # 文字起こし実行（ロック内で実行して並列実行を防ぐ）
-                    result = self._shared_engine.transcribe(str(validated_path), return_timestamps=True)
-                    text = result.get("text", "")
-            except ModelLoadError as e:
-                error_msg = f"モデルのロードに失敗しました: {audio_path}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
-            except TranscriptionFailedError as e:
-                error_msg = f"文字起こしに失敗しました: {audio_path}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
-            except FileNotFoundError as e:
-                error_msg = f"ファイルが見つかりません: {audio_path}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
-            except PermissionError as e:
-                error_msg = f"ファイルへのアクセス権限がありません: {audio_path}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
-            except MemoryError as e:
-                error_msg = f"メモリ不足です: {audio_path}"
-                logger.error(error_msg, exc_info=True)
-                raise InsufficientMemoryError(message=error_msg) from e
+                logger.debug(f"Applying speaker diarization to '{audio_path}'")
+                diarizer = FreeSpeakerDiarizer()
+                diar_segments = diarizer.diarize(item["audio_path"])
+                trans_segments = _normalize_segments(result)
+                text = diarizer.format_with_speakers(trans_segments, diar_segments)
+                logger.info(f"Speaker diarization completed for '{audio_path}'")
+            except ImportError as e:
+                logger.warning(
+                    f"Speaker diarization library not available for '{audio_path}': {e}",
+                    exc_info=False
+                )
             except (IOError, OSError) as e:
-                error_msg = f"ファイル読み込みエラー: {audio_path} - {e}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
-            except ValueError as e:
-                error_msg = f"音声フォーマットエラー: {audio_path} - {e}"
-                logger.error(error_msg, exc_info=True)
-                raise AudioFormatError(error_msg) from e
-            except Exception as e:
-                error_msg = f"予期しないエラー ({type(e).__name__}): {audio_path}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
-
-            # Optional speaker diarization (failure is non-critical)
-            if self.enable_diarization:
-                try:
-                    logger.debug(f"Applying speaker diarization to '{audio_path}'")
-                    diarizer = FreeSpeakerDiarizer()
-                    diar_segments = diarizer.diarize(str(validated_path))
-                    trans_segments = _normalize_segments(result)
-                    text = diarizer.format_with_speakers(trans_segments, diar_segments)
-                    logger.info(f"Speaker diarization completed for '{audio_path}'")
-                except ImportError as e:
-                    logger.warning(
-                        f"Speaker diarization library not available for '{audio_path}': {e}",
-                        exc_info=False
-                    )
-                except (IOError, OSError) as e:
-                    logger.warning(
-                        f"I/O error during diarization for '{audio_path}': {e}",
-                        exc_info=True
-                    )
-                except Exception as e:
-                    logger.warning(
-                        f"Speaker diarization failed for '{audio_path}': {type(e).__name__} - {e}",
-                        exc_info=True
-                    )
-                    # Continue with non-diarized text
-
-            # Text formatting（バッチ処理では常にルールベース句読点を使用）
-            try:
-                if self.formatter:
-                    formatted_text = self.formatter.format_all(
-                        text,
-                        remove_fillers=True,
-                        add_punctuation=True,  # バッチ処理ではルールベース句読点を使用
-                        format_paragraphs=True,  # バッチ処理ではルールベース段落整形を使用
-                        clean_repeated=True
-                    )
-                else:
-                    formatted_text = text
-            except ValidationError as e:
-                logger.warning(f"Text formatting validation error for '{audio_path}': {e}")
-                formatted_text = text  # Use unformatted text as fallback
+                logger.warning(
+                    f"I/O error during diarization for '{audio_path}': {e}",
+                    exc_info=True
+                )
             except Exception as e:
                 logger.warning(
-                    f"Text formatting failed for '{audio_path}': {type(e).__name__} - {e}",
+                    f"Speaker diarization failed for '{audio_path}': {type(e).__name__} - {e}",
                     exc_info=True
                 )
-                formatted_text = text  # Use unformatted text as fallback
-
-            # バッチ処理ではLLM補正をスキップ（速度重視）
-            # 単一ファイル処理でのみLLM補正を適用
+                # Continue with non-diarized text
 
-            # Save output file
-            try:
-                base_name = os.path.splitext(audio_path)[0]
-                output_file = f"{base_name}_文字起こし.txt"
-
-                # Validate output path (path traversal protection)
-                validated_output = Validator.validate_file_path(
-                    output_file,
-                    allowed_extensions=[".txt"],
-                    must_exist=False
+        # Text formatting（バッチ処理では常にルールベース句読点を使用）
+        try:
+            if self.formatter:
+                formatted_text = self.formatter.format_all(
+                    text,
+                    remove_fillers=True,
+                    add_punctuation=True,  # バッチ処理ではルールベース句読点を使用
+                    format_paragraphs=True,  # バッチ処理ではルールベース段落整形を使用
+                    clean_repeated=True
                 )
+            else:
+                formatted_text = text
+        except ValidationError as e:
+            logger.warning(f"Text formatting validation error for '{audio_path}': {e}")
+            formatted_text = text  # Use unformatted text as fallback
+        except Exception as e:
+            logger.warning(
+                f"Text formatting failed for '{audio_path}': {type(e).__name__} - {e}",
+                exc_info=True
+            )
+            formatted_text = text  # Use unformatted text as fallback
+
+        # バッチ処理ではLLM補正をスキップ（速度重視）
+        # 単一ファイル処理でのみLLM補正を適用
 
-                with open(str(validated_output), 'w', encoding='utf-8') as f:
-                    f.write(formatted_text)
+        # Save output file
+        try:
+            base_name = os.path.splitext(audio_path)[0]
+            output_file = f"{base_name}_文字起こし.txt"
+
+            # Validate output path (path traversal protection)
+            validated_output = Validator.validate_file_path(
+                output_file,
+                allowed_extensions=[".txt"],
+                must_exist=False
+            )
 
-                logger.info(f"Successfully processed '{audio_path}' -> '{output_file}'")
-                return audio_path, formatted_text, True
+            with open(str(validated_output), 'w', encoding='utf-8') as f:
+                f.write(formatted_text)
 
-            except ValidationError as e:
-                error_msg = f"出力パスが不正です: {audio_path}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
-            except (IOError, OSError, PermissionError) as e:
-                error_msg = f"出力ファイルの保存に失敗しました: {audio_path} - {e}"
-                logger.error(error_msg, exc_info=True)
-                raise FileProcessingError(error_msg) from e
+            logger.info(f"Successfully processed '{audio_path}' -> '{output_file}'")
+            return audio_path, formatted_text, True
 
-        except FileProcessingError as e:
+        except ValidationError as e:
+            error_msg = f"出力パスが不正です: {audio_path}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+        except (IOError, OSError, PermissionError) as e:
+            error_msg = f"出力ファイルの保存に失敗しました: {audio_path} - {e}"
+            logger.error(error_msg, exc_info=True)
+            raise FileProcessingError(error_msg) from e
+
+    def _failure_result(self, audio_path: str, error: BaseException):
+        """各段の例外を (パス, エラーメッセージ, False) に変換"""
+        if isinstance(error, FileProcessingError):
             # Already logged and formatted
-            return audio_path, str(e), False
-        except InsufficientMemoryError as e:
+            return audio_path, str(error), False
+        if isinstance(error, InsufficientMemoryError):
             error_msg = f"メモリ不足です。ファイルサイズが大きすぎる可能性があります: {audio_path}"
-            logger.error(error_msg, exc_info=True)
+            logger.error(error_msg, exc_info=error)
             return audio_path, error_msg, False
-        except AudioFormatError as e:
+        if isinstance(error, AudioFormatError):
             # Already logged
-            return audio_path, str(e), False
-        except Exception as e:
-            # Unexpected error - last resort fallback
-            error_msg = f"予期しないエラーが発生しました ({type(e).__name__}): {audio_path} - {e}"
-            logger.error(error_msg, exc_info=True)
-            return audio_path, error_msg, False
+            return audio_path, str(error), False
+        # Unexpected error - last resort fallback
+        error_msg = f"予期しないエラーが発生しました ({type(error).__name__}): {audio_path} - {error}"
+        logger.error(error_msg, exc_info=error)
+        return audio_path, error_msg, False
 
     def run(self):
-        """並列処理実行"""
+        """
+        3段のパイプラインで処理（デコード → 推論 → 後処理）
+
+        各段は別スレッドで動き、推論中に次のファイルのデコードと前のファイルの
+        後処理を進める。推論段は1つだけなのでエンジンは直列に使われる。
+        """
         try:
             total = len(self.audio_paths)
 
-            # ThreadPoolExecutorで並列処理
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                self._executor = executor  # 参照を保持（キャンセル用）
-
-                # 全ファイルを投入
-                future_to_path = {
-                    executor.submit(self.process_single_file, path): path
-                    for path in self.audio_paths
-                }
-
-                # 完了したものから処理
-                for future in as_completed(future_to_path):
-                    # キャンセルチェック
-                    if self._cancel_event.is_set():
-                        logger.info("Batch processing cancelled by user")
-                        break
-
-                    try:
-                        audio_path, result_text, success = future.result(timeout=600)  # 10分タイムアウト
-
-                        with self.lock:
-                            self.completed += 1
-                            if success:
-                                self.success_count += 1
-                            else:
-                                self.failed_count += 1
-                            completed_snapshot = self.completed
-
-                        # 進捗通知
-                        filename = os.path.basename(audio_path)
-                        self.progress.emit(completed_snapshot, total, filename)
-                        self.file_finished.emit(audio_path, result_text, success)
-
-                    except Exception as future_error:
-                        file_path = future_to_path.get(future, "unknown")
-                        logger.error(f"Future result error for {file_path}: {future_error}")
-                        with self.lock:
-                            self.completed += 1
-                            self.failed_count += 1
-                            completed_snapshot = self.completed
-                        filename = os.path.basename(file_path) if file_path != "unknown" else "unknown"
-                        self.progress.emit(completed_snapshot, total, filename)
-                        self.file_finished.emit(file_path, str(future_error), False)
-
-                self._executor = None  # 参照をクリア
+            # 前処理の有無で先行デコードの可否が決まるため、エンジンを先に用意（モデルは推論段でロード）
+            try:
+                with self._engine_lock:
+                    if self._shared_engine is None:
+                        self._shared_engine = TranscriptionEngine()
+            except Exception as e:
+                logger.warning(f"Failed to prepare transcription engine before batch: {e}")
+
+            self._decode_stage = AudioDecodeStage(
+                should_decode=self._should_predecode,
+                max_buffered_bytes=SharedConstants.BATCH_PREDECODE_MAX_BYTES,
+            )
+            validate = CallableStage("Validate", self._validate_item)
+            validate.set_next(self._decode_stage)
+            self._pipeline = StagedPipeline(
+                [validate,
+                 CallableStage("Inference", self._infer_item),
+                 CallableStage("PostProcess", self._postprocess_item)],
+                queue_sizes=[SharedConstants.BATCH_PREFETCH_FILES, 1, 1],
+            )
+
+            # 完了したものから（入力順に）通知
+            for audio_path, outcome, stage_error in self._pipeline.run(self.audio_paths):
+                # キャンセルチェック
+                if self._cancel_event.is_set():
+                    logger.info("Batch processing cancelled by user")
+                    break
+
+                if stage_error is None:
+                    audio_path, result_text, success = outcome
+                else:
+                    audio_path, result_text, success = self._failure_result(audio_path, stage_error)
+
+                with self.lock:
+                    self.completed += 1
+                    if success:
+                        self.success_count += 1
+                    else:
+                        self.failed_count += 1
+                    completed_snapshot = self.completed
+
+                # 進捗通知
+                filename = os.path.basename(audio_path)
+                self.progress.emit(completed_snapshot, total, filename)
+                self.file_finished.emit(audio_path, result_text, success)
+
+            self.stage_utilization = self._pipeline.get_utilization()
+            logger.info(f"Batch pipeline stage utilization: {self.stage_utilization}")
 
             # 全完了通知
             completion_msg = f"Batch processing completed: {self.success_count} success, {self.failed_count} failed"
@@ -341,7 +407,9 @@ class BatchTranscriptionWorker(QThread):
             logger.error(error_msg)
             self.error.emit(error_msg)
         finally:
-            self._executor = None  # 確実にクリア
+            self._pipeline = None  # 確実にクリア
+            self._transcription_stage = None
+            self._decode_stage = None
             # 共有エンジンのモデル解放
             try:
                 if hasattr(self, '_shared_engine') and self._shared_engine is not None:
@@ -0,0 +1,84 @@
+"""AdaptiveDecodingController 単体テスト"""
+
+import sys
+import os
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from api.adaptive_decoding import AdaptiveDecodingController, DEFAULT_PROFILES
+
+
+class TestAdaptiveDecodingController:
+    """負荷適応制御のテスト"""
+
+    def test_initial_profile_matches_legacy_beam(self):
+        """初期段階は従来の beam_size=1 相当"""
+        ctrl = AdaptiveDecodingController()
+        assert ctrl.current.name == "fast"
+        assert ctrl.current.beam_size == 1
+
+    def test_fallback_profile_excluded_by_default(self):
+        """フォールバックモデル未設定時はフォールバック段階を使わない"""
+        ctrl = AdaptiveDecodingController(target_latency=1.0, smoothing=1.0)
+        for _ in range(10):
+            ctrl.observe(audio_duration=1.0, processing_time=5.0, queue_lag=5.0)
+        assert ctrl.current.use_fallback_model is False
+        assert ctrl.current.name == "faster"
+
+    def test_overload_downgrades_immediately(self):
+        """遅延が目標を超えたら即座に軽量化"""
+        ctrl = AdaptiveDecodingController(target_latency=1.0, allow_fallback_model=True, smoothing=1.0)
+        profile = ctrl.observe(audio_duration=3.0, processing_time=2.0, queue_lag=0.5)
+        assert profile.name == "faster"
+        profile = ctrl.observe(audio_duration=1.5, processing_time=2.0, queue_lag=0.5)
+        assert profile.name == "fallback"
+        assert profile.use_fallback_model is True
+
+    def test_headroom_upgrades_after_patience(self):
+        """余裕が upgrade_patience 回続いたら1段階高精度化"""
+        ctrl = AdaptiveDecodingController(target_latency=2.0, upgrade_patience=3, smoothing=1.0)
+        for _ in range(2):
+            assert ctrl.observe(audio_duration=3.0, processing_time=0.3, queue_lag=0.0).name == "fast"
+        assert ctrl.observe(audio_duration=3.0, processing_time=0.3, queue_lag=0.0).name == "balanced"
+
+    def test_middle_band_resets_streak(self):
+        """余裕とも過負荷とも言えない計測は連続回数をリセット"""
+        ctrl = AdaptiveDecodingController(target_latency=2.0, upgrade_patience=2, smoothing=1.0)
+        ctrl.observe(audio_duration=3.0, processing_time=0.3, queue_lag=0.0)
+        ctrl.observe(audio_duration=3.0, processing_time=1.5, queue_lag=0.0)
+        ctrl.observe(audio_duration=3.0, processing_time=0.3, queue_lag=0.0)
+        assert ctrl.current.name == "fast"
+
+    def test_transition_callback(self):
+        """段階変更時にコールバックが呼ばれる"""
+        transitions = []
+        ctrl = AdaptiveDecodingController(
+            target_latency=1.0, smoothing=1.0,
+            on_transition=lambda old, new, reason: transitions.append((old.name, new.name, reason)),
+        )
+        ctrl.observe(audio_duration=3.0, processing_time=3.0, queue_lag=0.0)
+        assert transitions == [("fast", "faster", "overload")]
+        assert ctrl.get_stats()["transitions"] == 1
+
+    def test_disable_fallback_model(self):
+        """フォールバック無効化で軽量段階に戻る"""
+        ctrl = AdaptiveDecodingController(
+            initial_profile="fallback", allow_fallback_model=True,
+        )
+        assert ctrl.current.use_fallback_model is True
+        ctrl.disable_fallback_model()
+        assert ctrl.current.name == "faster"
+        assert all(not p.use_fallback_model for p in ctrl._profiles)
+
+    def test_invalid_target_latency(self):
+        """不正な目標遅延は ValueError"""
+        with pytest.raises(ValueError):
+            AdaptiveDecodingController(target_latency=0)
+
+    def test_profiles_ordered_by_cost(self):
+        """既定段階はビームサイズが単調非増加"""
+        beams = [p.beam_size for p in DEFAULT_PROFILES]
+        assert beams == sorted(beams, reverse=True)
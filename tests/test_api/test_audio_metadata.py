@@ -0,0 +1,167 @@
+"""音声メタデータ取得と長さに基づくバッチの並び替え・進捗のテスト"""
+
+import sys
+import os
+import struct
+import threading
+import time
+import wave
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+import audio_metadata
+from audio_metadata import (
+    AudioMetadata, AudioProbe, fill_unknown_durations, order_by_duration, read_header_metadata,
+)
+from api.job_store import JobStore
+from api.job_scheduler import JobScheduler
+from enhanced_batch_processor import EnhancedBatchProcessor
+
+
+def _wav(path, seconds, rate=16000, channels=1):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\x00\x00" * channels * int(rate * seconds))
+    return str(path)
+
+
+def _flac_header(path, seconds, rate=44100, channels=2, bits=16):
+    packed = (rate << 44) | ((channels - 1) << 41) | ((bits - 1) << 36) | int(rate * seconds)
+    streaminfo = b"\x00" * 10 + packed.to_bytes(8, "big") + b"\x00" * 16
+    path.write_bytes(b"fLaC" + bytes([0x80]) + len(streaminfo).to_bytes(3, "big") + streaminfo)
+    return str(path)
+
+
+class _RecordingBus:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, event_type, data=None):
+        with self._lock:
+            self.events.append((event_type, data or {}))
+
+    def of_type(self, event_type):
+        with self._lock:
+            return [d for t, d in self.events if t == event_type]
+
+
+class TestProbe:
+    """ヘッダ解析とキャッシュ"""
+
+    def test_wav_and_flac_headers(self, tmp_path):
+        assert read_header_metadata(_wav(tmp_path / "a.wav", 1.5, rate=8000, channels=2)) == \
+            AudioMetadata(1.5, 8000, 2)
+        assert read_header_metadata(_flac_header(tmp_path / "b.flac", 90)) == AudioMetadata(90.0, 44100, 2)
+        (tmp_path / "c.mp3").write_bytes(b"ID3\x03" + b"\x00" * 100)
+        assert read_header_metadata(str(tmp_path / "c.mp3")) is None
+
+    def test_streamed_wav_without_data_size(self, tmp_path):
+        path = _wav(tmp_path / "rec.wav", 2.0)
+        data = bytearray(open(path, "rb").read())
+        data[40:44] = struct.pack("<I", 0xFFFFFFFF)  # 書き出し途中のヘッダ
+        with open(path, "wb") as f:
+            f.write(data)
+        assert read_header_metadata(path).duration == pytest.approx(2.0)
+
+    def test_cached_by_path_and_mtime(self, tmp_path, monkeypatch):
+        reads = []
+        original = audio_metadata.read_header_metadata
+        monkeypatch.setattr(audio_metadata, "read_header_metadata", lambda p: reads.append(p) or original(p))
+        path = _wav(tmp_path / "a.wav", 1.0)
+        probe = AudioProbe(ffprobe_command=str(tmp_path / "no-ffprobe"))
+        assert probe.probe(path).duration == pytest.approx(1.0)
+        assert probe.probe(path).duration == pytest.approx(1.0)
+        assert len(reads) == 1
+
+        _wav(tmp_path / "a.wav", 3.0)
+        os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        assert probe.probe(path).duration == pytest.approx(3.0)
+        assert len(reads) == 2
+
+    def test_unknown_format_without_ffprobe(self, tmp_path):
+        (tmp_path / "a.m4a").write_bytes(b"\x00" * 64)
+        probe = AudioProbe(ffprobe_command=str(tmp_path / "no-ffprobe"))
+        assert probe.probe(str(tmp_path / "a.m4a")) is None
+        assert probe.probe(str(tmp_path / "missing.wav")) is None
+
+
+class TestOrdering:
+    """長さに基づく並び替え"""
+
+    def test_orders(self):
+        paths = ["a", "b", "c", "d"]
+        durations = {"a": 60.0, "b": 3600.0, "c": None, "d": 60.0}
+        assert order_by_duration(paths, durations) == paths
+        # 不明な c は判明分の平均（1240秒）として扱う
+        assert order_by_duration(paths, durations, "longest_first") == ["b", "c", "a", "d"]
+        assert order_by_duration(paths, durations, "shortest_first") == ["a", "d", "c", "b"]
+        with pytest.raises(ValueError):
+            order_by_duration(paths, durations, "random")
+
+    def test_fill_unknown_without_any_known(self):
+        assert fill_unknown_durations({"a": None, "b": 0.0}) == {"a": 1.0, "b": 1.0}
+
+
+class TestDurationProgress:
+    """長さで重み付けした進捗"""
+
+    def test_scheduler_orders_and_weights_batch(self):
+        bus = _RecordingBus()
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=bus,
+                                 handlers={"transcribe": lambda job, ctx: {"text": ""}})
+        durations = {"short.wav": 60.0, "long.wav": 540.0, "mid.wav": None}
+        _, jobs = scheduler.submit_batch(list(durations), durations=durations, order="longest_first")
+        assert [j.file_path for j in jobs] == ["long.wav", "mid.wav", "short.wav"]
+        assert jobs[0].options["audio_duration"] == 540.0
+        assert "audio_duration" not in jobs[1].options
+
+        scheduler.start()
+        try:
+            deadline = time.monotonic() + 10
+            while not bus.of_type("all_finished") and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            scheduler.stop()
+            scheduler.join(timeout=5)
+        progress = bus.of_type("batch_progress")
+        # 不明な mid.wav は判明分の平均（300秒）で重み付け
+        assert [p["progress"] for p in progress] == pytest.approx([540 / 900, 840 / 900, 1.0])
+        assert progress[-1]["eta_seconds"] == 0.0
+
+    def test_batch_events_aggregate_without_loading_jobs(self, monkeypatch):
+        store = JobStore(":memory:")
+        monkeypatch.setattr(store, "list", lambda *a, **k: pytest.fail("batch rows loaded"))
+        scheduler = JobScheduler(store=store, event_bus=_RecordingBus(),
+                                 handlers={"transcribe": lambda job, ctx: {"text": ""}})
+        batch_id, jobs = scheduler.submit_batch(["a.wav", "b.wav", "c.wav"],
+                                                durations={"a.wav": 100.0, "b.wav": 300.0})
+        store.claim_next()
+        store.finish(jobs[0].job_id, "completed", result={"text": "", "duplicate_of": "x.wav"})
+        store._conn.execute("UPDATE jobs SET started_at = finished_at - 50 WHERE job_id = ?",
+                            (jobs[0].job_id,))
+        scheduler._emit_batch_events(store.get(jobs[0].job_id))
+
+        progress = scheduler._bus.of_type("batch_progress")[0]
+        # c.wav は判明分の平均（200秒）: 100 / 600 完了、100秒分に50秒かかったので残り500秒分は250秒
+        assert progress["progress"] == pytest.approx(100 / 600)
+        assert progress["eta_seconds"] == pytest.approx(250.0, abs=0.5)
+        assert store.batch_summary(batch_id)["duplicates"] == 1
+
+    def test_processor_eta_weighted_by_duration(self, tmp_path):
+        files = [_wav(tmp_path / "long.wav", 3.0), _wav(tmp_path / "short.wav", 1.0)]
+        snapshots = []
+        processor = EnhancedBatchProcessor(enable_checkpoint=False, order="shortest_first")
+        result = processor.process_files(files, lambda p: {}, snapshots.append)
+
+        assert result["processed_files"] == files[::-1]
+        assert snapshots[0]["total_duration"] == pytest.approx(4.0)
+        assert snapshots[0]["processed_duration"] == pytest.approx(1.0)
+        # 1秒分の処理時間から残り3秒分を見積もる
+        assert snapshots[0]["estimated_remaining"] == pytest.approx(snapshots[0]["elapsed_time"] * 3)
+        assert processor.get_progress()["progress_percent"] == pytest.approx(100.0)
@@ -0,0 +1,151 @@
+"""EnhancedBatchProcessor の常駐ワーカープールと差分ジャーナル付きチェックポイントのテスト"""
+
+import sys
+import os
+import json
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+import enhanced_batch_processor as ebp_module
+from enhanced_batch_processor import CheckpointManager, EnhancedBatchProcessor
+
+
+class _Crash(BaseException):
+    """プロセスの強制終了の代わり（Exception ではないので処理側で捕捉されない）"""
+
+
+def _processor(checkpoint_dir):
+    processor = EnhancedBatchProcessor(enable_checkpoint=True)
+    processor.checkpoint_manager = CheckpointManager(str(checkpoint_dir))
+    return processor
+
+
+class TestJournal:
+    """CheckpointManager の差分ジャーナル"""
+
+    def test_records_replayed_over_snapshot(self, tmp_path):
+        cm = CheckpointManager(str(tmp_path))
+        cm.save("b1", [], [], ["a.wav", "b.wav", "c.wav"], {})
+        cm.record("b1", "b.wav")
+        cm.record("b1", "a.wav", error="decode error")
+        cm.record("other", "c.wav")  # 別バッチの記録は無視
+        cm.close()
+        with open(cm.journal_file, "a", encoding="utf-8") as f:
+            f.write('{"batch_id": "b1", "file": "c.w')  # 書きかけの行
+
+        loaded = CheckpointManager(str(tmp_path)).load("b1")
+        assert loaded["processed_files"] == ["b.wav"]
+        assert [f["file"] for f in loaded["failed_files"]] == ["a.wav"]
+        assert loaded["remaining_files"] == ["c.wav"]
+        assert CheckpointManager(str(tmp_path)).get_resume_info()["remaining_count"] == 1
+
+    def test_save_compacts_journal(self, tmp_path):
+        cm = CheckpointManager(str(tmp_path))
+        cm.save("b1", [], [], ["a.wav", "b.wav"], {})
+        cm.record("b1", "a.wav")
+        cm.save("b1", ["a.wav"], [], ["b.wav"], {})
+        assert os.path.getsize(cm.journal_file) == 0
+        assert cm.load("b1")["processed_files"] == ["a.wav"]
+
+        cm.clear()
+        assert not cm.journal_file.exists() and not cm.checkpoint_file.exists()
+
+
+class TestPersistentPool:
+    """常駐プールとクラッシュ後の再開"""
+
+    def test_single_pool_for_whole_batch(self, tmp_path, monkeypatch):
+        created = []
+        original = ebp_module.ThreadPoolExecutor
+
+        def tracking(*args, **kwargs):
+            created.append(kwargs)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(ebp_module, "ThreadPoolExecutor", tracking)
+        files = [f"f{i}.wav" for i in range(25)]
+        processor = _processor(tmp_path)
+        result = processor.process_files(files, lambda p: {"text": p}, batch_id="b1")
+
+        assert len(created) == 1
+        assert result["success"] and result["processed_files"] == files
+        assert processor.get_progress()["remaining_files"] == 0
+        # 完了時にはスナップショットへ書き直されている
+        with open(processor.checkpoint_manager.checkpoint_file, encoding="utf-8") as f:
+            assert json.load(f)["remaining_files"] == []
+
+    def test_concurrency_follows_current_workers(self, tmp_path):
+        processor = _processor(tmp_path)
+        processor.max_workers = processor.current_workers = 3
+        lock = threading.Lock()
+        active, started = [0], {}
+
+        def work(path):
+            with lock:
+                active[0] += 1
+                started[path] = active[0]
+            if path == "f0.wav":
+                processor.current_workers = 1  # メモリ逼迫で縮小した状態
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return {"text": path}
+
+        files = [f"f{i}.wav" for i in range(8)]
+        result = processor.process_files(files, work, batch_id="b1")
+        assert result["processed_files"] and len(result["processed_files"]) == 8
+        assert max(started.values()) > 1
+        # 縮小後に開始したファイルは1件ずつ実行される
+        assert all(started[f] == 1 for f in files[3:])
+
+    def test_resume_after_crash_is_exact(self, tmp_path):
+        files = [f"f{i}.wav" for i in range(12)]
+        calls = []
+        lock = threading.Lock()
+
+        def flaky(path):
+            with lock:
+                calls.append(path)
+            if path == "f3.wav":
+                raise RuntimeError("decode error")
+            return {"text": path}
+
+        def crash_after_seven(stats):
+            if stats["processed_count"] + stats["failed_count"] == 7:
+                raise _Crash()
+
+        processor = _processor(tmp_path)
+        with pytest.raises(_Crash):
+            processor.process_files(files, flaky, crash_after_seven, batch_id="b1")
+        # スナップショットは開始時のまま、完了はジャーナルにだけ記録されている
+        with open(processor.checkpoint_manager.checkpoint_file, encoding="utf-8") as f:
+            assert json.load(f)["processed_files"] == []
+
+        first_run = set(calls[:7])
+        calls.clear()
+        resumed = _processor(tmp_path)
+        result = resumed.process_files(files, flaky, batch_id="b1")
+
+        assert first_run.isdisjoint(calls)
+        assert sorted(result["processed_files"] + [f["file"] for f in result["failed_files"]]) == sorted(files)
+        assert [f["file"] for f in result["failed_files"]] == ["f3.wav"]
+        assert result["stats"]["processed_count"] == 11
+
+    def test_cancel_returns_pending_files(self, tmp_path):
+        files = [f"f{i}.wav" for i in range(6)]
+        processor = _processor(tmp_path)
+
+        def cancel_on_second(path):
+            if path == "f1.wav":
+                processor.cancel()
+            return {"text": path}
+
+        result = processor.process_files(files, cancel_on_second, batch_id="b1")
+        assert not result["success"]
+        info = processor.checkpoint_manager.get_resume_info()
+        assert info["remaining_files"] == files[len(result["processed_files"]):]
@@ -0,0 +1,208 @@
+"""内容フィンガープリントによる重複録音検出のテスト"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+import content_index as content_index_module
+from content_index import (
+    ContentIndex, SAMPLE_BLOCK_SIZE, quick_fingerprint, transcript_output_path,
+)
+from api.job_store import JobStore
+from api.job_scheduler import JobScheduler
+from api.folder_monitor_service import FolderMonitorService
+
+
+class _RecordingBus:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, event_type, data=None):
+        with self._lock:
+            self.events.append((event_type, data or {}))
+
+    def of_type(self, event_type):
+        with self._lock:
+            return [d for t, d in self.events if t == event_type]
+
+
+def _recording(path, size=SAMPLE_BLOCK_SIZE * 8, fill=b"\x01"):
+    data = bytearray(fill * size)
+    data[:4] = b"RIFF"
+    path.write_bytes(bytes(data))
+    past = time.time() - 60
+    os.utime(path, (past, past))
+    return str(path)
+
+
+def _transcribed(path, text):
+    with open(transcript_output_path(path), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def full_hash_calls(monkeypatch):
+    calls = []
+    original = content_index_module.full_hash
+    monkeypatch.setattr(content_index_module, "full_hash", lambda p: calls.append(p) or original(p))
+    return calls
+
+
+class TestFingerprint:
+    """フィンガープリントと全体ハッシュによる確認"""
+
+    def test_copy_under_new_name_detected(self, tmp_path, full_hash_calls):
+        index = ContentIndex(str(tmp_path / "index.jsonl"))
+        original = _recording(tmp_path / "会議.wav")
+        _transcribed(original, "本日の議題です")
+        index.record(original)
+
+        unrelated = _recording(tmp_path / "other.wav", fill=b"\x02")
+        assert index.find_duplicate(unrelated) is None
+        assert full_hash_calls == []  # 一致しなければ全体は読まない
+
+        copy = tmp_path / "会議 (1).wav"
+        copy.write_bytes((tmp_path / "会議.wav").read_bytes())
+        match = index.find_duplicate(str(copy))
+        assert match.original_path == original
+        assert len(full_hash_calls) == 2
+
+        result = index.reuse(match, str(copy))
+        assert result["duplicate_of"] == original
+        with open(transcript_output_path(str(copy)), encoding="utf-8") as f:
+            assert f.read() == "本日の議題です"
+        assert len(index) == 2
+
+    def test_reused_only_with_same_output_options(self, tmp_path):
+        index = ContentIndex(str(tmp_path / "index.jsonl"))
+        original = _recording(tmp_path / "a.wav")
+        _transcribed(original, "話者1: こんにちは")
+        index.record(original, options={"enable_diarization": True, "write_output": True})
+
+        copy = tmp_path / "b.wav"
+        copy.write_bytes((tmp_path / "a.wav").read_bytes())
+        assert index.find_duplicate(str(copy)) is None
+        assert index.find_duplicate(str(copy), options={"remove_fillers": True,
+                                                        "enable_diarization": True}) is None
+        # 出力に影響しないオプションは無視する
+        match = index.find_duplicate(str(copy), options={"enable_diarization": True})
+        assert match is not None and match.original_path == original
+
+        index.reuse(match, str(copy))
+        third = tmp_path / "c.wav"
+        third.write_bytes((tmp_path / "a.wav").read_bytes())
+        assert index.find_duplicate(str(third), options={"enable_diarization": True}) is not None
+        assert index.find_duplicate(str(third)) is None
+
+    def test_sampled_collision_rejected_by_full_hash(self, tmp_path):
+        index = ContentIndex(str(tmp_path / "index.jsonl"))
+        original = _recording(tmp_path / "a.wav")
+        _transcribed(original, "a")
+        index.record(original)
+
+        # サンプルされない位置だけが異なる → フィンガープリントは一致するが内容は別
+        data = bytearray((tmp_path / "a.wav").read_bytes())
+        data[SAMPLE_BLOCK_SIZE + 10] ^= 0xFF
+        other = tmp_path / "b.wav"
+        other.write_bytes(bytes(data))
+        assert quick_fingerprint(str(other)) == quick_fingerprint(original)
+        assert index.find_duplicate(str(other)) is None
+
+    def test_missing_original_or_output_not_reused(self, tmp_path):
+        index = ContentIndex(str(tmp_path / "index.jsonl"))
+        original = _recording(tmp_path / "a.wav")
+        index.record(original)
+        copy = tmp_path / "b.wav"
+        copy.write_bytes((tmp_path / "a.wav").read_bytes())
+        assert index.find_duplicate(str(copy)) is None  # 出力がない
+
+        _transcribed(original, "a")
+        os.remove(original)
+        assert index.find_duplicate(str(copy)) is None  # 元ファイルで確認できない
+
+    def test_falls_back_when_latest_original_deleted(self, tmp_path):
+        index = ContentIndex(str(tmp_path / "index.jsonl"))
+        first = _recording(tmp_path / "a.wav")
+        _transcribed(first, "a")
+        index.record(first)
+        second = tmp_path / "b.wav"
+        second.write_bytes((tmp_path / "a.wav").read_bytes())
+        _transcribed(str(second), "a")
+        index.record(str(second))
+
+        # 最後に記録した方（b.wav）が消えた — 古い候補で確認できる
+        os.remove(second)
+        copy = tmp_path / "c.wav"
+        copy.write_bytes((tmp_path / "a.wav").read_bytes())
+        match = index.find_duplicate(str(copy))
+        assert match is not None and match.original_path == first
+        # 消えた候補は索引から外れる
+        assert len(index) == 1
+
+    def test_persisted(self, tmp_path):
+        original = _recording(tmp_path / "a.wav")
+        _transcribed(original, "a")
+        index = ContentIndex(str(tmp_path / "index.jsonl"))
+        index.record(original)
+        index.close()
+
+        copy = tmp_path / "b.wav"
+        copy.write_bytes((tmp_path / "a.wav").read_bytes())
+        assert ContentIndex(str(tmp_path / "index.jsonl")).find_duplicate(str(copy)) is not None
+
+
+class TestStatistics:
+    """監視・バッチの統計"""
+
+    def test_monitor_reuses_instead_of_queueing(self, tmp_path):
+        folder = tmp_path / "watched"
+        folder.mkdir()
+        index = ContentIndex(str(tmp_path / "index.jsonl"))
+        original = _recording(tmp_path / "uploaded.wav")
+        _transcribed(original, "既存の結果")
+        index.record(original)
+        copy = folder / "copy.wav"
+        copy.write_bytes((tmp_path / "uploaded.wav").read_bytes())
+        os.utime(copy, (time.time() - 60, time.time() - 60))
+        fresh = _recording(folder / "fresh.wav", fill=b"\x03")
+
+        bus = _RecordingBus()
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=bus,
+                                 handlers={"transcribe": lambda job, ctx: {"text": ""}})
+        monitor = FolderMonitorService(str(folder), event_bus=bus, use_events=False,
+                                       scheduler=scheduler, content_index=index)
+        monitor._dispatch(monitor.get_unprocessed_files())
+
+        queued = [scheduler.get(job_id).file_path for job_id in scheduler.store.queued_ids("monitor")]
+        assert queued == [fresh]
+        assert monitor.is_processed(str(copy))
+        assert monitor.get_status()["duplicate_files"] == 1
+        assert [d["files"] for d in bus.of_type("new_files_detected")] == [[fresh]]
+
+    def test_batch_reports_duplicates(self):
+        def handler(job, ctx):
+            if job.file_path == "copy.wav":
+                return {"text": "t", "duplicate_of": "orig.wav"}
+            return {"text": "t"}
+
+        bus = _RecordingBus()
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=bus,
+                                 handlers={"transcribe": handler})
+        scheduler.submit_batch(["orig.wav", "copy.wav"])
+        scheduler.start()
+        try:
+            deadline = time.monotonic() + 10
+            while not bus.of_type("all_finished") and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            scheduler.stop()
+            scheduler.join(timeout=5)
+        assert [d["duplicate_of"] for d in bus.of_type("file_finished")] == [None, "orig.wav"]
+        assert bus.of_type("all_finished")[0]["duplicate_count"] == 1
@@ -0,0 +1,281 @@
+"""EventBus フィルタ・コアレス・終端イベント保証・emit コストのテスト"""
+
+import asyncio
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from api.event_bus import EventBus
+
+
+async def _drain(bus, **subscribe_kwargs):
+    """購読を開始し、受信イベントを返すタスクとリストを作成"""
+    received = []
+
+    async def consumer():
+        async for event in bus.subscribe(**subscribe_kwargs):
+            received.append(event)
+            if event["type"] == "done":
+                break
+
+    task = asyncio.create_task(consumer())
+    await asyncio.sleep(0.02)
+    return task, received
+
+
+class TestTopicFilter:
+    """topics / job_id フィルタ"""
+
+    @pytest.mark.asyncio
+    async def test_topic_filter(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        task, received = await _drain(bus, topics=["file_finished", "done"])
+
+        bus.emit("progress", {"value": 10})
+        bus.emit("file_finished", {"file_path": "a.wav"})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert [e["type"] for e in received] == ["file_finished", "done"]
+
+    @pytest.mark.asyncio
+    async def test_topic_prefix_filter(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        task, received = await _drain(bus, topics=["batch_*", "done"])
+
+        bus.emit("batch_progress", {"completed": 1})
+        bus.emit("text_ready", {"text": "x"})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert [e["type"] for e in received] == ["batch_progress", "done"]
+
+    @pytest.mark.asyncio
+    async def test_job_filter(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        task, received = await _drain(bus, job_id="job-1")
+
+        bus.emit("finished", {"job_id": "job-2", "text": "other"})
+        bus.emit("finished", {"job_id": "job-1", "text": "mine"})
+        bus.emit("done", {"job_id": "job-1"})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert [e["data"]["text"] for e in received if e["type"] == "finished"] == ["mine"]
+
+
+class TestCoalescing:
+    """最新値コアレス"""
+
+    @pytest.mark.asyncio
+    async def test_progress_coalesced_to_latest(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        received = []
+
+        async def consumer():
+            async for event in bus.subscribe():
+                received.append(event)
+                if event["type"] == "done":
+                    break
+
+        task = asyncio.create_task(consumer())
+        await asyncio.sleep(0.02)
+
+        # コンシューマが走る前に同一ループ tick で大量に emit
+        for i in range(100):
+            bus.emit("progress", {"value": i})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        progress = [e for e in received if e["type"] == "progress"]
+        assert len(progress) == 1
+        assert progress[0]["data"]["value"] == 99
+
+    @pytest.mark.asyncio
+    async def test_coalescing_is_per_job(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        task, received = await _drain(bus)
+
+        for i in range(10):
+            bus.emit("progress", {"job_id": "a", "value": i})
+            bus.emit("progress", {"job_id": "b", "value": i * 2})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        progress = {e["data"]["job_id"]: e["data"]["value"] for e in received if e["type"] == "progress"}
+        assert progress == {"a": 9, "b": 18}
+        assert len([e for e in received if e["type"] == "progress"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_coalesced_delivery_keeps_seq_order(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        task, received = await _drain(bus)
+
+        bus.emit("progress", {"job_id": "a", "value": 1})
+        bus.emit("text_ready", {"job_id": "a", "text": "x"})
+        bus.emit("progress", {"job_id": "a", "value": 2})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        seqs = [e["seq"] for e in received]
+        assert seqs == sorted(seqs)
+        assert [(e["type"], e["data"].get("value")) for e in received] == [
+            ("text_ready", None), ("progress", 2), ("done", None)]
+
+    @pytest.mark.asyncio
+    async def test_not_coalesced_past_terminal_event(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        task, received = await _drain(bus)
+
+        bus.emit("progress", {"job_id": "a", "value": 1})
+        bus.emit("file_finished", {"job_id": "a"})
+        bus.emit("progress", {"job_id": "a", "value": 2})
+        bus.emit("progress", {"job_id": "a", "value": 3})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert [(e["type"], e["data"].get("value")) for e in received] == [
+            ("progress", 1), ("file_finished", None), ("progress", 3), ("done", None)]
+        seqs = [e["seq"] for e in received]
+        assert seqs == sorted(seqs)
+
+    @pytest.mark.asyncio
+    async def test_non_coalesced_events_all_delivered(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        task, received = await _drain(bus)
+
+        for i in range(20):
+            bus.emit("text_ready", {"text": str(i)})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert len([e for e in received if e["type"] == "text_ready"]) == 20
+
+
+class TestTerminalDelivery:
+    """終端イベントはキュー満杯でも破棄されない"""
+
+    @pytest.mark.asyncio
+    async def test_terminal_events_survive_overflow(self):
+        bus = EventBus(maxsize=5)
+        bus.set_loop(asyncio.get_running_loop())
+        task, received = await _drain(bus)
+
+        bus.emit("file_finished", {"file_path": "first.wav"})
+        for i in range(50):
+            bus.emit("text_ready", {"text": str(i)})
+        bus.emit("finished", {"text": "final"})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        types = [e["type"] for e in received]
+        assert "file_finished" in types
+        assert "finished" in types
+        assert types[0] == "file_finished"
+        stats = bus.get_stats()
+        assert stats == [] or stats[0]["dropped"] > 0
+
+
+@pytest.mark.performance
+class TestEmitCostBenchmark:
+    """emit コストのベンチマーク（10購読者・1kHz）"""
+
+    @pytest.mark.asyncio
+    async def test_single_loop_callback_per_emit(self):
+        """emit 1回あたりのループコールバックは購読者数によらず1回"""
+        bus = EventBus()
+        loop = asyncio.get_running_loop()
+        bus.set_loop(loop)
+
+        tasks = []
+        for _ in range(10):
+            async def consumer():
+                async for event in bus.subscribe():
+                    if event["type"] == "done":
+                        break
+            tasks.append(asyncio.create_task(consumer()))
+        await asyncio.sleep(0.05)
+
+        calls = []
+        original = loop.call_soon_threadsafe
+
+        def counting(*args, **kwargs):
+            calls.append(args[0])
+            return original(*args, **kwargs)
+
+        loop.call_soon_threadsafe = counting
+        try:
+            for i in range(100):
+                bus.emit("progress", {"value": i})
+        finally:
+            del loop.call_soon_threadsafe
+        bus.emit("done", {})
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=3.0)
+
+        assert len(calls) == 100
+
+    @pytest.mark.asyncio
+    async def test_emit_cost_10_subscribers_1khz(self):
+        """10購読者に 1kHz で progress / volume を2秒間 emit したときのコスト"""
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        counts = [0] * 10
+
+        async def consumer(idx):
+            async for event in bus.subscribe():
+                counts[idx] += 1
+                if event["type"] == "done":
+                    break
+
+        tasks = [asyncio.create_task(consumer(i)) for i in range(10)]
+        await asyncio.sleep(0.05)
+
+        n_events = 2000
+        emit_times = []
+
+        def producer():
+            interval = 0.001
+            next_t = time.perf_counter()
+            for i in range(n_events):
+                t0 = time.perf_counter()
+                event_type = "progress" if i % 2 else "volume_changed"
+                bus.emit(event_type, {"value": i})
+                emit_times.append(time.perf_counter() - t0)
+                next_t += interval
+                delay = next_t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+        thread = threading.Thread(target=producer)
+        wall_start = time.perf_counter()
+        thread.start()
+        while thread.is_alive():
+            await asyncio.sleep(0.01)
+        wall = time.perf_counter() - wall_start
+        bus.emit("done", {})
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5.0)
+
+        emit_times.sort()
+        mean_us = sum(emit_times) / len(emit_times) * 1e6
+        p99_us = emit_times[int(len(emit_times) * 0.99)] * 1e6
+        delivered = sum(counts)
+        print(f"\nEventBus emit: subscribers=10 events={n_events} wall={wall:.2f}s "
+              f"mean={mean_us:.1f}us p99={p99_us:.1f}us delivered={delivered} "
+              f"(uncoalesced would be {n_events * 10 + 10})")
+
+        # コアレスにより配信件数は発行件数×購読者数を超えない
+        assert delivered <= n_events * 10 + 10
+        assert mean_us < 1000
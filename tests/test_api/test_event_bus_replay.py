@@ -0,0 +1,279 @@
+"""EventBus 連番・リプレイログ（EventLog）テスト"""
+
+import asyncio
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from api.event_bus import EventBus
+from api.event_log import EventLog
+
+
+def _event(seq, event_type="text_ready"):
+    return {"type": event_type, "data": {"n": seq}, "timestamp": 0.0, "seq": seq}
+
+
+class TestEventLog:
+    """リプレイログ単体"""
+
+    def test_since_returns_newer_events(self):
+        log = EventLog(maxlen=10)
+        for seq in range(1, 6):
+            log.append(_event(seq))
+        events, gap = log.since(3)
+        assert [e["seq"] for e in events] == [4, 5]
+        assert gap is False
+        assert log.last_seq == 5
+
+    def test_gap_when_evicted(self):
+        log = EventLog(maxlen=3)
+        for seq in range(1, 8):
+            log.append(_event(seq))
+        events, gap = log.since(2)
+        assert [e["seq"] for e in events] == [5, 6, 7]
+        assert gap is True
+
+    def test_stale_seq_after_restart(self):
+        log = EventLog(maxlen=10)
+        for seq in range(1, 4):
+            log.append(_event(seq))
+        events, gap = log.since(100)
+        assert [e["seq"] for e in events] == [1, 2, 3]
+        assert gap is True
+
+    def test_spill_to_disk(self, tmp_path):
+        path = str(tmp_path / "events.jsonl")
+        log = EventLog(maxlen=3, spill_path=path)
+        for seq in range(1, 11):
+            log.append(_event(seq))
+        events, gap = log.since(0)
+        assert [e["seq"] for e in events] == list(range(1, 11))
+        assert gap is False
+        log.close()
+
+    def test_spill_rotation_bounds_disk(self, tmp_path):
+        path = str(tmp_path / "events.jsonl")
+        log = EventLog(maxlen=2, spill_path=path, spill_max_bytes=300)
+        for seq in range(1, 101):
+            log.append(_event(seq))
+        events, gap = log.since(0)
+        seqs = [e["seq"] for e in events]
+        assert gap is True
+        assert seqs == sorted(seqs)
+        assert seqs[-1] == 100
+        assert os.path.getsize(path) <= 300
+        assert log.oldest_seq == seqs[0]
+        log.close()
+
+
+class TestEventBusReplay:
+    """subscribe(since=...) によるリプレイ"""
+
+    @pytest.mark.asyncio
+    async def test_events_have_monotonic_seq(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        received = []
+
+        async def consumer():
+            async for event in bus.subscribe():
+                received.append(event)
+                if event["type"] == "done":
+                    break
+
+        task = asyncio.create_task(consumer())
+        await asyncio.sleep(0.02)
+        for i in range(5):
+            bus.emit("text_ready", {"i": i})
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        seqs = [e["seq"] for e in received]
+        assert seqs == sorted(seqs)
+        assert len(set(seqs)) == len(seqs)
+        assert bus.last_seq == seqs[-1]
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_missed_events(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+
+        bus.emit("file_finished", {"file_path": "a.wav"})
+        last_seen = bus.last_seq
+        # 切断中に発行されたイベント
+        bus.emit("file_finished", {"file_path": "b.wav"})
+        bus.emit("all_finished", {"success_count": 2})
+
+        received = []
+
+        async def consumer():
+            async for event in bus.subscribe(since=last_seen):
+                received.append(event)
+                if event["type"] == "done":
+                    break
+
+        task = asyncio.create_task(consumer())
+        await asyncio.sleep(0.02)
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert [e["type"] for e in received] == ["file_finished", "all_finished", "done"]
+        assert received[0]["data"]["file_path"] == "b.wav"
+
+    @pytest.mark.asyncio
+    async def test_no_duplicates_with_pending_dispatch(self):
+        """リプレイ対象がライブ配信キューにも残っていても重複しない"""
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        received = []
+
+        async def other():
+            async for event in bus.subscribe():
+                if event["type"] == "done":
+                    break
+
+        other_task = asyncio.create_task(other())
+        await asyncio.sleep(0.02)
+
+        # 既存購読者がいるため _dispatch が予約されたまま新規購読がリプレイする
+        bus.emit("text_ready", {"text": "x"})
+        bus.emit("text_ready", {"text": "y"})
+
+        async def consumer():
+            async for event in bus.subscribe(since=0):
+                received.append(event)
+                if event["type"] == "done":
+                    break
+
+        task = asyncio.create_task(consumer())
+        await asyncio.sleep(0.02)
+        bus.emit("done", {})
+        await asyncio.wait_for(asyncio.gather(task, other_task), timeout=3.0)
+
+        assert [e["data"].get("text") for e in received[:2]] == ["x", "y"]
+        assert len(received) == 3
+
+    @pytest.mark.asyncio
+    async def test_gap_event_when_log_overflowed(self):
+        bus = EventBus(replay_size=3)
+        bus.set_loop(asyncio.get_running_loop())
+        for i in range(10):
+            bus.emit("text_ready", {"i": i})
+
+        received = []
+
+        async def consumer():
+            async for event in bus.subscribe(since=1):
+                received.append(event)
+                if event["type"] == "done":
+                    break
+
+        task = asyncio.create_task(consumer())
+        await asyncio.sleep(0.02)
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert received[0]["type"] == "replay_gap"
+        assert received[0]["data"] == {"since": 1, "oldest_seq": 8}
+        assert [e["data"]["i"] for e in received[1:4]] == [7, 8, 9]
+
+    @pytest.mark.asyncio
+    async def test_reconnect_after_coalescing_across_terminal(self):
+        """コアレス後も配信は連番順 — 最後に受け取った seq からの再接続で終端イベントを失わない"""
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        received = []
+
+        async def first_connection():
+            async for event in bus.subscribe():
+                received.append(event)
+                if event["type"] == "progress" and event["data"]["value"] == 2:
+                    break  # 接続断
+
+        task = asyncio.create_task(first_connection())
+        await asyncio.sleep(0.02)
+        bus.emit("progress", {"job_id": "a", "value": 1})
+        bus.emit("file_finished", {"job_id": "a"})
+        bus.emit("progress", {"job_id": "a", "value": 2})
+        bus.emit("all_finished", {"job_id": "a"})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        last_seq = received[-1]["seq"]
+        assert [e["type"] for e in received] == ["progress", "file_finished", "progress"]
+
+        resumed = []
+
+        async def second_connection():
+            async for event in bus.subscribe(since=last_seq):
+                resumed.append(event)
+                if event["type"] == "all_finished":
+                    break
+
+        await asyncio.wait_for(second_connection(), timeout=3.0)
+        assert [e["type"] for e in resumed] == ["all_finished"]
+
+    @pytest.mark.asyncio
+    async def test_replay_respects_filters(self):
+        bus = EventBus()
+        bus.set_loop(asyncio.get_running_loop())
+        bus.emit("finished", {"job_id": "a"})
+        bus.emit("finished", {"job_id": "b"})
+
+        received = []
+
+        async def consumer():
+            async for event in bus.subscribe(job_id="b", since=0):
+                received.append(event)
+                if event["type"] == "done":
+                    break
+
+        task = asyncio.create_task(consumer())
+        await asyncio.sleep(0.02)
+        bus.emit("done", {"job_id": "b"})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert [e["data"]["job_id"] for e in received] == ["b", "b"]
+
+    @pytest.mark.asyncio
+    async def test_spill_read_outside_lock_and_loop(self, tmp_path, monkeypatch):
+        """退避ファイルの読み出し中もバスをブロックせず、並びも保たれる"""
+        bus = EventBus(replay_size=2, spill_path=str(tmp_path / "events.jsonl"))
+        bus.set_loop(asyncio.get_running_loop())
+        for i in range(6):
+            bus.emit("file_finished", {"i": i})
+
+        loop_thread = threading.get_ident()
+        observed = {}
+        original = EventLog._read_spill
+
+        def slow_read(log, after_seq, before_seq):
+            observed["lock_free"] = not bus._lock.locked()
+            observed["off_loop"] = threading.get_ident() != loop_thread
+            # 読み出し中に発行されたイベントはリプレイの後に並ぶ
+            bus.emit("file_finished", {"i": 6})
+            time.sleep(0.05)
+            return original(log, after_seq, before_seq)
+
+        monkeypatch.setattr(EventLog, "_read_spill", slow_read)
+        received = []
+
+        async def consumer():
+            async for event in bus.subscribe(since=0):
+                received.append(event)
+                if event["type"] == "done":
+                    break
+
+        task = asyncio.create_task(consumer())
+        await asyncio.sleep(0.2)
+        bus.emit("done", {})
+        await asyncio.wait_for(task, timeout=3.0)
+
+        assert observed == {"lock_free": True, "off_loop": True}
+        assert [e["data"].get("i") for e in received] == [0, 1, 2, 3, 4, 5, 6, None]
+        bus.shutdown()
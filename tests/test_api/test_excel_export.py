@@ -0,0 +1,133 @@
+"""Excelエクスポート（write-only ストリーミング）のテスト"""
+
+import sys
+import os
+import time
+import tracemalloc
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+from export.excel_exporter import ExcelExporter
+
+pytestmark = pytest.mark.skipif(not OPENPYXL_AVAILABLE, reason="openpyxl not available")
+
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.5, "text": "こんにちは", "speaker": "A"},
+    {"start": 3725.5, "end": 3727.0, "text": ""},
+]
+
+MINUTES = {
+    "title": "定例会議",
+    "date": "2026-01-01",
+    "location": "本社",
+    "attendees": ["田中", "佐藤"],
+    "agenda": ["工程"],
+    "decisions": ["承認"],
+    "action_items": [{"description": "資料作成", "assignee": "田中", "due_date": "1/5"}],
+    "statements": [
+        {"speaker": "田中", "text": "始めます", "statement_type": "決定事項"},
+        {"speaker": "田中", "text": "続けます"},
+        {"speaker": "佐藤", "text": "了解です"},
+    ],
+    "next_meeting": "来週",
+}
+
+
+def _load(path):
+    return openpyxl.load_workbook(path).active
+
+
+class TestTranscriptionExport:
+    """書き起こしシート"""
+
+    def test_values_and_styles(self, tmp_path):
+        path = str(tmp_path / "t.xlsx")
+        assert ExcelExporter().export_transcription(SEGMENTS, path)
+        ws = _load(path)
+
+        assert ws.title == "書き起こし"
+        assert [[c.value for c in row] for row in ws.iter_rows()] == [
+            ["No.", "開始時間", "終了時間", "話者", "テキスト"],
+            [1, "00:00", "00:01", "A", "こんにちは"],
+            [2, "1:02:05", "1:02:07", "Unknown", None],
+        ]
+        assert ws["A1"].font.b and ws["A1"].fill.fgColor.rgb.endswith("4472C4")
+        # 空テキストを含む全データセルに枠線、テキスト列のみ折り返し
+        assert all(c.border.left.style == "thin" for row in ws.iter_rows() for c in row)
+        assert ws["E3"].alignment.wrap_text and not ws["D3"].alignment.wrap_text
+        assert ws.column_dimensions["E"].width == 60
+
+    def test_accepts_generator(self, tmp_path):
+        path = str(tmp_path / "g.xlsx")
+        assert ExcelExporter().export_transcription((s for s in SEGMENTS), path)
+        assert _load(path).max_row == 3
+
+    def test_invalid_segment_returns_false(self, tmp_path):
+        path = str(tmp_path / "bad.xlsx")
+        assert not ExcelExporter().export_transcription([None], path)
+        assert not os.path.exists(path)
+
+
+class TestMeetingMinutesExport:
+    """議事録シート"""
+
+    def test_layout(self, tmp_path):
+        path = str(tmp_path / "m.xlsx")
+        assert ExcelExporter().export_meeting_minutes(MINUTES, path)
+        ws = _load(path)
+
+        assert ws["A1"].value.endswith("議事録") and ws["A1"].font.sz == 16
+        assert ws.row_dimensions[1].height == 30
+        merged = {str(m) for m in ws.merged_cells.ranges}
+        assert {"A1:E1", "B3:E3", "D4:E4", "B5:E5"} <= merged
+
+        labels = {ws.cell(r, 1).value: r for r in range(1, ws.max_row + 1) if ws.cell(r, 1).value}
+        assert ws.cell(labels["決定事項"], 1).fill.fgColor.rgb.endswith("E7E6E6")
+        action_row = labels["アクションアイテム"]
+        assert all(ws.cell(action_row, c).fill.fgColor.rgb.endswith("D9EAD3") for c in range(1, 6))
+        assert ws.cell(action_row + 1, 5).value == "中"
+
+        # 同じ話者の連続発言では話者名を省略
+        first = labels["議事内容"] + 1
+        assert [ws.cell(first + i, 1).value for i in range(3)] == ["田中", None, "佐藤"]
+        assert ws.cell(first, 2).value == "【決定】始めます"
+        assert ws.cell(first, 1).font.color.rgb.endswith("4472C4")
+        assert ws.cell(first + 1, 1).border.left.style is None
+        assert ws.cell(labels["次回会議"], 2).value == "来週"
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+class TestLargeExportBenchmark:
+    """50k 行（MAX_EXPORT_SEGMENTS）の書き出し時間とピークメモリ"""
+
+    def test_50k_rows(self, tmp_path):
+        segments = (
+            {"start": i * 2.0, "end": i * 2.0 + 1.8, "speaker": f"話者{i % 4}",
+             "text": "本日の会議では工程表の見直しについて議論しました。" * 2}
+            for i in range(50_000)
+        )
+        path = str(tmp_path / "large.xlsx")
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            assert ExcelExporter().export_transcription(segments, path)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        print(f"\n50k rows: {elapsed:.2f}s, peak {peak / 1e6:.1f}MB, "
+              f"{os.path.getsize(path) / 1e6:.1f}MB on disk")
+        # write-only モードではワークブック全体を保持しない（従来は約130MB）
+        assert peak < 40e6
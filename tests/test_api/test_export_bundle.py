@@ -0,0 +1,161 @@
+"""複数形式一括エクスポートのテスト"""
+
+import sys
+import os
+import json
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from export.bundle import NormalizedTranscript, export_bundle
+from subtitle_exporter import SubtitleExporter
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+try:
+    from httpx import AsyncClient, ASGITransport
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from api.main import app
+    from api.auth import get_token_manager
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.5, "text": "こんにちは", "speaker": "A"},
+    {"start": 1.5, "end": 3.25, "text": "  ", "speaker": "B"},
+    {"start": 3725.5, "end": 3727.0, "text": "本日の議題です"},
+]
+TEXT = "こんにちは 本日の議題です"
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class TestNormalizedTranscript:
+    """正規化"""
+
+    def test_columns_and_defaults(self):
+        t = NormalizedTranscript.from_segments(TEXT, SEGMENTS)
+        assert len(t) == 3
+        assert t.starts == (0.0, 1.5, 3725.5)
+        assert t.speakers == ("A", "B", None)
+        assert t.speaker_or_unknown(2) == "Unknown"
+        assert t.hms_starts[2] == "1:02:05"
+
+    def test_empty_segments_use_text(self):
+        t = NormalizedTranscript.from_segments(TEXT, [])
+        assert t.texts == (TEXT,)
+        assert t.speakers == ("",)
+
+    def test_invalid_segments_rejected(self):
+        with pytest.raises(TypeError):
+            NormalizedTranscript.from_segments(TEXT, "not a list")
+
+
+class TestExportBundle:
+    """並行書き出し"""
+
+    def test_subtitles_match_single_format_exporter(self, tmp_path):
+        t = NormalizedTranscript.from_segments(TEXT, SEGMENTS)
+        results = export_bundle(t, str(tmp_path / "meeting"), ["srt", "vtt", "txt", "json"])
+
+        assert [r.format for r in results] == ["srt", "vtt", "txt", "json"]
+        assert all(r.success for r in results)
+        exporter = SubtitleExporter()
+        assert _read(tmp_path / "meeting.srt") == exporter.generate_srt_content(SEGMENTS)
+        assert _read(tmp_path / "meeting.vtt") == exporter.generate_vtt_content(SEGMENTS)
+        assert _read(tmp_path / "meeting.txt") == TEXT
+        assert json.loads(_read(tmp_path / "meeting.json")) == {"text": TEXT, "segments": SEGMENTS}
+
+    @pytest.mark.skipif(not OPENPYXL_AVAILABLE, reason="openpyxl not available")
+    def test_xlsx_rows_match_single_format_exporter(self, tmp_path):
+        from export.excel_exporter import ExcelExporter
+        t = NormalizedTranscript.from_segments(TEXT, SEGMENTS)
+        export_bundle(t, str(tmp_path / "bundle"), ["xlsx", "txt"])
+        ExcelExporter().export_transcription(SEGMENTS, str(tmp_path / "single.xlsx"))
+
+        def rows(path):
+            ws = openpyxl.load_workbook(path).active
+            return [[c.value for c in row] for row in ws.iter_rows()]
+
+        assert rows(tmp_path / "bundle.xlsx") == rows(tmp_path / "single.xlsx")
+
+    def test_duplicates_removed_and_unknown_rejected(self, tmp_path):
+        t = NormalizedTranscript.from_segments(TEXT, SEGMENTS)
+        results = export_bundle(t, str(tmp_path / "m"), ["txt", "txt"])
+        assert len(results) == 1
+        with pytest.raises(ValueError):
+            export_bundle(t, str(tmp_path / "m"), ["pdf"])
+
+    def test_failure_reported_per_format(self, tmp_path, monkeypatch):
+        import export.bundle as bundle
+
+        def broken(transcript, path):
+            raise OSError("disk full")
+
+        monkeypatch.setitem(bundle.BUNDLE_WRITERS, "json", broken)
+        t = NormalizedTranscript.from_segments(TEXT, SEGMENTS)
+        results = {r.format: r for r in export_bundle(t, str(tmp_path / "m"), ["txt", "json"])}
+        assert results["txt"].success
+        assert not results["json"].success
+        assert results["json"].error
+        assert os.path.isfile(tmp_path / "m.txt")
+
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE or not APP_AVAILABLE, reason="httpx or app not available")
+class TestExportBundleApi:
+    """POST /api/export/bundle"""
+
+    def _client(self):
+        token = get_token_manager().get_current_token()
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                           headers={"Authorization": f"Bearer {token}"})
+
+    @pytest.mark.asyncio
+    async def test_bundle_returns_per_format_results(self, tmp_path):
+        async with self._client() as client:
+            resp = await client.post("/api/export/bundle", json={
+                "text": TEXT, "segments": SEGMENTS,
+                "output_base": str(tmp_path / "meeting"),
+                "formats": ["txt", "srt", "vtt"],
+            })
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["success"] is True
+        assert [r["format"] for r in data["results"]] == ["txt", "srt", "vtt"]
+        assert all(os.path.isfile(r["output_path"]) for r in data["results"])
+        assert data["trace"]["name"] == "export_bundle"
+        span_names = {c["name"] for c in data["trace"]["children"]}
+        assert {"normalize", "export.txt", "export.srt", "export.vtt"} <= span_names
+
+    @pytest.mark.asyncio
+    async def test_subtitles_require_segments(self, tmp_path):
+        async with self._client() as client:
+            resp = await client.post("/api/export/bundle", json={
+                "text": TEXT, "segments": [],
+                "output_base": str(tmp_path / "meeting"),
+                "formats": ["srt"],
+            })
+        assert resp.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_unknown_format_rejected(self, tmp_path):
+        async with self._client() as client:
+            resp = await client.post("/api/export/bundle", json={
+                "text": TEXT, "output_base": str(tmp_path / "meeting"), "formats": ["pdf"],
+            })
+        assert resp.status_code == 422
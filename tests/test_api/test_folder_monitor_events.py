@@ -0,0 +1,231 @@
+"""FolderMonitorService のイベント駆動監視・準備判定のテスト"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+import api.folder_monitor_service as folder_monitor_service
+from api.folder_monitor_service import FolderMonitorService, WATCHDOG_AVAILABLE
+from file_readiness import ReadinessTracker
+
+
+class _RecordingBus:
+    """emit された new_files_detected を記録する"""
+
+    def __init__(self):
+        self.detected = []
+        self._event = threading.Event()
+
+    def emit(self, event_type, data=None):
+        if event_type == "new_files_detected":
+            self.detected.append(data["files"])
+            self._event.set()
+
+    def wait(self, timeout=10.0):
+        ok = self._event.wait(timeout)
+        self._event.clear()
+        return ok
+
+
+def _write(path, data=b"RIFF0000"):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _stop(monitor):
+    monitor.stop()
+    monitor.join(timeout=10)
+    assert not monitor.is_alive()
+
+
+class TestReadinessTracker:
+    """サイズ・更新時刻の安定による準備判定"""
+
+    def test_ready_after_stable_window(self, tmp_path):
+        clock = _Clock()
+        tracker = ReadinessTracker(stable_seconds=2.0, clock=clock)
+        path = str(tmp_path / "rec.wav")
+        _write(path)
+        tracker.add([path])
+        assert tracker.check() == []
+        assert tracker.next_check_delay() == pytest.approx(2.0, abs=0.1)
+
+        clock.now += 1.5
+        _write(path, b"RIFF00000000")  # 書き込み継続 → 計測やり直し
+        _age(path, 0)
+        assert tracker.check() == []
+        clock.now += 1.9
+        assert tracker.check() == []
+        clock.now += 0.2
+        assert tracker.check() == [path]
+        assert tracker.check() == []  # 既に準備完了
+        assert tracker.ready_paths() == [path] and tracker.pending_count == 0
+
+    def test_old_file_ready_on_first_sight(self, tmp_path):
+        tracker = ReadinessTracker(stable_seconds=2.0)
+        old, empty = str(tmp_path / "old.wav"), str(tmp_path / "empty.wav")
+        _write(old)
+        _write(empty, b"")
+        _age(old, 60)
+        _age(empty, 60)
+        assert tracker.update([old, empty]) == [old]
+        assert tracker.pending_count == 1
+
+    def test_locked_and_vanished_files(self, tmp_path):
+        locked = {True}
+        tracker = ReadinessTracker(stable_seconds=0, lock_check=lambda p: not locked)
+        path = str(tmp_path / "a.wav")
+        _write(path)
+        tracker.add([path])
+        assert tracker.check() == []
+        locked.clear()
+        assert tracker.check() == [path]
+        os.remove(path)
+        tracker.check()
+        assert len(tracker) == 0
+
+    def test_many_candidates_checked_in_one_pass(self, tmp_path):
+        for i in range(300):
+            path = tmp_path / f"rec{i:03d}.wav"
+            _write(path)
+            _age(path, 60)
+        monitor = FolderMonitorService(str(tmp_path), event_bus=_RecordingBus())
+        start = time.perf_counter()
+        files = monitor.get_unprocessed_files()
+        # 従来はファイルごとに1秒待機していた（300ファイルで約5分）
+        assert time.perf_counter() - start < 5.0
+        assert len(files) == 300
+
+
+@pytest.mark.skipif(not WATCHDOG_AVAILABLE, reason="watchdog not available")
+class TestEventMode:
+    """watchdog イベントによる検出"""
+
+    def test_new_file_detected_without_rescan(self, tmp_path, monkeypatch):
+        existing = tmp_path / "old.wav"
+        _write(existing)
+        _age(existing, 60)
+        bus = _RecordingBus()
+        monitor = FolderMonitorService(str(tmp_path), check_interval=60, event_bus=bus)
+
+        scans = []
+        original = monitor._scan_unprocessed
+        monkeypatch.setattr(monitor, "_scan_unprocessed", lambda *a: scans.append(1) or original(*a))
+        monitor.start()
+        try:
+            assert bus.wait()
+            assert bus.detected[0] == [str(existing)]
+
+            _write(tmp_path / "notes.txt")
+            new_file = tmp_path / "new.mp3"
+            _write(new_file)
+            # check_interval (60s) を待たずに検出される
+            assert bus.wait()
+            assert bus.detected[1] == [str(new_file)]
+            assert monitor.get_status()["mode"] == "events"
+            assert monitor.get_status()["detected_files"] == 1
+            assert monitor.get_status()["last_detection_latency"] < 30
+            assert len(scans) == 1
+        finally:
+            _stop(monitor)
+
+    def test_processed_files_not_announced(self, tmp_path):
+        bus = _RecordingBus()
+        monitor = FolderMonitorService(str(tmp_path), check_interval=60, event_bus=bus)
+        done = tmp_path / "done.wav"
+        monitor.mark_as_processed(str(done))
+        monitor.start()
+        try:
+            _write(done)
+            _write(tmp_path / "todo.wav")
+            assert bus.wait()
+            assert bus.detected == [[str(tmp_path / "todo.wav")]]
+        finally:
+            _stop(monitor)
+
+    def test_unready_file_kept_pending(self, tmp_path, monkeypatch):
+        bus = _RecordingBus()
+        monitor = FolderMonitorService(str(tmp_path), check_interval=60, event_bus=bus)
+        ready = threading.Event()
+        monkeypatch.setattr(monitor, "is_file_ready", lambda path: ready.is_set())
+        monitor.start()
+        try:
+            _write(tmp_path / "rec.wav")
+            deadline = time.time() + 10
+            while monitor.get_status()["pending_files"] == 0 and time.time() < deadline:
+                time.sleep(0.05)
+            assert monitor.get_status()["pending_files"] == 1
+            assert bus.detected == []
+            # 新しいイベントがなくても準備待ちは再確認される
+            ready.set()
+            assert bus.wait()
+            assert bus.detected == [[str(tmp_path / "rec.wav")]]
+            assert monitor.get_status()["pending_files"] == 0
+        finally:
+            _stop(monitor)
+
+
+class TestPollingFallback:
+    """watchdog を使えない場合のポーリング"""
+
+    def test_disabled_events_use_polling(self, tmp_path):
+        bus = _RecordingBus()
+        monitor = FolderMonitorService(str(tmp_path), check_interval=60, event_bus=bus,
+                                       use_events=False, stable_seconds=0.5)
+        monitor.start()
+        try:
+            time.sleep(0.2)
+            _write(tmp_path / "a.wav")
+            # 初回スキャン後に作られたファイルは次の全体スキャン（60秒後）まで検出されない
+            assert not bus.wait(timeout=1.0)
+            assert monitor.get_status()["mode"] == "polling"
+        finally:
+            _stop(monitor)
+
+    def test_polling_rechecks_pending_between_scans(self, tmp_path):
+        _write(tmp_path / "a.wav")
+        bus = _RecordingBus()
+        monitor = FolderMonitorService(str(tmp_path), check_interval=60, event_bus=bus,
+                                       use_events=False, stable_seconds=0.5)
+        monitor.start()
+        try:
+            assert bus.wait(timeout=5.0)
+            assert bus.detected == [[str(tmp_path / "a.wav")]]
+            assert monitor.get_status()["detected_files"] == 1
+        finally:
+            _stop(monitor)
+
+    @pytest.mark.skipif(not WATCHDOG_AVAILABLE, reason="watchdog not available")
+    def test_observer_failure_falls_back(self, tmp_path, monkeypatch):
+        def broken_observer():
+            raise OSError("inotify watch limit reached")
+
+        monkeypatch.setattr(folder_monitor_service, "Observer", broken_observer)
+        _write(tmp_path / "a.wav")
+        bus = _RecordingBus()
+        monitor = FolderMonitorService(str(tmp_path), check_interval=60, event_bus=bus)
+        monitor.start()
+        try:
+            assert bus.wait()
+            assert monitor.get_status()["mode"] == "polling"
+        finally:
+            _stop(monitor)
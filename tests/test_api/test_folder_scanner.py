@@ -0,0 +1,151 @@
+"""監視フォルダの再帰スキャン（複数ルート・ディレクトリ一覧キャッシュ）のテスト"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from folder_scanner import DirectoryScanner
+from api.folder_monitor_service import FolderMonitorService, WATCHDOG_AVAILABLE
+
+EXTENSIONS = {".wav", ".mp3"}
+
+
+def _write(path, data=b"RIFF0000"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _age_tree(root, seconds=60):
+    """ツリー内の全ファイル・ディレクトリの更新時刻を過去にする"""
+    past = time.time() - seconds
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames:
+            os.utime(os.path.join(dirpath, name), (past, past))
+        os.utime(dirpath, (past, past))
+
+
+def _dated_tree(root, days=3, per_day=2):
+    paths = []
+    for day in range(days):
+        for i in range(per_day):
+            path = os.path.join(root, "2026", f"10-{day + 1:02d}", f"rec{i}.wav")
+            _write(path)
+            paths.append(path)
+    return sorted(paths)
+
+
+class _RecordingBus:
+    def __init__(self):
+        self.detected = []
+        self._event = threading.Event()
+
+    def emit(self, event_type, data=None):
+        if event_type == "new_files_detected":
+            self.detected.append(data["files"])
+            self._event.set()
+
+    def wait(self, timeout=10.0):
+        ok = self._event.wait(timeout)
+        self._event.clear()
+        return ok
+
+
+class TestDirectoryScanner:
+    """DirectoryScanner"""
+
+    def test_recursive_and_flat(self, tmp_path):
+        root = str(tmp_path)
+        nested = _dated_tree(root)
+        top = os.path.join(root, "top.mp3")
+        _write(top)
+        _write(os.path.join(root, "notes.txt"))
+        _write(os.path.join(root, ".backups", "hidden.wav"))
+
+        assert sorted(DirectoryScanner([root], EXTENSIONS).scan()) == sorted(nested + [top])
+        assert DirectoryScanner([root], EXTENSIONS, recursive=False).scan() == [top]
+
+    def test_unchanged_directories_not_relisted(self, tmp_path):
+        root = str(tmp_path)
+        paths = _dated_tree(root, days=5)
+        _age_tree(root)
+        scanner = DirectoryScanner([root], EXTENSIONS)
+        assert sorted(scanner.scan()) == paths
+        assert scanner.last_stats == {"directories": 7, "listed": 7, "files": 10}
+
+        assert sorted(scanner.scan()) == paths
+        assert scanner.last_stats["listed"] == 0
+
+        # 深い階層への追加は、そのディレクトリだけ読み直して検出する
+        added = os.path.join(root, "2026", "10-03", "late.wav")
+        _write(added)
+        assert added in scanner.scan()
+        assert scanner.last_stats["listed"] == 1
+
+    def test_recently_modified_directory_relisted(self, tmp_path):
+        # 更新時刻の粒度内（RACY_SECONDS）の一覧は信用しない
+        root = str(tmp_path)
+        _write(os.path.join(root, "a.wav"))
+        scanner = DirectoryScanner([root], EXTENSIONS)
+        scanner.scan()
+        scanner.scan()
+        assert scanner.last_stats["listed"] == 1
+
+    def test_removed_subtree_dropped(self, tmp_path):
+        root = str(tmp_path)
+        _dated_tree(root, days=2)
+        _age_tree(root)
+        scanner = DirectoryScanner([root], EXTENSIONS)
+        scanner.scan()
+        day = os.path.join(root, "2026", "10-01")
+        for name in os.listdir(day):
+            os.remove(os.path.join(day, name))
+        os.rmdir(day)
+        assert all("10-01" not in p for p in scanner.scan())
+        assert scanner.last_stats["directories"] == 3
+
+
+class TestMultiRootService:
+    """FolderMonitorService の複数ルート・再帰監視"""
+
+    def test_scan_across_roots(self, tmp_path):
+        share_a, share_b = str(tmp_path / "a"), str(tmp_path / "b")
+        files_a, files_b = _dated_tree(share_a), _dated_tree(share_b, days=1)
+        _write(os.path.join(share_b, "2026", "10-01", "rec0_文字起こし.txt"))
+        _age_tree(str(tmp_path))
+
+        monitor = FolderMonitorService(share_a, additional_folders=[share_b], recursive=True,
+                                       event_bus=_RecordingBus(), use_events=False)
+        assert sorted(monitor.get_unprocessed_files()) == sorted(files_a + files_b[1:])
+
+        monitor.mark_as_processed(files_b[1])
+        assert files_b[1] not in monitor.get_unprocessed_files()
+        with pytest.raises(ValueError):
+            monitor.mark_as_processed(str(tmp_path / "elsewhere.wav"))
+
+    @pytest.mark.skipif(not WATCHDOG_AVAILABLE, reason="watchdog not available")
+    def test_moved_in_directory_detected(self, tmp_path):
+        root = tmp_path / "watched"
+        root.mkdir()
+        staging = tmp_path / "staging" / "10-05"
+        _write(str(staging / "rec.wav"))
+        _age_tree(str(tmp_path / "staging"))
+
+        bus = _RecordingBus()
+        monitor = FolderMonitorService(str(root), check_interval=60, event_bus=bus, recursive=True)
+        monitor.start()
+        try:
+            time.sleep(0.3)
+            os.rename(staging, root / "10-05")
+            # ディレクトリ移動ではファイル単位のイベントが来ないが、次の全体スキャンを待たずに検出する
+            assert bus.wait()
+            assert bus.detected == [[str(root / "10-05" / "rec.wav")]]
+        finally:
+            monitor.stop()
+            monitor.join(timeout=10)
@@ -0,0 +1,377 @@
+"""JobStore / JobScheduler / ジョブAPI テスト"""
+
+import asyncio
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from api.job_store import JobStore
+from api.job_scheduler import JobScheduler
+
+try:
+    from httpx import AsyncClient, ASGITransport
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from api.main import app
+    from api.auth import get_token_manager
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+
+class _RecordingBus:
+    """emit() を記録するだけのテスト用バス"""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, event_type, data=None):
+        with self._lock:
+            self.events.append((event_type, data or {}))
+
+    def of_type(self, event_type):
+        with self._lock:
+            return [d for t, d in self.events if t == event_type]
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestJobStore:
+    """SQLite ジョブストア"""
+
+    def test_claim_order_by_priority_then_fifo(self):
+        store = JobStore(":memory:")
+        b1 = store.add("b1.wav", priority="batch")
+        m1 = store.add("m1.wav", priority="monitor")
+        i1 = store.add("i1.wav", priority="interactive")
+        b2 = store.add("b2.wav", priority="batch")
+
+        order = []
+        while True:
+            job = store.claim_next()
+            if job is None:
+                break
+            order.append(job.job_id)
+            store.finish(job.job_id, "completed", result={"text": ""})
+        assert order == [i1.job_id, m1.job_id, b1.job_id, b2.job_id]
+
+    def test_unknown_priority_rejected(self):
+        store = JobStore(":memory:")
+        with pytest.raises(ValueError):
+            store.add("a.wav", priority="urgent")
+
+    def test_survives_restart_and_recovers_running(self, tmp_path):
+        db = str(tmp_path / "jobs.db")
+        store = JobStore(db)
+        running = store.add("a.wav", priority="batch", options={"remove_fillers": True})
+        queued = store.add("b.wav", priority="batch")
+        assert store.claim_next().job_id == running.job_id
+        store.close()
+
+        reopened = JobStore(db)
+        assert reopened.recover() == 1
+        job = reopened.get(running.job_id)
+        assert job.status == "queued"
+        assert job.options == {"remove_fillers": True}
+        assert reopened.get(queued.job_id).status == "queued"
+        reopened.close()
+
+    def test_recover_fails_orphaned_interactive_jobs(self, tmp_path):
+        db = str(tmp_path / "jobs.db")
+        store = JobStore(db)
+        running = store.add("a.wav", priority="interactive")
+        store.claim_next()
+        queued = store.add("b.wav", priority="interactive")
+        monitor = store.add("c.wav", priority="monitor")
+        store.close()
+
+        reopened = JobStore(db)
+        assert reopened.recover() == 0
+        for job_id in (running.job_id, queued.job_id):
+            job = reopened.get(job_id)
+            assert job.status == "failed"
+            assert job.error and job.finished_at
+        assert reopened.get(monitor.job_id).status == "queued"
+        assert reopened.claim_next().job_id == monitor.job_id
+        reopened.close()
+
+    def test_cancel_only_queued(self):
+        store = JobStore(":memory:")
+        job = store.add("a.wav")
+        store.claim_next()
+        assert store.cancel_queued(job.job_id) is False
+        other = store.add("b.wav")
+        assert store.cancel_queued(other.job_id) is True
+        assert store.get(other.job_id).status == "cancelled"
+
+    def test_cancel_queued_where_bulk(self):
+        store = JobStore(":memory:")
+        running = store.add("r.wav", priority="batch", batch_id="b1")
+        store.claim_next()
+        queued = [store.add(f"{i}.wav", priority="batch", batch_id="b1") for i in range(3)]
+        other = store.add("m.wav", priority="monitor")
+
+        cancelled = store.cancel_queued_where(priority="batch")
+        assert [j.job_id for j in cancelled] == [j.job_id for j in queued]
+        assert all(j.status == "cancelled" and j.finished_at for j in cancelled)
+        assert store.get(running.job_id).status == "running"
+        assert store.get(other.job_id).status == "queued"
+        assert store.cancel_queued_where(priority="batch") == []
+
+    def test_finish_stores_result(self):
+        store = JobStore(":memory:")
+        job = store.add("a.wav")
+        store.claim_next()
+        finished = store.finish(job.job_id, "completed", result={"text": "こんにちは"})
+        assert finished.result == {"text": "こんにちは"}
+        assert finished.progress == 100
+        assert finished.finished_at is not None
+
+
+class TestJobScheduler:
+    """スケジューラ実行ループ"""
+
+    def _make(self, handler):
+        bus = _RecordingBus()
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=bus,
+                                 handlers={"transcribe": handler})
+        return scheduler, bus
+
+    def test_runs_jobs_in_priority_order(self):
+        ran = []
+
+        def handler(job, ctx):
+            ran.append(job.file_path)
+            ctx.progress(50)
+            return {"text": job.file_path}
+
+        scheduler, bus = self._make(handler)
+        scheduler.submit("batch.wav", priority="batch")
+        scheduler.submit("monitor.wav", priority="monitor")
+        scheduler.submit("interactive.wav", priority="interactive")
+        scheduler.start()
+        assert _wait_until(lambda: len(ran) == 3)
+        scheduler.stop()
+        scheduler.join(timeout=5)
+
+        assert ran == ["interactive.wav", "monitor.wav", "batch.wav"]
+        assert len(bus.of_type("job_finished")) == 3
+        assert all("job_id" in d for d in bus.of_type("job_progress"))
+        # interactive のみ従来の progress / finished を発行
+        assert [d["text"] for d in bus.of_type("finished")] == ["interactive.wav"]
+
+    def test_failed_job_reports_generic_error(self):
+        def handler(job, ctx):
+            raise RuntimeError("secret path /home/user")
+
+        scheduler, bus = self._make(handler)
+        job = scheduler.submit("a.wav")
+        scheduler.start()
+        assert _wait_until(lambda: scheduler.get(job.job_id).status == "failed")
+        scheduler.stop()
+
+        assert "secret" not in scheduler.get(job.job_id).error
+        assert bus.of_type("error")[0]["job_id"] == job.job_id
+
+    def test_cancel_queued_and_running(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def handler(job, ctx):
+            started.set()
+            release.wait(timeout=5)
+            ctx.raise_if_cancelled()
+            return {"text": "done"}
+
+        scheduler, bus = self._make(handler)
+        running = scheduler.submit("running.wav")
+        queued = scheduler.submit("queued.wav")
+        scheduler.start()
+        assert started.wait(timeout=5)
+
+        assert scheduler.cancel(queued.job_id).status == "cancelled"
+        assert scheduler.cancel(running.job_id).status == "running"
+        assert scheduler.is_cancel_requested(running.job_id)
+        release.set()
+        assert _wait_until(lambda: scheduler.get(running.job_id).status == "cancelled")
+        scheduler.stop()
+
+    def test_cancel_where_emits_one_summary_per_batch(self, monkeypatch):
+        scheduler, bus = self._make(lambda job, ctx: {"text": "ok"})
+        batch_a, jobs_a = scheduler.submit_batch(["a1.wav", "a2.wav", "a3.wav"])
+        batch_b, jobs_b = scheduler.submit_batch(["b1.wav", "b2.wav"])
+        calls = []
+        original = scheduler.store.batch_summary
+        monkeypatch.setattr(scheduler.store, "batch_summary",
+                            lambda batch_id: calls.append(batch_id) or original(batch_id))
+
+        assert scheduler.cancel_where(priority="batch") == 5
+        assert sorted(calls) == sorted([batch_a, batch_b])
+        assert len(bus.of_type("file_finished")) == 5
+        assert len(bus.of_type("job_finished")) == 5
+        assert [p["completed"] for p in bus.of_type("batch_progress")] == [3, 2]
+        assert {d["batch_id"]: d["failed_count"] for d in bus.of_type("all_finished")} == {
+            batch_a: 3, batch_b: 2,
+        }
+
+    def test_batch_emits_legacy_events(self):
+        scheduler, bus = self._make(lambda job, ctx: {"text": "ok"})
+        batch_id, jobs = scheduler.submit_batch(["a.wav", "b.wav"])
+        scheduler.start()
+        assert _wait_until(lambda: bool(bus.of_type("all_finished")))
+        scheduler.stop()
+
+        progress = bus.of_type("batch_progress")
+        assert [p["completed"] for p in progress] == [1, 2]
+        assert all(p["total"] == 2 and p["batch_id"] == batch_id for p in progress)
+        assert bus.of_type("all_finished") == [
+            {"success_count": 2, "failed_count": 0, "duplicate_count": 0, "batch_id": batch_id}
+        ]
+        assert all(f["success"] for f in bus.of_type("file_finished"))
+
+    def test_purges_expired_jobs_at_startup(self, monkeypatch):
+        store = JobStore(":memory:")
+        old = store.add("old.wav")
+        store.claim_next()
+        store.finish(old.job_id, "completed", result={"text": ""})
+        recent = store.add("recent.wav")
+        store.claim_next()
+        store.finish(recent.job_id, "failed", error="x")
+        queued = store.add("queued.wav", priority="batch")
+        store._conn.execute("UPDATE jobs SET finished_at = ?, created_at = ? WHERE job_id IN (?, ?)",
+                            (time.time() - 3600, time.time() - 3600, old.job_id, queued.job_id))
+
+        monkeypatch.setenv("KOTOBA_JOB_RETENTION_DAYS", "0")
+        assert JobScheduler(store=store, event_bus=_RecordingBus()).retention_seconds is None
+        scheduler = JobScheduler(store=store, event_bus=_RecordingBus(), retention_seconds=600,
+                                 handlers={"transcribe": lambda job, ctx: {"text": ""}})
+        scheduler.start()
+        assert _wait_until(lambda: store.get(queued.job_id).status == "completed")
+        scheduler.stop()
+        scheduler.join(timeout=5)
+
+        assert store.get(old.job_id) is None
+        assert store.get(recent.job_id).status == "failed"
+
+    def test_engine_stays_busy_between_jobs(self):
+        """ジョブ間でスケジューラが待機しない（キューが空になるまで連続実行）"""
+        timestamps = []
+
+        def handler(job, ctx):
+            timestamps.append((time.monotonic(), "start"))
+            time.sleep(0.02)
+            timestamps.append((time.monotonic(), "end"))
+            return {}
+
+        scheduler, _ = self._make(handler)
+        for i in range(5):
+            scheduler.submit(f"{i}.wav", priority="batch")
+        scheduler.start()
+        assert _wait_until(lambda: scheduler.processed_count == 5)
+        scheduler.stop()
+
+        gaps = [timestamps[i + 1][0] - timestamps[i][0]
+                for i in range(1, len(timestamps) - 1, 2)]
+        assert max(gaps) < 0.5
+
+    @pytest.mark.asyncio
+    async def test_wait_resolves_on_completion(self):
+        scheduler, _ = self._make(lambda job, ctx: {"text": "結果"})
+        job = scheduler.submit("a.wav")
+        scheduler.start()
+        finished = await asyncio.wait_for(scheduler.wait(job.job_id), timeout=5)
+        scheduler.stop()
+        assert finished.status == "completed"
+        assert finished.result["text"] == "結果"
+        assert finished.result["trace"]["name"] == "job"
+
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE or not APP_AVAILABLE, reason="httpx or app not available")
+class TestJobsApi:
+    """ジョブAPI と /api/transcribe のキューイング"""
+
+    @pytest.fixture
+    def scheduler(self, monkeypatch):
+        import api.job_scheduler as job_scheduler_module
+
+        release = threading.Event()
+
+        def handler(job, ctx):
+            release.wait(timeout=5)
+            return {"text": f"text:{os.path.basename(job.file_path)}", "segments": []}
+
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=_RecordingBus(),
+                                 handlers={"transcribe": handler})
+        scheduler.release = release
+        monkeypatch.setattr(job_scheduler_module, "_job_scheduler", scheduler)
+        yield scheduler
+        release.set()
+        scheduler.stop()
+
+    @pytest.fixture
+    def audio_files(self, tmp_path):
+        paths = []
+        for name in ("a.wav", "b.wav"):
+            path = tmp_path / name
+            path.write_bytes(b"RIFF0000WAVE")
+            paths.append(str(path))
+        return paths
+
+    def _client(self):
+        token = get_token_manager().get_current_token()
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                           headers={"Authorization": f"Bearer {token}"})
+
+    @pytest.mark.asyncio
+    async def test_submit_list_get_cancel(self, scheduler, audio_files):
+        async with self._client() as client:
+            first = (await client.post("/api/jobs", json={"file_path": audio_files[0]})).json()
+            second = (await client.post("/api/jobs", json={"file_path": audio_files[1]})).json()
+            assert first["status"] == "queued"
+            assert first["priority"] == "batch"
+
+            listed = (await client.get("/api/jobs")).json()
+            assert {j["job_id"] for j in listed["jobs"]} == {first["job_id"], second["job_id"]}
+
+            cancelled = (await client.post(f"/api/jobs/{second['job_id']}/cancel")).json()
+            assert cancelled["status"] == "cancelled"
+
+            scheduler.release.set()
+            assert _wait_until(lambda: scheduler.get(first["job_id"]).status == "completed")
+            job = (await client.get(f"/api/jobs/{first['job_id']}")).json()
+            assert job["result"]["text"] == "text:a.wav"
+
+            missing = await client.get("/api/jobs/unknown")
+            assert missing.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_concurrent_transcribe_queues_instead_of_409(self, scheduler, audio_files):
+        async with self._client() as client:
+            requests = [
+                client.post("/api/transcribe", json={"file_path": path}) for path in audio_files
+            ]
+            tasks = [asyncio.ensure_future(r) for r in requests]
+            await asyncio.sleep(0.1)
+            scheduler.release.set()
+            responses = await asyncio.wait_for(asyncio.gather(*tasks), timeout=10)
+
+        assert [r.status_code for r in responses] == [200, 200]
+        assert sorted(r.json()["text"] for r in responses) == ["text:a.wav", "text:b.wav"]
+        assert all(r.json()["job_id"] for r in responses)
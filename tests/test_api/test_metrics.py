@@ -0,0 +1,201 @@
+"""メトリクスレジストリと /api/metrics のテスト"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+import metrics
+from metrics import MetricsRegistry
+
+try:
+    from httpx import AsyncClient, ASGITransport
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from api.main import app
+    from api.auth import get_token_manager
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+
+def _sample(text, prefix):
+    """出力テキストから prefix で始まるサンプル行の値を取得"""
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestCounter:
+    """スレッドごとのセルに分散したカウンタ"""
+
+    def test_concurrent_increments_are_not_lost(self):
+        counter = MetricsRegistry().counter("c_total", "test")
+
+        def work():
+            for _ in range(10000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # 終了したスレッドのセルも集計に残る
+        assert counter.value == 80000
+
+    def test_dead_thread_cells_are_retired(self):
+        counter = MetricsRegistry().counter("c_total", "test")
+        for _ in range(20):
+            t = threading.Thread(target=lambda: counter.inc(2))
+            t.start()
+            t.join()
+        counter.inc()
+        assert counter.value == 41
+        # 終了したスレッドのセルは合算後に破棄され、呼び出しスレッドの分だけ残る
+        assert len(counter._cells) == 1
+        assert counter.value == 41
+
+    def test_negative_increment_rejected(self):
+        counter = MetricsRegistry().counter("c_total", "test")
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_labels_render_and_escape(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("req_total", "requests", ["path"])
+        counter.labels('a"b').inc(2)
+        counter.labels(path="c").inc()
+        text = registry.render()
+        assert "# TYPE req_total counter" in text
+        assert 'req_total{path="a\\"b"} 2' in text
+        assert 'req_total{path="c"} 1' in text
+
+    def test_wrong_label_count_rejected(self):
+        counter = MetricsRegistry().counter("req_total", "requests", ["path"])
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+
+class TestHistogram:
+    """固定バケットのヒストグラム"""
+
+    def test_cumulative_buckets_and_inclusive_bounds(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram("d_seconds", "durations", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            hist.observe(value)
+        text = registry.render()
+        assert _sample(text, 'd_seconds_bucket{le="0.1"}') == 2
+        assert _sample(text, 'd_seconds_bucket{le="1"}') == 3
+        assert _sample(text, 'd_seconds_bucket{le="+Inf"}') == 4
+        assert _sample(text, "d_seconds_count") == 4
+        assert _sample(text, "d_seconds_sum") == pytest.approx(5.65)
+
+    def test_time_context_manager(self):
+        hist = MetricsRegistry().histogram("t_seconds", "timer")
+        with hist.time():
+            time.sleep(0.01)
+        assert hist.count == 1
+        assert hist.sum >= 0.01
+
+
+class TestRegistry:
+    """登録と出力"""
+
+    def test_same_name_returns_existing(self):
+        registry = MetricsRegistry()
+        assert registry.counter("x_total", "x") is registry.counter("x_total", "x")
+        with pytest.raises(ValueError):
+            registry.histogram("x_total", "x")
+
+    def test_gauge_callback_evaluated_on_render(self):
+        registry = MetricsRegistry()
+        value = [1.0]
+        registry.gauge("g", "gauge", callback=lambda: value[0])
+        value[0] = 42.0
+        assert _sample(registry.render(), "g") == 42
+
+    def test_record_transcription_realtime_factor(self):
+        before = metrics.TRANSCRIPTION_RTF.labels("test_engine").count
+        metrics.record_transcription("test_engine", 2.0, 10.0)
+        assert metrics.TRANSCRIPTION_RTF.labels("test_engine").count == before + 1
+        assert metrics.AUDIO_SECONDS.labels("test_engine").value >= 10.0
+
+    def test_text_formatter_cache_hits_recorded(self):
+        from text_formatter import RegexPatterns
+        hits = metrics.CACHE_REQUESTS.labels("text_pattern", "hit")
+        RegexPatterns.get_filler_pattern("えーと")
+        before = hits.value
+        RegexPatterns.get_filler_pattern("えーと")
+        assert hits.value == before + 1
+
+    @pytest.mark.performance
+    def test_counter_overhead(self):
+        counter = MetricsRegistry().counter("fast_total", "overhead")
+        start = time.perf_counter()
+        for _ in range(100000):
+            counter.inc()
+        elapsed = time.perf_counter() - start
+        assert counter.value == 100000
+        assert elapsed < 1.0
+
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE or not APP_AVAILABLE, reason="httpx or app not available")
+class TestMetricsEndpoint:
+    """GET /api/metrics"""
+
+    @pytest.mark.asyncio
+    async def test_prometheus_text(self, monkeypatch):
+        import api.job_scheduler as job_scheduler_module
+        from api.job_scheduler import JobScheduler
+        from api.job_store import JobStore
+        from api.event_bus import get_event_bus
+
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=get_event_bus())
+        monkeypatch.setattr(job_scheduler_module, "_job_scheduler", scheduler)
+        scheduler.submit("a.wav", priority="batch")
+        emitted_before = metrics.EVENTS_EMITTED.value
+        get_event_bus().emit("metrics_probe", {})
+
+        token = get_token_manager().get_current_token()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                               headers={"Authorization": f"Bearer {token}"}) as client:
+            resp = await client.get("/api/metrics")
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = resp.text
+        assert _sample(text, 'kotoba_job_queue_depth{priority="batch"}') == 1
+        assert _sample(text, 'kotoba_job_queue_depth{priority="interactive"}') == 0
+        assert _sample(text, "process_resident_memory_bytes") > 0
+        assert _sample(text, "kotoba_events_emitted_total") >= emitted_before + 1
+        assert "# TYPE kotoba_transcription_seconds histogram" in text
+
+    @pytest.mark.asyncio
+    async def test_does_not_create_job_store(self, monkeypatch, tmp_path):
+        import api.job_scheduler as job_scheduler_module
+
+        db_path = tmp_path / "jobs.db"
+        monkeypatch.setenv("KOTOBA_JOB_DB", str(db_path))
+        monkeypatch.setattr(job_scheduler_module, "_job_scheduler", None)
+
+        token = get_token_manager().get_current_token()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                               headers={"Authorization": f"Bearer {token}"}) as client:
+            resp = await client.get("/api/metrics")
+
+        assert resp.status_code == 200
+        assert _sample(resp.text, 'kotoba_job_queue_depth{priority="batch"}') == 0
+        assert _sample(resp.text, "kotoba_job_running") == 0
+        assert job_scheduler_module._job_scheduler is None
+        assert not db_path.exists()
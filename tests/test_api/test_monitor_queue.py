@@ -0,0 +1,157 @@
+"""フォルダ監視 → 文字起こしキュー受け渡しのテスト"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from api.job_store import JobStore
+from api.job_scheduler import JobScheduler
+from api.monitor_queue import MonitorJobQueue
+from api.folder_monitor_service import FolderMonitorService
+
+
+class _RecordingBus:
+    """emit() を記録するだけのテスト用バス"""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, event_type, data=None):
+        with self._lock:
+            self.events.append((event_type, data or {}))
+
+    def detected(self):
+        with self._lock:
+            return [d["files"] for t, d in self.events if t == "new_files_detected"]
+
+
+def _wait_until(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _audio_files(folder, count):
+    paths = []
+    past = time.time() - 60
+    for i in range(count):
+        path = folder / f"rec{i}.wav"
+        path.write_bytes(b"RIFF0000")
+        os.utime(path, (past, past))
+        paths.append(str(path))
+    return paths
+
+
+def _scheduler(handler, bus):
+    return JobScheduler(store=JobStore(":memory:"), event_bus=bus, handlers={"transcribe": handler})
+
+
+def _stop(*threads):
+    for thread in threads:
+        thread.stop()
+        thread.join(timeout=10)
+
+
+class TestHandoff:
+    """in-flight による重複排除と上限"""
+
+    def test_rescan_does_not_requeue_in_flight(self, tmp_path):
+        paths = _audio_files(tmp_path, 3)
+        bus = _RecordingBus()
+        scheduler = _scheduler(lambda job, ctx: {"text": ""}, bus)  # 未起動: 実行されない
+        monitor = FolderMonitorService(str(tmp_path), event_bus=bus, use_events=False,
+                                       scheduler=scheduler)
+        for _ in range(3):
+            monitor._dispatch(monitor.get_unprocessed_files())
+
+        assert len(scheduler.store.queued_ids("monitor")) == 3
+        assert [sorted(files) for files in bus.detected()] == [paths]
+        status = monitor.get_status()
+        assert status["queued_files"] == 3 and status["in_flight_files"] == 3
+
+    def test_backpressure_defers_until_capacity(self, tmp_path):
+        paths = _audio_files(tmp_path, 5)
+        bus = _RecordingBus()
+        release = threading.Event()
+
+        def handler(job, ctx):
+            release.wait(10)
+            return {"text": ""}
+
+        scheduler = _scheduler(handler, bus)
+        monitor = FolderMonitorService(str(tmp_path), check_interval=60, event_bus=bus,
+                                       use_events=False, scheduler=scheduler, max_in_flight=2)
+        monitor.start()
+        try:
+            assert _wait_until(lambda: monitor.get_status()["deferred_files"] == 3)
+            assert len(scheduler.store.queued_ids("monitor")) == 2
+
+            scheduler.start()
+            assert _wait_until(lambda: monitor.get_status()["queued_files"] == 1)
+            status = monitor.get_status()
+            assert status["in_flight_files"] == 2 and status["deferred_files"] == 3
+
+            # 完了で空きができると、次の全体スキャン（60秒後）を待たずに保留分が投入される
+            release.set()
+            assert _wait_until(lambda: monitor.get_status()["total_processed"] == 5)
+            status = monitor.get_status()
+            assert status["in_flight_files"] == 0 and status["deferred_files"] == 0
+            assert all(monitor.is_processed(p) for p in paths)
+            assert sorted(sum(bus.detected(), [])) == sorted(paths)
+        finally:
+            _stop(monitor, scheduler)
+
+    def test_failed_file_not_retried_until_modified(self, tmp_path):
+        (path,) = _audio_files(tmp_path, 1)
+        bus = _RecordingBus()
+
+        def handler(job, ctx):
+            raise RuntimeError("decode error")
+
+        scheduler = _scheduler(handler, bus)
+        scheduler.start()
+        try:
+            queue = MonitorJobQueue(scheduler, [str(tmp_path)], on_completed=lambda p: None)
+            assert queue.offer([path]) == ([path], [])
+            assert _wait_until(lambda: queue.get_status()["total_failed"] == 1)
+            assert queue.offer([path]) == ([], [])
+
+            with open(path, "ab") as f:
+                f.write(b"more")
+            assert queue.offer([path]) == ([path], [])
+        finally:
+            _stop(scheduler)
+
+
+class TestResume:
+    """監視再開時の引き継ぎ"""
+
+    def test_adopts_queued_jobs_for_folder(self, tmp_path):
+        inside, = _audio_files(tmp_path, 1)
+        bus = _RecordingBus()
+        scheduler = _scheduler(lambda job, ctx: {"text": ""}, bus)
+        scheduler.submit(inside, priority="monitor")
+        scheduler.submit("/elsewhere/other.wav", priority="monitor")
+
+        marked = []
+        queue = MonitorJobQueue(scheduler, [str(tmp_path)], on_completed=marked.append)
+        assert queue.is_in_flight(inside)
+        assert queue.offer([inside]) == ([], [])
+        assert queue.get_status()["in_flight_files"] == 1
+
+        scheduler.start()
+        try:
+            assert _wait_until(lambda: marked == [inside])
+            assert queue.get_status()["in_flight_files"] == 0
+        finally:
+            _stop(scheduler)
@@ -0,0 +1,150 @@
+"""処理済みファイル台帳（追記型ジャーナル）のテスト"""
+
+import sys
+import os
+import json
+import time
+import pytest
+from unittest.mock import patch
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from processed_ledger import ProcessedLedger, LEDGER_FILENAME, LEGACY_FILENAME
+from api.folder_monitor_service import FolderMonitorService
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if line]
+
+
+class TestJournal:
+    """追記と再読み込み"""
+
+    def test_mark_appends_and_reloads(self, tmp_path):
+        audio = tmp_path / "a.wav"
+        audio.write_bytes(b"RIFF0000")
+        ledger = ProcessedLedger.for_folder(str(tmp_path))
+        ledger.load()
+        ledger.mark(str(audio), content_hash="h1")
+        ledger.mark(str(tmp_path / "gone.wav"))
+        ledger.remove(str(tmp_path / "gone.wav"))
+        ledger.close()
+
+        journal = str(tmp_path / LEDGER_FILENAME)
+        assert len(_lines(journal)) == 3
+
+        reloaded = ProcessedLedger.for_folder(str(tmp_path))
+        assert reloaded.load() == 1
+        entry = reloaded.get(str(audio))
+        assert entry.size == 8 and entry.mtime == pytest.approx(os.path.getmtime(audio))
+        assert reloaded.find_by_hash("h1").path == str(audio)
+        assert str(tmp_path / "gone.wav") not in reloaded
+
+    def test_truncated_record_skipped(self, tmp_path):
+        ledger = ProcessedLedger.for_folder(str(tmp_path))
+        ledger.mark("/x/a.wav")
+        ledger.close()
+        with open(tmp_path / LEDGER_FILENAME, "a", encoding="utf-8") as f:
+            f.write('{"path": "/x/b.w')
+        reloaded = ProcessedLedger.for_folder(str(tmp_path))
+        assert reloaded.load() == 1 and "/x/a.wav" in reloaded
+
+    def test_mark_after_truncated_record_survives(self, tmp_path):
+        ledger = ProcessedLedger.for_folder(str(tmp_path))
+        ledger.mark("/x/a.wav")
+        ledger.close()
+        with open(tmp_path / LEDGER_FILENAME, "a", encoding="utf-8") as f:
+            f.write('{"path": "/x/b.w')
+        resumed = ProcessedLedger.for_folder(str(tmp_path))
+        resumed.load()
+        resumed.mark("/x/c.wav")
+        resumed.close()
+        # 書きかけの行に連結されず、次の記録は独立した行になる
+        reloaded = ProcessedLedger.for_folder(str(tmp_path))
+        assert reloaded.load() == 2
+        assert "/x/a.wav" in reloaded and "/x/c.wav" in reloaded
+
+    def test_compaction(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ProcessedLedger, "COMPACT_MIN_RECORDS", 10)
+        ledger = ProcessedLedger.for_folder(str(tmp_path))
+        for i in range(30):
+            ledger.mark(f"/x/{i % 3}.wav")
+        ledger.close()
+        # 同じ3件の上書きが続くので、行数は有効件数の2倍と下限の大きい方を超えない
+        assert len(_lines(tmp_path / LEDGER_FILENAME)) <= 10
+        reloaded = ProcessedLedger.for_folder(str(tmp_path))
+        assert reloaded.load() == 3
+
+    def test_all_paths_kept_per_hash(self, tmp_path):
+        ledger = ProcessedLedger.for_folder(str(tmp_path))
+        ledger.mark("/x/a.wav", content_hash="h")
+        ledger.mark("/x/b.wav", content_hash="h")
+        assert [e.path for e in ledger.find_all_by_hash("h")] == ["/x/b.wav", "/x/a.wav"]
+        assert ledger.find_by_hash("h").path == "/x/b.wav"
+
+        ledger.remove("/x/b.wav")
+        assert ledger.find_by_hash("h").path == "/x/a.wav"
+        ledger.mark("/x/a.wav", content_hash="other")
+        assert ledger.find_all_by_hash("h") == []
+        ledger.close()
+
+    def test_replace_and_clear(self, tmp_path):
+        ledger = ProcessedLedger.for_folder(str(tmp_path))
+        ledger.mark("/x/a.wav", content_hash="h")
+        ledger.replace(["/x/a.wav", "/x/b.wav"])
+        assert ledger.get("/x/a.wav").content_hash == "h"
+        ledger.clear()
+        assert len(ledger) == 0 and ledger.find_by_hash("h") is None
+        assert _lines(tmp_path / LEDGER_FILENAME) == []
+
+
+class TestLegacyImport:
+    """旧形式の取り込み"""
+
+    def test_processed_files_txt(self, tmp_path):
+        paths = [str(tmp_path / "a.wav"), str(tmp_path / "b.mp3")]
+        (tmp_path / LEGACY_FILENAME).write_text("\n".join(paths) + "\n", encoding="utf-8")
+        ledger = ProcessedLedger.for_folder(str(tmp_path))
+        assert ledger.load() == 2
+        assert set(ledger) == set(paths)
+        assert len(_lines(tmp_path / LEDGER_FILENAME)) == 2
+
+    def test_processed_files_json(self, tmp_path):
+        legacy = tmp_path / "processed_files.json"
+        legacy.write_text(json.dumps({"files": ["/x/a.wav"], "updated": "2026-01-01"}), encoding="utf-8")
+        ledger = ProcessedLedger(str(tmp_path / "ledger.jsonl"), legacy_path=str(legacy))
+        assert ledger.load() == 1 and "/x/a.wav" in ledger
+
+
+class TestFolderMonitorService:
+    """FolderMonitorService からの利用"""
+
+    def test_service_reads_legacy_list_and_appends(self, tmp_path):
+        old = str(tmp_path / "old.wav")
+        (tmp_path / LEGACY_FILENAME).write_text(old + "\n", encoding="utf-8")
+        monitor = FolderMonitorService(str(tmp_path))
+        assert monitor.is_processed(old)
+
+        new = tmp_path / "new.wav"
+        new.write_bytes(b"RIFF")
+        monitor.mark_as_processed(str(new))
+        assert monitor.is_processed(str(new))
+        assert len(_lines(tmp_path / LEDGER_FILENAME)) == 2
+        monitor.remove_from_processed(str(new))
+        assert not monitor.is_processed(str(new))
+
+    def test_marks_do_not_rewrite_list(self, tmp_path):
+        with patch.object(FolderMonitorService, "load_processed_files"):
+            monitor = FolderMonitorService(str(tmp_path))
+        with patch.object(ProcessedLedger, "compact") as compact:
+            start = time.perf_counter()
+            for i in range(5_000):
+                monitor.mark_as_processed(str(tmp_path / f"rec{i}.wav"))
+            elapsed = time.perf_counter() - start
+        compact.assert_not_called()
+        assert len(monitor.processed_files) == 5_000
+        # 従来はマークごとに全件をソートして書き直していた（5000件で数十秒）
+        assert elapsed < 10.0
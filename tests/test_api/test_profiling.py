@@ -0,0 +1,158 @@
+"""ジョブプロファイラのテスト"""
+
+import sys
+import os
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from profiling import JobProfiler, SamplingProfiler
+from api.job_store import JobStore
+from api.job_scheduler import JobScheduler
+
+try:
+    from httpx import AsyncClient, ASGITransport
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from api.main import app
+    from api.auth import get_token_manager
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+
+class _Bus:
+    def emit(self, event_type, data=None):
+        pass
+
+
+def _busy_hot_path(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(200))
+    return total
+
+
+@pytest.fixture(autouse=True)
+def profile_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("KOTOBA_PROFILE_DIR", str(tmp_path))
+    monkeypatch.delenv("KOTOBA_PROFILE", raising=False)
+    return tmp_path
+
+
+class TestSamplingProfiler:
+    """スタックサンプリング"""
+
+    def test_collapsed_stacks_contain_hot_function(self):
+        sampler = SamplingProfiler(interval=0.001)
+        sampler.start()
+        _busy_hot_path(0.2)
+        sampler.stop()
+
+        assert sampler.sample_count > 0
+        folded = sampler.collapsed()
+        hot_lines = [line for line in folded.splitlines() if "_busy_hot_path" in line]
+        assert hot_lines
+        # ルート→リーフの順で、末尾がサンプル数
+        stack, count = hot_lines[0].rsplit(" ", 1)
+        assert int(count) >= 1
+        assert stack.index("test_collapsed_stacks_contain_hot_function") < stack.index("_busy_hot_path")
+
+
+class TestJobProfiler:
+    """予約・常時モードの判定と出力"""
+
+    def test_not_profiled_by_default(self, profile_env):
+        profiler = JobProfiler()
+        with profiler.profile("job1"):
+            pass
+        assert profiler.status()["recent"] == []
+        assert os.listdir(profile_env) == []
+
+    def test_armed_count_consumed(self, profile_env):
+        profiler = JobProfiler()
+        profiler.arm(1, mode="sample", interval=0.001)
+        with profiler.profile("job1", kind="transcribe"):
+            _busy_hot_path(0.05)
+        with profiler.profile("job2"):
+            pass
+
+        recent = profiler.status()["recent"]
+        assert [r["job_id"] for r in recent] == ["job1"]
+        assert recent[0]["kind"] == "transcribe"
+        assert os.path.isfile(profile_env / "job1.folded")
+        assert not os.path.exists(profile_env / "job2.folded")
+
+    def test_cprofile_mode_from_env(self, profile_env, monkeypatch):
+        monkeypatch.setenv("KOTOBA_PROFILE", "cprofile")
+        profiler = JobProfiler()
+        with profiler.profile("batch_会議 1"):
+            _busy_hot_path(0.01)
+
+        files = profiler.status()["recent"][0]["files"]
+        assert [os.path.splitext(f)[1] for f in files] == [".prof", ".txt"]
+        assert all(os.path.isfile(f) for f in files)
+        with open(files[1], encoding="utf-8") as f:
+            assert "_busy_hot_path" in f.read()
+
+    def test_invalid_mode_rejected(self):
+        with pytest.raises(ValueError):
+            JobProfiler().arm(1, mode="perf")
+
+
+class TestSchedulerProfiling:
+    """スケジューラ経由のジョブのプロファイル"""
+
+    def test_next_job_profiled(self, profile_env, monkeypatch):
+        import profiling
+        profiler = JobProfiler()
+        monkeypatch.setattr(profiling, "_job_profiler", profiler)
+        profiler.arm(1, interval=0.001)
+
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=_Bus(),
+                                 handlers={"transcribe": lambda job, ctx: {"text": str(_busy_hot_path(0.05))}})
+        first = scheduler.submit("a.wav", priority="interactive")
+        second = scheduler.submit("b.wav", priority="batch")
+        scheduler.start()
+        try:
+            deadline = time.time() + 5
+            while scheduler.get(second.job_id).status != "completed" and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            scheduler.stop()
+
+        recent = profiler.status()["recent"]
+        assert [r["job_id"] for r in recent] == [first.job_id]
+        assert recent[0]["file_path"] == "a.wav"
+        with open(profile_env / f"{first.job_id}.folded", encoding="utf-8") as f:
+            assert "_busy_hot_path" in f.read()
+
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE or not APP_AVAILABLE, reason="httpx or app not available")
+class TestDebugProfileApi:
+    """/api/debug/profile"""
+
+    @pytest.mark.asyncio
+    async def test_arm_and_status(self, monkeypatch):
+        import profiling
+        monkeypatch.setattr(profiling, "_job_profiler", JobProfiler())
+        token = get_token_manager().get_current_token()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                               headers={"Authorization": f"Bearer {token}"}) as client:
+            resp = await client.post("/api/debug/profile", json={"jobs": 3, "mode": "cprofile"})
+            assert resp.status_code == 200
+            assert resp.json()["armed_remaining"] == 3
+            assert resp.json()["armed_mode"] == "cprofile"
+
+            resp = await client.get("/api/debug/profile")
+            assert resp.json()["armed_remaining"] == 3
+
+            resp = await client.post("/api/debug/profile", json={"jobs": 1, "mode": "perf"})
+            assert resp.status_code == 422
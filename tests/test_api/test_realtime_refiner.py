@@ -0,0 +1,212 @@
+"""AudioSpool / UtteranceRefiner テスト"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+np = pytest.importorskip("numpy")
+
+from api.audio_spool import AudioSpool
+from api.realtime_refiner import UtteranceRefiner
+
+
+class _RecordingBus:
+    """emit() を記録するだけのテスト用バス"""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, event_type, data=None):
+        with self._lock:
+            self.events.append((event_type, data or {}))
+
+
+class _FakeEngine:
+    """WAV パスを受け取り固定テキストを返すエンジン"""
+
+    def __init__(self):
+        self.is_loaded = False
+        self.paths = []
+
+    def load_model(self):
+        self.is_loaded = True
+        return True
+
+    def transcribe(self, audio_path, **kwargs):
+        assert os.path.exists(audio_path)
+        self.paths.append(audio_path)
+        return {"text": "高精度テキスト"}
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestAudioSpool:
+    """ディスク上リングバッファのテスト"""
+
+    def test_append_and_read_roundtrip(self, tmp_path):
+        spool = AudioSpool(sample_rate=100, max_seconds=10, directory=str(tmp_path))
+        audio = np.linspace(-0.5, 0.5, 100, dtype=np.float32)
+        assert spool.append(1, audio)
+        restored = spool.read(1)
+        assert restored is not None
+        assert np.allclose(restored, audio, atol=1e-3)
+        spool.close()
+
+    def test_ring_evicts_oldest(self, tmp_path):
+        spool = AudioSpool(sample_rate=100, max_seconds=3, directory=str(tmp_path))
+        chunk = np.zeros(100, dtype=np.float32)
+        for seg_id in range(1, 5):
+            assert spool.append(seg_id, chunk)
+        # 容量3秒に4秒分書き込み → 最古のセグメントが上書き
+        assert spool.read(1) is None
+        assert spool.read(4) is not None
+        assert spool.evicted == 1
+        spool.close()
+
+    def test_oversized_chunk_rejected(self, tmp_path):
+        spool = AudioSpool(sample_rate=100, max_seconds=1, directory=str(tmp_path))
+        assert spool.append(1, np.zeros(200, dtype=np.float32)) is False
+        spool.close()
+
+    def test_close_removes_file(self, tmp_path):
+        spool = AudioSpool(sample_rate=100, max_seconds=1, directory=str(tmp_path))
+        path = spool.path
+        assert os.path.exists(path)
+        spool.close()
+        assert not os.path.exists(path)
+        assert spool.read(1) is None
+
+
+class TestUtteranceRefiner:
+    """リファインスレッドのテスト"""
+
+    def _make(self, tmp_path, **kwargs):
+        spool = AudioSpool(sample_rate=100, max_seconds=60, directory=str(tmp_path))
+        bus = _RecordingBus()
+        engine = _FakeEngine()
+        refiner = UtteranceRefiner(spool, engine_getter=lambda: engine, event_bus=bus, **kwargs)
+        return refiner, bus, engine, spool
+
+    def test_refines_closed_utterance(self, tmp_path):
+        refiner, bus, engine, spool = self._make(tmp_path, idle_seconds=0.0)
+        refiner.start()
+        refiner.add_segment(1, np.zeros(100, dtype=np.float32), "下書き1")
+        refiner.add_segment(2, np.zeros(100, dtype=np.float32), "下書き2")
+        refiner.finish()
+        refiner.join(timeout=5)
+
+        refined = [d for t, d in bus.events if t == "refined_text"]
+        assert refined == [{
+            "segment_ids": [1, 2],
+            "text": "高精度テキスト 高精度テキスト",
+            "draft_text": "下書き1 下書き2",
+        }]
+        # セグメントごとに再文字起こしする
+        assert len(engine.paths) == 2
+        assert engine.is_loaded is True
+        # 一時 WAV とスプールは削除される
+        assert all(not os.path.exists(p) for p in engine.paths)
+        assert not os.path.exists(spool.path)
+
+    def test_waits_while_speaking(self, tmp_path):
+        refiner, bus, engine, _ = self._make(tmp_path, idle_seconds=0.3)
+        refiner.start()
+        refiner.add_segment(1, np.zeros(100, dtype=np.float32), "下書き")
+        refiner.close_utterance()
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            refiner.notify_activity()
+            time.sleep(0.05)
+        assert engine.paths == []
+        time.sleep(0.8)
+        assert len(engine.paths) == 1
+        refiner.cancel()
+        refiner.join(timeout=5)
+
+    def test_defers_when_engine_busy(self, tmp_path):
+        busy = threading.Event()
+        busy.set()
+        refiner, bus, engine, _ = self._make(tmp_path, idle_seconds=0.0, is_engine_busy=busy.is_set)
+        refiner.start()
+        refiner.add_segment(1, np.zeros(100, dtype=np.float32), "下書き")
+        refiner.close_utterance()
+        time.sleep(0.4)
+        assert engine.paths == []
+        busy.clear()
+        refiner.finish()
+        refiner.join(timeout=5)
+        assert len(engine.paths) == 1
+
+    def test_defers_while_engine_lock_held(self, tmp_path):
+        lock = threading.Lock()
+        lock.acquire()  # ジョブがエンジンを使用中
+        refiner, bus, engine, spool = self._make(tmp_path, idle_seconds=0.0, engine_lock=lock)
+        refiner.start()
+        refiner.add_segment(1, np.zeros(100, dtype=np.float32), "下書き")
+        refiner.close_utterance()
+        time.sleep(0.4)
+        assert engine.paths == []
+        lock.release()
+        refiner.finish()
+        refiner.join(timeout=5)
+        assert len(engine.paths) == 1
+        assert [d["segment_ids"] for t, d in bus.events if t == "refined_text"] == [[1]]
+        assert not lock.locked()
+
+    def test_yields_engine_between_segments(self, tmp_path):
+        lock = threading.Lock()
+        busy = threading.Event()
+        refiner, bus, engine, spool = self._make(tmp_path, idle_seconds=0.0, engine_lock=lock,
+                                                 is_engine_busy=busy.is_set)
+        held = []
+        transcribe = engine.transcribe
+
+        def transcribe_then_queue_job(audio_path, **kwargs):
+            held.append(lock.locked())
+            busy.set()  # 1セグメント目の処理中にジョブが投入された
+            return transcribe(audio_path, **kwargs)
+
+        engine.transcribe = transcribe_then_queue_job
+        for seg_id in (1, 2, 3):
+            refiner.add_segment(seg_id, np.zeros(100, dtype=np.float32), f"下書き{seg_id}")
+        refiner.close_utterance()
+        refiner.start()
+        assert _wait_until(lambda: len(engine.paths) == 1)
+        time.sleep(0.4)
+        # 残りのセグメントは後回し、ロックは解放済み
+        assert len(engine.paths) == 1
+        assert not lock.locked()
+        assert [t for t, _ in bus.events if t == "refined_text"] == []
+
+        engine.transcribe = transcribe
+        busy.clear()
+        refiner.finish()
+        refiner.join(timeout=5)
+        assert held == [True]
+        assert len(engine.paths) == 3
+        refined = [d for t, d in bus.events if t == "refined_text"]
+        assert [d["segment_ids"] for d in refined] == [[1, 2, 3]]
+
+    def test_evicted_audio_is_skipped(self, tmp_path):
+        refiner, bus, engine, spool = self._make(tmp_path, idle_seconds=0.0)
+        refiner.add_segment(1, np.zeros(100, dtype=np.float32), "下書き")
+        spool.discard(1)
+        refiner.finish()
+        refiner.start()
+        refiner.join(timeout=5)
+        assert engine.paths == []
+        assert refiner.skipped_count == 1
@@ -0,0 +1,60 @@
+"""RealtimeWorker デコードスレッドのテスト"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+np = pytest.importorskip("numpy")
+
+from api.realtime_worker import RealtimeWorker
+
+
+class _NullBus:
+    def emit(self, event_type, data=None):
+        pass
+
+
+class TestDecodeLoop:
+    """キャプチャ停止時のデコードキュー処理"""
+
+    def _make(self):
+        worker = RealtimeWorker(event_bus=_NullBus(), adaptive=False)
+        decoded = []
+
+        def transcribe(audio_data, enqueued_at, segment_id=0, utterance_end=True):
+            time.sleep(0.05)
+            decoded.append(segment_id)
+
+        worker._transcribe_chunk = transcribe
+        worker._decode_thread = threading.Thread(target=worker._decode_loop, daemon=True)
+        return worker, decoded
+
+    def test_stop_drains_queued_chunks(self):
+        worker, decoded = self._make()
+        worker._running_event.set()
+        for segment_id in range(1, 6):
+            worker._decode_queue.put((np.zeros(160, dtype=np.float32), time.monotonic(),
+                                      segment_id, True))
+        worker._decode_thread.start()
+
+        # キャプチャ停止 — キューにチャンクが残っている
+        worker._running_event.clear()
+        assert not worker._decode_queue.empty()
+        worker._stop_decode_thread(timeout=5.0)
+
+        assert not worker._decode_thread.is_alive()
+        assert decoded == [1, 2, 3, 4, 5]
+        assert worker._decode_queue.empty()
+
+    def test_stop_without_pending_chunks(self):
+        worker, decoded = self._make()
+        worker._decode_thread.start()
+        worker._stop_decode_thread(timeout=5.0)
+        assert not worker._decode_thread.is_alive()
+        assert decoded == []
@@ -260,21 +260,21 @@ class TestTranscriptionEngineLock:
         assert isinstance(_engine_lock, type(threading.Lock()))
 
     def test_do_transcribe_checks_is_loaded(self):
-        """_do_transcribe がエンジンの is_loaded を確認してから load_model を呼ぶ"""
-        from api.routers.transcription import _do_transcribe
+        """transcribe_file がエンジンの is_loaded を確認してから load_model を呼ぶ"""
+        from api.workers import transcribe_file
 
         mock_engine = MagicMock()
         mock_engine.is_loaded = True
         mock_engine.transcribe.return_value = {"text": "test", "chunks": []}
 
-        mock_bus = MagicMock()
-        mock_req = MagicMock()
-        mock_req.enable_diarization = False
-        mock_req.remove_fillers = False
-        mock_req.add_punctuation = False
-        mock_req.format_paragraphs = False
+        options = {
+            "enable_diarization": False,
+            "remove_fillers": False,
+            "add_punctuation": False,
+            "format_paragraphs": False,
+        }
 
-        text, segments = _do_transcribe(mock_engine, "test.wav", mock_bus, mock_req)
+        text, segments = transcribe_file(mock_engine, "test.wav", options)
 
         # is_loaded=True なので load_model は呼ばれない
         mock_engine.load_model.assert_not_called()
@@ -282,20 +282,20 @@ class TestTranscriptionEngineLock:
 
     def test_do_transcribe_loads_when_not_loaded(self):
         """is_loaded=False のときは load_model が呼ばれる"""
-        from api.routers.transcription import _do_transcribe
+        from api.workers import transcribe_file
 
         mock_engine = MagicMock()
         mock_engine.is_loaded = False
         mock_engine.transcribe.return_value = {"text": "loaded", "chunks": []}
 
-        mock_bus = MagicMock()
-        mock_req = MagicMock()
-        mock_req.enable_diarization = False
-        mock_req.remove_fillers = False
-        mock_req.add_punctuation = False
-        mock_req.format_paragraphs = False
+        options = {
+            "enable_diarization": False,
+            "remove_fillers": False,
+            "add_punctuation": False,
+            "format_paragraphs": False,
+        }
 
-        text, segments = _do_transcribe(mock_engine, "test.wav", mock_bus, mock_req)
+        text, segments = transcribe_file(mock_engine, "test.wav", options)
 
         mock_engine.load_model.assert_called_once()
         assert text == "loaded"
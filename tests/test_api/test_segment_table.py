@@ -0,0 +1,156 @@
+"""列指向セグメントテーブルのテスト"""
+
+import sys
+import os
+import random
+import numpy as np
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from segment_table import SegmentTable, speaker_indices_at, NO_SPEAKER
+from export.common import merge_short_segments, split_long_segments
+from speaker_diarization_utils import SpeakerFormatterMixin
+
+
+SEGMENTS = [
+    {"start": 0.0, "end": 0.4, "text": "はい", "speaker": "A", "confidence": 0.9},
+    {"start": 0.5, "end": 0.8, "text": "はい", "speaker": "A"},
+    {"start": 1.0, "end": 4.0, "text": "本日の議題です。", "speaker": "B"},
+    {"start": 4.0, "end": 12.0, "text": "工程の確認です。予算の確認です。最後に質疑です。"},
+]
+
+
+def _linear_position(time_, speaker_segments):
+    for position, seg in enumerate(speaker_segments):
+        if seg.get("start", 0) <= time_ <= seg.get("end", 0):
+            return position
+    return -1
+
+
+def _random_segments(rng, count):
+    segments = []
+    t = 0.0
+    for _ in range(count):
+        t += rng.choice([0.0, 0.3, 1.0, 2.0])
+        seg = {"start": t, "end": t + rng.choice([0.2, 0.8, 3.0, 8.0]),
+               "text": rng.choice(["", " はい ", "了解です", "第一の文。第二の文！第三の文？" * rng.randint(1, 3)])}
+        if rng.random() < 0.7:
+            seg["speaker"] = rng.choice(["A", "B"])
+        segments.append(seg)
+    return segments
+
+
+class TestColumns:
+    """列とプール"""
+
+    def test_from_dicts_interns_text_and_speakers(self):
+        table = SegmentTable.from_dicts(SEGMENTS)
+        assert len(table) == 4
+        assert table.text_pool.count("はい") == 1
+        assert table.speaker_names == ["A", "B"]
+        assert table.speaker_ids.tolist() == [0, 0, 1, NO_SPEAKER]
+        assert table.starts.dtype == np.float64
+
+    def test_row_is_dict_compatible(self):
+        table = SegmentTable.from_dicts(SEGMENTS)
+        row = table[0]
+        assert row.get("text") == "はい"
+        assert row["confidence"] == pytest.approx(0.9)
+        assert "speaker" not in table[3]
+        assert table[-1].get("speaker") is None
+        assert dict(table[2]) == {"start": 1.0, "end": 4.0, "text": "本日の議題です。", "speaker": "B"}
+        with pytest.raises(IndexError):
+            table[4]
+
+    def test_to_dicts_round_trip(self):
+        table = SegmentTable.from_dicts(SEGMENTS)
+        assert table.to_dicts()[1:] == SEGMENTS[1:]
+        assert table.to_dicts(fields=("text", "speaker"))[3] == {"text": SEGMENTS[3]["text"], "speaker": None}
+
+    def test_slice_is_zero_copy(self):
+        table = SegmentTable.from_dicts(SEGMENTS)
+        part = table[1:3]
+        assert np.shares_memory(part.starts, table.starts)
+        assert part.text_pool is table.text_pool
+        assert part.texts == ["はい", "本日の議題です。"]
+
+
+class TestVectorizedOperations:
+    """ベクトル化された操作"""
+
+    def test_window_on_sorted_table_returns_view(self):
+        table = SegmentTable.from_dicts(SEGMENTS)
+        window = table.window(0.6, 4.0)
+        assert window.texts == ["はい", "本日の議題です。"]
+        assert np.shares_memory(window.starts, table.starts)
+        assert len(table.window(20, 30)) == 0
+
+    def test_overlap_and_speaker_durations(self):
+        table = SegmentTable.from_dicts(SEGMENTS)
+        assert table.overlap_seconds(0.2, 2.0).tolist() == pytest.approx([0.2, 0.3, 1.0, 0.0])
+        assert table.speaker_durations() == pytest.approx({"A": 0.7, "B": 3.0})
+
+    def test_speaker_indices_match_linear_scan(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            speakers = []
+            if rng.random() < 0.5:
+                # 境界で接する連続区間（通常の話者分離結果）
+                boundary = 0.0
+                for i in range(rng.randint(1, 6)):
+                    end = boundary + rng.choice([1.0, 2.5])
+                    speakers.append({"start": boundary, "end": end, "speaker": f"S{i}"})
+                    boundary = end + rng.choice([0.0, 0.5])
+                rng.shuffle(speakers)
+            else:
+                for i in range(rng.randint(1, 8)):
+                    start = rng.choice([0, 1, 2.5, 5])
+                    speakers.append({"start": start, "end": start + rng.choice([0, 1, 2.5, 6]),
+                                     "speaker": f"S{i}"})
+            times = [rng.choice([0, 1, 2.5, 3.5, 5, 7.5, 20]) for _ in range(12)]
+            assert speaker_indices_at(times, speakers).tolist() == \
+                [_linear_position(t, speakers) for t in times]
+
+    def test_assign_speakers(self):
+        table = SegmentTable.from_dicts(SEGMENTS).assign_speakers([
+            {"start": 0.0, "end": 1.0, "speaker": "X"},
+            {"start": 1.0, "end": 3.0, "speaker": "Y"},
+        ])
+        assert table.speakers == ["X", "X", "X", None]
+
+    def test_merge_and_split_match_dict_helpers(self):
+        for seed in range(50):
+            rng = random.Random(seed)
+            segments = _random_segments(rng, rng.randint(0, 25))
+            table = SegmentTable.from_dicts(segments)
+            assert table.split_long(20, 5.0).to_dicts(fields=("start", "end", "text", "speaker")) == \
+                [{"start": s["start"], "end": s["end"], "text": s["text"], "speaker": s.get("speaker")}
+                 for s in split_long_segments(segments, 20, 5.0)]
+            assert table.merge_short(1.0, 40).to_dicts(fields=("start", "end", "text", "speaker")) == \
+                merge_short_segments(segments, 1.0, 40)
+
+    def test_merge_short_joins_same_speaker(self):
+        merged = SegmentTable.from_dicts(SEGMENTS).merge_short(min_duration=1.0, max_chars=40)
+        assert merged.texts[0] == "はい はい"
+        assert merged.ends[0] == 0.8
+        assert merged[0]["confidence"] == pytest.approx(0.9)
+        assert len(merged) == 3
+
+    def test_split_without_long_rows_returns_self(self):
+        table = SegmentTable.from_dicts(SEGMENTS[:3])
+        assert table.split_long(40, 5.0) is table
+
+
+class TestDiarizationFormatting:
+    """話者付きテキストの整形"""
+
+    def test_format_with_speakers_boundary(self):
+        text = SpeakerFormatterMixin().format_with_speakers(
+            [{"start": 0.0, "text": "a"}, {"start": 5.0, "text": "b"}, {"start": 7.0, "text": "c"},
+             {"start": 20.0, "text": "d"}],
+            [{"start": 0.0, "end": 5.0, "speaker": "S1"}, {"start": 5.0, "end": 10.0, "speaker": "S2"}],
+        )
+        assert text == "[S1]\na\nb\n\n[S2]\nc\n\n[UNKNOWN]\nd"
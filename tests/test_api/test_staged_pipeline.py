@@ -0,0 +1,167 @@
+"""StagedPipeline（デコード・推論・後処理の重ね合わせ）のテスト"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+import numpy as np
+
+import optimized_pipeline
+from optimized_pipeline import (
+    AudioDecodeStage, CallableStage, StagedPipeline, TranscriptionStage,
+)
+
+
+def _sleeping(name, seconds, log=None):
+    def func(data):
+        time.sleep(seconds)
+        if log is not None:
+            log.append((name, data))
+        return f"{data}>{name}"
+    return CallableStage(name, func)
+
+
+class TestOverlap:
+    """ステージの並行実行"""
+
+    def test_stages_overlap_and_keep_order(self):
+        stages = [_sleeping("decode", 0.05), _sleeping("infer", 0.05), _sleeping("post", 0.05)]
+        pipeline = StagedPipeline(stages, queue_sizes=[2, 1, 1])
+        start = time.perf_counter()
+        results = list(pipeline.run(range(8)))
+        elapsed = time.perf_counter() - start
+
+        assert [r for _, r, _ in results] == [f"{i}>decode>infer>post" for i in range(8)]
+        # 直列なら 8 * 3 * 0.05 = 1.2 秒。重なれば約 (8 + 2) * 0.05 秒
+        assert elapsed < 0.9
+        utilization = pipeline.get_utilization()
+        assert list(utilization) == ["decode", "infer", "post"]
+        assert all(u["items"] == 8 for u in utilization.values())
+        assert utilization["infer"]["utilization"] > 0.5
+
+    def test_prefetch_bounded_by_queue(self):
+        release = threading.Event()
+        decoded = []
+
+        def decode(data):
+            decoded.append(data)
+            return data
+
+        def infer(data):
+            release.wait(10)
+            return data
+
+        pipeline = StagedPipeline([CallableStage("decode", decode), CallableStage("infer", infer)],
+                                  queue_sizes=[2, 1])
+        results = pipeline.run(range(10))
+        consumer = threading.Thread(target=lambda: list(results))
+        consumer.start()
+        time.sleep(0.3)
+        # 推論中の1件 + キュー2件 + デコード済みで投入待ちの1件まで
+        assert len(decoded) == 4
+        release.set()
+        consumer.join(timeout=10)
+        assert len(decoded) == 10
+        assert pipeline.get_utilization()["decode"]["blocked_seconds"] > 0.1
+
+    def test_errors_skip_later_stages(self):
+        post_seen = []
+
+        def infer(data):
+            if data == 1:
+                raise ValueError("bad audio")
+            return data
+
+        pipeline = StagedPipeline([CallableStage("infer", infer),
+                                   CallableStage("post", lambda d: post_seen.append(d) or d)])
+        results = list(pipeline.run([0, 1, 2]))
+        assert [(s, type(e).__name__ if e else None) for s, _, e in results] == \
+            [(0, None), (1, "ValueError"), (2, None)]
+        assert post_seen == [0, 2]
+
+    def test_early_exit_stops_threads(self):
+        pipeline = StagedPipeline([_sleeping("a", 0.01), _sleeping("b", 0.01)])
+        for source, _, _ in pipeline.run(range(1000)):
+            if source == 3:
+                break
+        assert pipeline.is_stopped
+        assert not [t for t in threading.enumerate() if t.name.startswith("Pipeline-")]
+
+
+class TestStages:
+    """デコード済み音声の受け渡し"""
+
+    def test_decoded_audio_used_by_engine(self, monkeypatch):
+        monkeypatch.setattr(optimized_pipeline, "decode_audio",
+                            lambda path, rate: np.zeros(rate, dtype=np.float32))
+
+        class _Engine:
+            def __init__(self):
+                self.calls = []
+
+            def transcribe_audio(self, audio, sample_rate, return_timestamps=None):
+                self.calls.append(("audio", len(audio), sample_rate))
+                return {"text": "a"}
+
+            def transcribe(self, path, return_timestamps=None):
+                self.calls.append(("path", path))
+                return {"text": "p"}
+
+        engine = _Engine()
+        decode = AudioDecodeStage(should_decode=lambda p: p != "long.wav")
+        pipeline = StagedPipeline([decode, TranscriptionStage(engine)])
+        results = [r for _, r, _ in pipeline.run(["a.wav", "long.wav"])]
+
+        assert engine.calls == [("audio", 16000, 16000), ("path", "long.wav")]
+        assert [r["transcription"]["text"] for r in results] == ["a", "p"]
+        assert all("audio" not in r for r in results)  # 推論後は音声を保持しない
+
+    def test_decoded_bytes_budget_bounds_prefetch(self, monkeypatch):
+        monkeypatch.setattr(optimized_pipeline, "decode_audio",
+                            lambda path, rate: np.zeros(rate, dtype=np.float32))
+        one_second = 16000 * 4
+        decode = AudioDecodeStage(max_buffered_bytes=one_second)
+
+        first = decode.process_one("a.wav")
+        assert first["audio_nbytes"] == one_second
+        assert decode.available_bytes == 0
+        # 保持枠が空くまで後続はデコードせずパスのまま渡す
+        assert decode.process_one("b.wav") == {"audio_path": "b.wav"}
+
+        decode.release(first)
+        decode.release(first)  # 二重解放しても枠は増えない
+        assert "audio" not in first
+        assert decode.available_bytes == one_second
+        assert "audio" in decode.process_one("c.wav")
+
+    def test_transcription_stage_releases_budget(self, monkeypatch):
+        monkeypatch.setattr(optimized_pipeline, "decode_audio",
+                            lambda path, rate: np.zeros(rate, dtype=np.float32))
+
+        class _Engine:
+            def transcribe_audio(self, audio, sample_rate, return_timestamps=None):
+                return {"text": "a"}
+
+            def transcribe(self, path, return_timestamps=None):
+                return {"text": "p"}
+
+        decode = AudioDecodeStage(max_buffered_bytes=16000 * 4)
+        pipeline = StagedPipeline([decode, TranscriptionStage(_Engine(), decode_stage=decode)])
+        results = [r for _, r, _ in pipeline.run(["a.wav", "b.wav", "c.wav"])]
+        assert [r["transcription"]["text"] for r in results][0] == "a"
+        assert decode.available_bytes == 16000 * 4
+
+    def test_missing_ffmpeg_falls_back_to_path(self, monkeypatch):
+        def missing(path, rate):
+            raise FileNotFoundError("ffmpeg")
+
+        monkeypatch.setattr(optimized_pipeline, "decode_audio", missing)
+        stage = AudioDecodeStage()
+        assert stage.process_one("a.wav") == {"audio_path": "a.wav"}
+        assert stage.process_one({"audio_path": "b.wav"}) == {"audio_path": "b.wav"}
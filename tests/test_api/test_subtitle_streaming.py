@@ -0,0 +1,112 @@
+"""字幕・テキストの逐次書き出しと話者索引のテスト"""
+
+import sys
+import os
+import random
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from export.common import SpeakerIndex, atomic_write_iter
+from subtitle_exporter import SubtitleExporter
+from enhanced_subtitle_exporter import EnhancedSubtitleExporter, SRTFormatter, VTTFormatter
+
+
+SEGMENTS = [
+    {"start": 0.5, "end": 3.2, "text": "こんにちは"},
+    {"start": 3.5, "end": 5.0, "text": "  "},
+    {"start": 5.0, "end": 6.8, "text": "<b>進捗</b>"},
+]
+SPEAKERS = [
+    {"start": 0.0, "end": 5.0, "speaker": "話者A"},
+    {"start": 5.0, "end": 11.0, "speaker": "話者B"},
+]
+
+
+def _linear_speaker(time_, speaker_segments):
+    for seg in speaker_segments:
+        if seg.get("start", 0) <= time_ <= seg.get("end", 0):
+            return seg.get("speaker")
+    return None
+
+
+class TestSpeakerIndex:
+    """ソート済み索引による話者検索"""
+
+    def test_boundary_prefers_first_listed(self):
+        index = SpeakerIndex(SPEAKERS)
+        assert [index.speaker_at(t) for t in (0.5, 5.0, 7.0, 12.0)] == ["話者A", "話者A", "話者B", None]
+
+    def test_empty(self):
+        assert SpeakerIndex(None).speaker_at(1.0) is None
+        assert len(SpeakerIndex([])) == 0
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            speakers = []
+            for i in range(rng.randint(1, 12)):
+                start = rng.choice([0, 1, 2.5, 4, 5, 8])
+                speakers.append({"start": start, "end": start + rng.choice([0, 1, 3, 10]),
+                                 "speaker": f"S{i}"})
+            times = sorted(rng.uniform(0, 20) for _ in range(20)) + [0, 5, 4, 2.5, 18]
+            index = SpeakerIndex(speakers)
+            # 単調増加の後に時刻が戻る問い合わせも含める
+            assert [index.speaker_at(t) for t in times] == [_linear_speaker(t, speakers) for t in times]
+
+
+class TestStreamingWriters:
+    """逐次書き出し"""
+
+    def test_iter_joins_to_generated_content(self):
+        exporter = SubtitleExporter()
+        assert "".join(exporter.iter_srt_content(SEGMENTS, SPEAKERS)) == \
+            exporter.generate_srt_content(SEGMENTS, SPEAKERS)
+        assert exporter.generate_srt_content(SEGMENTS, SPEAKERS).startswith("1\n00:00:00,500 --> ")
+        assert exporter.generate_vtt_content(SEGMENTS, SPEAKERS).endswith(
+            "<v 話者A>&lt;b&gt;進捗&lt;/b&gt;</v>\n")
+        assert exporter.generate_vtt_content([]) == "WEBVTT\n"
+
+    def test_export_accepts_generator(self, tmp_path):
+        exporter = SubtitleExporter()
+        path = tmp_path / "out.srt"
+        assert exporter.export_srt((s for s in SEGMENTS), str(path), SPEAKERS)
+        assert path.read_text(encoding="utf-8") == exporter.generate_srt_content(SEGMENTS, SPEAKERS)
+
+    def test_enhanced_formatters_stream(self, tmp_path):
+        segments = [dict(s, speaker="A") for s in SEGMENTS]
+        for fmt, formatter in (("srt", SRTFormatter()), ("vtt", VTTFormatter())):
+            path = tmp_path / f"out.{fmt}"
+            assert EnhancedSubtitleExporter().export(segments, str(path), fmt)
+            assert path.read_text(encoding="utf-8") == formatter.format_segments(segments)
+
+    def test_atomic_write_iter_keeps_original_on_failure(self, tmp_path):
+        path = tmp_path / "out.txt"
+        path.write_text("old", encoding="utf-8")
+
+        def chunks():
+            yield "partial"
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            atomic_write_iter(str(path), chunks())
+        assert path.read_text(encoding="utf-8") == "old"
+        assert os.listdir(tmp_path) == ["out.txt"]
+        assert atomic_write_iter(str(path), iter(["a", "bc"])) == 3
+
+
+@pytest.mark.performance
+class TestLongTranscriptScaling:
+    """長時間の書き起こしでも話者検索が線形走査にならない"""
+
+    def test_many_cues_and_speaker_turns(self, tmp_path):
+        segments = [{"start": i * 2.0, "end": i * 2.0 + 1.5, "text": f"発言{i}"} for i in range(20_000)]
+        speakers = [{"start": i * 8.0, "end": i * 8.0 + 8.0, "speaker": f"話者{i % 5}"}
+                    for i in range(5_000)]
+        start = time.perf_counter()
+        assert SubtitleExporter().export_srt(iter(segments), str(tmp_path / "long.srt"), speakers)
+        # 線形走査では約6秒（索引では 0.3 秒未満）
+        assert time.perf_counter() - start < 5.0
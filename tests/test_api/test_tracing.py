@@ -0,0 +1,175 @@
+"""スパントレーサーのテスト"""
+
+import sys
+import os
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+import tracing
+from api.job_store import JobStore
+from api.job_scheduler import JobScheduler
+
+try:
+    from httpx import AsyncClient, ASGITransport
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from api.main import app
+    from api.auth import get_token_manager
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+
+class _Bus:
+    def emit(self, event_type, data=None):
+        pass
+
+
+class TestSpans:
+    """スパンツリーの記録"""
+
+    def test_span_outside_trace_is_noop(self):
+        with tracing.span("orphan") as s:
+            assert s is None
+        assert tracing.current_span() is None
+
+    def test_nested_tree(self):
+        with tracing.trace("job", job_id="j1") as root:
+            with tracing.span("transcribe"):
+                with tracing.span("inference", chunk_length_s=15):
+                    time.sleep(0.01)
+            with tracing.span("text_format"):
+                pass
+        tree = root.to_dict()
+
+        assert tree["name"] == "job"
+        assert tree["attrs"] == {"job_id": "j1"}
+        assert [c["name"] for c in tree["children"]] == ["transcribe", "text_format"]
+        inference = tree["children"][0]["children"][0]
+        assert inference["attrs"] == {"chunk_length_s": 15}
+        assert inference["duration_ms"] >= 10
+        # 子の開始はルート基準の相対時刻
+        assert tree["children"][1]["start_ms"] >= inference["start_ms"] + inference["duration_ms"]
+
+    def test_exception_marks_span(self):
+        with pytest.raises(ValueError):
+            with tracing.trace("job") as root:
+                with tracing.span("ffmpeg_extract"):
+                    raise ValueError("bad")
+        assert root.children[0].attrs["error"] == "ValueError"
+        assert root.children[0].end is not None
+
+    def test_context_does_not_leak_between_threads(self):
+        seen = []
+        with tracing.trace("job"):
+            thread = threading.Thread(target=lambda: seen.append(tracing.current_span()))
+            thread.start()
+            thread.join()
+        assert seen == [None]
+
+    def test_bind_context_propagates_to_pool(self):
+        with tracing.trace("export") as root:
+            def work(fmt):
+                with tracing.span(fmt):
+                    pass
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(tracing.bind_context(work), ["srt", "vtt"]))
+        assert sorted(c.name for c in root.children) == ["srt", "vtt"]
+
+    def test_span_cap(self, monkeypatch):
+        monkeypatch.setattr(tracing, "MAX_SPANS_PER_TRACE", 3)
+        with tracing.trace("job") as root:
+            for i in range(5):
+                with tracing.span(f"region{i}"):
+                    pass
+        tree = root.to_dict()
+        assert len(tree["children"]) == 2
+        assert tree["attrs"]["dropped_spans"] == 3
+
+
+class TestChromeTrace:
+    """Chrome トレース JSON 出力"""
+
+    def test_complete_events(self, tmp_path):
+        with tracing.trace("job") as root:
+            with tracing.span("inference", path="a.wav"):
+                pass
+        path = tracing.write_chrome_trace(root, str(tmp_path / "t" / "job.trace.json"))
+        data = json.loads(open(path, encoding="utf-8").read())
+
+        events = data["traceEvents"]
+        assert [e["name"] for e in events] == ["job", "inference"]
+        assert all(e["ph"] == "X" for e in events)
+        assert events[0]["ts"] == 0
+        assert events[1]["args"] == {"path": "a.wav"}
+
+    def test_save_trace_disabled_without_env(self, monkeypatch):
+        monkeypatch.delenv("KOTOBA_TRACE_DIR", raising=False)
+        with tracing.trace("job") as root:
+            pass
+        assert tracing.save_trace(root, "job") is None
+
+
+class TestSchedulerTracing:
+    """ジョブ結果へのスパンツリー添付"""
+
+    def test_job_result_carries_trace(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("KOTOBA_TRACE_DIR", str(tmp_path))
+
+        def handler(job, ctx):
+            with tracing.span("inference"):
+                pass
+            with tracing.span("text_format"):
+                pass
+            return {"text": "ok"}
+
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=_Bus(),
+                                 handlers={"transcribe": handler})
+        scheduler.start()
+        try:
+            job = scheduler.submit("a.wav", priority="interactive")
+            deadline = time.time() + 5
+            while scheduler.get(job.job_id).status != "completed" and time.time() < deadline:
+                time.sleep(0.01)
+            finished = scheduler.get(job.job_id)
+        finally:
+            scheduler.stop()
+
+        trace = finished.result["trace"]
+        assert trace["name"] == "job"
+        assert trace["attrs"]["job_id"] == job.job_id
+        assert [c["name"] for c in trace["children"]] == ["inference", "text_format"]
+        assert os.path.isfile(tmp_path / f"{job.job_id}.trace.json")
+
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE or not APP_AVAILABLE, reason="httpx or app not available")
+class TestExportTracing:
+    """エクスポート応答のスパンツリー"""
+
+    @pytest.mark.asyncio
+    async def test_export_response_includes_file_write_span(self, tmp_path):
+        token = get_token_manager().get_current_token()
+        output = tmp_path / "out.srt"
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                               headers={"Authorization": f"Bearer {token}"}) as client:
+            resp = await client.post("/api/export/srt", json={
+                "text": "こんにちは",
+                "segments": [{"text": "こんにちは", "start": 0.0, "end": 1.0}],
+                "output_path": str(output),
+                "format": "srt",
+            })
+        assert resp.status_code == 200
+        trace = resp.json()["trace"]
+        assert trace["name"] == "export"
+        assert trace["attrs"]["format"] == "srt"
+        assert [c["name"] for c in trace["children"]] == ["file_write"]
@@ -0,0 +1,219 @@
+"""/api/transcribe の NDJSON ストリーミング応答テスト"""
+
+import asyncio
+import json
+import sys
+import os
+import threading
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from api.job_store import JobStore
+from api.job_scheduler import JobScheduler
+
+try:
+    from httpx import AsyncClient, ASGITransport
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from api.main import app
+    from api.auth import get_token_manager
+    from api.routers.transcription import _RecordChannel
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+try:
+    from api.workers import transcribe_file
+    WORKERS_AVAILABLE = True
+except ImportError:
+    WORKERS_AVAILABLE = False  # torch 等の依存が無い環境
+
+
+class _NullBus:
+    def emit(self, event_type, data=None):
+        pass
+
+
+class _FakeEngine:
+    is_loaded = True
+
+    def transcribe(self, file_path, return_timestamps=True):
+        return {
+            "text": "こんにちは世界",
+            "chunks": [
+                {"text": "こんにちは", "timestamp": (0.0, 1.0)},
+                {"text": "世界", "timestamp": (1.0, 2.0)},
+            ],
+        }
+
+
+@pytest.mark.skipif(not WORKERS_AVAILABLE, reason="workers not available")
+class TestRecordCallback:
+    """transcribe_file の部分結果通知"""
+
+    def test_segments_then_text(self):
+        records = []
+        text, segments = transcribe_file(
+            _FakeEngine(), "a.wav", {},
+            record_callback=lambda kind, data: records.append((kind, data)),
+        )
+        assert [k for k, _ in records] == ["segment", "segment", "text"]
+        assert records[0][1] == {"index": 0, "start": 0.0, "end": 1.0, "text": "こんにちは"}
+        assert records[-1][1] == {"text": text}
+        assert len(segments) == 2
+
+
+@pytest.mark.skipif(not APP_AVAILABLE, reason="app not available")
+class TestRecordChannel:
+    """ジョブスレッド → レスポンスの有界チャネル"""
+
+    @pytest.mark.asyncio
+    async def test_producer_never_blocks_when_full(self):
+        channel = _RecordChannel(asyncio.get_running_loop(), maxsize=1)
+        thread = threading.Thread(
+            target=lambda: [channel.push("segment", {"index": i}) for i in range(5)]
+        )
+        thread.start()
+        # 受信側が読まなくてもジョブスレッドは即座に戻る
+        thread.join(timeout=2)
+        assert not thread.is_alive()
+        assert channel.spilled == 4
+
+        received = [await asyncio.wait_for(channel.get(), timeout=2) for _ in range(5)]
+        assert [r["index"] for r in received] == [0, 1, 2, 3, 4]
+        assert received[0]["type"] == "segment"
+        with pytest.raises(asyncio.QueueEmpty):
+            channel.get_nowait()
+        channel.close()
+
+    @pytest.mark.asyncio
+    async def test_order_kept_across_spill_and_memory(self):
+        channel = _RecordChannel(asyncio.get_running_loop(), maxsize=2)
+        for i in range(4):
+            channel.push("segment", {"index": i})
+        first = [channel.get_nowait()["index"] for _ in range(3)]
+        # 退避分が残っている間の追記も退避側に入り、順序が保たれる
+        channel.push("segment", {"index": 4})
+        rest = [channel.get_nowait()["index"] for _ in range(2)]
+        assert first + rest == [0, 1, 2, 3, 4]
+        # 退避分を読み切った後はメモリ側に戻る
+        channel.push("text", {"text": "x"})
+        assert channel.get_nowait() == {"type": "text", "text": "x"}
+        channel.close()
+
+    @pytest.mark.asyncio
+    async def test_get_wakes_on_push_from_thread(self):
+        channel = _RecordChannel(asyncio.get_running_loop(), maxsize=1)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0.05)
+        threading.Thread(target=channel.push, args=("segment", {"index": 0})).start()
+        record = await asyncio.wait_for(getter, timeout=2)
+        assert record == {"type": "segment", "index": 0}
+        channel.close()
+
+    @pytest.mark.asyncio
+    async def test_push_after_close_is_dropped(self):
+        channel = _RecordChannel(asyncio.get_running_loop(), maxsize=1)
+        channel.close()
+        channel.push("segment", {"index": 0})
+        with pytest.raises(asyncio.QueueEmpty):
+            channel.get_nowait()
+
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE or not APP_AVAILABLE, reason="httpx or app not available")
+class TestNdjsonResponse:
+    """Accept: application/x-ndjson"""
+
+    @pytest.fixture
+    def audio_file(self, tmp_path):
+        path = tmp_path / "a.wav"
+        path.write_bytes(b"RIFF0000WAVE")
+        return str(path)
+
+    def _install(self, monkeypatch, handler):
+        import api.job_scheduler as job_scheduler_module
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=_NullBus(),
+                                 handlers={"transcribe": handler})
+        monkeypatch.setattr(job_scheduler_module, "_job_scheduler", scheduler)
+        return scheduler
+
+    def _client(self):
+        token = get_token_manager().get_current_token()
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                           headers={"Authorization": f"Bearer {token}"})
+
+    @pytest.mark.asyncio
+    async def test_records_in_order(self, monkeypatch, audio_file):
+        def handler(job, ctx):
+            assert ctx.streaming
+            for i in range(3):
+                ctx.record("segment", {"index": i, "start": i, "end": i + 1, "text": f"s{i}"})
+            ctx.record("speaker", {"speaker": "SPEAKER_00", "start": 0, "end": 3})
+            ctx.record("text", {"text": "整形済み"})
+            return {"text": "整形済み", "segment_count": 3}
+
+        scheduler = self._install(monkeypatch, handler)
+        try:
+            async with self._client() as client:
+                resp = await asyncio.wait_for(client.post(
+                    "/api/transcribe", json={"file_path": audio_file},
+                    headers={"Accept": "application/x-ndjson"},
+                ), timeout=10)
+        finally:
+            scheduler.stop()
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["type"] for r in records] == [
+            "job", "segment", "segment", "segment", "speaker", "text", "done",
+        ]
+        assert records[0]["job_id"] == records[-1]["job_id"]
+        assert records[-1]["segment_count"] == 3
+        assert records[5]["text"] == "整形済み"
+
+    @pytest.mark.asyncio
+    async def test_failure_reported_as_record(self, monkeypatch, audio_file):
+        def handler(job, ctx):
+            ctx.record("segment", {"index": 0, "start": 0, "end": 1, "text": "s0"})
+            raise RuntimeError("secret path")
+
+        scheduler = self._install(monkeypatch, handler)
+        try:
+            async with self._client() as client:
+                resp = await asyncio.wait_for(client.post(
+                    "/api/transcribe", json={"file_path": audio_file},
+                    headers={"Accept": "application/x-ndjson"},
+                ), timeout=10)
+        finally:
+            scheduler.stop()
+
+        records = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["type"] for r in records] == ["job", "segment", "error"]
+        assert "secret" not in records[-1]["message"]
+
+    @pytest.mark.asyncio
+    async def test_json_mode_not_streaming(self, monkeypatch, audio_file):
+        def handler(job, ctx):
+            assert not ctx.streaming
+            ctx.record("segment", {"index": 0})  # 受信者なし — 無視される
+            return {"text": "全文", "segments": [{"text": "全文", "start": 0, "end": 1}]}
+
+        scheduler = self._install(monkeypatch, handler)
+        try:
+            async with self._client() as client:
+                resp = await asyncio.wait_for(client.post(
+                    "/api/transcribe", json={"file_path": audio_file},
+                ), timeout=10)
+        finally:
+            scheduler.stop()
+
+        assert resp.status_code == 200
+        assert resp.json()["text"] == "全文"
+        assert len(resp.json()["segments"]) == 1
@@ -0,0 +1,229 @@
+"""書き起こしアーカイブ（.ktb）のテスト"""
+
+import sys
+import os
+import json
+import time
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from export.transcript_archive import (
+    ArchiveFormatError, TranscriptArchive, read_archive, write_archive,
+)
+from export.bundle import NormalizedTranscript, export_bundle
+
+try:
+    from httpx import AsyncClient, ASGITransport
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from api.main import app
+    from api.auth import get_token_manager
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.5, "text": "こんにちは", "speaker": "話者A", "confidence": 0.5,
+     "words": [{"word": "こんにちは", "start": 0.0, "end": 1.5, "probability": 0.75}]},
+    {"start": 1.5, "end": 3.0, "text": "🎤 emoji と English"},
+    {"start": 3725.5, "end": 3727.0, "text": "本日の議題です", "speaker": "話者B",
+     "words": [{"word": "本日", "start": 3725.5, "end": 3726.0},
+               {"word": "の議題です", "start": 3726.0, "end": 3727.0, "probability": 0.5}]},
+]
+TEXT = "こんにちは\n本日の議題です"
+
+
+def _long_segments(count):
+    return [{"start": i * 2.0, "end": i * 2.0 + 1.8, "speaker": f"話者{i % 4}",
+             "text": f"発言{i}：本日の会議では工程表の見直しについて議論しました。"}
+            for i in range(count)]
+
+
+class TestRoundTrip:
+    """書き込み → 読み込み"""
+
+    def test_segments_words_and_metadata(self, tmp_path):
+        path = str(tmp_path / "m.ktb")
+        write_archive(path, TEXT, SEGMENTS, metadata={"source": "会議.wav"},
+                      engine_config={"model_size": "base"}, block_rows=2)
+        text, segments, metadata = read_archive(path)
+        assert text == TEXT
+        assert segments == SEGMENTS
+        assert metadata == {"source": "会議.wav"}
+        with TranscriptArchive(path) as archive:
+            assert archive.engine_config == {"model_size": "base"}
+            assert archive.speakers == ["話者A", "話者B"]
+            assert len(archive) == 3 and archive.duration == 3727.0
+
+    def test_empty(self, tmp_path):
+        path = str(tmp_path / "e.ktb")
+        write_archive(path, "", [])
+        assert read_archive(path) == ("", [], {})
+        with TranscriptArchive(path) as archive:
+            assert len(archive.read_table(0, 10)) == 0
+
+    def test_bundle_writes_archive(self, tmp_path):
+        t = NormalizedTranscript.from_segments(TEXT, SEGMENTS)
+        assert export_bundle(t, str(tmp_path / "m"), ["ktb"])[0].success
+        assert read_archive(str(tmp_path / "m.ktb"))[1] == SEGMENTS
+
+
+class TestRangeReads:
+    """ブロック索引による時間範囲読み込み"""
+
+    def test_only_overlapping_blocks_decoded(self, tmp_path, monkeypatch):
+        import export.transcript_archive as module
+        path = str(tmp_path / "long.ktb")
+        write_archive(path, "", _long_segments(2_000), block_rows=100)
+
+        decoded = []
+        original = module._decode_block
+        monkeypatch.setattr(module, "_decode_block",
+                            lambda data, names: decoded.append(1) or original(data, names))
+        with TranscriptArchive(path) as archive:
+            table = archive.read_table(1000.5, 1004.0)
+            assert table.starts.tolist() == [1000.0, 1002.0]
+            assert table.speakers == ["話者0", "話者1"]
+            assert len(decoded) == 1
+            # ブロック境界をまたぐ範囲
+            segments = archive.read_segments(398.0, 402.0)
+            assert [s["start"] for s in segments] == [398.0, 400.0]
+            assert len(decoded) == 3
+            assert len(archive.read_segments(10_000, 20_000)) == 0
+            assert len(archive.read_table()) == 2_000
+
+
+class TestInvalidArchives:
+    """不正なファイル"""
+
+    def test_bad_magic_and_version(self, tmp_path):
+        path = tmp_path / "bad.ktb"
+        path.write_bytes(b"not an archive at all")
+        with pytest.raises(ArchiveFormatError):
+            TranscriptArchive(str(path))
+
+        good = tmp_path / "good.ktb"
+        write_archive(str(good), TEXT, SEGMENTS)
+        data = bytearray(good.read_bytes())
+        data[4] = 99
+        path.write_bytes(bytes(data))
+        with pytest.raises(ArchiveFormatError, match="version"):
+            TranscriptArchive(str(path))
+
+    def test_truncated(self, tmp_path):
+        path = tmp_path / "t.ktb"
+        write_archive(str(path), TEXT, SEGMENTS)
+        path.write_bytes(path.read_bytes()[:-6])
+        with pytest.raises(ArchiveFormatError):
+            read_archive(str(path))
+
+
+def _archive_with_header(path, header):
+    """任意のヘッダーを持つアーカイブを書き出す"""
+    import zlib
+    from export import transcript_archive as module
+    body = module._PREAMBLE.pack(module._MAGIC, module.ARCHIVE_VERSION, 0)
+    header_data = zlib.compress(json.dumps(header).encode("utf-8"))
+    path.write_bytes(body + header_data + module._TRAILER.pack(len(body), len(header_data), module._MAGIC))
+    return str(path)
+
+
+class TestInvalidHeaders:
+    """必須キーが欠けた・型が不正なヘッダー"""
+
+    @pytest.mark.parametrize("header", [
+        [],
+        {},
+        {"version": 1, "segment_count": 0, "duration": 0.0, "text": [8, 0]},
+        {"version": 1, "segment_count": 0, "duration": 0.0, "blocks": []},
+        {"version": 1, "segment_count": "3", "duration": 0.0, "text": [8, 0], "blocks": []},
+        {"version": 1, "segment_count": 0, "duration": 0.0, "text": [8, 0], "blocks": [[8, 0]]},
+        {"version": 1, "segment_count": 0, "duration": 0.0, "text": [8, 0], "blocks": [],
+         "speakers": "A"},
+    ])
+    def test_rejected_as_format_error(self, tmp_path, header):
+        path = _archive_with_header(tmp_path / "h.ktb", header)
+        with pytest.raises(ArchiveFormatError):
+            read_archive(path)
+
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE or not APP_AVAILABLE, reason="httpx or app not available")
+class TestArchiveApi:
+    """POST /api/export/ktb と /api/export/archive/read"""
+
+    def _client(self):
+        token = get_token_manager().get_current_token()
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                           headers={"Authorization": f"Bearer {token}"})
+
+    @pytest.mark.asyncio
+    async def test_export_then_read_range(self, tmp_path):
+        path = str(tmp_path / "meeting.ktb")
+        async with self._client() as client:
+            resp = await client.post("/api/export/ktb", json={
+                "text": TEXT, "segments": SEGMENTS, "output_path": path, "format": "ktb",
+                "metadata": {"title": "定例"},
+            })
+            assert resp.status_code == 200
+            resp = await client.post("/api/export/archive/read", json={
+                "path": path, "start": 3000, "include_text": False,
+            })
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["segments"] == SEGMENTS[2:]
+        assert data["text"] is None
+        assert data["metadata"] == {"title": "定例"}
+        assert data["total_segments"] == 3
+
+    @pytest.mark.asyncio
+    async def test_read_rejects_invalid_archive(self, tmp_path):
+        bad = tmp_path / "bad.ktb"
+        bad.write_bytes(b"garbage")
+        async with self._client() as client:
+            resp = await client.post("/api/export/archive/read", json={"path": str(bad)})
+            assert resp.status_code == 400
+            resp = await client.post("/api/export/archive/read", json={"path": str(tmp_path / "none.ktb")})
+            assert resp.status_code == 400
+            missing = _archive_with_header(tmp_path / "missing.ktb", {"version": 1})
+            resp = await client.post("/api/export/archive/read", json={"path": missing})
+            assert resp.status_code == 400
+
+
+@pytest.mark.performance
+class TestArchiveBenchmark:
+    """JSON エクスポートとのサイズ・読み込み時間の比較"""
+
+    def test_smaller_and_faster_than_json(self, tmp_path):
+        segments = _long_segments(20_000)
+        json_path = tmp_path / "long.json"
+        json_path.write_text(json.dumps({"text": "", "segments": segments}, ensure_ascii=False, indent=2),
+                             encoding="utf-8")
+        archive_path = str(tmp_path / "long.ktb")
+        write_archive(archive_path, "", segments)
+
+        start = time.perf_counter()
+        with open(json_path, encoding="utf-8") as f:
+            json.load(f)
+        json_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        with TranscriptArchive(archive_path) as archive:
+            archive.read_table()
+        archive_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        with TranscriptArchive(archive_path) as archive:
+            archive.read_table(20_000, 20_060)
+        range_seconds = time.perf_counter() - start
+
+        json_size, archive_size = os.path.getsize(json_path), os.path.getsize(archive_path)
+        print(f"\n20k segments: json {json_size / 1e6:.2f}MB / {json_seconds * 1e3:.1f}ms, "
+              f"ktb {archive_size / 1e6:.2f}MB / {archive_seconds * 1e3:.1f}ms, "
+              f"range {range_seconds * 1e3:.2f}ms")
+        assert archive_size * 4 < json_size
+        assert range_seconds < json_seconds
@@ -0,0 +1,356 @@
+"""ストリーミングアップロード（スプール・逐次デコード・区間切り出し・API）テスト"""
+
+import asyncio
+import sys
+import os
+import threading
+import time
+import numpy as np
+import pytest
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from api.job_store import JobStore
+from api.job_scheduler import JobScheduler
+from api.upload_stream import (
+    SpeechRegionSegmenter,
+    StreamingDecoder,
+    UploadAborted,
+    UploadSpool,
+    UploadStalled,
+    get_upload_registry,
+)
+from exceptions import AudioFormatError
+
+try:
+    from httpx import AsyncClient, ASGITransport
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from api.main import app
+    from api.auth import get_token_manager
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+SR = 16000
+
+# stdin をそのまま stdout へ流す「デコーダ」（ffmpeg の代わりに s16le PCM を通す）
+PASSTHROUGH = [sys.executable, "-u", "-c",
+               "import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer, 4096)"]
+
+
+def _pcm(seconds, amplitude=0.0):
+    t = np.arange(int(SR * seconds)) / SR
+    audio = amplitude * np.sin(2 * np.pi * 440 * t)
+    return (audio * 32767).astype(np.int16).tobytes()
+
+
+class _NullBus:
+    def emit(self, event_type, data=None):
+        pass
+
+
+def _energy(frame):
+    return float(np.sqrt(np.mean(frame * frame))) >= 0.01
+
+
+class TestUploadSpool:
+    """書き込み途中ファイルの読み出し"""
+
+    def test_reader_waits_for_data_then_eof(self, tmp_path):
+        spool = UploadSpool(str(tmp_path / "a.wav"))
+        reader = spool.open_reader()
+        received = []
+
+        def read_all():
+            while True:
+                chunk = reader.read(4)
+                if not chunk:
+                    break
+                received.append(chunk)
+
+        thread = threading.Thread(target=read_all)
+        thread.start()
+        spool.write(b"abcd")
+        spool.write(b"efgh")
+        spool.finish()
+        thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert b"".join(received) == b"abcdefgh"
+
+    def test_abort_releases_reader(self, tmp_path):
+        spool = UploadSpool(str(tmp_path / "a.wav"))
+        reader = spool.open_reader()
+        errors = []
+
+        def read():
+            try:
+                reader.read()
+            except UploadAborted as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        spool.abort()
+        thread.join(timeout=5)
+        assert len(errors) == 1
+        with pytest.raises(UploadAborted):
+            spool.write(b"late")
+
+    def test_stalled_upload_times_out(self, tmp_path):
+        spool = UploadSpool(str(tmp_path / "a.wav"), idle_timeout=0.2)
+        spool.write(b"abcd")
+        reader = spool.open_reader()
+        assert reader.read(100) == b"abcd"
+        start = time.monotonic()
+        with pytest.raises(UploadStalled):
+            reader.read(100)
+        assert time.monotonic() - start < 2
+        # 書き手にも中断が伝わる
+        with pytest.raises(UploadAborted):
+            spool.write(b"late")
+        with pytest.raises(UploadAborted):
+            spool.wait_complete()
+
+    def test_stalled_upload_does_not_block_queue(self, tmp_path):
+        spool = get_upload_registry().create("stalled", str(tmp_path / "s.wav"), idle_timeout=0.3)
+        ran = []
+
+        def upload_handler(job, ctx):
+            try:
+                spool.wait_complete()
+            finally:
+                get_upload_registry().remove("stalled")
+                spool.remove()
+            return {"text": ""}
+
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=_NullBus(),
+                                 handlers={"upload": upload_handler,
+                                           "transcribe": lambda job, ctx: ran.append(job) or {}})
+        stalled = scheduler.submit(spool.path, kind="upload", options={"upload_id": "stalled"})
+        queued = scheduler.submit("next.wav")
+        scheduler.start()
+        try:
+            deadline = time.monotonic() + 5
+            while scheduler.get(queued.job_id).status != "completed" and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            scheduler.stop()
+            scheduler.join(timeout=5)
+        assert scheduler.get(stalled.job_id).status == "failed"
+        assert scheduler.get(queued.job_id).status == "completed"
+        assert not os.path.exists(spool.path)
+
+    def test_completed_spool(self, tmp_path):
+        spool = UploadSpool(str(tmp_path / "done.wav"))
+        spool.write(b"0123456789")
+        spool.finish()
+        reader = UploadSpool.completed(spool.path).open_reader()
+        assert reader.read(100) == b"0123456789"
+        assert reader.read(100) == b""
+        reader.close()
+        spool.remove()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_partial_upload_not_treated_as_completed(self, tmp_path):
+        # 受信途中でプロセスが止まった（finish() されていない）
+        spool = UploadSpool(str(tmp_path / "partial.wav"))
+        spool.write(b"01234")
+        with pytest.raises(UploadAborted):
+            UploadSpool.completed(spool.path)
+
+        # 完了後にファイルが切り詰められた場合もサイズ照合で弾く
+        spool.finish()
+        with open(spool.path, "wb") as f:
+            f.write(b"01")
+        with pytest.raises(UploadAborted):
+            UploadSpool.completed(spool.path)
+
+
+class TestStreamingDecoder:
+    """受信中ファイルの逐次デコード"""
+
+    def test_frames_arrive_before_upload_finishes(self, tmp_path):
+        spool = UploadSpool(str(tmp_path / "a.pcm"))
+        decoder = StreamingDecoder(spool.open_reader(), frame_seconds=0.25, command=PASSTHROUGH)
+        first_frame = threading.Event()
+        frames = []
+
+        def consume():
+            for frame in decoder.frames():
+                frames.append(frame)
+                first_frame.set()
+
+        thread = threading.Thread(target=consume)
+        thread.start()
+        spool.write(_pcm(1.0, 0.5))
+        # 残りを送る前に先頭のフレームが出てくる
+        assert first_frame.wait(timeout=10)
+        spool.write(_pcm(1.0, 0.5))
+        spool.finish()
+        thread.join(timeout=10)
+
+        assert sum(len(f) for f in frames) == 2 * SR
+        assert frames[0].dtype == np.float32
+
+    def test_decoder_failure_raises_audio_format_error(self, tmp_path):
+        spool = UploadSpool(str(tmp_path / "a.pcm"))
+        spool.write(b"\x00" * 100)
+        spool.finish()
+        decoder = StreamingDecoder(spool.open_reader(),
+                                   command=[sys.executable, "-c", "import sys; sys.exit(3)"])
+        with pytest.raises(AudioFormatError):
+            list(decoder.frames())
+
+
+class TestSpeechRegionSegmenter:
+    """無音区切りの区間確定"""
+
+    def _audio(self, *parts):
+        return np.concatenate([
+            np.frombuffer(_pcm(sec, amp), dtype=np.int16).astype(np.float32) / 32768.0
+            for sec, amp in parts
+        ])
+
+    def test_regions_split_on_silence(self):
+        seg = SpeechRegionSegmenter(is_speech=_energy, min_silence_s=0.5)
+        audio = self._audio((1.0, 0.0), (1.0, 0.5), (1.0, 0.0), (1.0, 0.5))
+        regions = []
+        # 不揃いなチャンクで逐次投入
+        for i in range(0, len(audio), 7000):
+            regions.extend(seg.feed(audio[i:i + 7000]))
+        # 最初の区間は2つ目の発話より前に確定している
+        assert len(regions) == 1
+        regions.extend(seg.flush())
+
+        assert len(regions) == 2
+        assert regions[0].start == pytest.approx(1.0, abs=0.05)
+        assert regions[1].start == pytest.approx(3.0, abs=0.05)
+        assert regions[1].end == pytest.approx(4.0, abs=0.05)
+
+    def test_long_speech_capped_at_max_region(self):
+        seg = SpeechRegionSegmenter(is_speech=_energy, max_region_s=2.0)
+        regions = seg.feed(self._audio((5.0, 0.5))) + seg.flush()
+        assert len(regions) == 3
+        assert all(r.end - r.start <= 2.0 + 1e-6 for r in regions)
+
+    def test_silence_only_yields_nothing(self):
+        seg = SpeechRegionSegmenter(is_speech=_energy)
+        assert seg.feed(self._audio((3.0, 0.0))) + seg.flush() == []
+
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE or not APP_AVAILABLE, reason="httpx or app not available")
+class TestUploadApi:
+    """POST /api/upload"""
+
+    @pytest.fixture(autouse=True)
+    def upload_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("KOTOBA_UPLOAD_DIR", str(tmp_path / "uploads"))
+        return tmp_path / "uploads"
+
+    def _client(self):
+        token = get_token_manager().get_current_token()
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                           headers={"Authorization": f"Bearer {token}"})
+
+    def _install(self, monkeypatch, handler, **handlers):
+        import api.job_scheduler as job_scheduler_module
+
+        scheduler = JobScheduler(store=JobStore(":memory:"), event_bus=_NullBus(),
+                                 handlers={"upload": handler, **handlers})
+        monkeypatch.setattr(job_scheduler_module, "_job_scheduler", scheduler)
+        return scheduler
+
+    @pytest.mark.asyncio
+    async def test_job_reads_while_uploading(self, monkeypatch):
+        first_chunk_seen = threading.Event()
+
+        def handler(job, ctx):
+            spool = get_upload_registry().get(job.options["upload_id"])
+            reader = spool.open_reader()
+            total = 0
+            while True:
+                chunk = reader.read()
+                if not chunk:
+                    break
+                total += len(chunk)
+                first_chunk_seen.set()
+            reader.close()
+            get_upload_registry().remove(job.options["upload_id"])
+            spool.remove()
+            return {"text": f"{total} bytes", "segments": []}
+
+        scheduler = self._install(monkeypatch, handler)
+
+        async def body():
+            yield b"x" * 1000
+            # ジョブが受信途中のデータを読むまで残りを送らない
+            assert await asyncio.to_thread(first_chunk_seen.wait, 5)
+            yield b"y" * 500
+
+        try:
+            async with self._client() as client:
+                resp = await asyncio.wait_for(client.post(
+                    "/api/upload", params={"filename": "talk.wav", "wait": "true"},
+                    content=body(),
+                ), timeout=10)
+        finally:
+            scheduler.stop()
+
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["bytes_received"] == 1500
+        assert data["text"] == "1500 bytes"
+        assert data["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_rejected_upload_removes_unstarted_spool(self, monkeypatch, upload_dir):
+        import api.routers.upload as upload_router
+
+        monkeypatch.setattr(upload_router, "MAX_UPLOAD_BYTES", 1000)
+        busy, release = threading.Event(), threading.Event()
+
+        def blocking(job, ctx):
+            busy.set()
+            release.wait(5)
+            return {}
+
+        scheduler = self._install(monkeypatch, lambda job, ctx: {}, transcribe=blocking)
+        scheduler.submit("other.wav")  # 先行ジョブでアップロードジョブを待機させる
+        scheduler.ensure_started()
+        assert await asyncio.to_thread(busy.wait, 5)
+
+        async def body():
+            yield b"x" * 600
+            yield b"y" * 600
+
+        try:
+            async with self._client() as client:
+                resp = await client.post("/api/upload", params={"filename": "talk.wav"},
+                                         content=body())
+        finally:
+            release.set()
+            scheduler.stop()
+
+        assert resp.status_code == 413
+        assert [j.status for j in scheduler.list(status="cancelled")] == ["cancelled"]
+        assert scheduler.list(status="cancelled")[0].started_at is None
+        assert list(upload_dir.iterdir()) == []
+        assert len(get_upload_registry()) == 0
+
+    @pytest.mark.asyncio
+    async def test_unsupported_extension_rejected(self, monkeypatch):
+        scheduler = self._install(monkeypatch, lambda job, ctx: {})
+        try:
+            async with self._client() as client:
+                resp = await client.post("/api/upload", params={"filename": "notes.txt"},
+                                         content=b"hello")
+        finally:
+            scheduler.stop()
+        assert resp.status_code == 400
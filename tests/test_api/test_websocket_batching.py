@@ -0,0 +1,143 @@
+"""WebSocket 送信キュー・バッチフラッシュ・エンコードのテスト"""
+
+import asyncio
+import json
+import sys
+import os
+import pytest
+from unittest.mock import AsyncMock
+
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from api.websocket import (
+    ClientConnection,
+    ConnectionManager,
+    MSGPACK_AVAILABLE,
+    available_encodings,
+    encode_events,
+)
+
+
+def _events(n, event_type="text_ready"):
+    return [{"type": event_type, "data": {"i": i}, "seq": i + 1} for i in range(n)]
+
+
+class TestEncodeEvents:
+    """フレームエンコード"""
+
+    def test_json_single(self):
+        frame = encode_events(_events(1), "json", batched=False)
+        assert isinstance(frame, str)
+        assert json.loads(frame)["seq"] == 1
+
+    def test_json_batched(self):
+        frame = encode_events(_events(3), "json", batched=True)
+        assert [e["seq"] for e in json.loads(frame)] == [1, 2, 3]
+
+    def test_japanese_not_escaped(self):
+        frame = encode_events([{"type": "text_ready", "data": {"text": "こんにちは"}}], "json")
+        assert "こんにちは" in frame
+
+    @pytest.mark.skipif(not MSGPACK_AVAILABLE, reason="msgpack not installed")
+    def test_msgpack_batched(self):
+        import msgpack
+        frame = encode_events(_events(3), "msgpack", batched=True)
+        assert isinstance(frame, bytes)
+        assert [e["seq"] for e in msgpack.unpackb(frame, raw=False)] == [1, 2, 3]
+
+    def test_available_encodings(self):
+        assert "json" in available_encodings()
+        assert ("msgpack" in available_encodings()) == MSGPACK_AVAILABLE
+
+
+class TestClientConnection:
+    """接続ごとの送信ループ"""
+
+    @pytest.mark.asyncio
+    async def test_unbatched_sends_one_frame_per_event(self):
+        ws = AsyncMock()
+        client = ClientConnection(ws)
+        sender = asyncio.create_task(client.run_sender())
+        for event in _events(3):
+            await client.put(event)
+        await asyncio.sleep(0.05)
+        sender.cancel()
+
+        assert ws.send_text.await_count == 3
+        assert client.frames_sent == 3
+        assert client.events_sent == 3
+
+    @pytest.mark.asyncio
+    async def test_batched_packs_events_into_one_frame(self):
+        ws = AsyncMock()
+        client = ClientConnection(ws, flush_interval=0.03)
+        sender = asyncio.create_task(client.run_sender())
+        for event in _events(20):
+            await client.put(event)
+        await asyncio.sleep(0.1)
+        sender.cancel()
+
+        assert ws.send_text.await_count == 1
+        payload = json.loads(ws.send_text.await_args.args[0])
+        assert [e["seq"] for e in payload] == list(range(1, 21))
+        assert client.events_sent == 20
+
+    @pytest.mark.asyncio
+    async def test_flush_interval_clamped(self):
+        client = ClientConnection(AsyncMock(), flush_interval=10.0)
+        assert client.flush_interval == 0.2
+
+    def test_unsupported_encoding_rejected(self):
+        with pytest.raises(ValueError):
+            ClientConnection(AsyncMock(), encoding="xml")
+
+    @pytest.mark.asyncio
+    async def test_send_failure_releases_waiting_put(self):
+        ws = AsyncMock()
+        ws.send_text.side_effect = RuntimeError("closed")
+        client = ClientConnection(ws, max_pending=1)
+        sender = asyncio.create_task(client.run_sender())
+        await client.put(_events(1)[0])
+        await asyncio.sleep(0.01)
+        assert sender.done()
+        # 満杯でも待機し続けない
+        await asyncio.wait_for(client.put(_events(1)[0]), timeout=1.0)
+
+
+class TestSlowClientIsolation:
+    """遅いクライアントが他の接続を妨げない"""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_does_not_wait_for_slow_client(self, monkeypatch):
+        monkeypatch.setattr("api.websocket.verify_websocket_token_from_header", lambda ws: True)
+        mgr = ConnectionManager()
+        slow_gate = asyncio.Event()
+
+        async def slow_send(_frame):
+            await slow_gate.wait()
+
+        slow_ws, fast_ws = AsyncMock(), AsyncMock()
+        slow_ws.send_text.side_effect = slow_send
+        for ws in (slow_ws, fast_ws):
+            assert await mgr.connect(ws)
+
+        slow = mgr.open_stream(slow_ws)
+        fast = mgr.open_stream(fast_ws)
+        tasks = [asyncio.create_task(c.run_sender()) for c in (slow, fast)]
+
+        for i in range(5):
+            await asyncio.wait_for(mgr.broadcast("text_ready", {"i": i}), timeout=1.0)
+        await asyncio.sleep(0.05)
+
+        assert fast_ws.send_text.await_count == 5
+        assert slow_ws.send_text.await_count == 1
+        stats = mgr.get_stats()
+        assert len(stats) == 2
+
+        slow_gate.set()
+        for t in tasks:
+            t.cancel()
+        mgr.disconnect(slow_ws)
+        assert mgr.get_client(slow_ws) is None
@@ -5041,14 +5041,14 @@ class TestBatchTranscriptionWorkerInit:
         worker.cancel()
         assert worker._cancel_event.is_set() is True
 
-    def test_cancel_with_executor(self):
-        """executor存在時のキャンセル"""
+    def test_cancel_with_pipeline(self):
+        """パイプライン実行中のキャンセル"""
         worker = BatchTranscriptionWorker(["/a.mp3"])
-        mock_executor = MagicMock()
-        worker._executor = mock_executor
+        mock_pipeline = MagicMock()
+        worker._pipeline = mock_pipeline
         worker.cancel()
         assert worker._cancel_event.is_set() is True
-        mock_executor.shutdown.assert_called_once_with(wait=False)
+        mock_pipeline.stop.assert_called_once_with()
 
     def test_process_single_file_cancelled(self):
         """キャンセル済みファイルの処理"""